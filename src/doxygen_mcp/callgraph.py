@@ -0,0 +1,281 @@
+"""
+Call/reference graph queries over Doxygen XML
+
+With ``REFERENCES_RELATION``/``REFERENCED_BY_RELATION`` enabled, every memberdef
+in the XML output lists the members it references and is referenced by. This
+module loads those edges once into a compact graph and answers caller/callee,
+reachability, impact and shortest-path queries without Graphviz.
+
+Refids are interned to dense integers and edges are stored in CSR form (an
+offsets array plus a flat targets array, for both directions) using the stdlib
+``array`` module, so a graph with millions of edges costs a few bytes per edge
+and neighbour lookups are plain slices.
+"""
+
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .xmldiff import _compound_files, find_xml_dir
+
+QUERIES = ("callers", "callees", "reachable", "impact", "path")
+
+
+class CSR:
+    """
+    @brief Compressed sparse row adjacency for one edge direction
+
+    @details Neighbours of node ``n`` are ``targets[offsets[n]:offsets[n + 1]]``.
+    """
+
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, node_count: int, sources: array, destinations: array):
+        counts = array("q", bytes(8 * (node_count + 1)))
+        for source in sources:
+            counts[source + 1] += 1
+        for node in range(node_count):
+            counts[node + 1] += counts[node]
+        offsets = array("q", counts)
+        cursor = array("q", counts)
+        targets = array("i", bytes(4 * len(sources)))
+        for source, destination in zip(sources, destinations):
+            targets[cursor[source]] = destination
+            cursor[source] += 1
+
+        # Drop duplicate edges (a reference listed on both ends) row by row.
+        unique = array("i")
+        self.offsets = array("q", [0])
+        for node in range(node_count):
+            row = sorted(set(targets[offsets[node]:offsets[node + 1]]))
+            unique.extend(row)
+            self.offsets.append(len(unique))
+        self.targets = unique
+
+    def neighbours(self, node: int) -> array:
+        """@brief Adjacent nodes of a node"""
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+
+class CallGraph:
+    """
+    @brief Member reference graph loaded from a Doxygen XML output
+    """
+
+    def __init__(self):
+        self.refids: List[str] = []
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self.forward: Optional[CSR] = None
+        self.reverse: Optional[CSR] = None
+
+    def _intern(self, refid: str) -> int:
+        node = self._ids.get(refid)
+        if node is None:
+            node = len(self.refids)
+            self._ids[refid] = node
+            self.refids.append(refid)
+            self.names.append("")
+            self.kinds.append("")
+        return node
+
+    @classmethod
+    def from_xml(cls, xml_dir: Path) -> "CallGraph":
+        """
+        @brief Stream-load reference edges from every compound file
+        @param xml_dir Directory containing ``index.xml``
+        @return Loaded graph
+        """
+        graph = cls()
+        sources, destinations = array("i"), array("i")
+        for _, path in _compound_files(xml_dir):
+            try:
+                graph._load_compound(path, sources, destinations)
+            except ET.ParseError:
+                continue
+        graph._finish(sources, destinations)
+        return graph
+
+    def _load_compound(self, path: Path, sources: array, destinations: array) -> None:
+        compound_id = ""
+        compound_name = ""
+        for event, element in ET.iterparse(str(path), events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == "compounddef":
+                    compound_id = element.get("id", "")
+                continue
+            if tag == "compoundname":
+                compound_name = (element.text or "").strip()
+            elif tag == "memberdef":
+                refid = element.get("id", "")
+                node = self._intern(refid)
+                # Files and groups also list members of classes and namespaces; as in
+                # xmldiff.py, the compound whose id prefixes the member's names it.
+                owned = refid.startswith(compound_id + "_1") or "_1" not in refid
+                if owned or not self.names[node]:
+                    name = (element.findtext("name") or "").strip()
+                    self.names[node] = f"{compound_name}::{name}" if compound_name else name
+                    self.kinds[node] = element.get("kind", "")
+                for ref in element.iterfind("references"):
+                    if ref.get("refid"):
+                        sources.append(node)
+                        destinations.append(self._intern(ref.get("refid")))
+                for ref in element.iterfind("referencedby"):
+                    if ref.get("refid"):
+                        sources.append(self._intern(ref.get("refid")))
+                        destinations.append(node)
+                element.clear()
+            elif tag in ("programlisting", "listofallmembers"):
+                element.clear()
+
+    def _finish(self, sources: array, destinations: array) -> None:
+        count = len(self.refids)
+        self.forward = CSR(count, sources, destinations)
+        self.reverse = CSR(count, destinations, sources)
+        for node, name in enumerate(self.names):
+            if not name:
+                continue
+            self._by_name.setdefault(name, []).append(node)
+            short = name.rsplit("::", 1)[-1]
+            if short != name:
+                self._by_name.setdefault(short, []).append(node)
+
+    @property
+    def node_count(self) -> int:
+        """@brief Number of interned members"""
+        return len(self.refids)
+
+    @property
+    def edge_count(self) -> int:
+        """@brief Number of distinct reference edges"""
+        return len(self.forward) if self.forward else 0
+
+    def resolve(self, symbol: str) -> List[int]:
+        """
+        @brief Nodes matching a refid, qualified name or unqualified name
+        @param symbol Refid, ``Scope::name`` or ``name`` (``.`` is accepted as scope separator)
+        @return Matching nodes (overloads yield several)
+        """
+        if symbol in self._ids:
+            return [self._ids[symbol]]
+        return list(self._by_name.get(symbol.replace(".", "::"), []))
+
+    def describe(self, node: int, depth: int = 1) -> Dict[str, object]:
+        """@brief JSON-friendly description of a node"""
+        return {"refid": self.refids[node], "name": self.names[node] or self.refids[node],
+                "kind": self.kinds[node], "depth": depth}
+
+    def neighbours(self, nodes: Iterable[int], reverse: bool = False) -> List[int]:
+        """
+        @brief Direct callees (or callers) of a set of nodes
+        @param nodes Start nodes
+        @param reverse Follow edges backwards (callers)
+        @return Distinct neighbour nodes
+        """
+        csr = self.reverse if reverse else self.forward
+        seen = set()
+        result = []
+        for node in nodes:
+            for neighbour in csr.neighbours(node):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    result.append(neighbour)
+        return result
+
+    def reachable(self, nodes: Sequence[int], reverse: bool = False, max_depth: int = 0) -> List[Tuple[int, int]]:
+        """
+        @brief Breadth-first transitive closure
+        @param nodes Start nodes (not included in the result unless reached via a cycle)
+        @param reverse Follow edges backwards (impact analysis)
+        @param max_depth Stop after this many hops (0 for unlimited)
+        @return (node, depth) pairs in BFS order
+        """
+        csr = self.reverse if reverse else self.forward
+        depth_of = {node: 0 for node in nodes}
+        queue = deque(nodes)
+        result: List[Tuple[int, int]] = []
+        while queue:
+            node = queue.popleft()
+            depth = depth_of[node]
+            if max_depth and depth >= max_depth:
+                continue
+            for neighbour in csr.neighbours(node):
+                if neighbour not in depth_of:
+                    depth_of[neighbour] = depth + 1
+                    result.append((neighbour, depth + 1))
+                    queue.append(neighbour)
+        return result
+
+    def shortest_path(self, sources: Sequence[int], targets: Sequence[int], max_depth: int = 0) -> List[int]:
+        """
+        @brief Shortest call chain from any source to any target
+        @param sources Start nodes
+        @param targets Goal nodes
+        @param max_depth Give up beyond this many hops (0 for unlimited)
+        @return Node sequence from source to target, or an empty list if unreachable
+        """
+        goals = set(targets)
+        parent: Dict[int, int] = {node: -1 for node in sources}
+        depth_of = {node: 0 for node in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            if node in goals:
+                path = [node]
+                while parent[path[-1]] != -1:
+                    path.append(parent[path[-1]])
+                return path[::-1]
+            if max_depth and depth_of[node] >= max_depth:
+                continue
+            for neighbour in self.forward.neighbours(node):
+                if neighbour not in parent:
+                    parent[neighbour] = node
+                    depth_of[neighbour] = depth_of[node] + 1
+                    queue.append(neighbour)
+        return []
+
+
+class GraphCache:
+    """
+    @brief Small LRU of loaded graphs, invalidated when ``index.xml`` changes
+    """
+
+    def __init__(self, max_graphs: int = 4):
+        self.max_graphs = max_graphs
+        self._graphs: "OrderedDict[str, Tuple[Tuple[int, int], CallGraph]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> CallGraph:
+        """
+        @brief Graph for a project, XML output or XML directory
+        @param path Anything find_xml_dir() accepts
+        @return Loaded (possibly cached) graph
+        """
+        xml_dir = find_xml_dir(Path(path)).resolve()
+        stat = (xml_dir / "index.xml").stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = str(xml_dir)
+        with self._lock:
+            cached = self._graphs.get(key)
+            if cached and cached[0] == signature:
+                self._graphs.move_to_end(key)
+                return cached[1]
+        graph = CallGraph.from_xml(xml_dir)
+        with self._lock:
+            self._graphs[key] = (signature, graph)
+            self._graphs.move_to_end(key)
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        return graph
+
+
+graph_cache = GraphCache()
@@ -0,0 +1,271 @@
+"""
+Change detection for project trees
+
+Scans and rebuild decisions need two things: the list of files in a project and
+the files that changed since the last build. In a git checkout both come from
+data git already maintains: ``git ls-files`` reads the index instead of walking
+the tree, and ``git diff --name-only`` against the commit of the last build
+yields the change set. Trees that are not git repositories (or machines without
+git) fall back to walking the file system and comparing modification times and
+sizes.
+
+A snapshot taken before a build records the state to compare against later. For
+git it holds the HEAD commit plus the stat signature of files that differed from
+HEAD at build time (uncommitted edits and untracked files), so it stays small on
+clean checkouts. Build inputs git cannot see (ignored files such as generated
+headers, and INPUT entries outside the project) are compared by stat signature.
+"""
+
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+GIT_TIMEOUT = 60
+
+Signature = Tuple[int, int]
+
+
+class FileListing(NamedTuple):
+    """@brief Files of a project and how they were found"""
+
+    files: List[Path]
+    method: str  # "git" or "filesystem"
+
+
+class ChangeSet(NamedTuple):
+    """@brief Files changed since a snapshot"""
+
+    changed: List[str]
+    method: str
+    base: str  # commit of the snapshot, empty for file-system snapshots
+
+
+def _git(root: Path, *args: str) -> Optional[bytes]:
+    """
+    @brief Run a git command in a directory
+    @param root Working directory
+    @param args git arguments
+    @return Standard output, or None when git is missing or the command fails
+    """
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=str(root), capture_output=True, timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _split(output: bytes) -> List[str]:
+    """@brief Paths of NUL-separated git output"""
+    return [item for item in output.decode("utf-8", errors="surrogateescape").split("\0") if item]
+
+
+def _visible(relative: str) -> bool:
+    """@brief Whether a path avoids hidden directories, like the file-system walk"""
+    return not any(part.startswith(".") for part in relative.split("/")[:-1])
+
+
+def _excluded(relative: str, exclude: Sequence[str]) -> bool:
+    return any(relative == prefix or relative.startswith(prefix + "/") for prefix in exclude)
+
+
+def is_git_tree(root: Path) -> bool:
+    """
+    @brief Whether a directory is inside a git work tree
+    @param root Directory to check
+    @return True if git is available and ``root`` belongs to a work tree
+    """
+    output = _git(root, "rev-parse", "--is-inside-work-tree")
+    return output is not None and output.strip() == b"true"
+
+
+def _git_files(root: Path) -> Optional[List[str]]:
+    """
+    @brief Files present below ``root`` according to git, relative to ``root``
+    @return Tracked and untracked, non-ignored files, or None outside a git tree
+
+    @details Tracked files come from the index rather than a directory walk.
+    Files deleted from the work tree but still in the index are left out.
+    """
+    if not is_git_tree(root):
+        return None
+    listed = _git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+    deleted = _git(root, "ls-files", "-z", "--deleted")
+    if listed is None or deleted is None:
+        return None
+    gone = set(_split(deleted))
+    return sorted({name for name in _split(listed) if name not in gone and _visible(name)})
+
+
+def walk_files(root: Path, exclude: Sequence[str] = ()) -> Iterable[Path]:
+    """
+    @brief Yield every file below a directory, skipping hidden directories
+    @param root Root directory to walk
+    @param exclude Directories relative to ``root`` not to descend into
+    @return Iterator over file paths
+    """
+    for directory, subdirectories, files in os.walk(root):
+        relative = Path(directory).relative_to(root).as_posix()
+        subdirectories[:] = sorted(
+            name for name in subdirectories
+            if not name.startswith(".")
+            and not _excluded(name if relative == "." else f"{relative}/{name}", exclude)
+        )
+        for name in files:
+            yield Path(directory) / name
+
+
+def list_files(root: Path) -> FileListing:
+    """
+    @brief List the files of a project, from git's index when possible
+    @param root Project directory
+    @return Files and the method used ("git" or "filesystem")
+
+    @details In a git checkout, files ignored through ``.gitignore`` are not
+    listed, so build output and vendored dependencies do not skew scans.
+    """
+    names = _git_files(root)
+    if names is not None:
+        return FileListing([root / name for name in names], "git")
+    return FileListing(list(walk_files(root)), "filesystem")
+
+
+def _signature(path: Path) -> Optional[Signature]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _walk_signatures(root: Path, exclude: Sequence[str]) -> Dict[str, Optional[Signature]]:
+    """@brief Stat signature of every file found by the file-system walk"""
+    return {path.relative_to(root).as_posix(): _signature(path) for path in walk_files(root, exclude)}
+
+
+def _git_dirty(root: Path, commit: str) -> Optional[List[str]]:
+    """
+    @brief Files below ``root`` that differ from a commit, including untracked ones
+    @param root Directory inside a git work tree
+    @param commit Commit to compare the work tree with (empty for "no commit yet")
+    @return Paths relative to ``root``, or None if git cannot answer
+    """
+    if commit:
+        diff = _git(root, "diff", "--name-only", "--relative", "-z", commit, "--")
+        untracked = _git(root, "ls-files", "-z", "--others", "--exclude-standard")
+    else:
+        diff = b""
+        untracked = _git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    return sorted(set(_split(diff)) | set(_split(untracked)))
+
+
+def _external_signatures(root: Path, inputs: Sequence[Path]) -> Dict[str, Optional[Signature]]:
+    """@brief Stat signature of every input file outside ``root``, by absolute path"""
+    signatures: Dict[str, Optional[Signature]] = {}
+    for path in inputs:
+        if not path.is_relative_to(root):
+            files = [path] if path.is_file() else walk_files(path)
+            signatures.update((file.as_posix(), _signature(file)) for file in files)
+    return signatures
+
+
+def _uncovered_signatures(
+    root: Path, inputs: Sequence[Path], exclude: Sequence[str]
+) -> Optional[Dict[str, Optional[Signature]]]:
+    """
+    @brief Stat signatures of input files git does not track
+    @param root Directory inside a git work tree
+    @param inputs Absolute input files and directories (e.g. a Doxyfile's INPUT)
+    @param exclude Directories relative to ``root`` to ignore
+    @return Ignored files below ``root`` (relative) and files outside it (absolute),
+    or None if git cannot answer
+    """
+    signatures = _external_signatures(root, inputs)
+    for path in inputs:
+        if not path.is_relative_to(root):
+            continue
+        relative = path.relative_to(root).as_posix()
+        ignored = _git(root, "ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--", relative)
+        if ignored is None:
+            return None
+        for name in _split(ignored):
+            if _visible(name) and not _excluded(name, exclude):
+                signatures[name] = _signature(root / name)
+    return signatures
+
+
+def snapshot(root: Path, exclude: Sequence[str] = (), inputs: Sequence[Path] = ()) -> Dict[str, object]:
+    """
+    @brief Record the state of a project tree for later change detection
+    @param root Project directory
+    @param exclude Directories relative to ``root`` to ignore (e.g. build output)
+    @param inputs Absolute input files and directories to cover even where git does not
+    @return JSON-serialisable snapshot
+    """
+    if is_git_tree(root):
+        head = _git(root, "rev-parse", "--verify", "-q", "HEAD")
+        commit = head.decode().strip() if head else ""
+        dirty = _git_dirty(root, commit)
+        uncovered = _uncovered_signatures(root, inputs, exclude)
+        if dirty is not None and uncovered is not None:
+            signatures = {}
+            for name in dirty:
+                if _visible(name) and not _excluded(name, exclude):
+                    signatures[name] = _signature(root / name)
+            return {"method": "git", "commit": commit, "dirty": signatures, "uncovered": uncovered}
+    files = {**_walk_signatures(root, exclude), **_external_signatures(root, inputs)}
+    return {"method": "filesystem", "files": files}
+
+
+def _diff(before: Dict[str, object], after: Dict[str, Optional[Signature]]) -> List[str]:
+    """@brief Names whose stored signature differs from the current one"""
+    stored = {name: tuple(sig) if sig else None for name, sig in before.items()}
+    return sorted(name for name in stored.keys() | after.keys() if stored.get(name) != after.get(name))
+
+
+def changes_since(
+    root: Path, previous: Dict[str, object], exclude: Sequence[str] = (), inputs: Sequence[Path] = ()
+) -> Optional[ChangeSet]:
+    """
+    @brief Files that changed since a snapshot
+    @param root Project directory
+    @param previous Snapshot returned by ``snapshot`` for the same directory
+    @param exclude Directories relative to ``root`` to ignore
+    @param inputs Input files and directories, as passed to ``snapshot``
+    @return Changed, added and removed files, or None when the snapshot cannot be
+    compared (e.g. its commit no longer exists); callers should then assume
+    everything changed
+
+    @details With git, only files that differ from the snapshot's commit (or
+    that differed from it when the snapshot was taken) are examined; a file
+    counts as unchanged when it was already dirty at snapshot time and still has
+    the same modification time and size. Inputs git does not track are compared
+    by signature, like in a file-system walk.
+    """
+    method = "git" if is_git_tree(root) else "filesystem"
+    if method != previous.get("method"):
+        return None
+    if method == "filesystem":
+        after = {**_walk_signatures(root, exclude), **_external_signatures(root, inputs)}
+        return ChangeSet(_diff(previous.get("files", {}), after), "filesystem", "")
+
+    commit = str(previous.get("commit", ""))
+    dirty = _git_dirty(root, commit)
+    uncovered = _uncovered_signatures(root, inputs, exclude)
+    if dirty is None or uncovered is None:
+        return None
+    before = {name: tuple(sig) if sig else None for name, sig in previous.get("dirty", {}).items()}
+    changed = []
+    for name in sorted(set(dirty) | before.keys()):
+        if not _visible(name) or _excluded(name, exclude):
+            continue
+        if name not in before:
+            changed.append(name)  # differs from the commit, but did not at snapshot time
+        elif name not in dirty or _signature(root / name) != before[name]:
+            changed.append(name)  # reverted to the committed content, or edited again
+    changed = sorted(set(changed) | set(_diff(previous.get("uncovered", {}), uncovered)))
+    return ChangeSet(changed, "git", commit)
@@ -0,0 +1,427 @@
+"""
+On-demand diagrams
+
+Builds with ``CLASS_GRAPH``, ``COLLABORATION_GRAPH``, ``INCLUDE_GRAPH`` and
+``INCLUDED_BY_GRAPH`` make Doxygen run dot for every class and file up front,
+although few of those diagrams are ever looked at. A build with lazy diagrams runs
+Doxygen with ``HAVE_DOT = NO`` and XML enabled instead. The graph structure is
+still in the XML:
+
+- inheritance from ``<basecompoundref>``/``<derivedcompoundref>``
+- collaboration from the classes referenced in member variable types
+- includes from ``<includes>``/``<includedby>`` of file compounds
+
+A ``DiagramIndex`` keeps these edges for a whole build. A diagram is the
+breadth-first subgraph around one class or file, written as deterministic dot
+source. The SHA-256 of that source (plus the Graphviz version) is the diagram's
+cache key, so the rendered SVG of an unchanged subgraph is reused across builds
+and projects. Only changed diagrams run dot, in a bounded pool, and concurrent
+requests for the same diagram share one dot run.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .jobs import BuildPool, run_process
+from .storage import state_dir, write_atomic
+from .xmldiff import _compound_files, find_xml_dir
+
+KINDS = ("inheritance", "collaboration", "include", "included_by")
+# Doxygen's DOT_GRAPH_MAX_NODES default.
+DEFAULT_MAX_NODES = 50
+MAX_NODES = 500
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DOT_TIMEOUT = 60.0
+
+_SKIPPED_SUBTREES = {"programlisting", "listofallmembers", "inheritancegraph", "collaborationgraph",
+                     "incdepgraph", "invincdepgraph", "briefdescription", "detaileddescription"}
+
+
+class DiagramNode(NamedTuple):
+    """@brief Compound known to a diagram index"""
+
+    refid: str
+    kind: str
+    name: str
+
+
+class DiagramIndex:
+    """
+    @brief Inheritance, usage and include edges of one XML build
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, DiagramNode] = {}
+        self.bases: Dict[str, List[Tuple[str, str]]] = {}  # refid -> [(base refid or "", name)]
+        self.derived: Dict[str, List[str]] = {}
+        self.uses: Dict[str, List[Tuple[str, str]]] = {}  # refid -> [(used refid, member name)]
+        self.includes: Dict[str, List[Tuple[str, str]]] = {}  # file refid -> [(refid or "", name)]
+        self.included_by: Dict[str, List[str]] = {}
+        self._by_name: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_xml(cls, xml_dir: Path) -> "DiagramIndex":
+        """
+        @brief Stream-load the graph structure from every compound file
+        @param xml_dir Directory containing ``index.xml``
+        @return Loaded index
+        """
+        index = cls()
+        for _, path in _compound_files(xml_dir):
+            try:
+                index._load_compound(path)
+            except ET.ParseError:
+                continue
+        for refid, bases in index.bases.items():
+            for base, _ in bases:
+                if base:
+                    index.derived.setdefault(base, []).append(refid)
+        for refid, includes in index.includes.items():
+            for target, _ in includes:
+                if target:
+                    index.included_by.setdefault(target, []).append(refid)
+        for derived in (index.derived, index.included_by):
+            for refid, sources in derived.items():
+                derived[refid] = sorted(set(sources))
+        for node in index.nodes.values():
+            index._by_name.setdefault(node.name, []).append(node.refid)
+            short = node.name.rsplit("::", 1)[-1]
+            if short != node.name:
+                index._by_name.setdefault(short, []).append(node.refid)
+        return index
+
+    def _load_compound(self, path: Path) -> None:
+        refid = kind = name = ""
+        for event, element in ET.iterparse(str(path), events=("start", "end")):
+            if event == "start":
+                if element.tag == "compounddef":
+                    refid, kind = element.get("id", ""), element.get("kind", "")
+                continue
+            tag = element.tag
+            if tag == "compoundname":
+                name = (element.text or "").strip()
+            elif tag == "basecompoundref":
+                self.bases.setdefault(refid, []).append((element.get("refid", ""), "".join(element.itertext()).strip()))
+            elif tag == "includes":
+                self.includes.setdefault(refid, []).append((element.get("refid", ""), "".join(element.itertext()).strip()))
+            elif tag == "memberdef":
+                if element.get("kind") == "variable" and element.get("static") != "yes":
+                    member = (element.findtext("name") or "").strip()
+                    type_element = element.find("type")
+                    for ref in type_element.iter("ref") if type_element is not None else ():
+                        if ref.get("kindref") == "compound" and ref.get("refid"):
+                            self.uses.setdefault(refid, []).append((ref.get("refid"), member))
+                element.clear()
+            elif tag in _SKIPPED_SUBTREES:
+                element.clear()
+        if refid:
+            self.nodes[refid] = DiagramNode(refid, kind, name)
+
+    def resolve(self, symbol: str) -> List[str]:
+        """
+        @brief Compounds matching a refid, qualified name or unqualified name
+        @param symbol Refid, ``Scope::name``, ``name`` or a file name (``.`` is accepted as scope separator)
+        """
+        if symbol in self.nodes:
+            return [symbol]
+        matches = self._by_name.get(symbol, [])
+        if not matches and "." in symbol:
+            matches = self._by_name.get(symbol.replace(".", "::"), [])
+        return sorted(set(matches))
+
+    def label(self, refid: str, fallback: str = "") -> str:
+        node = self.nodes.get(refid)
+        return node.name if node else fallback or refid
+
+
+class Subgraph(NamedTuple):
+    """@brief Nodes and edges of one diagram, ready to be written as dot"""
+
+    kind: str
+    root: str
+    nodes: List[Tuple[str, str, str]]  # (key, label, url)
+    edges: List[Tuple[int, int, str, str]]  # (from, to, style, label)
+    truncated: bool
+
+
+def subgraph(index: DiagramIndex, refid: str, kind: str, max_nodes: int = DEFAULT_MAX_NODES) -> Subgraph:
+    """
+    @brief Breadth-first subgraph around a compound
+    @param index Graph structure of the build
+    @param refid Class (inheritance, collaboration) or file (include, included_by)
+    @param kind One of KINDS
+    @param max_nodes Nodes at which the diagram is cut off
+    @return Subgraph with nodes in breadth-first order
+    @throws ValueError For an unknown kind, or a compound of the wrong kind
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown diagram kind '{kind}'. Use one of: {', '.join(KINDS)}")
+    node = index.nodes.get(refid)
+    is_file = node is not None and node.kind == "file"
+    if kind in ("include", "included_by") and not is_file:
+        raise ValueError(f"{index.label(refid)} is not a file; {kind} diagrams need a file")
+    if kind in ("inheritance", "collaboration") and is_file:
+        raise ValueError(f"{index.label(refid)} is a file; {kind} diagrams need a class")
+
+    def neighbours(key: str) -> List[Tuple[str, str, str, bool]]:
+        """(neighbour key, label, edge style, edge points from the neighbour)"""
+        if kind == "inheritance":
+            up = [(base or f"?{name}", index.label(base, name), "inherit", False) for base, name in index.bases.get(key, [])]
+            down = [(child, index.label(child), "inherit", True) for child in index.derived.get(key, [])]
+            # Only walk up from ancestors and down from descendants, like Doxygen
+            if key == refid:
+                return up + down
+            return up if key in ancestors else down
+        if kind == "collaboration":
+            edges = [(base or f"?{name}", index.label(base, name), "inherit", False) for base, name in index.bases.get(key, [])]
+            used: Dict[str, List[str]] = {}
+            for target, member in index.uses.get(key, []):
+                used.setdefault(target, []).append(member)
+            edges += [(target, index.label(target), "use:" + "\\n".join(sorted(set(members))), False)
+                      for target, members in sorted(used.items())]
+            return edges
+        if kind == "include":
+            return [(target or f"?{name}", index.label(target, name), "include", False)
+                    for target, name in index.includes.get(key, [])]
+        return [(source, index.label(source), "include", True) for source in index.included_by.get(key, [])]
+
+    ancestors = set()
+    order = [refid]
+    positions = {refid: 0}
+    labels = {refid: index.label(refid)}
+    edges = set()
+    truncated = False
+    queue = deque([refid])
+    while queue:
+        key = queue.popleft()
+        for other, label, style, reverse in sorted(neighbours(key), key=lambda item: (item[1], item[0])):
+            if other not in positions:
+                if len(order) >= max_nodes:
+                    truncated = True
+                    continue
+                positions[other] = len(order)
+                order.append(other)
+                labels[other] = label
+                if kind == "inheritance" and not reverse:
+                    ancestors.add(other)
+                if not other.startswith("?"):
+                    queue.append(other)
+            source, target = (positions[other], positions[key]) if reverse else (positions[key], positions[other])
+            edges.add((source, target, *style.partition(":")[::2]))
+    nodes = [
+        (key, labels[key], "" if key.startswith("?") else f"{key}.html")
+        for key in order
+    ]
+    return Subgraph(kind, refid, nodes, sorted(edges), truncated)
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def to_dot(graph: Subgraph) -> str:
+    """
+    @brief Deterministic dot source for a subgraph
+    @param graph Subgraph to draw
+    @return Dot source; equal subgraphs always produce equal text
+    """
+    direction = "LR" if graph.kind in ("include", "included_by") else "BT"
+    lines = [
+        f"digraph {_quote(graph.nodes[0][1])} {{",
+        f"  rankdir={direction};",
+        '  node [shape=box, fontname="Helvetica", fontsize=10, height=0.2, width=0.4];',
+        '  edge [fontname="Helvetica", fontsize=10, labelfontname="Helvetica", labelfontsize=10];',
+    ]
+    for position, (key, label, url) in enumerate(graph.nodes):
+        attributes = [f"label={_quote(label)}"]
+        if position == 0:
+            attributes.append('style=filled, fillcolor="#bfbfbf"')
+        elif url:
+            attributes.append(f"URL={_quote(url)}")
+        else:
+            attributes.append('color="grey75"')
+        if graph.truncated and position == len(graph.nodes) - 1:
+            attributes.append('color="red"')
+        lines.append(f"  n{position} [{', '.join(attributes)}];")
+    for source, target, style, label in graph.edges:
+        if style == "inherit":
+            attributes = 'dir=back, color="steelblue1", arrowtail=onormal'
+            # Arrows point from the derived class to its base
+            lines.append(f"  n{target} -> n{source} [{attributes}];")
+        elif style == "use":
+            # Arrows point from the using class to the class it uses
+            lines.append(f'  n{target} -> n{source} [dir=back, color="darkorchid3", style=dashed, '
+                         f'label={_quote(label)}];')
+        else:
+            lines.append(f'  n{source} -> n{target} [color="midnightblue"];')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+class RenderedDiagram(NamedTuple):
+    """@brief Result of a diagram request"""
+
+    key: str
+    svg: bytes
+    path: Path
+    cached: bool
+    seconds: float
+
+
+class DiagramRenderer:
+    """
+    @brief Renders dot source to SVG in a bounded pool with a content-addressed cache
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.pool = BuildPool(max_builds=max_jobs or max(1, os.cpu_count() or 1),
+                              max_builds_per_client=max_jobs or max(1, os.cpu_count() or 1))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.rendered = 0
+        self._inflight: Dict[str, "asyncio.Task[RenderedDiagram]"] = {}
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def configure(self, max_jobs: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """@brief Resize the dot pool or the cache"""
+        if max_jobs:
+            self.pool.configure(max_jobs, max_jobs)
+        if max_bytes:
+            self.max_bytes = max_bytes
+
+    @property
+    def root(self) -> Path:
+        return state_dir("diagrams")
+
+    async def dot_version(self) -> str:
+        """@brief Graphviz version line, part of every cache key"""
+        if self._version is None:
+            result = await run_process(["dot", "-V"], timeout=DOT_TIMEOUT)
+            if result.returncode != 0:
+                raise RuntimeError(f"dot -V failed: {(result.stderr or result.stdout).strip()}")
+            self._version = (result.stderr or result.stdout).strip()
+        return self._version
+
+    async def render(self, source: str, client: str = "local") -> RenderedDiagram:
+        """
+        @brief SVG for dot source, from the cache or a pooled dot run
+        @param source Dot source (see to_dot)
+        @param client Key of the calling client for pool quotas
+        @return Rendered diagram
+        @throws FileNotFoundError If dot is not installed
+        @throws RuntimeError If dot fails
+
+        @details Concurrent requests for the same source share one dot run. The run
+        is a task of its own that every requester awaits through ``asyncio.shield``,
+        so a requester that goes away does not cancel it for the others (and a run
+        nobody waits for any more still fills the cache).
+        """
+        version = await self.dot_version()
+        key = hashlib.sha256(f"{version}\0{source}".encode("utf-8")).hexdigest()
+        path = self.root / f"{key}.svg"
+        if path.is_file():
+            self.hits += 1
+            svg = await asyncio.to_thread(path.read_bytes)
+            os.utime(path)  # most recently used, for pruning
+            return RenderedDiagram(key, svg, path, True, 0.0)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            # Same subgraph requested concurrently: share the running dot process
+            return (await asyncio.shield(pending))._replace(cached=True)
+        task = asyncio.get_running_loop().create_task(self._run_dot(source, key, path, client))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._finished(key, task))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: "asyncio.Task[RenderedDiagram]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so failures nobody waits for are not logged as unhandled
+
+    async def _run_dot(self, source: str, key: str, path: Path, client: str) -> RenderedDiagram:
+        """@brief Render dot source in a pool slot and store the SVG in the cache"""
+        started = time.perf_counter()
+        async with self.pool.slot(client):
+            result = await run_process(["dot", "-Tsvg"], input_text=source, timeout=DOT_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"dot failed: {(result.stderr or result.stdout).strip()}")
+        svg = result.stdout.encode("utf-8")
+        await asyncio.to_thread(write_atomic, path, svg)
+        await asyncio.to_thread(self.prune)
+        self.rendered += 1
+        return RenderedDiagram(key, svg, path, False, time.perf_counter() - started)
+
+    def prune(self) -> int:
+        """
+        @brief Delete the least recently used SVGs beyond the cache size
+        @return Number of files removed
+        """
+        with self._lock:
+            files = []
+            for path in self.root.glob("*.svg"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        """@brief Counters for status reporting"""
+        return {"rendered": self.rendered, "hits": self.hits, "running": self.pool.active,
+                "max_jobs": self.pool.max_builds}
+
+
+class DiagramIndexCache:
+    """
+    @brief Small LRU of loaded diagram indexes, invalidated when ``index.xml`` changes
+    """
+
+    def __init__(self, max_indexes: int = 4):
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, Tuple[Tuple[int, int], DiagramIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> DiagramIndex:
+        """
+        @brief Index for a project, XML output or XML directory
+        @param path Anything find_xml_dir() accepts
+        """
+        xml_dir = find_xml_dir(Path(path)).resolve()
+        stat = (xml_dir / "index.xml").stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = str(xml_dir)
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached and cached[0] == signature:
+                self._indexes.move_to_end(key)
+                return cached[1]
+        index = DiagramIndex.from_xml(xml_dir)
+        with self._lock:
+            self._indexes[key] = (signature, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+
+diagram_indexes = DiagramIndexCache()
+diagram_renderer = DiagramRenderer()
@@ -0,0 +1,858 @@
+"""
+Distributed shard builds
+
+A coordinator splits a project's input files into shards and dispatches each shard
+to a worker: another ``doxygen-mcp`` instance started with ``--worker``, reached
+over MCP like any other server. Workers run as extra local processes (stdio) or
+on other machines (streamable HTTP), so one protocol covers both testing and
+scale-out.
+
+Sources travel content-addressed: the coordinator asks a worker which file
+digests it is missing and only sends those, and workers keep received blobs in
+their data home, so rebuilding a project only transfers changed files. Each
+shard returns its HTML output and tag file; the coordinator unpacks the HTML
+under one directory per shard and merges the tag files into a single tag file
+for the whole project.
+
+Each directory's files are sent back to the worker that built them last time
+(while it is healthy), so that worker already holds their sources; affinity is
+kept per directory because shard names change whenever the plan does. A worker
+that does not complete the MCP handshake within CONNECT_TIMEOUT is treated as
+unreachable, so it cannot hold on to its directories. Shards that fail are
+retried on any healthy worker up to a fixed number of attempts. A worker that cannot be reached, lacks Doxygen or keeps failing with
+transport errors is taken out of rotation for the rest of the build.
+
+Workers only answer callers that present their shared token, and build each
+shard from an allow-list of the coordinator's Doxyfile options: options that
+name paths, run commands or filters, or pull in other files are never taken
+from the request.
+"""
+
+import abc
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import secrets
+import shutil
+import sys
+import tarfile
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from html import escape
+from pathlib import Path
+from typing import AsyncContextManager, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.server.fastmcp import Context, FastMCP
+
+from .doxyfile import format_overrides, parse_doxyfile, quote
+from .jobs import DrainingError, build_pool, client_key, client_label, run_process
+from .storage import state_dir, write_atomic
+
+logger = logging.getLogger("doxygen-mcp")
+
+PROTOCOL_VERSION = 1
+MAX_ATTEMPTS = 3
+MAX_CONSECUTIVE_FAILURES = 2
+UPLOAD_BATCH_BYTES = 4 * 1024 * 1024
+CONNECT_TIMEOUT = 30.0
+SHARD_TAG_NAME = "shard.tag"
+TOKEN_ENV = "DOXYGEN_MCP_WORKER_TOKEN"
+
+# Doxyfile options a worker accepts from a coordinator. Everything else (paths, input
+# and source filters, external commands, header/footer files, other output formats)
+# is left at Doxygen's default or pinned by the worker itself.
+SHARD_OPTIONS = frozenset("""
+    PROJECT_NAME PROJECT_NUMBER PROJECT_BRIEF OUTPUT_LANGUAGE BRIEF_MEMBER_DESC REPEAT_BRIEF
+    ABBREVIATE_BRIEF ALWAYS_DETAILED_SEC INLINE_INHERITED_MEMB FULL_PATH_NAMES SHORT_NAMES
+    JAVADOC_AUTOBRIEF JAVADOC_BANNER QT_AUTOBRIEF MULTILINE_CPP_IS_BRIEF PYTHON_DOCSTRING INHERIT_DOCS
+    SEPARATE_MEMBER_PAGES TAB_SIZE ALIASES OPTIMIZE_OUTPUT_FOR_C OPTIMIZE_OUTPUT_JAVA OPTIMIZE_FOR_FORTRAN
+    OPTIMIZE_OUTPUT_VHDL OPTIMIZE_OUTPUT_SLICE EXTENSION_MAPPING MARKDOWN_SUPPORT TOC_INCLUDE_HEADINGS
+    AUTOLINK_SUPPORT BUILTIN_STL_SUPPORT CPP_CLI_SUPPORT SIP_SUPPORT IDL_PROPERTY_SUPPORT
+    DISTRIBUTE_GROUP_DOC GROUP_NESTED_COMPOUNDS SUBGROUPING INLINE_GROUPED_CLASSES INLINE_SIMPLE_STRUCTS
+    TYPEDEF_HIDES_STRUCT LOOKUP_CACHE_SIZE NUM_PROC_THREADS
+    EXTRACT_ALL EXTRACT_PRIVATE EXTRACT_PRIV_VIRTUAL EXTRACT_PACKAGE EXTRACT_STATIC EXTRACT_LOCAL_CLASSES
+    EXTRACT_LOCAL_METHODS EXTRACT_ANON_NSPACES RESOLVE_UNNAMED_PARAMS HIDE_UNDOC_MEMBERS HIDE_UNDOC_CLASSES
+    HIDE_FRIEND_COMPOUNDS HIDE_IN_BODY_DOCS INTERNAL_DOCS CASE_SENSE_NAMES HIDE_SCOPE_NAMES
+    HIDE_COMPOUND_REFERENCE SHOW_HEADERFILE SHOW_INCLUDE_FILES SHOW_GROUPED_MEMB_INC FORCE_LOCAL_INCLUDES
+    INLINE_INFO SORT_MEMBER_DOCS SORT_BRIEF_DOCS SORT_MEMBERS_CTORS_1ST SORT_GROUP_NAMES SORT_BY_SCOPE_NAME
+    STRICT_PROTO_MATCHING GENERATE_TODOLIST GENERATE_TESTLIST GENERATE_BUGLIST GENERATE_DEPRECATEDLIST
+    ENABLED_SECTIONS MAX_INITIALIZER_LINES SHOW_USED_FILES SHOW_FILES SHOW_NAMESPACES
+    QUIET WARNINGS WARN_IF_UNDOCUMENTED WARN_IF_DOC_ERROR WARN_IF_INCOMPLETE_DOC WARN_NO_PARAMDOC
+    WARN_FORMAT INPUT_ENCODING FILE_PATTERNS EXCLUDE_PATTERNS EXCLUDE_SYMBOLS
+    SOURCE_BROWSER INLINE_SOURCES STRIP_CODE_COMMENTS REFERENCED_BY_RELATION REFERENCES_RELATION
+    REFERENCES_LINK_SOURCE SOURCE_TOOLTIPS VERBATIM_HEADERS ALPHABETICAL_INDEX IGNORE_PREFIX
+    HTML_FILE_EXTENSION HTML_COLORSTYLE HTML_COLORSTYLE_HUE HTML_COLORSTYLE_SAT HTML_COLORSTYLE_GAMMA
+    HTML_TIMESTAMP HTML_DYNAMIC_MENUS HTML_DYNAMIC_SECTIONS HTML_INDEX_NUM_ENTRIES DISABLE_INDEX
+    GENERATE_TREEVIEW ENUM_VALUES_PER_LINE TREEVIEW_WIDTH EXT_LINKS_IN_WINDOW SEARCHENGINE
+    ENABLE_PREPROCESSING MACRO_EXPANSION EXPAND_ONLY_PREDEF SEARCH_INCLUDES PREDEFINED EXPAND_AS_DEFINED
+    SKIP_FUNCTION_MACROS ALLEXTERNALS EXTERNAL_GROUPS EXTERNAL_PAGES HIDE_UNDOC_RELATIONS
+    CLASS_DIAGRAMS HAVE_DOT DOT_NUM_THREADS CLASS_GRAPH COLLABORATION_GRAPH GROUP_GRAPHS UML_LOOK
+    UML_LIMIT_NUM_FIELDS TEMPLATE_RELATIONS INCLUDE_GRAPH INCLUDED_BY_GRAPH CALL_GRAPH CALLER_GRAPH
+    GRAPHICAL_HIERARCHY DIRECTORY_GRAPH DIR_GRAPH_MAX_DEPTH DOT_IMAGE_FORMAT INTERACTIVE_SVG
+    DOT_GRAPH_MAX_NODES MAX_DOT_GRAPH_DEPTH DOT_MULTI_TARGETS DOT_CLEANUP
+""".split())
+
+_INCLUDE = re.compile(r"^\s*@INCLUDE(?:_PATH)?\b", re.M)
+
+_PACKAGE_ROOT = str(Path(__file__).resolve().parents[1])
+_HEX = set("0123456789abcdef")
+
+
+class WorkerError(RuntimeError):
+    """Raised when a worker is unreachable or rejects a request"""
+
+
+class ShardFailed(RuntimeError):
+    """Raised when Doxygen itself fails on a shard"""
+
+
+def file_digest(path: Path) -> str:
+    """
+    @brief Content address of a file
+    @param path File to hash
+    @return Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    @brief Content-addressed file store of a worker
+
+    @details Blobs live at ``blobs/<first two hex digits>/<digest>`` below the data
+    home and are verified against their digest before they are stored.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else state_dir("blobs")
+
+    def path(self, digest: str) -> Path:
+        """
+        @brief Location of a blob
+        @param digest Hex SHA-256 digest
+        @throws ValueError If the digest is malformed
+        """
+        if len(digest) != 64 or not set(digest) <= _HEX:
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return self.root / digest[:2] / digest
+
+    def missing(self, digests: Iterable[str]) -> List[str]:
+        """@brief Digests not yet present in the store"""
+        return [digest for digest in dict.fromkeys(digests) if not self.path(digest).is_file()]
+
+    def put(self, digest: str, data: bytes) -> None:
+        """
+        @brief Store a blob after checking its content
+        @throws ValueError If the data does not match the digest
+        """
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Blob content does not match digest {digest}")
+        path = self.path(digest)
+        if not path.is_file():
+            write_atomic(path, data)
+
+    def materialize(self, digest: str, destination: Path) -> None:
+        """
+        @brief Place a blob at a path, hard-linking when possible
+        @param digest Blob digest
+        @param destination File to create
+        """
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(self.path(digest), destination)
+        except OSError:
+            shutil.copyfile(self.path(digest), destination)
+
+
+def uses_include(doxyfile: str) -> bool:
+    """@brief Whether Doxyfile text pulls in other files with ``@INCLUDE``"""
+    return bool(_INCLUDE.search(doxyfile))
+
+
+def shard_doxyfile(doxyfile: str) -> str:
+    """
+    @brief Doxyfile a worker builds a shard from, restricted to SHARD_OPTIONS
+    @param doxyfile Doxyfile text sent by the coordinator
+    @return Doxyfile text holding only the allowed options
+    @throws ValueError If the text uses ``@INCLUDE``
+
+    @details Values that expand environment variables (``$(NAME)``) are dropped as
+    well, so a request cannot copy the worker's environment into the output.
+    """
+    if uses_include(doxyfile):
+        raise ValueError("Shard Doxyfiles cannot use @INCLUDE")
+    options = parse_doxyfile(doxyfile)
+    lines = [
+        f"{name:<22} = {value}" for name, value in options.items()
+        if name in SHARD_OPTIONS and "$(" not in value
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _safe_relative(name: str) -> Path:
+    """
+    @brief Validate a workspace-relative path received from a coordinator
+    @throws ValueError If the path is absolute or escapes the workspace
+    """
+    path = Path(name)
+    if not name or path.is_absolute() or ".." in path.parts:
+        raise ValueError(f"Unsafe shard path: {name!r}")
+    return path
+
+
+def _pack_directory(directory: Path) -> str:
+    """@brief Base64 tar.gz of a directory's contents"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        if directory.is_dir():
+            archive.add(str(directory), arcname=".")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _unpack_directory(payload: str, destination: Path) -> None:
+    """
+    @brief Extract an archive produced by _pack_directory()
+    @throws ValueError If a member is not a plain file or directory inside destination
+    """
+    destination.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(fileobj=io.BytesIO(base64.b64decode(payload)), mode="r:gz") as archive:
+        members = archive.getmembers()
+        for member in members:
+            if not (member.isfile() or member.isdir()):
+                raise ValueError(f"Unexpected archive member: {member.name}")
+            if member.name != ".":
+                _safe_relative(member.name[2:] if member.name.startswith("./") else member.name)
+        archive.extractall(str(destination), members=members)
+
+
+# Worker side -----------------------------------------------------------------
+
+_worker_token = ""
+
+
+def _reply(**payload) -> str:
+    return json.dumps(payload)
+
+
+def _authorized(token: str) -> bool:
+    """@brief Whether a request carries this worker's token (never true without one)"""
+    return bool(_worker_token) and hmac.compare_digest(token.encode("utf-8"), _worker_token.encode("utf-8"))
+
+
+_UNAUTHORIZED = json.dumps({"status": "error", "error": "Unauthorized: wrong or missing worker token"})
+
+
+async def worker_info(token: str = "") -> str:
+    """Describe this worker: protocol version, Doxygen version and build capacity"""
+    if not _authorized(token):
+        return _UNAUTHORIZED
+    doxygen = None
+    executable = shutil.which("doxygen")
+    if executable:
+        try:
+            result = await run_process([executable, "--version"], timeout=30)
+            if result.returncode == 0:
+                doxygen = result.stdout.strip()
+        except (OSError, asyncio.TimeoutError):
+            pass
+    stats = build_pool.stats()
+    return _reply(
+        status="ok",
+        protocol=PROTOCOL_VERSION,
+        doxygen=doxygen,
+        slots=stats["max_builds_per_client"],
+        active=stats["active"],
+        draining=stats["draining"],
+    )
+
+
+async def worker_missing_blobs(digests: List[str], token: str = "") -> str:
+    """List which of the given source digests this worker does not have yet"""
+    if not _authorized(token):
+        return _UNAUTHORIZED
+    try:
+        return _reply(status="ok", missing=await asyncio.to_thread(BlobStore().missing, digests))
+    except ValueError as e:
+        return _reply(status="error", error=str(e))
+
+
+async def worker_put_blobs(blobs: Dict[str, str], token: str = "") -> str:
+    """Store base64-encoded source files keyed by their SHA-256 digest"""
+    if not _authorized(token):
+        return _UNAUTHORIZED
+    store = BlobStore()
+    try:
+        for digest, data in blobs.items():
+            await asyncio.to_thread(store.put, digest, base64.b64decode(data))
+        return _reply(status="ok", stored=len(blobs))
+    except ValueError as e:
+        return _reply(status="error", error=str(e))
+
+
+def _materialize(store: BlobStore, files: Dict[Path, str]) -> List[str]:
+    """@brief Lay out a shard's files from the blob store; returns missing digests"""
+    missing = store.missing(files.values())
+    if missing:
+        return missing
+    for path, digest in files.items():
+        store.materialize(digest, path)
+    return []
+
+
+async def worker_build_shard(
+    shard: str,
+    doxyfile: str,
+    files: Dict[str, str],
+    timeout: float = 0,
+    token: str = "",
+    ctx: Optional[Context] = None,
+) -> str:
+    """Build one shard of a project from blobs already sent to this worker"""
+    if not _authorized(token):
+        return _UNAUTHORIZED
+    workspace = Path(tempfile.mkdtemp(prefix="shard-", dir=state_dir("worker-builds")))
+    try:
+        source_dir = workspace / "src"
+        output_dir = workspace / "out"
+        config = shard_doxyfile(doxyfile)
+        layout = {source_dir / _safe_relative(name): digest for name, digest in files.items()}
+        missing = await asyncio.to_thread(_materialize, BlobStore(), layout)
+        if missing:
+            return _reply(status="error", error=f"Missing {len(missing)} source blobs", missing=missing)
+
+        # Only the shard's files, with paths shown relative to the project root
+        overrides = {
+            "INPUT": " ".join(quote(str(path)) for path in sorted(layout)),
+            "RECURSIVE": "NO",
+            "STRIP_FROM_PATH": quote(str(source_dir)),
+            "OUTPUT_DIRECTORY": quote(str(output_dir)),
+            "GENERATE_HTML": "YES",
+            "HTML_OUTPUT": "html",
+            "GENERATE_LATEX": "NO",
+            "GENERATE_XML": "NO",
+            "GENERATE_RTF": "NO",
+            "GENERATE_MAN": "NO",
+            "GENERATE_DOCBOOK": "NO",
+            "GENERATE_TAGFILE": quote(str(output_dir / SHARD_TAG_NAME)),
+            "TAGFILES": "",
+        }
+        async with build_pool.slot(client_key(ctx), client_label(ctx)):
+            result = await run_process(
+                ["doxygen", "-"],
+                cwd=str(workspace),
+                input_text=config + format_overrides(overrides),
+                timeout=timeout,
+            )
+        warnings = [line for line in result.stderr.split("\n") if "warning" in line.lower()]
+        if result.returncode != 0:
+            return _reply(
+                status="failed",
+                shard=shard,
+                returncode=result.returncode,
+                output=(result.stderr or result.stdout)[-4000:],
+            )
+
+        tag_path = output_dir / SHARD_TAG_NAME
+        return _reply(
+            status="ok",
+            shard=shard,
+            warnings=warnings,
+            tagfile=tag_path.read_text(encoding="utf-8", errors="replace") if tag_path.is_file() else "",
+            html=await asyncio.to_thread(_pack_directory, output_dir / "html"),
+        )
+
+    except DrainingError as e:
+        return _reply(status="error", error=str(e))
+    except asyncio.TimeoutError:
+        return _reply(status="failed", shard=shard, returncode=None, output=f"Timed out after {timeout:g}s")
+    except ValueError as e:
+        return _reply(status="error", error=str(e))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def register_worker_tools(server: FastMCP, token: str) -> None:
+    """
+    @brief Expose the worker protocol on a server
+    @param server FastMCP instance started with ``--worker``
+    @param token Shared secret every worker call must present
+    @throws ValueError If the token is empty
+    """
+    global _worker_token
+    if not token:
+        raise ValueError(f"Worker mode needs a shared token in ${TOKEN_ENV}")
+    _worker_token = token
+    for tool in (worker_info, worker_missing_blobs, worker_put_blobs, worker_build_shard):
+        server.add_tool(tool)
+
+
+# Coordinator side ------------------------------------------------------------
+
+class Shard(NamedTuple):
+    """@brief A group of input files built together on one worker"""
+
+    name: str
+    files: Tuple[Tuple[str, Path], ...]
+    size: int
+
+    @property
+    def directories(self) -> List[str]:
+        """@brief Workspace-relative directories of the shard's files (stable across plans)"""
+        return sorted({posixpath.dirname(name) for name, _ in self.files})
+
+
+def _relative_name(path: Path, root: Path) -> str:
+    """@brief Path of an input file as seen inside a worker workspace"""
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return "_external/" + path.as_posix().lstrip("/").replace(":", "")
+
+
+def plan_shards(files: Iterable[Path], root: Path, count: int) -> List[Shard]:
+    """
+    @brief Split input files into roughly equal shards
+    @param files Input files
+    @param root Project root (names inside shards are relative to it)
+    @param count Desired number of shards
+    @return Non-empty shards, largest first
+
+    @details Files are grouped by directory so that headers and their sources stay
+    in the same shard, then directories are assigned largest-first to the shard
+    with the least total size.
+    """
+    groups: Dict[Path, List[Tuple[str, Path, int]]] = {}
+    for path in dict.fromkeys(files):
+        size = path.stat().st_size
+        groups.setdefault(path.parent, []).append((_relative_name(path, root), path, size))
+
+    units = sorted(groups.values(), key=lambda group: (-sum(item[2] for item in group), group[0][0]))
+    bins: List[List] = [[0, []] for _ in range(max(1, min(count, len(units))))]
+    for group in units:
+        target = min(bins, key=lambda item: item[0])
+        target[0] += sum(item[2] for item in group)
+        target[1].extend(group)
+
+    shards = []
+    for size, items in sorted(bins, key=lambda item: -item[0]):
+        if items:
+            files_in_shard = tuple(sorted((name, path) for name, path, _ in items))
+            shards.append(Shard(f"shard{len(shards):03d}", files_in_shard, size))
+    return shards
+
+
+class Worker(abc.ABC):
+    """
+    @brief Coordinator-side handle for one worker and its health
+    """
+
+    def __init__(self, spec: str, token: str = ""):
+        self.spec = spec
+        self.token = token
+        self.healthy = True
+        self.error = ""
+        self.shards_built = 0
+        self.failures = 0
+        self.files_sent = 0
+        self.bytes_sent = 0
+
+    @abc.abstractmethod
+    def connect(self) -> AsyncContextManager[ClientSession]:
+        """@brief Async context manager yielding an initialized ClientSession"""
+
+    async def _handshake(self, session: ClientSession) -> None:
+        """
+        @brief Initialize a session, giving up on workers that do not answer
+        @throws WorkerError If the handshake takes longer than CONNECT_TIMEOUT
+        """
+        try:
+            await asyncio.wait_for(session.initialize(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise WorkerError(f"No MCP handshake within {CONNECT_TIMEOUT:g}s") from None
+
+    def summary(self) -> Dict[str, object]:
+        """@brief JSON-friendly health and transfer statistics"""
+        return {
+            "worker": self.spec,
+            "healthy": self.healthy,
+            "shards_built": self.shards_built,
+            "failures": self.failures,
+            "files_sent": self.files_sent,
+            "bytes_sent": self.bytes_sent,
+            "error": self.error or None,
+        }
+
+
+class LocalWorker(Worker):
+    """
+    @brief Worker started as a local ``doxygen-mcp --worker`` process over stdio
+
+    @details Each local worker gets its own data home, so it behaves like a
+    separate node (own blob store) and keeps its blobs between builds.
+    """
+
+    def __init__(self, index: int):
+        super().__init__(f"local-{index}", secrets.token_urlsafe(32))
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[ClientSession]:
+        from mcp.client.stdio import StdioServerParameters, stdio_client
+
+        env = dict(os.environ)
+        env["DOXYGEN_MCP_HOME"] = str(state_dir("workers", self.spec))
+        env[TOKEN_ENV] = self.token
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+        params = StdioServerParameters(
+            command=sys.executable, args=["-m", "doxygen_mcp", "--worker"], env=env
+        )
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await self._handshake(session)
+                yield session
+
+
+class RemoteWorker(Worker):
+    """
+    @brief Worker reached over streamable HTTP (``http://host:port/mcp``)
+
+    @details Authenticates with the coordinator's own ``$DOXYGEN_MCP_WORKER_TOKEN``,
+    which must match the token the worker was started with.
+    """
+
+    def __init__(self, spec: str):
+        super().__init__(spec, os.environ.get(TOKEN_ENV, ""))
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[ClientSession]:
+        try:
+            from mcp.client.streamable_http import streamable_http_client as connect
+        except ImportError:  # mcp < 1.24
+            from mcp.client.streamable_http import streamablehttp_client as connect
+
+        async with connect(self.spec) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await self._handshake(session)
+                yield session
+
+
+def parse_workers(spec: str) -> List[Worker]:
+    """
+    @brief Build worker handles from a comma-separated specification
+    @param spec Items are ``local``, ``local:N`` or worker URLs
+    @return Worker handles
+    @throws ValueError For unrecognised items
+    """
+    workers: List[Worker] = []
+    local = 0
+    for item in (part.strip() for part in spec.split(",")):
+        if not item:
+            continue
+        if item == "local" or item.startswith("local:"):
+            count = int(item.partition(":")[2] or 1)
+            for _ in range(count):
+                workers.append(LocalWorker(local))
+                local += 1
+        elif item.startswith(("http://", "https://")):
+            workers.append(RemoteWorker(item))
+        else:
+            raise ValueError(f"Unknown worker '{item}'. Use local, local:N or an http(s) URL")
+    return workers
+
+
+async def _call(session: ClientSession, worker: Worker, tool: str, call_timeout: float = 0, **arguments) -> Dict:
+    """
+    @brief Call a worker tool with the worker's token and decode its JSON reply
+    @param call_timeout Seconds to wait for the reply (0 for no limit)
+    @throws WorkerError If the call fails or the worker reports an error
+    """
+    read_timeout = timedelta(seconds=call_timeout) if call_timeout else None
+    arguments["token"] = worker.token
+    result = await session.call_tool(tool, arguments, read_timeout_seconds=read_timeout)
+    text = "".join(getattr(block, "text", "") for block in result.content)
+    if result.isError:
+        raise WorkerError(text or f"{tool} failed")
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        raise WorkerError(f"Invalid reply from {tool}: {text[:200]}")
+    if payload.get("status") == "error":
+        raise WorkerError(payload.get("error") or f"{tool} failed")
+    return payload
+
+
+class DistributedBuild:
+    """
+    @brief Runs shards on a set of workers with retries and health tracking
+    """
+
+    def __init__(
+        self,
+        workers: List[Worker],
+        shards: List[Shard],
+        doxyfile: str,
+        html_dir: Path,
+        timeout: float = 0,
+        max_attempts: int = MAX_ATTEMPTS,
+        affinity: Optional[Dict[str, str]] = None,
+    ):
+        """
+        @param affinity Directory mapped to the spec of the worker that built it last
+        """
+        self.workers = workers
+        self.shards = shards
+        self.doxyfile = doxyfile
+        self.html_dir = html_dir
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.digests: Dict[Path, str] = {}
+        self.warnings: List[str] = []
+        self.tagfiles: Dict[str, str] = {}
+        self.failed: Dict[str, str] = {}
+        self.retries = 0
+        self.affinity: Dict[str, str] = dict(affinity or {})
+        self._pending = deque(shards)
+        self._attempts: Dict[str, int] = {}
+        self._in_flight = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def files_total(self) -> int:
+        """@brief Number of input files across all shards"""
+        return sum(len(shard.files) for shard in self.shards)
+
+    async def run(self) -> "DistributedBuild":
+        """
+        @brief Hash the sources and build every shard
+        @return self; ``failed`` names the shards that could not be built
+        """
+        paths = [path for shard in self.shards for _, path in shard.files]
+        self.digests = await asyncio.to_thread(lambda: {path: file_digest(path) for path in paths})
+        await asyncio.gather(*[self._drive(worker) for worker in self.workers])
+        for shard in self._pending:
+            self.failed.setdefault(shard.name, "No healthy workers left")
+        self._pending.clear()
+        return self
+
+    def _owner(self, shard: Shard) -> Optional[str]:
+        """@brief Worker that built most of a shard's directories last time"""
+        owners = Counter(self.affinity[name] for name in shard.directories if name in self.affinity)
+        return owners.most_common(1)[0][0] if owners else None
+
+    def _claimable(self, worker: Worker, shard: Shard) -> bool:
+        """
+        @brief Whether a worker may take a shard
+
+        @details A shard goes back to the worker that built (most of) its directories
+        last time, which already holds their sources, unless that worker is gone or
+        unhealthy.
+        """
+        owner = self._owner(shard)
+        if owner is None or owner == worker.spec:
+            return True
+        return not any(other.spec == owner and other.healthy for other in self.workers)
+
+    async def _next_shard(self, worker: Worker) -> Optional[Shard]:
+        async with self._changed:
+            while worker.healthy:
+                for shard in self._pending:
+                    if self._claimable(worker, shard):
+                        self._pending.remove(shard)
+                        self._in_flight += 1
+                        return shard
+                if not self._pending and not self._in_flight:
+                    return None
+                await self._changed.wait()
+            return None
+
+    async def _finish(self, shard: Shard, error: str = "") -> None:
+        async with self._changed:
+            self._in_flight -= 1
+            if error:
+                for name in shard.directories:
+                    self.affinity.pop(name, None)
+                attempts = self._attempts[shard.name] = self._attempts.get(shard.name, 0) + 1
+                if attempts >= self.max_attempts:
+                    self.failed[shard.name] = error
+                else:
+                    self.retries += 1
+                    self._pending.append(shard)
+            self._changed.notify_all()
+
+    async def _retire(self, worker: Worker, error: str) -> None:
+        worker.healthy = False
+        worker.error = error
+        logger.warning("Worker %s taken out of rotation: %s", worker.spec, error)
+        async with self._changed:
+            # Let idle lanes of other workers re-check whether work remains
+            self._changed.notify_all()
+
+    async def _drive(self, worker: Worker) -> None:
+        try:
+            async with worker.connect() as session:
+                info = await _call(session, worker, "worker_info", call_timeout=60)
+                if info.get("protocol") != PROTOCOL_VERSION:
+                    raise WorkerError(f"Unsupported worker protocol {info.get('protocol')}")
+                if not info.get("doxygen"):
+                    raise WorkerError("Doxygen is not installed on the worker")
+                lanes = max(1, min(int(info.get("slots") or 1), len(self.shards)))
+                await asyncio.gather(*[self._lane(worker, session) for _ in range(lanes)])
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            # Errors raised inside the MCP client's task groups arrive wrapped
+            while isinstance(e, BaseExceptionGroup) and len(e.exceptions) == 1:
+                e = e.exceptions[0]
+            if worker.healthy:
+                await self._retire(worker, str(e) or type(e).__name__)
+
+    async def _lane(self, worker: Worker, session: ClientSession) -> None:
+        consecutive = 0
+        while worker.healthy:
+            shard = await self._next_shard(worker)
+            if shard is None:
+                return
+            try:
+                await self._build(worker, session, shard)
+            except asyncio.CancelledError:
+                await self._finish(shard, "Cancelled")
+                raise
+            except ShardFailed as e:
+                worker.failures += 1
+                await self._finish(shard, str(e))
+            except Exception as e:
+                worker.failures += 1
+                consecutive += 1
+                await self._finish(shard, str(e) or type(e).__name__)
+                if consecutive >= MAX_CONSECUTIVE_FAILURES:
+                    await self._retire(worker, str(e) or type(e).__name__)
+            else:
+                consecutive = 0
+                worker.shards_built += 1
+                self.affinity.update(dict.fromkeys(shard.directories, worker.spec))
+                await self._finish(shard)
+
+    async def _upload(self, worker: Worker, session: ClientSession, manifest: Dict[str, str],
+                      sources: Dict[str, Path]) -> None:
+        reply = await _call(session, worker, "worker_missing_blobs", call_timeout=300, digests=sorted(set(manifest.values())))
+        batch: Dict[str, str] = {}
+        batch_bytes = 0
+        for digest in reply.get("missing", []):
+            data = await asyncio.to_thread(sources[digest].read_bytes)
+            batch[digest] = base64.b64encode(data).decode("ascii")
+            batch_bytes += len(data)
+            worker.files_sent += 1
+            worker.bytes_sent += len(data)
+            if batch_bytes >= UPLOAD_BATCH_BYTES:
+                await _call(session, worker, "worker_put_blobs", call_timeout=300, blobs=batch)
+                batch, batch_bytes = {}, 0
+        if batch:
+            await _call(session, worker, "worker_put_blobs", call_timeout=300, blobs=batch)
+
+    async def _build(self, worker: Worker, session: ClientSession, shard: Shard) -> None:
+        manifest = {name: self.digests[path] for name, path in shard.files}
+        sources = {self.digests[path]: path for _, path in shard.files}
+        await self._upload(worker, session, manifest, sources)
+
+        reply = await _call(
+            session,
+            worker,
+            "worker_build_shard",
+            call_timeout=self.timeout + 300 if self.timeout else 0,
+            shard=shard.name,
+            doxyfile=self.doxyfile,
+            files=manifest,
+            timeout=self.timeout,
+        )
+        if reply.get("status") != "ok":
+            raise ShardFailed(f"{shard.name}: {reply.get('output') or 'Doxygen failed'}".strip())
+
+        destination = self.html_dir / shard.name
+        await asyncio.to_thread(shutil.rmtree, destination, True)
+        await asyncio.to_thread(_unpack_directory, reply.get("html", ""), destination)
+        self.warnings.extend(reply.get("warnings", []))
+        if reply.get("tagfile"):
+            self.tagfiles[shard.name] = reply["tagfile"]
+
+
+_MERGED_KINDS = {"namespace", "package", "module", "group"}
+
+
+def merge_tagfiles(parts: Dict[str, str], path: Path) -> int:
+    """
+    @brief Merge per-shard tag files into one
+    @param parts Shard name mapped to tag file text
+    @param path Merged tag file to write
+    @return Number of compounds in the merged tag file
+
+    @details HTML references are prefixed with the shard directory. Namespaces and
+    similar scopes that several shards contribute to are merged into one compound.
+    """
+    root = ET.Element("tagfile")
+    scopes: Dict[Tuple[str, str], ET.Element] = {}
+    for prefix, text in sorted(parts.items()):
+        try:
+            tree = ET.fromstring(text)
+        except ET.ParseError:
+            logger.warning("Skipping unreadable tag file from %s", prefix)
+            continue
+        if not root.attrib:
+            root.attrib.update(tree.attrib)
+        for compound in tree.findall("compound"):
+            for element in compound.iter():
+                if element.tag in ("filename", "anchorfile") and element.text:
+                    element.text = f"{prefix}/{element.text.strip()}"
+            kind = compound.get("kind", "")
+            key = (kind, compound.findtext("name") or "")
+            if kind in _MERGED_KINDS and key in scopes:
+                existing = scopes[key]
+                for child in compound:
+                    if child.tag not in ("name", "filename", "title"):
+                        existing.append(child)
+                continue
+            scopes[key] = compound
+            root.append(compound)
+    write_atomic(path, ET.tostring(root, encoding="utf-8", xml_declaration=True))
+    return len(root)
+
+
+def clear_shard_output(html_dir: Path) -> None:
+    """@brief Remove shard directories left by a previous distributed build"""
+    for directory in html_dir.glob("shard[0-9][0-9][0-9]"):
+        if directory.is_dir():
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def write_shard_index(html_dir: Path, project_name: str, shards: List[Shard]) -> Path:
+    """
+    @brief Write a top-level index page linking every shard's documentation
+    @return Path of the index page
+    """
+    rows = []
+    for shard in shards:
+        directories = sorted({str(Path(name).parent) for name, _ in shard.files})
+        rows.append(
+            f'<li><a href="{shard.name}/index.html">{escape(", ".join(directories))}</a>'
+            f" ({len(shard.files)} files)</li>"
+        )
+    page = (
+        f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{escape(project_name)}</title></head>\n"
+        f"<body><h1>{escape(project_name)}</h1>\n<ul>\n" + "\n".join(rows) + "\n</ul></body></html>\n"
+    )
+    index = html_dir / "index.html"
+    write_atomic(index, page.encode("utf-8"))
+    return index
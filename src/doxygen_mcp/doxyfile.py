@@ -0,0 +1,114 @@
+"""
+Doxyfile helpers
+
+Minimal reader for existing Doxyfiles and a writer for build-time overrides.
+Overrides are appended after the project's own configuration and fed to Doxygen
+on standard input, so the server can adjust a build (extra tag files, output
+locations, ...) without ever rewriting the user's Doxyfile.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Mapping
+
+_ASSIGNMENT = re.compile(r"^\s*([A-Z_][A-Z0-9_]*)\s*(\+?=)\s*(.*)$")
+
+
+def parse_doxyfile(text: str) -> Dict[str, str]:
+    """
+    @brief Parse Doxyfile text into a tag -> raw value mapping
+    @param text Doxyfile contents
+    @return Mapping of option names to their (unsplit) values
+
+    @details Handles comments, ``+=`` appends and backslash line continuations.
+    ``@INCLUDE`` directives are not followed.
+    """
+    options: Dict[str, str] = {}
+    pending = ""
+    for raw_line in text.splitlines():
+        line = pending + raw_line
+        pending = ""
+        stripped = line.strip()
+        if stripped.endswith("\\") and not stripped.endswith('\\"'):
+            pending = stripped[:-1] + " "
+            continue
+        if not stripped or stripped.startswith("#"):
+            continue
+        match = _ASSIGNMENT.match(stripped)
+        if not match:
+            continue
+        name, operator, value = match.groups()
+        value = value.strip()
+        if operator == "+=" and options.get(name):
+            options[name] = f"{options[name]} {value}"
+        else:
+            options[name] = value
+    return options
+
+
+def read_doxyfile(path: Path) -> Dict[str, str]:
+    """
+    @brief Parse a Doxyfile from disk
+    @param path Doxyfile location
+    @return Mapping of option names to raw values
+    """
+    return parse_doxyfile(Path(path).read_text(encoding="utf-8", errors="replace"))
+
+
+def split_value(value: str) -> List[str]:
+    """
+    @brief Split a raw Doxyfile value into its items, honouring quotes
+    @param value Raw option value
+    @return List of unquoted items
+
+    @details Backslashes are kept as-is so Windows paths survive the split.
+    """
+    return [part[1:-1] if part.startswith('"') else part for part in re.findall(r'"[^"]*"|\S+', value)]
+
+
+def option(options: Mapping[str, str], name: str, default: str = "") -> str:
+    """
+    @brief Look up a single-valued option, stripping surrounding quotes
+    @param options Parsed Doxyfile options
+    @param name Option name
+    @param default Value to use when the option is missing or empty
+    @return Unquoted option value
+    """
+    value = options.get(name, "").strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return value or default
+
+
+def is_enabled(options: Mapping[str, str], name: str, default: bool = False) -> bool:
+    """
+    @brief Interpret a YES/NO Doxyfile option
+    @param options Parsed Doxyfile options
+    @param name Option name
+    @param default Value to use when the option is missing
+    @return True if the option is set to YES
+    """
+    value = option(options, name)
+    if not value:
+        return default
+    return value.upper() == "YES"
+
+
+def quote(value: str) -> str:
+    """@brief Quote a value for a Doxyfile if it contains whitespace"""
+    if value and not re.search(r'[\s"]', value):
+        return value
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def format_overrides(overrides: Mapping[str, str]) -> str:
+    """
+    @brief Render override assignments to append after a Doxyfile
+    @param overrides Option names mapped to already-formatted values
+    @return Doxyfile fragment (empty string when there is nothing to override)
+    """
+    if not overrides:
+        return ""
+    lines = ["", "# Build-time overrides added by Doxygen MCP Server"]
+    lines.extend(f"{name:<22} = {value}" for name, value in overrides.items())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,358 @@
+"""
+Build history and cost model
+
+Every local build appends a record to a per-project history: input size, the
+Doxygen features that were enabled, how long each phase took and the peak memory
+of the Doxygen process. From all recorded builds a small linear cost model is
+fitted, so the duration and memory of a proposed build can be predicted before it
+starts, and a project whose builds suddenly take longer than their history
+suggests is flagged as a regression.
+
+The model is ridge regression over a handful of features (input megabytes, file
+count, and input megabytes for each expensive feature such as diagrams or source
+browsing), solved in closed form, then scaled per project by how its recent
+builds compared with the fitted prediction.
+"""
+
+import math
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from .doxyfile import is_enabled
+from .storage import state_dir, write_atomic
+
+# Records kept per project; older ones are dropped when the history is compacted.
+HISTORY_LIMIT = 500
+
+# Options Doxygen enables when a Doxyfile does not mention them.
+DOXYGEN_DEFAULT_ON = {
+    "GENERATE_HTML", "GENERATE_LATEX", "EXTRACT_LOCAL_CLASSES", "CLASS_GRAPH", "COLLABORATION_GRAPH",
+    "INCLUDE_GRAPH", "INCLUDED_BY_GRAPH", "STRIP_CODE_COMMENTS",
+}
+
+# Features whose cost grows with the amount of input. Graph options only cost
+# anything when dot is used, so they are combined with HAVE_DOT.
+SCALED_FEATURES = (
+    "have_dot", "call_graph", "caller_graph", "source_browser", "inline_sources",
+    "generate_html", "generate_latex", "generate_xml", "extract_all", "extract_private",
+)
+_DOT_FEATURES = {"call_graph", "caller_graph"}
+
+RIDGE = 1e-3
+# Relative error assumed while a project has fewer than two builds to compare with.
+DEFAULT_RELATIVE_ERROR = 1.0
+# A build is a regression when it is this much slower than its baseline...
+REGRESSION_RATIO = 1.25
+# ...and at least this many seconds slower, so tiny builds do not flap.
+REGRESSION_MIN_SECONDS = 1.0
+
+
+class BuildRecord(BaseModel):
+    """@brief One recorded build"""
+
+    project: str
+    project_path: str
+    started_at: float
+    status: str  # "success" or "failed"
+    input_files: int
+    input_bytes: int
+    features: Dict[str, bool]
+    phases: Dict[str, float]
+    peak_rss: Optional[int] = None
+    cpu_seconds: Optional[float] = None
+    warnings: int = 0
+    doxygen_version: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        """@brief Time spent running Doxygen"""
+        return self.phases.get("doxygen", 0.0)
+
+
+class PhaseTimer:
+    """@brief Wall-clock durations of consecutive build phases"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self._mark = time.perf_counter()
+
+    def lap(self, phase: str) -> float:
+        """
+        @brief Attribute the time since the previous lap to a phase
+        @param phase Phase name
+        @return Total seconds recorded for the phase
+        """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+        return self.phases[phase]
+
+
+def enabled_features(options: Mapping[str, str], names: Iterable[str]) -> Dict[str, bool]:
+    """
+    @brief Effective YES/NO settings of a build
+    @param options Parsed Doxyfile options, including build-time overrides
+    @param names Lower-case option names (the boolean ``DoxygenConfig`` fields)
+    @return Feature name mapped to whether Doxygen will use it
+    """
+    return {
+        name: is_enabled(options, name.upper(), name.upper() in DOXYGEN_DEFAULT_ON)
+        for name in names
+    }
+
+
+class HistoryStore:
+    """
+    @brief Append-only build histories, one JSON-lines file per project
+
+    @details Layout below the data home::
+
+        history/<project-key>.jsonl
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+        self._lock = threading.Lock()
+        self._cache: Dict[Path, Tuple[int, int, List[BuildRecord]]] = {}
+
+    @property
+    def root(self) -> Path:
+        """@brief History directory (resolved lazily so DOXYGEN_MCP_HOME changes apply)"""
+        if self._root is not None:
+            self._root.mkdir(parents=True, exist_ok=True)
+            return self._root
+        return state_dir("history")
+
+    def _read(self, path: Path) -> List[BuildRecord]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return []
+        cached = self._cache.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        records = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                records.append(BuildRecord.model_validate_json(line))
+            except ValueError:
+                continue  # torn write from a crash; skip the line
+        self._cache[path] = (stat.st_mtime_ns, stat.st_size, records)
+        return records
+
+    def append(self, key: str, record: BuildRecord) -> None:
+        """
+        @brief Add a build to a project's history
+        @param key File-system friendly project key
+        @param record Build to record
+        """
+        path = self.root / f"{key}.jsonl"
+        with self._lock:
+            records = self._read(path)
+            if len(records) >= HISTORY_LIMIT:
+                kept = records[-(HISTORY_LIMIT - 1):] + [record]
+                write_atomic(path, "".join(r.model_dump_json() + "\n" for r in kept).encode("utf-8"))
+            else:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(record.model_dump_json() + "\n")
+
+    def load(self, key: str) -> List[BuildRecord]:
+        """
+        @brief Builds of one project, oldest first
+        @param key Project key
+        """
+        with self._lock:
+            return list(self._read(self.root / f"{key}.jsonl"))
+
+    def load_all(self) -> List[BuildRecord]:
+        """@brief Builds of every project"""
+        with self._lock:
+            return [record for path in sorted(self.root.glob("*.jsonl")) for record in self._read(path)]
+
+
+def design_row(input_bytes: int, input_files: int, features: Mapping[str, bool]) -> List[float]:
+    """
+    @brief Model inputs for one build
+    @return Intercept, input megabytes, thousands of files, and input megabytes
+    per enabled scaled feature
+    """
+    megabytes = input_bytes / 1e6
+    row = [1.0, megabytes, input_files / 1000.0]
+    for name in SCALED_FEATURES:
+        enabled = features.get(name, False)
+        if name in _DOT_FEATURES:
+            enabled = enabled and features.get("have_dot", False)
+        row.append(megabytes if enabled else 0.0)
+    return row
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """@brief Solve a small dense linear system by Gaussian elimination with partial pivoting"""
+    size = len(vector)
+    rows = [matrix[i][:] + [vector[i]] for i in range(size)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        if abs(rows[column][column]) < 1e-12:
+            continue
+        for r in range(column + 1, size):
+            factor = rows[r][column] / rows[column][column]
+            for c in range(column, size + 1):
+                rows[r][c] -= factor * rows[column][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        if abs(rows[r][r]) < 1e-12:
+            continue
+        total = rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))
+        solution[r] = total / rows[r][r]
+    return solution
+
+
+def fit_ridge(rows: Sequence[Sequence[float]], targets: Sequence[float], ridge: float = RIDGE) -> List[float]:
+    """
+    @brief Least-squares fit with an L2 penalty on every weight but the intercept
+    @param rows Design rows (first column is the intercept)
+    @param targets Observed values
+    @param ridge Penalty strength
+    @return Weights
+    """
+    width = len(rows[0])
+    gram = [[sum(row[i] * row[j] for row in rows) for j in range(width)] for i in range(width)]
+    for i in range(1, width):
+        gram[i][i] += ridge * len(rows)
+    moment = [sum(row[i] * target for row, target in zip(rows, targets)) for i in range(width)]
+    return _solve(gram, moment)
+
+
+class Prediction(NamedTuple):
+    """@brief Predicted cost of a build"""
+
+    seconds: float
+    peak_rss: Optional[int]
+    relative_error: float
+    samples: int  # builds the model was fitted on
+    project_samples: int  # builds of this project used for calibration
+
+
+class CostModel:
+    """
+    @brief Duration and memory model fitted on recorded builds
+    """
+
+    def __init__(self, records: Sequence[BuildRecord]):
+        successful = [record for record in records if record.status == "success"]
+        self.samples = len(successful)
+        self.projects = len({record.project_path for record in successful})
+        self._time = self._fit(successful, lambda record: record.seconds)
+        self._memory = self._fit(
+            [record for record in successful if record.peak_rss], lambda record: float(record.peak_rss)
+        )
+
+    @staticmethod
+    def _fit(records: Sequence[BuildRecord], target) -> Optional[List[float]]:
+        if not records:
+            return None
+        rows = [design_row(r.input_bytes, r.input_files, r.features) for r in records]
+        return fit_ridge(rows, [target(r) for r in records])
+
+    @staticmethod
+    def _apply(weights: Optional[List[float]], row: List[float]) -> Optional[float]:
+        if weights is None:
+            return None
+        return sum(w * x for w, x in zip(weights, row))
+
+    def predict(
+        self,
+        input_bytes: int,
+        input_files: int,
+        features: Mapping[str, bool],
+        project_history: Sequence[BuildRecord] = (),
+    ) -> Optional[Prediction]:
+        """
+        @brief Predict a proposed build
+        @param input_bytes Total size of the input files
+        @param input_files Number of input files
+        @param features Effective Doxygen features of the proposed build
+        @param project_history Earlier builds of the same project, for calibration
+        @return Prediction, or None when no successful build has been recorded
+        """
+        if self._time is None:
+            return None
+        row = design_row(input_bytes, input_files, features)
+        seconds = self._apply(self._time, row)
+        memory = self._apply(self._memory, row)
+
+        # Scale by how this project's recent builds compared with the model
+        ratios = []
+        memory_ratios = []
+        for record in [r for r in project_history if r.status == "success"][-10:]:
+            raw_row = design_row(record.input_bytes, record.input_files, record.features)
+            raw = self._apply(self._time, raw_row)
+            if raw and raw > 0 and record.seconds > 0:
+                ratios.append(record.seconds / raw)
+            raw_memory = self._apply(self._memory, raw_row)
+            if record.peak_rss and raw_memory and raw_memory > 0:
+                memory_ratios.append(record.peak_rss / raw_memory)
+        if ratios:
+            seconds *= statistics.median(ratios)
+        if memory is not None and memory_ratios:
+            memory *= statistics.median(memory_ratios)
+
+        if len(ratios) >= 2:
+            spread = [abs(math.log(ratio / statistics.median(ratios))) for ratio in ratios]
+            relative_error = max(0.1, math.expm1(statistics.mean(spread) * 2))
+        else:
+            relative_error = DEFAULT_RELATIVE_ERROR
+        return Prediction(
+            seconds=max(seconds, 0.0),
+            peak_rss=int(max(memory, 0.0)) if memory is not None else None,
+            relative_error=relative_error,
+            samples=self.samples,
+            project_samples=len(ratios),
+        )
+
+
+def detect_regression(history: Sequence[BuildRecord]) -> Optional[Dict[str, float]]:
+    """
+    @brief Check whether a project's latest build was unusually slow
+    @param history Builds of one project, oldest first
+    @return Latest and expected seconds and their ratio, or None when the latest
+    build is in line with earlier ones (or there are too few to tell)
+
+    @details The baseline is the median time per input megabyte of up to ten
+    earlier successful builds with the same features, scaled to the latest
+    build's input size.
+    """
+    successful = [record for record in history if record.status == "success"]
+    if len(successful) < 2:
+        return None
+    latest = successful[-1]
+    earlier = [r for r in successful[:-1] if r.features == latest.features and r.input_bytes][-10:]
+    if not earlier or not latest.input_bytes:
+        return None
+    rate = statistics.median(r.seconds / r.input_bytes for r in earlier)
+    expected = rate * latest.input_bytes
+    if latest.seconds < expected * REGRESSION_RATIO or latest.seconds - expected < REGRESSION_MIN_SECONDS:
+        return None
+    return {"latest_seconds": latest.seconds, "expected_seconds": expected, "ratio": latest.seconds / expected}
+
+
+def suggest_timeout(prediction: Prediction) -> int:
+    """@brief Timeout leaving room for the prediction's error (at least a minute)"""
+    return max(60, math.ceil(prediction.seconds * (1 + 3 * prediction.relative_error) + 10))
+
+
+def suggest_shards(prediction: Prediction, target_seconds: float, input_files: int) -> int:
+    """@brief Shards needed for each to finish in about ``target_seconds``"""
+    if target_seconds <= 0:
+        return 1
+    return max(1, min(input_files or 1, math.ceil(prediction.seconds / target_seconds)))
+
+
+history_store = HistoryStore()
@@ -0,0 +1,324 @@
+"""
+Build job pool
+
+Doxygen runs are the expensive part of the server. When a single long-lived server
+is shared by many MCP clients (HTTP transports), every build goes through one
+process-wide pool that caps the total number of concurrent Doxygen processes,
+enforces a per-client concurrency quota and supports graceful draining on shutdown
+so that in-flight builds are allowed to finish instead of being killed.
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from functools import partial
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+from mcp.server.fastmcp import Context
+
+logger = logging.getLogger("doxygen-mcp")
+
+
+class DrainingError(RuntimeError):
+    """Raised when a build is requested while the pool is shutting down"""
+
+
+def client_key(ctx: Optional[Context]) -> str:
+    """
+    @brief Identify the calling client for per-client build quotas
+    @param ctx Request context injected by FastMCP, or None for direct calls
+    @return HTTP session id, in-process session id, or "local" for stdio and direct calls
+
+    @details The key comes from the transport session only. ``ctx.client_id`` is
+    read from the request's ``_meta`` and so is chosen by the client; keying on it
+    would let one session claim a fresh quota per request (see client_label).
+    """
+    if ctx is None:
+        return "local"
+    try:
+        request_context = ctx.request_context
+    except ValueError:
+        return "local"
+    request = getattr(request_context, "request", None)
+    headers = getattr(request, "headers", None)
+    if headers is not None and headers.get("mcp-session-id"):
+        return headers["mcp-session-id"]
+    return f"session-{id(request_context.session):x}"
+
+
+def client_label(ctx: Optional[Context]) -> Optional[str]:
+    """
+    @brief Client-supplied name shown next to a session in status reports
+    @param ctx Request context injected by FastMCP, or None for direct calls
+    @return The request's client id, or None when the client sent none
+    """
+    if ctx is None:
+        return None
+    try:
+        return ctx.client_id
+    except ValueError:
+        return None
+
+
+class BuildPool:
+    """
+    @brief Process-wide pool of Doxygen build slots
+
+    @details A build first acquires its client's quota slot and then one of the
+    global slots, so a single busy client can never occupy the whole pool. Clients
+    are identified by their transport session (see client_key); in stdio mode every
+    call shares the ``"local"`` key. Client-supplied labels are for display only.
+    """
+
+    def __init__(self, max_builds: Optional[int] = None, max_builds_per_client: int = 2):
+        self.max_builds = max_builds or max(1, os.cpu_count() or 1)
+        self.max_builds_per_client = max(1, max_builds_per_client)
+        self._global = asyncio.Semaphore(self.max_builds)
+        self._clients: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self._pending: Dict[str, int] = {}
+        self._labels: Dict[str, str] = {}
+        self._waiting = 0
+        self._draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind(self) -> None:
+        """
+        @brief Recreate the asyncio primitives when used from a new event loop
+
+        @details The module-level pool is created at import time, before any loop
+        exists, and test runners start a fresh loop per test. Primitives are only
+        rebuilt while the pool is idle, so no waiter can be lost.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        if self.active or self._waiting:
+            raise RuntimeError("Build pool is in use by another event loop")
+        self._loop = loop
+        self._global = asyncio.Semaphore(self.max_builds)
+        self._clients.clear()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def configure(self, max_builds: Optional[int] = None, max_builds_per_client: Optional[int] = None) -> None:
+        """
+        @brief Resize the pool; only valid while no builds are running
+        @param max_builds Total concurrent builds across all clients
+        @param max_builds_per_client Concurrent builds allowed for a single client
+        """
+        if self.active:
+            raise RuntimeError("Cannot reconfigure the build pool while builds are running")
+        if max_builds:
+            self.max_builds = max_builds
+            self._global = asyncio.Semaphore(max_builds)
+        if max_builds_per_client:
+            self.max_builds_per_client = max_builds_per_client
+            self._clients.clear()
+
+    @property
+    def active(self) -> int:
+        """@brief Number of builds currently holding a slot"""
+        return sum(self._active.values())
+
+    @property
+    def draining(self) -> bool:
+        """@brief True once shutdown has begun"""
+        return self._draining
+
+    def stats(self) -> Dict[str, object]:
+        """@brief Snapshot of pool usage for status reporting"""
+        return {
+            "max_builds": self.max_builds,
+            "max_builds_per_client": self.max_builds_per_client,
+            "active": self.active,
+            "waiting": self._waiting,
+            "clients": {self._display(key): count for key, count in self._active.items() if count},
+            "draining": self._draining,
+        }
+
+    def _display(self, client: str) -> str:
+        """@brief Client key with its last reported label, for status output"""
+        label = self._labels.get(client)
+        return f"{label} ({client})" if label and label != client else client
+
+    @asynccontextmanager
+    async def slot(self, client: str = "local", label: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        @brief Hold a build slot for the duration of the context
+        @param client Key identifying the calling client's session
+        @param label Optional client-supplied name shown in stats; never affects quotas
+        @throws DrainingError If the pool is draining for shutdown
+        """
+        if self._draining:
+            raise DrainingError("Server is shutting down; no new builds are accepted")
+
+        self._bind()
+        if label:
+            self._labels[client] = label
+        quota = self._clients.setdefault(client, asyncio.Semaphore(self.max_builds_per_client))
+        self._pending[client] = self._pending.get(client, 0) + 1
+        self._waiting += 1
+        acquired = False
+        try:
+            async with quota:
+                async with self._global:
+                    self._waiting -= 1
+                    acquired = True
+                    self._active[client] = self._active.get(client, 0) + 1
+                    self._idle.clear()
+                    try:
+                        yield
+                    finally:
+                        self._active[client] -= 1
+                        if not self._active[client]:
+                            del self._active[client]
+                        if not self._active:
+                            self._idle.set()
+        finally:
+            if not acquired:
+                # Cancelled while still queued for a slot.
+                self._waiting -= 1
+            self._pending[client] -= 1
+            if not self._pending[client]:
+                # Forget idle clients so long-lived servers do not accumulate sessions.
+                del self._pending[client]
+                self._clients.pop(client, None)
+                self._labels.pop(client, None)
+
+    def start_draining(self) -> None:
+        """@brief Stop accepting new builds; running builds are unaffected"""
+        if not self._draining:
+            logger.info("Build pool draining: %d build(s) in flight", self.active)
+        self._draining = True
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        @brief Stop accepting builds and wait for in-flight builds to finish
+        @param timeout Maximum seconds to wait, or None to wait indefinitely
+        @return True if the pool became idle, False if the timeout expired
+        """
+        self.start_draining()
+        self._bind()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Build pool drain timed out with %d build(s) still running", self.active)
+            return False
+        return True
+
+
+class ProcessResult(subprocess.CompletedProcess):
+    """
+    @brief Completed process with its resource usage
+    @details ``peak_rss`` (bytes) and ``cpu_seconds`` cover the process and the
+    children it waited for; both are None where ``os.wait4`` is unavailable.
+    """
+
+    peak_rss: Optional[int] = None
+    cpu_seconds: Optional[float] = None
+
+
+class _MeasuredPopen(subprocess.Popen):
+    """@brief Popen that keeps the child's rusage when reaping it"""
+
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        if not hasattr(os, "wait4"):
+            return super()._try_wait(wait_flags)
+        try:
+            pid, status, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, status
+
+
+def _peak_rss(rusage) -> int:
+    """@brief ru_maxrss in bytes (kilobytes on Linux, bytes on macOS)"""
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+# Threads that spawn and wait on external processes. They spend their time blocked
+# on pipes, so the pool is sized for concurrency rather than for CPU count.
+_process_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="doxygen-mcp-proc")
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """@brief Kill a process and reap it"""
+    with suppress(ProcessLookupError, OSError):
+        process.kill()
+    with suppress(Exception):
+        process.communicate()
+
+
+async def run_process(
+    cmd: Sequence[str],
+    cwd: Optional[str] = None,
+    input_text: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> ProcessResult:
+    """
+    @brief Run an external tool without blocking the event loop
+    @param cmd Command line
+    @param cwd Working directory
+    @param input_text Text fed to the process on stdin (None for no stdin)
+    @param timeout Seconds before the process is killed (None or 0 for no limit)
+    @return Completed process with decoded stdout/stderr and resource usage
+    @throws asyncio.TimeoutError If the timeout expires
+    @throws FileNotFoundError If the executable does not exist
+
+    @details Spawning (fork/exec) and waiting both happen on worker threads, so
+    even a burst of builds never stalls the event loop. On timeout or cancellation
+    the process is killed and reaped before the exception propagates, so superseded
+    or runaway Doxygen and dot processes never outlive the call that started them.
+    """
+    loop = asyncio.get_running_loop()
+    spawn = loop.run_in_executor(
+        _process_executor,
+        partial(
+            _MeasuredPopen,
+            list(cmd),
+            cwd=cwd,
+            stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ),
+    )
+    try:
+        process = await asyncio.shield(spawn)
+    except asyncio.CancelledError:
+        with suppress(Exception):
+            _kill(await spawn)
+        raise
+
+    data = input_text.encode("utf-8") if input_text is not None else None
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            loop.run_in_executor(_process_executor, process.communicate, data),
+            timeout or None,
+        )
+    except BaseException:
+        await asyncio.shield(loop.run_in_executor(_process_executor, _kill, process))
+        raise
+    result = ProcessResult(
+        list(cmd),
+        process.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace"),
+    )
+    if process.rusage is not None:
+        result.peak_rss = _peak_rss(process.rusage)
+        result.cpu_seconds = process.rusage.ru_utime + process.rusage.ru_stime
+    return result
+
+
+build_pool = BuildPool()
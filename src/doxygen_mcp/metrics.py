@@ -0,0 +1,501 @@
+"""
+Documentation metrics warehouse
+
+The numbers the tools already compute (warnings per build, files per extension,
+coverage) are appended to one column store, so questions across many projects
+("coverage by team this quarter", "warnings by category per month") are answered
+from a single query instead of re-running tools per repository.
+
+Each metric is split into one partition per project and category, made of two
+fixed-width column files: time (float64 Unix seconds) and value (float64). Rows are
+only ever appended, in time order, so a time window or a calendar bucket is found by
+binary search on the time column. Columns are read through ``mmap`` as typed
+memoryviews and aggregated a whole slice at a time (``fsum``, ``min``, ``max``)
+rather than row by row in Python.
+"""
+
+import bisect
+import contextlib
+import fnmatch
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .storage import state_dir, write_json_atomic
+
+# Column name -> array type code; the order is the row layout.
+COLUMNS = (("time", "d"), ("value", "d"))
+# Smaller columns are read instead of memory-mapped.
+MMAP_MIN_BYTES = 64 * 1024
+
+DIMENSIONS = ("project", "team", "category")
+AGGREGATES = ("sum", "mean", "min", "max", "count", "last")
+BUCKETS = ("hour", "day", "week", "month", "quarter", "year")
+
+# Doxygen warning classes, first match wins. Every build records all of them
+# (zeros included) so that trends have no gaps.
+WARNING_CATEGORIES = (
+    ("undocumented", re.compile(r"is not documented|not documented|no documentation", re.I)),
+    ("parameters", re.compile(r"argument|parameter|@param|\\param|return type", re.I)),
+    ("references", re.compile(r"unable to resolve|explicit link request|reference to|unknown (?:class|file)", re.I)),
+    ("markup", re.compile(r"unknown command|unsupported xml/html tag|end of list|unbalanced|found </|expected", re.I)),
+    ("other", re.compile(r"")),
+)
+
+_METRIC_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)\s*([hdwy])$")
+_UNITS = {"h": 3600.0, "d": 86400.0, "w": 7 * 86400.0, "y": 365 * 86400.0}
+UNASSIGNED = "(unassigned)"
+
+
+def warning_counts(warnings: Iterable[str]) -> Dict[str, int]:
+    """
+    @brief Count Doxygen warnings by category
+    @param warnings Warning lines from a build
+    @return Count for every category in WARNING_CATEGORIES
+    """
+    counts = {name: 0 for name, _ in WARNING_CATEGORIES}
+    for line in warnings:
+        for name, pattern in WARNING_CATEGORIES:
+            if pattern.search(line):
+                counts[name] += 1
+                break
+    return counts
+
+
+def parse_time(value: str, now: Optional[float] = None) -> Optional[float]:
+    """
+    @brief Interpret a time bound
+    @param value ISO date or datetime (UTC unless it has an offset), or an age such as
+    ``36h``, ``90d``, ``12w`` or ``1y``; empty for no bound
+    @return Unix seconds, or None for no bound
+    @throws ValueError If the value cannot be parsed
+    """
+    value = value.strip()
+    if not value:
+        return None
+    relative = _RELATIVE.match(value)
+    if relative:
+        return (time.time() if now is None else now) - float(relative.group(1)) * _UNITS[relative.group(2)]
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Unrecognised time '{value}'; use an ISO date or an age such as 90d") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def bucket_edges(start: float, end: float, bucket: str) -> List[Tuple[str, float]]:
+    """
+    @brief Calendar buckets (UTC) covering a time range
+    @param start First timestamp to cover
+    @param end Last timestamp to cover
+    @param bucket One of BUCKETS
+    @return (label, bucket start) pairs in time order
+    """
+    moment = datetime.fromtimestamp(start, timezone.utc)
+    if bucket == "hour":
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    else:
+        moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        moment -= timedelta(days=moment.weekday())
+    elif bucket == "month":
+        moment = moment.replace(day=1)
+    elif bucket == "quarter":
+        moment = moment.replace(month=3 * ((moment.month - 1) // 3) + 1, day=1)
+    elif bucket == "year":
+        moment = moment.replace(month=1, day=1)
+
+    edges = []
+    while moment.timestamp() <= end:
+        if bucket == "hour":
+            label, following = moment.strftime("%Y-%m-%d %H:00"), moment + timedelta(hours=1)
+        elif bucket == "day":
+            label, following = moment.strftime("%Y-%m-%d"), moment + timedelta(days=1)
+        elif bucket == "week":
+            year, week, _ = moment.isocalendar()
+            label, following = f"{year}-W{week:02d}", moment + timedelta(weeks=1)
+        elif bucket == "year":
+            label, following = str(moment.year), moment.replace(year=moment.year + 1)
+        else:
+            step = 1 if bucket == "month" else 3
+            label = moment.strftime("%Y-%m") if step == 1 else f"{moment.year}-Q{(moment.month - 1) // 3 + 1}"
+            month = moment.month - 1 + step
+            following = moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+        edges.append((label, moment.timestamp()))
+        moment = following
+    return edges
+
+class MetricRow(NamedTuple):
+    """@brief One value to append"""
+
+    project: str
+    category: str
+    value: float
+    at: Optional[float] = None  # Unix seconds; now when omitted
+
+
+class Columns:
+    """
+    @brief Read-only view of one partition
+
+    @details ``time`` and ``value`` are typed memoryviews of equal length. Columns
+    of at least MMAP_MIN_BYTES are memory-mapped; smaller ones are read, which is
+    cheaper than setting up a mapping. Use as a context manager; views must not be
+    kept after it exits.
+    """
+
+    def __init__(self, directory: str):
+        self._maps: List[mmap.mmap] = []
+        self._views: List[memoryview] = []
+        files = []
+        try:
+            for name, code in COLUMNS:
+                try:
+                    fd = os.open(os.path.join(directory, f"{name}.col"), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+                except FileNotFoundError:
+                    fd = -1
+                files.append((name, code, fd, os.fstat(fd).st_size if fd >= 0 else 0))
+            self.rows = min(size // array(code).itemsize for _, code, _, size in files)
+            for name, code, fd, size in files:
+                if self.rows and size >= MMAP_MIN_BYTES:
+                    mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                    self._maps.append(mapped)
+                    raw = memoryview(mapped)
+                    self._views.append(raw)
+                    view = raw.cast(code)[:self.rows]
+                else:
+                    data = array(code)
+                    if self.rows:
+                        data.frombytes(os.read(fd, self.rows * data.itemsize))
+                    view = memoryview(data)
+                self._views.append(view)
+                setattr(self, name, view)
+        finally:
+            for _, _, fd, _ in files:
+                if fd >= 0:
+                    os.close(fd)
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # a slice is still referenced; the map is closed when it is collected
+        self._views, self._maps = [], []
+
+    def __enter__(self) -> "Columns":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _column_rows(directory: str, name: str, code: str) -> int:
+    try:
+        return os.stat(os.path.join(directory, f"{name}.col")).st_size // array(code).itemsize
+    except FileNotFoundError:
+        return 0
+
+
+def _partition_rows(directory: str) -> int:
+    """@brief Complete rows of a partition (the shortest column after a torn append)"""
+    return min(_column_rows(directory, name, code) for name, code in COLUMNS)
+
+
+class _Accumulator:
+    """@brief Running aggregate of one group, merged from partition slices"""
+
+    __slots__ = ("total", "count", "low", "high", "last", "last_time")
+
+    def __init__(self):
+        self.total, self.count = 0.0, 0
+        self.low, self.high = math.inf, -math.inf
+        self.last, self.last_time = 0.0, -math.inf
+
+    def add(self, aggregate: str, values: memoryview, times: memoryview) -> None:
+        self.count += len(values)
+        if aggregate in ("sum", "mean"):
+            self.total += math.fsum(values)
+        elif aggregate == "min":
+            self.low = min(self.low, min(values))
+        elif aggregate == "max":
+            self.high = max(self.high, max(values))
+        elif aggregate == "last" and times[-1] >= self.last_time:
+            self.last, self.last_time = values[-1], times[-1]
+
+    def result(self, aggregate: str) -> float:
+        if aggregate == "mean":
+            return self.total / self.count
+        if aggregate == "count":
+            return float(self.count)
+        return {"sum": self.total, "min": self.low, "max": self.high, "last": self.last}[aggregate]
+
+
+class QueryResult(NamedTuple):
+    """@brief Aggregated groups and what it took to compute them"""
+
+    groups: List[Dict[str, object]]
+    rows_scanned: int
+    rows_total: int
+    seconds: float
+
+
+class MetricsStore:
+    """
+    @brief Append-only column store of documentation metrics
+
+    @details Layout below the data home::
+
+        metrics/strings.json                               project and category names
+        metrics/<metric>/p<project id>/c<category id>/{time,value}.col
+
+    Ids are positions in ``strings.json``. Because every partition holds a single
+    project and category, grouping never looks at individual rows: each partition
+    contributes whole slices to its group. A crash between column appends leaves
+    columns of unequal length; readers use the shortest, and the next append
+    truncates the others back to it.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+        self._lock = threading.Lock()
+        self._strings: Optional[Tuple[Path, Tuple[int, int, int], List[str], Dict[str, int]]] = None
+
+    @property
+    def root(self) -> Path:
+        """@brief Warehouse directory (resolved lazily so DOXYGEN_MCP_HOME changes apply)"""
+        if self._root is not None:
+            self._root.mkdir(parents=True, exist_ok=True)
+            return self._root
+        return state_dir("metrics")
+
+    @staticmethod
+    def _stamp(path: Path) -> Tuple[int, int, int]:
+        """@brief Modification time, size and inode of a file (zeros when it is missing)"""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return 0, 0, 0
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _dictionary(self) -> Tuple[List[str], Dict[str, int]]:
+        # strings.json is replaced atomically, so a rewrite within the clock's
+        # resolution still changes the inode even if mtime and size match
+        path = self.root / "strings.json"
+        stamp = self._stamp(path)
+        if self._strings is None or self._strings[:2] != (path, stamp):
+            names = json.loads(path.read_text(encoding="utf-8")) if stamp[0] else []
+            self._strings = (path, stamp, names, {name: position for position, name in enumerate(names)})
+        return self._strings[2], self._strings[3]
+
+    def metrics(self) -> List[str]:
+        """@brief Names of the metrics with at least one row"""
+        return sorted({
+            metric for metric, _, _, directory in self.partitions()
+            if _partition_rows(directory)
+        })
+
+    def partitions(self, metric: str = "") -> List[Tuple[str, str, str, str]]:
+        """
+        @brief Partitions of one metric, or of all metrics
+        @return (metric, project, category, directory) tuples
+        """
+        names, _ = self._dictionary()
+        found = []
+        metrics = [metric] if metric else [entry.name for entry in os.scandir(self.root) if entry.is_dir()]
+        for name in metrics:
+            for project in _scan_ids(os.path.join(self.root, name), "p", len(names)):
+                for category in _scan_ids(project.path, "c", len(names)):
+                    found.append((name, names[int(project.name[1:])], names[int(category.name[1:])], category.path))
+        return sorted(found)
+
+    def append(self, metric: str, rows: Sequence[MetricRow]) -> int:
+        """
+        @brief Append rows to a metric
+        @param metric Metric name (lower case letters, digits and underscores)
+        @param rows Rows to add; a row older than the newest stored row of its
+        partition is stamped with that row's time so the time column stays sorted
+        @return Number of rows appended
+        @throws ValueError For an invalid metric name
+        """
+        if not _METRIC_NAME.match(metric):
+            raise ValueError(f"Invalid metric name: {metric}")
+        if not rows:
+            return 0
+        now = time.time()
+        with self._lock:
+            names, ids = self._dictionary()
+            added = [name for name in dict.fromkeys(n for row in rows for n in (row.project, row.category))
+                     if name not in ids]
+            if added:
+                path = self.root / "strings.json"
+                names = names + added
+                write_json_atomic(path, names)
+                ids = {name: position for position, name in enumerate(names)}
+                self._strings = (path, self._stamp(path), names, ids)
+
+            partitions: Dict[Tuple[int, int], List[MetricRow]] = defaultdict(list)
+            for row in rows:
+                partitions[ids[row.project], ids[row.category]].append(row)
+            for (project, category), partition_rows in partitions.items():
+                directory = os.path.join(self.root, metric, f"p{project}", f"c{category}")
+                _append_partition(directory, partition_rows, now)
+        return len(rows)
+
+    def record(self, project: str, values: Mapping[str, Mapping[str, float]], at: Optional[float] = None) -> None:
+        """
+        @brief Append one observation of several metrics for a project
+        @param project Project identifier (the resolved project path)
+        @param values Metric name -> category -> value
+        @param at Unix seconds; now when omitted
+        """
+        at = time.time() if at is None else at
+        for metric, categories in values.items():
+            self.append(metric, [MetricRow(project, category, value, at) for category, value in categories.items()])
+
+    def query(
+        self,
+        metric: str,
+        group_by: Sequence[str] = ("project",),
+        aggregate: str = "last",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bucket: str = "",
+        projects: str = "",
+        categories: Sequence[str] = (),
+        teams: Optional[Mapping[str, str]] = None,
+    ) -> QueryResult:
+        """
+        @brief Aggregate a metric by dimensions and calendar buckets
+        @param metric Metric name
+        @param group_by Dimensions from DIMENSIONS
+        @param aggregate One of AGGREGATES
+        @param since Earliest timestamp (inclusive), or None
+        @param until Latest timestamp (exclusive), or None
+        @param bucket Calendar bucket from BUCKETS, or empty for one bucket
+        @param projects Glob matched against project identifiers; empty for all
+        @param categories Categories to keep; empty for all
+        @param teams Project glob -> team name; the first matching glob wins
+        @return Groups ordered by bucket and then by dimension values
+        @throws ValueError For unknown metrics, dimensions, aggregates or buckets
+        """
+        for dimension in group_by:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension '{dimension}'. Use any of: {', '.join(DIMENSIONS)}")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}'. Use one of: {', '.join(AGGREGATES)}")
+        if bucket and bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+        if not _METRIC_NAME.match(metric) or not (self.root / metric).is_dir():
+            known = ", ".join(self.metrics()) or "none recorded yet"
+            raise ValueError(f"Unknown metric '{metric}' (known: {known})")
+
+        started = time.perf_counter()
+        wanted = set(categories)
+        patterns = list((teams or {}).items())
+        team_of: Dict[str, str] = {}
+        groups: Dict[tuple, _Accumulator] = defaultdict(_Accumulator)
+        scanned = total = 0
+        with contextlib.ExitStack() as stack:
+            # Open every selected partition and find its rows inside the time window
+            selected = []
+            for _, project, category, directory in self.partitions(metric):
+                if (projects and not fnmatch.fnmatchcase(project, projects)) or (wanted and category not in wanted):
+                    total += _partition_rows(directory)
+                    continue
+                columns = stack.enter_context(Columns(directory))
+                total += columns.rows
+                lo = 0 if since is None else bisect.bisect_left(columns.time, since)
+                hi = columns.rows if until is None else bisect.bisect_left(columns.time, until, lo)
+                if lo < hi:
+                    selected.append((project, category, columns, lo, hi))
+            edges: List[Tuple[str, float]] = []
+            if bucket and selected:
+                start = min(columns.time[lo] for _, _, columns, lo, _ in selected)
+                end = max(columns.time[hi - 1] for _, _, columns, _, hi in selected)
+                edges = bucket_edges(start, end, bucket)
+            starts = [start for _, start in edges]
+
+            for project, category, columns, lo, hi in selected:
+                if project not in team_of:
+                    team_of[project] = next(
+                        (team for pattern, team in patterns if fnmatch.fnmatchcase(project, pattern)), UNASSIGNED
+                    )
+                dimensions = {"project": project, "team": team_of[project], "category": category}
+                key = tuple(dimensions[dimension] for dimension in group_by)
+                times = columns.time
+                scanned += hi - lo
+                if not bucket:
+                    groups[("",) + key].add(aggregate, columns.value[lo:hi], times[lo:hi])
+                    continue
+                # Row ranges per bucket, found by binary search on the sorted time column
+                position = max(0, bisect.bisect_right(starts, times[lo]) - 1)
+                first = lo
+                while first < hi:
+                    end = starts[position + 1] if position + 1 < len(starts) else math.inf
+                    last = bisect.bisect_left(times, end, first, hi)
+                    if first < last:
+                        groups[(edges[position][0],) + key].add(aggregate, columns.value[first:last], times[first:last])
+                    first, position = last, position + 1
+
+        order = {label: position for position, (label, _) in enumerate(edges)}
+        result = []
+        for key in sorted(groups, key=lambda key: (order.get(key[0], 0),) + key[1:]):
+            accumulator = groups[key]
+            group: Dict[str, object] = {"bucket": key[0]} if bucket else {}
+            group.update(zip(group_by, key[1:]))
+            group.update(value=accumulator.result(aggregate), rows=accumulator.count)
+            result.append(group)
+        return QueryResult(result, scanned, total, time.perf_counter() - started)
+
+
+def _scan_ids(directory: str, prefix: str, limit: int) -> List[os.DirEntry]:
+    """@brief Partition subdirectories named ``<prefix><id>`` with a known id"""
+    try:
+        entries = list(os.scandir(directory))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return [
+        entry for entry in entries
+        if entry.name.startswith(prefix) and entry.name[1:].isdigit() and int(entry.name[1:]) < limit
+    ]
+
+
+def _append_partition(directory: str, rows: List[MetricRow], now: float) -> None:
+    """@brief Append rows of one project and category, repairing a torn earlier append"""
+    os.makedirs(directory, exist_ok=True)
+    stored = _partition_rows(directory)
+    for name, code in COLUMNS:
+        if _column_rows(directory, name, code) > stored:
+            os.truncate(os.path.join(directory, f"{name}.col"), stored * array(code).itemsize)
+    latest = -math.inf
+    if stored:
+        with open(os.path.join(directory, "time.col"), "rb") as f:
+            f.seek((stored - 1) * array("d").itemsize)
+            latest = array("d", f.read())[0]
+
+    times, values = array("d"), array("d")
+    for row in sorted(rows, key=lambda row: now if row.at is None else row.at):
+        latest = max(latest, now if row.at is None else row.at)
+        times.append(latest)
+        values.append(float(row.value))
+    for name, column in (("time", times), ("value", values)):
+        with open(os.path.join(directory, f"{name}.col"), "ab") as f:
+            column.tofile(f)
+
+
+metrics_store = MetricsStore()
@@ -0,0 +1,801 @@
+"""
+Native Python API extraction
+
+Doxygen is slow on large Python trees and its Python parser predates much of the
+modern syntax (positional-only parameters, PEP 604/695 annotations, ``match``).
+For projects whose inputs are all Python, XML builds can skip Doxygen entirely:
+
+- Every ``*.py``/``*.pyi`` file is parsed with ``ast`` on a process pool and
+  reduced to a small outline (classes, functions, variables, docstrings,
+  signatures, imports and called names). Outlines do not depend on where a file
+  lives, so they are cached by content hash; a rebuild only parses files whose
+  content changed.
+- The outlines are written as Doxygen-schema XML: a ``namespace`` compound per
+  module (packages are resolved through ``__init__.py`` files), a ``class``
+  compound per class, a ``file`` compound per source file, ``index.xml`` and a
+  tag file. Refids use Doxygen's escaping, and calls that resolve to functions of
+  the project become ``<references>``/``<referencedby>`` elements.
+
+The coverage, drift, call graph and page rendering tools therefore read the
+output like a Doxygen XML build. Docstrings are taken verbatim; Doxygen-style
+(``@brief``, ``@param``, ``@return``) and Sphinx-style (``:param x:``,
+``:returns:``) fields are converted, as are ``##`` comment blocks above a
+definition.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .estimate import CHUNK_SIZE, POOL_THRESHOLD, PYTHON_EXTENSIONS, _process_pool
+from .staging import swap_into_place
+from .storage import state_dir, write_json_atomic
+
+# Bump when outlines change shape; cached outlines of other versions are re-parsed.
+EXTRACTOR_VERSION = 1
+GENERATOR = f"doxygen-mcp-python-{EXTRACTOR_VERSION}"
+
+# Longest initial value shown for a variable.
+MAX_INITIALIZER = 80
+
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+_REFID_ESCAPES = {
+    "_": "__", ":": "_1", "/": "_2", "<": "_3", ">": "_4", "*": "_5", "&": "_6",
+    "|": "_7", ".": "_8", "!": "_9", ",": "_00", " ": "_01",
+}
+_FIELD = re.compile(r"^(?:[@\\](\w+)(?:\[[^\]]*\])?|:(\w+)(?:\s+[^:]*)?:)\s*(.*)$")
+_SPHINX_PARAM = re.compile(r"^:(?:param|parameter|arg|argument|key|keyword)\s+(?:[^:]*\s)?(\*{0,2}\w+):\s*(.*)$")
+
+
+class ExtractResult(NamedTuple):
+    """@brief What an extraction run did"""
+
+    files: int
+    parsed: int  # files parsed this run (the others came from the cache)
+    compounds: int
+    members: int
+    warnings: List[str]
+    seconds: float
+
+
+# Outlines --------------------------------------------------------------------
+
+def _comment_block(node, lines: List[str]) -> str:
+    """@brief Text of a ``##`` comment block directly above a definition"""
+    first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    block = []
+    index = first - 2
+    while index >= 0 and lines[index].lstrip().startswith("#"):
+        block.append(lines[index].strip())
+        index -= 1
+    block.reverse()
+    if not block or not block[0].startswith("##"):
+        return ""
+    return "\n".join(re.sub(r"^#+ ?", "", line) for line in block).strip()
+
+
+def _called_names(node) -> List[str]:
+    """@brief Dotted names called anywhere in a function body"""
+    names = set()
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Call):
+            continue
+        parts = []
+        target = child.func
+        while isinstance(target, ast.Attribute):
+            parts.append(target.attr)
+            target = target.value
+        if isinstance(target, ast.Name):
+            parts.append(target.id)
+            names.add(".".join(reversed(parts)))
+    return sorted(names)
+
+
+def _parameters(args: ast.arguments) -> List[List[str]]:
+    """@brief [name, annotation, default] for every parameter, in order"""
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params = []
+    for arg, default in zip(positional, defaults):
+        params.append([arg.arg, arg.annotation, default])
+    if args.vararg:
+        params.append(["*" + args.vararg.arg, args.vararg.annotation, None])
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append([arg.arg, arg.annotation, default])
+    if args.kwarg:
+        params.append(["**" + args.kwarg.arg, args.kwarg.annotation, None])
+    return [
+        [name, ast.unparse(annotation) if annotation is not None else "",
+         ast.unparse(default) if default is not None else ""]
+        for name, annotation, default in params
+    ]
+
+
+def _outline_body(body: List[ast.stmt], lines: List[str], imports: Optional[List[list]]) -> List[dict]:
+    """@brief Outline the definitions of a module or class body"""
+    entries: List[dict] = []
+    for index, node in enumerate(body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            decorators = [ast.unparse(d) for d in node.decorator_list]
+            returns = ast.unparse(node.returns) if node.returns is not None else ""
+            entries.append({
+                "kind": "function",
+                "name": node.name,
+                "line": node.lineno,
+                "end": node.end_lineno,
+                "doc": ast.get_docstring(node) or _comment_block(node, lines),
+                "args": f"({ast.unparse(node.args)})" + (f" -> {returns}" if returns else ""),
+                "params": _parameters(node.args),
+                "returns": returns,
+                "decorators": decorators,
+                "async": isinstance(node, ast.AsyncFunctionDef),
+                "calls": _called_names(node),
+            })
+        elif isinstance(node, ast.ClassDef):
+            entries.append({
+                "kind": "class",
+                "name": node.name,
+                "line": node.lineno,
+                "end": node.end_lineno,
+                "doc": ast.get_docstring(node) or _comment_block(node, lines),
+                "bases": [ast.unparse(base) for base in node.bases],
+                "members": _outline_body(node.body, lines, None),
+            })
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if len(targets) != 1 or not isinstance(targets[0], ast.Name):
+                continue
+            following = body[index + 1] if index + 1 < len(body) else None
+            doc = _comment_block(node, lines)
+            if (isinstance(following, ast.Expr) and isinstance(following.value, ast.Constant)
+                    and isinstance(following.value.value, str)):
+                doc = following.value.value.strip()
+            value = ast.unparse(node.value) if node.value is not None else ""
+            entries.append({
+                "kind": "variable",
+                "name": targets[0].id,
+                "line": node.lineno,
+                "end": node.end_lineno,
+                "doc": doc,
+                "type": ast.unparse(node.annotation) if isinstance(node, ast.AnnAssign) else "",
+                "value": value if len(value) <= MAX_INITIALIZER else value[:MAX_INITIALIZER - 3] + "...",
+            })
+        elif isinstance(node, (ast.Import, ast.ImportFrom)) and imports is not None:
+            for alias in node.names:
+                if isinstance(node, ast.Import):
+                    bound = alias.asname or alias.name.split(".")[0]
+                    imports.append([bound, alias.name if alias.asname else bound, 0])
+                elif alias.name != "*":
+                    imports.append([alias.asname or alias.name, f"{node.module or ''}.{alias.name}".lstrip("."),
+                                    node.level])
+        elif isinstance(node, ast.If):
+            # Definitions guarded by version checks
+            entries += _outline_body(node.body, lines, imports)
+            entries += _outline_body(node.orelse, lines, imports)
+        elif isinstance(node, ast.Try):
+            # Fallback definitions for optional imports
+            entries += _outline_body(node.body, lines, imports)
+            for handler in node.handlers:
+                entries += _outline_body(handler.body, lines, imports)
+            entries += _outline_body(node.orelse, lines, imports)
+    return entries
+
+
+def outline_python(text: str) -> dict:
+    """
+    @brief Reduce Python source to the outline the XML is written from
+    @param text Source code
+    @return JSON-serialisable outline (``doc``, ``imports``, ``members``)
+    @throws SyntaxError If the source cannot be parsed
+    """
+    tree = ast.parse(text)
+    lines = text.splitlines()
+    imports: List[list] = []
+    members = _outline_body(tree.body, lines, imports)
+    return {"doc": ast.get_docstring(tree) or "", "imports": imports, "members": members}
+
+
+def _outline_file(path: str, cached_hash: str) -> Tuple[str, str, Optional[dict], str]:
+    """
+    @brief Hash a file and outline it unless its content is unchanged
+    @return (path, content hash, outline or None when cached, error message)
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return path, "", None, str(e)
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == cached_hash:
+        return path, digest, None, ""
+    try:
+        return path, digest, outline_python(data.decode("utf-8", errors="replace")), ""
+    except (SyntaxError, ValueError) as e:
+        line = getattr(e, "lineno", None) or 0
+        return path, digest, {"doc": "", "imports": [], "members": [], "error": [line, str(e)]}, ""
+
+
+def _outline_chunk(items: List[Tuple[str, str]]) -> List[Tuple[str, str, Optional[dict], str]]:
+    return [_outline_file(path, cached_hash) for path, cached_hash in items]
+
+
+def outline_files(paths: Sequence[Path], cache_key: str) -> Tuple[Dict[str, dict], int, List[str]]:
+    """
+    @brief Outline many files, reusing cached outlines of unchanged content
+    @param paths Python source files
+    @param cache_key Identifier of the cache (one per project)
+    @return (outline per path, number of files parsed, unreadable-file warnings)
+    """
+    cache_path = state_dir("pyextract") / f"{cache_key}.json"
+    cached: Dict[str, dict] = {}
+    if cache_path.is_file():
+        try:
+            stored = json.loads(cache_path.read_text(encoding="utf-8"))
+            if stored.get("version") == EXTRACTOR_VERSION:
+                cached = stored["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    items = [(str(path), cached.get(str(path), {}).get("hash", "")) for path in paths]
+    if len(items) < POOL_THRESHOLD:
+        results = _outline_chunk(items)
+    else:
+        chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+        results = [result for chunk in _process_pool().map(_outline_chunk, chunks) for result in chunk]
+
+    files: Dict[str, dict] = {}
+    outlines: Dict[str, dict] = {}
+    warnings: List[str] = []
+    parsed = 0
+    for path, digest, outline, error in results:
+        if error:
+            warnings.append(f"{path}:1: warning: cannot read file: {error}")
+            continue
+        if outline is None:
+            outline = cached[path]["outline"]
+        else:
+            parsed += 1
+        files[path] = {"hash": digest, "outline": outline}
+        outlines[path] = outline
+    write_json_atomic(cache_path, {"version": EXTRACTOR_VERSION, "files": files})
+    return outlines, parsed, warnings
+
+
+# Doxygen XML -----------------------------------------------------------------
+
+def escape_refid(name: str) -> str:
+    """
+    @brief Doxygen's file-name escaping of a compound name
+    @param name Scoped name or file name
+    @return Escaped name, case preserved (``CASE_SENSE_NAMES = YES``, Doxygen's
+    default on Linux)
+    """
+    out = []
+    for char in name:
+        if char in _REFID_ESCAPES:
+            out.append(_REFID_ESCAPES[char])
+        elif char.isalnum() or char == "-":
+            out.append(char)
+        else:
+            out.append(f"_x{ord(char):04x}")
+    return "".join(out)
+
+
+def _namespace_id(module: str) -> str:
+    """@brief Refid of a module's namespace compound"""
+    return "namespace" + escape_refid(module.replace(".", "::"))
+
+
+def _protection(name: str) -> str:
+    if name.startswith("__") and not name.endswith("__"):
+        return "private"
+    if name.startswith("_") and not name.startswith("__"):
+        return "protected"
+    return "public"
+
+
+def parse_docstring(doc: str) -> Tuple[str, List[str], List[Tuple[str, str]], str]:
+    """
+    @brief Split a docstring into Doxygen's parts
+    @param doc Cleaned docstring
+    @return (brief, detailed paragraphs, parameter descriptions, return description)
+    """
+    brief = ""
+    paragraphs: List[str] = []
+    params: List[Tuple[str, str]] = []
+    returns = ""
+    current: List[str] = []
+    target = None  # ("brief",) / ("param", index) / ("return",) for field continuation lines
+
+    def flush():
+        if current:
+            paragraphs.append(" ".join(current))
+            current.clear()
+
+    for raw in doc.splitlines():
+        line = raw.strip()
+        if not line:
+            flush()
+            target = None
+            continue
+        sphinx = _SPHINX_PARAM.match(line)
+        field = _FIELD.match(line)
+        if sphinx:
+            flush()
+            params.append((sphinx.group(1), sphinx.group(2)))
+            target = ("param", len(params) - 1)
+        elif field and (field.group(1) or field.group(2)).lower() in (
+            "brief", "short", "param", "return", "returns", "details", "type", "rtype", "raises", "raise"
+        ):
+            flush()
+            command = (field.group(1) or field.group(2)).lower()
+            rest = field.group(3)
+            if command in ("brief", "short"):
+                brief, target = rest, ("brief",)
+            elif command == "param":
+                name, _, text = rest.partition(" ")
+                params.append((name, text.strip()))
+                target = ("param", len(params) - 1)
+            elif command in ("return", "returns"):
+                returns, target = rest, ("return",)
+            elif command == "details":
+                if rest:
+                    current.append(rest)
+                target = None
+            else:
+                target = ("ignored",)
+        elif target == ("brief",):
+            brief += " " + line
+        elif target == ("return",):
+            returns += " " + line
+        elif target and target[0] == "param":
+            name, text = params[target[1]]
+            params[target[1]] = (name, f"{text} {line}".strip())
+        elif target == ("ignored",):
+            continue
+        else:
+            current.append(line)
+    flush()
+    if not brief and paragraphs:
+        brief = paragraphs.pop(0)
+    return brief, paragraphs, params, returns
+
+
+def _description(parent: ET.Element, tag: str, paragraphs: Iterable[str]) -> ET.Element:
+    element = ET.SubElement(parent, tag)
+    for text in paragraphs:
+        ET.SubElement(element, "para").text = text
+    return element
+
+
+def _documentation(parent: ET.Element, doc: str) -> None:
+    """@brief Append ``briefdescription`` and ``detaileddescription`` for a docstring"""
+    brief, paragraphs, params, returns = parse_docstring(doc)
+    _description(parent, "briefdescription", [brief] if brief else [])
+    detailed = _description(parent, "detaileddescription", paragraphs)
+    if params:
+        holder = ET.SubElement(ET.SubElement(detailed, "para"), "parameterlist", kind="param")
+        for name, text in params:
+            item = ET.SubElement(holder, "parameteritem")
+            ET.SubElement(ET.SubElement(item, "parameternamelist"), "parametername").text = name
+            ET.SubElement(ET.SubElement(item, "parameterdescription"), "para").text = text
+    if returns:
+        section = ET.SubElement(ET.SubElement(detailed, "para"), "simplesect", kind="return")
+        ET.SubElement(section, "para").text = returns.strip()
+
+
+def _location(parent: ET.Element, file: str, entry: dict) -> None:
+    ET.SubElement(parent, "location", file=file, line=str(entry.get("line", 1)), column="1",
+                  bodyfile=file, bodystart=str(entry.get("line", 1)), bodyend=str(entry.get("end") or -1))
+
+
+class _Module(NamedTuple):
+    name: str  # dotted module name
+    path: str  # source path relative to the project root
+    outline: dict
+    is_package: bool
+
+
+class _Symbol(NamedTuple):
+    refid: str
+    compound: str  # refid of the compound that defines it
+    kind: str  # "class", "function" or "variable"
+    entry: dict
+    scope: str  # dotted name of the enclosing module or class
+
+
+def _module_names(paths: Sequence[str]) -> Dict[str, Tuple[str, bool]]:
+    """
+    @brief Dotted module name of every source file
+    @param paths Source paths relative to the project root (POSIX separators)
+    @return Path mapped to (module name, whether it is a package ``__init__``)
+    """
+    present = set(paths)
+
+    def is_package(directory: str) -> bool:
+        prefix = f"{directory}/" if directory else ""
+        return f"{prefix}__init__.py" in present or f"{prefix}__init__.pyi" in present
+
+    names = {}
+    for path in paths:
+        directory, _, filename = path.rpartition("/")
+        stem = filename.rsplit(".", 1)[0]
+        parts = [] if stem == "__init__" else [stem]
+        while directory and is_package(directory):
+            directory, _, package = directory.rpartition("/")
+            parts.insert(0, package)
+        names[path] = (".".join(parts) or stem, stem == "__init__")
+    return names
+
+
+class _XmlWriter:
+    """
+    @brief Writes the compounds, index and tag file of a set of outlined modules
+    """
+
+    def __init__(self, modules: List[_Module], extract_private: bool):
+        self.modules = modules
+        self.extract_private = extract_private
+        self.symbols: Dict[str, _Symbol] = {}
+        self.references: Dict[str, set] = {}
+        self.referenced_by: Dict[str, set] = {}
+        self.compounds: List[Tuple[str, str, str, List[Tuple[str, str, str]]]] = []
+        self._bases: Dict[str, List[str]] = {}
+        self._file_paths: Dict[str, str] = {}
+        for module in modules:
+            self._collect(module.outline["members"], module.name, _namespace_id(module.name))
+
+    def _visible(self, entry: dict) -> bool:
+        return self.extract_private or _protection(entry["name"]) != "private"
+
+    def _classes(self, scope: str, entries: List[dict]) -> List[Tuple[str, dict]]:
+        """@brief Visible classes of a scope, skipping redefinitions of a name (first one wins)"""
+        classes = []
+        for item in entries:
+            if item["kind"] == "class" and self._visible(item):
+                qualified = f"{scope}.{item['name']}"
+                if self.symbols[qualified].entry is item:
+                    classes.append((qualified, item))
+        return classes
+
+    def _collect(self, entries: List[dict], scope: str, compound: str) -> None:
+        for entry in entries:
+            if not self._visible(entry):
+                continue
+            qualified = f"{scope}.{entry['name']}"
+            if entry["kind"] == "class":
+                refid = "class" + escape_refid(qualified.replace(".", "::"))
+                if self.symbols.setdefault(qualified, _Symbol(refid, refid, "class", entry, scope)).entry is entry:
+                    self._collect(entry["members"], qualified, refid)
+            else:
+                anchor = hashlib.md5(f"{qualified}{entry.get('args', '')}".encode("utf-8")).hexdigest()
+                self.symbols.setdefault(qualified, _Symbol(f"{compound}_1a{anchor}", compound, entry["kind"], entry, scope))
+
+    # Name resolution
+
+    def _imports(self, module: _Module) -> Dict[str, str]:
+        package = module.name if module.is_package else module.name.rpartition(".")[0]
+        resolved = {}
+        for bound, target, level in module.outline["imports"]:
+            if level:
+                base = package.split(".") if package else []
+                base = base[:len(base) - (level - 1)] if level > 1 else base
+                target = ".".join(base + ([target] if target else []))
+            resolved[bound] = target
+        return resolved
+
+    def _method(self, class_name: str, name: str, seen: Optional[set] = None) -> Optional[_Symbol]:
+        """@brief Look a method up along a project class's bases"""
+        seen = seen if seen is not None else set()
+        if class_name in seen:
+            return None
+        seen.add(class_name)
+        symbol = self.symbols.get(f"{class_name}.{name}")
+        if symbol is not None:
+            return symbol
+        for base in self._bases.get(class_name, []):
+            symbol = self._method(base, name, seen)
+            if symbol is not None:
+                return symbol
+        return None
+
+    @staticmethod
+    def _qualify(dotted: str, module: str, imports: Dict[str, str]) -> str:
+        """@brief Fully qualified form of a name used inside a module"""
+        head, _, rest = dotted.partition(".")
+        if head in imports:
+            return imports[head] + (f".{rest}" if rest else "")
+        return f"{module}.{dotted}"
+
+    def _resolve(self, dotted: str, module: str, imports: Dict[str, str], class_name: str = "") -> Optional[str]:
+        """@brief Qualified name a called name refers to, when it is part of the project"""
+        head, _, rest = dotted.partition(".")
+        if head in ("self", "cls") and class_name and rest and "." not in rest:
+            symbol = self._method(class_name, rest)
+            return f"{symbol.scope}.{rest}" if symbol else None
+        full = self._qualify(dotted, module, imports)
+        symbol = self.symbols.get(full)
+        if symbol is not None and symbol.kind == "class":
+            constructor = self._method(full, "__init__")
+            return f"{constructor.scope}.__init__" if constructor else None
+        return full if symbol is not None else None
+
+    def link(self) -> None:
+        """@brief Resolve base classes and calls between project functions"""
+        for module in self.modules:
+            imports = self._imports(module)
+
+            def bases(entries: List[dict], scope: str) -> None:
+                for qualified, entry in self._classes(scope, entries):
+                    self._bases[qualified] = [
+                        full if full in self.symbols else base
+                        for base, full in ((base, self._qualify(base, module.name, imports)) for base in entry["bases"])
+                    ]
+                    bases(entry["members"], qualified)
+
+            bases(module.outline["members"], module.name)
+
+        for module in self.modules:
+            imports = self._imports(module)
+
+            def calls(entries: List[dict], scope: str, class_name: str = "") -> None:
+                for entry in entries:
+                    if not self._visible(entry):
+                        continue
+                    qualified = f"{scope}.{entry['name']}"
+                    if entry["kind"] == "class":
+                        if self.symbols[qualified].entry is entry:
+                            calls(entry["members"], qualified, qualified)
+                    elif entry["kind"] == "function":
+                        caller = self.symbols[qualified].refid
+                        for name in entry["calls"]:
+                            target = self._resolve(name, module.name, imports, class_name)
+                            if target is None:
+                                continue
+                            callee = self.symbols[target].refid
+                            self.references.setdefault(caller, set()).add(target)
+                            self.referenced_by.setdefault(callee, set()).add(qualified)
+
+            calls(module.outline["members"], module.name)
+
+    # Output
+
+    def _ref(self, parent: ET.Element, tag: str, qualified: str) -> None:
+        symbol = self.symbols[qualified]
+        element = ET.SubElement(parent, tag, refid=symbol.refid, compoundref=symbol.compound)
+        element.text = qualified.rpartition(".")[2]
+
+    def _member(self, parent: ET.Element, qualified: str, file: str) -> ET.Element:
+        symbol = self.symbols[qualified]
+        entry = symbol.entry
+        static = "yes" if "staticmethod" in entry.get("decorators", []) else "no"
+        member = ET.SubElement(parent, "memberdef", kind=entry["kind"], id=symbol.refid,
+                               prot=_protection(entry["name"]), static=static)
+        if entry["kind"] == "function":
+            ET.SubElement(member, "type").text = "async def" if entry["async"] else "def"
+            ET.SubElement(member, "definition").text = f"def {qualified}"
+            ET.SubElement(member, "argsstring").text = entry["args"]
+        else:
+            ET.SubElement(member, "type").text = entry["type"]
+            ET.SubElement(member, "definition").text = qualified
+            ET.SubElement(member, "argsstring")
+        ET.SubElement(member, "name").text = entry["name"]
+        ET.SubElement(member, "qualifiedname").text = qualified
+        if entry.get("value"):
+            ET.SubElement(member, "initializer").text = f"= {entry['value']}"
+        for name, annotation, default in entry.get("params", []):
+            param = ET.SubElement(member, "param")
+            if annotation:
+                ET.SubElement(param, "type").text = annotation
+            ET.SubElement(param, "declname").text = name
+            if default:
+                ET.SubElement(param, "defval").text = default
+        _documentation(member, entry["doc"])
+        ET.SubElement(member, "inbodydescription")
+        _location(member, file, entry)
+        for target in sorted(self.references.get(symbol.refid, ())):
+            self._ref(member, "references", target)
+        for source in sorted(self.referenced_by.get(symbol.refid, ())):
+            self._ref(member, "referencedby", source)
+        return member
+
+    @staticmethod
+    def _document(compound_id: str, kind: str, name: str) -> Tuple[ET.ElementTree, ET.Element]:
+        root = ET.Element("doxygen", version=GENERATOR)
+        root.set(_XML_LANG, "en-US")
+        compound = ET.SubElement(root, "compounddef", id=compound_id, kind=kind, language="Python", prot="public")
+        ET.SubElement(compound, "compoundname").text = name
+        return ET.ElementTree(root), compound
+
+    def _scope(self, out_dir: Path, kind: str, dotted: str, entry: dict, members: List[dict],
+               file: str, inner_namespaces: Sequence[str] = ()) -> None:
+        """@brief Write a namespace (module) or class compound"""
+        scoped = dotted.replace(".", "::")
+        compound_id = self.symbols[dotted].refid if kind == "class" else _namespace_id(dotted)
+        tree, compound = self._document(compound_id, kind, scoped)
+        if kind == "class":
+            for base in self._bases.get(dotted, []):
+                attributes = {"prot": "public", "virt": "non-virtual"}
+                if base in self.symbols:
+                    attributes["refid"] = self.symbols[base].refid
+                ET.SubElement(compound, "basecompoundref", **attributes).text = base.replace(".", "::")
+        for child in inner_namespaces:
+            ET.SubElement(compound, "innernamespace", refid=_namespace_id(child)).text = child.replace(".", "::")
+        visible = [item for item in members if self._visible(item)]
+        classes = self._classes(dotted, visible)
+        for qualified, item in classes:
+            ET.SubElement(compound, "innerclass", refid=self.symbols[qualified].refid,
+                          prot=_protection(item["name"])).text = qualified.replace(".", "::")
+
+        sections: Dict[str, List[str]] = {}
+        for item in visible:
+            if item["kind"] == "class":
+                continue
+            qualified = f"{dotted}.{item['name']}"
+            if self.symbols[qualified].entry is not item:
+                continue  # redefinition (e.g. a fallback in an ``except`` block)
+            group = "func" if item["kind"] == "function" else "var"
+            if kind == "class":
+                static = "static-" if "staticmethod" in item.get("decorators", []) else ""
+                group = f"{_protection(item['name'])}-{static}{'func' if group == 'func' else 'attrib'}"
+            sections.setdefault(group, []).append(qualified)
+        index_members = []
+        for group, names in sections.items():
+            section = ET.SubElement(compound, "sectiondef", kind=group)
+            for qualified in names:
+                self._member(section, qualified, file)
+                symbol = self.symbols[qualified]
+                index_members.append((symbol.refid, symbol.kind, symbol.entry["name"]))
+
+        _documentation(compound, entry.get("doc", ""))
+        _location(compound, file, entry)
+        tree.write(out_dir / f"{compound_id}.xml", encoding="utf-8", xml_declaration=True)
+        self.compounds.append((compound_id, kind, scoped, index_members))
+
+        for qualified, item in classes:
+            self._scope(out_dir, "class", qualified, item, item["members"], file)
+
+    def write(self, out_dir: Path) -> None:
+        """@brief Write every compound file and ``index.xml``"""
+        basenames: Dict[str, int] = {}
+        for module in self.modules:
+            name = module.path.rpartition("/")[2]
+            basenames[name] = basenames.get(name, 0) + 1
+        module_names = {module.name for module in self.modules}
+
+        for module in self.modules:
+            children = sorted(
+                other for other in module_names
+                if other.rpartition(".")[0] == module.name and other != module.name
+            )
+            self._scope(out_dir, "namespace", module.name, {"doc": module.outline["doc"], "line": 1},
+                        module.outline["members"], module.path, children)
+
+            filename = module.path.rpartition("/")[2]
+            file_id = escape_refid(filename if basenames[filename] == 1 else module.path)
+            tree, compound = self._document(file_id, "file", filename)
+            ET.SubElement(compound, "innernamespace", refid=_namespace_id(module.name)
+                          ).text = module.name.replace(".", "::")
+            for qualified, _ in self._classes(module.name, module.outline["members"]):
+                ET.SubElement(compound, "innerclass", refid=self.symbols[qualified].refid,
+                              prot="public").text = qualified.replace(".", "::")
+            _description(compound, "briefdescription", [])
+            _description(compound, "detaileddescription", [])
+            ET.SubElement(compound, "location", file=module.path)
+            tree.write(out_dir / f"{file_id}.xml", encoding="utf-8", xml_declaration=True)
+            self.compounds.append((file_id, "file", filename, []))
+            self._file_paths[file_id] = module.path
+
+        root = ET.Element("doxygenindex", version=GENERATOR)
+        root.set(_XML_LANG, "en-US")
+        for compound_id, kind, name, members in self.compounds:
+            compound = ET.SubElement(root, "compound", refid=compound_id, kind=kind)
+            ET.SubElement(compound, "name").text = name
+            for refid, member_kind, member_name in members:
+                member = ET.SubElement(compound, "member", refid=refid, kind=member_kind)
+                ET.SubElement(member, "name").text = member_name
+        ET.ElementTree(root).write(out_dir / "index.xml", encoding="utf-8", xml_declaration=True)
+
+    def write_tagfile(self, path: Path) -> None:
+        """@brief Write a Doxygen tag file describing the written compounds"""
+        root = ET.Element("tagfile", doxygen_version=GENERATOR)
+        for compound_id, kind, name, members in self.compounds:
+            compound = ET.SubElement(root, "compound", kind=kind)
+            ET.SubElement(compound, "name").text = name
+            if kind == "file":
+                directory = self._file_paths[compound_id].rpartition("/")[0]
+                ET.SubElement(compound, "path").text = f"{directory}/" if directory else ""
+            ET.SubElement(compound, "filename").text = f"{compound_id}.html"
+            for refid, member_kind, member_name in members:
+                member = ET.SubElement(compound, "member", kind=member_kind)
+                entry = self.symbols[f"{name.replace('::', '.')}.{member_name}"].entry
+                ET.SubElement(member, "type").text = "def" if member_kind == "function" else entry.get("type", "")
+                ET.SubElement(member, "name").text = member_name
+                ET.SubElement(member, "anchorfile").text = f"{compound_id}.html"
+                ET.SubElement(member, "anchor").text = refid[len(compound_id) + 2:]
+                ET.SubElement(member, "arglist").text = entry.get("args", "")
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ET.ElementTree(root).write(tmp, encoding="utf-8", xml_declaration=True)
+        os.replace(tmp, path)
+
+
+def extract_python(
+    files: Sequence[Path],
+    project_root: Path,
+    xml_dir: Path,
+    tag_path: Optional[Path],
+    cache_key: str,
+    extract_private: bool = False,
+) -> ExtractResult:
+    """
+    @brief Write Doxygen-schema XML for a Python project without running Doxygen
+    @param files Input files (files that are not Python are ignored)
+    @param project_root Directory module names and locations are relative to
+    @param xml_dir XML output directory; replaced as a whole once complete
+    @param tag_path Tag file to write, or None
+    @param cache_key Identifier of the project's outline cache
+    @param extract_private Include name-mangled ``__private`` members (EXTRACT_PRIVATE)
+    @return Extraction statistics and warnings (unreadable files, syntax errors)
+    """
+    started = time.perf_counter()
+    sources = sorted({Path(path) for path in files if Path(path).suffix.lower() in PYTHON_EXTENSIONS})
+    outlines, parsed, warnings = outline_files(sources, cache_key)
+
+    relative = {}
+    for path in sources:
+        if str(path) not in outlines:
+            continue
+        try:
+            relative[str(path)] = path.relative_to(project_root).as_posix()
+        except ValueError:
+            relative[str(path)] = path.as_posix().lstrip("/")
+    names = _module_names(list(relative.values()))
+
+    modules: Dict[str, _Module] = {}
+    for path, rel in relative.items():
+        outline = outlines[path]
+        if outline.get("error"):
+            line, message = outline["error"]
+            warnings.append(f"{path}:{line}: warning: syntax error, file skipped: {message}")
+            continue
+        name, is_package = names[rel]
+        existing = modules.get(name)
+        if existing is not None:
+            # A stub and its module describe the same namespace; the module wins
+            if rel.endswith(".pyi"):
+                continue
+            if not existing.path.endswith(".pyi"):
+                warnings.append(f"{path}:1: warning: module {name} is also defined by {existing.path}, file skipped")
+                continue
+        modules[name] = _Module(name, rel, outline, is_package)
+
+    writer = _XmlWriter(sorted(modules.values(), key=lambda module: module.name), extract_private)
+    writer.link()
+    xml_dir.parent.mkdir(parents=True, exist_ok=True)
+    staged = xml_dir.with_name(f".{xml_dir.name}.new-{uuid.uuid4().hex[:8]}")
+    staged.mkdir()
+    try:
+        writer.write(staged)
+        swap_into_place(staged, xml_dir)
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    if tag_path is not None:
+        writer.write_tagfile(tag_path)
+    return ExtractResult(
+        files=len(sources),
+        parsed=parsed,
+        compounds=len(writer.compounds),
+        members=sum(len(members) for _, _, _, members in writer.compounds),
+        warnings=warnings,
+        seconds=time.perf_counter() - started,
+    )
@@ -0,0 +1,508 @@
+"""
+On-demand HTML rendering from Doxygen XML
+
+Instead of having Doxygen write HTML for every page of every build, a project can
+be built with XML output only and its class, file, namespace (and other compound)
+pages rendered when someone opens them. Rendering parses a single compound file
+and fills a small template, so the cost is paid per viewed page.
+
+Rendered pages are kept in a size-bounded LRU cache. ETags are derived from the
+XML file's identity (path, modification time, size) and the template version, so
+a conditional request for an unchanged page is answered without rendering or
+even reading the XML.
+"""
+
+import hashlib
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Bump whenever the templates or the XML conversion change, to invalidate ETags.
+TEMPLATE_VERSION = "1"
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+_PAGE_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+# Template engine -------------------------------------------------------------
+
+class TemplateError(ValueError):
+    """Raised for malformed templates"""
+
+
+class Template:
+    """
+    @brief Minimal template engine for documentation pages
+
+    @details Supports ``{{ expr }}`` (HTML-escaped unless followed by ``|safe``),
+    ``{% for name in expr %}...{% endfor %}`` and
+    ``{% if expr %}...{% else %}...{% endif %}``. Expressions are dotted lookups
+    into dictionaries (``member.name``). Templates are parsed once.
+    """
+
+    _TOKEN = re.compile(r"{{\s*(.+?)\s*}}|{%\s*(.+?)\s*%}", re.S)
+
+    def __init__(self, source: str):
+        self._nodes, end, _ = self._parse(self._tokenize(source), 0, ())
+        if end is not None:
+            raise TemplateError(f"Unexpected {{% {end} %}}")
+
+    @classmethod
+    def _tokenize(cls, source: str) -> List[Tuple[str, str]]:
+        tokens = []
+        position = 0
+        for match in cls._TOKEN.finditer(source):
+            if match.start() > position:
+                tokens.append(("text", source[position:match.start()]))
+            if match.group(1) is not None:
+                tokens.append(("var", match.group(1)))
+            else:
+                tokens.append(("tag", match.group(2)))
+            position = match.end()
+        tokens.append(("text", source[position:]))
+        return tokens
+
+    @classmethod
+    def _parse(cls, tokens, index: int, stop: Tuple[str, ...]):
+        """
+        @brief Parse tokens until one of the stop tags
+        @return (nodes, stop tag found or None, index after it)
+        """
+        nodes: List[Any] = []
+        while index < len(tokens):
+            kind, value = tokens[index]
+            index += 1
+            if kind == "text":
+                nodes.append(("text", value))
+            elif kind == "var":
+                expr, _, flag = value.partition("|")
+                nodes.append(("var", expr.strip(), flag.strip() == "safe"))
+            else:
+                word = value.split()[0]
+                if word in stop:
+                    return nodes, word, index
+                if word == "for":
+                    match = re.match(r"for\s+(\w+)\s+in\s+(\S+)$", value)
+                    if not match:
+                        raise TemplateError(f"Malformed tag: {{% {value} %}}")
+                    body, end, index = cls._parse(tokens, index, ("endfor",))
+                    if end is None:
+                        raise TemplateError("Missing {% endfor %}")
+                    nodes.append(("for", match.group(1), match.group(2), body))
+                elif word == "if":
+                    body, end, index = cls._parse(tokens, index, ("else", "endif"))
+                    orelse: List[Any] = []
+                    if end == "else":
+                        orelse, end, index = cls._parse(tokens, index, ("endif",))
+                    if end is None:
+                        raise TemplateError("Missing {% endif %}")
+                    nodes.append(("if", value[2:].strip(), body, orelse))
+                else:
+                    raise TemplateError(f"Unknown tag: {{% {value} %}}")
+        return nodes, None, index
+
+    @staticmethod
+    def _lookup(expr: str, context: Dict[str, Any]) -> Any:
+        value: Any = context
+        for part in expr.split("."):
+            value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+            if value is None:
+                return None
+        return value
+
+    def _render(self, nodes, context: Dict[str, Any], out: List[str]) -> None:
+        for node in nodes:
+            kind = node[0]
+            if kind == "text":
+                out.append(node[1])
+            elif kind == "var":
+                value = self._lookup(node[1], context)
+                if value is not None:
+                    out.append(str(value) if node[2] else escape(str(value)))
+            elif kind == "for":
+                for item in self._lookup(node[2], context) or ():
+                    self._render(node[3], dict(context, **{node[1]: item}), out)
+            elif kind == "if":
+                self._render(node[2] if self._lookup(node[1], context) else node[3], context, out)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """
+        @brief Render the template
+        @param context Template variables
+        @return Rendered text
+        """
+        out: List[str] = []
+        self._render(self._nodes, context, out)
+        return "".join(out)
+
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{{ title }}</title>
+<style>
+body { font-family: sans-serif; margin: 2em auto; max-width: 60em; color: #222; }
+a { color: #1a5fb4; text-decoration: none; }
+pre, code { font-family: monospace; background: #f4f4f4; }
+pre { padding: 0.5em; overflow-x: auto; }
+.memitem { border-top: 1px solid #ddd; padding: 0.5em 0; }
+.memproto { font-family: monospace; font-weight: bold; }
+.brief { color: #555; }
+</style>
+</head>
+<body>
+<nav><a href="index.html">{{ project }}</a></nav>
+{{ content|safe }}
+</body>
+</html>
+""")
+
+COMPOUND_TEMPLATE = Template("""<h1>{{ title }}</h1>
+{% if brief %}<div class="brief">{{ brief|safe }}</div>{% endif %}
+{% if location %}<p><small>Defined in {{ location }}</small></p>{% endif %}
+{% if bases %}<p>Inherits: {% for base in bases %}{% if base.href %}<a href="{{ base.href }}">{{ base.name }}</a>{% else %}{{ base.name }}{% endif %} {% endfor %}</p>{% endif %}
+{% for group in inner %}<h2>{{ group.title }}</h2>
+<ul>{% for item in group.items %}<li><a href="{{ item.href }}">{{ item.name }}</a></li>{% endfor %}</ul>
+{% endfor %}{% for section in sections %}<h2>{{ section.title }}</h2>
+<ul>{% for member in section.members %}<li><a href="#{{ member.id }}">{{ member.name }}</a>{% if member.brief %} &mdash; {{ member.brief|safe }}{% endif %}</li>{% endfor %}</ul>
+{% endfor %}{% if detailed %}<h2>Detailed Description</h2>
+{{ detailed|safe }}
+{% endif %}{% for section in sections %}{% for member in section.members %}<div class="memitem" id="{{ member.id }}">
+<div class="memproto">{{ member.definition }}{{ member.argsstring }}</div>
+{% if member.brief %}<div class="brief">{{ member.brief|safe }}</div>{% endif %}
+{{ member.detailed|safe }}
+</div>
+{% endfor %}{% endfor %}""")
+
+INDEX_TEMPLATE = Template("""<h1>{{ project }}</h1>
+{% for group in groups %}<h2>{{ group.title }}</h2>
+<ul>{% for item in group.items %}<li><a href="{{ item.href }}">{{ item.name }}</a></li>{% endfor %}</ul>
+{% endfor %}""")
+
+
+# XML to HTML -----------------------------------------------------------------
+
+_INLINE_TAGS = {
+    "para": "p", "bold": "b", "emphasis": "em", "computeroutput": "code",
+    "itemizedlist": "ul", "orderedlist": "ol", "listitem": "li", "programlisting": "pre",
+    "verbatim": "pre", "table": "table", "row": "tr", "entry": "td", "superscript": "sup",
+    "subscript": "sub", "strike": "s", "underline": "u", "blockquote": "blockquote",
+}
+_SECTION_TITLES = {
+    "return": "Returns", "note": "Note", "warning": "Warning", "see": "See also",
+    "since": "Since", "pre": "Precondition", "post": "Postcondition", "deprecated": "Deprecated",
+    "author": "Author", "version": "Version", "attention": "Attention", "todo": "Todo",
+}
+_PARAM_TITLES = {"param": "Parameters", "templateparam": "Template Parameters",
+                 "exception": "Exceptions", "retval": "Return values"}
+_SECTIONDEF_TITLES = {
+    "public-type": "Public Types", "public-func": "Public Member Functions",
+    "public-attrib": "Public Attributes", "public-static-func": "Static Public Member Functions",
+    "public-static-attrib": "Static Public Attributes", "protected-func": "Protected Member Functions",
+    "protected-attrib": "Protected Attributes", "private-func": "Private Member Functions",
+    "private-attrib": "Private Attributes", "func": "Functions", "var": "Variables",
+    "typedef": "Typedefs", "enum": "Enumerations", "define": "Macros",
+}
+_INNER_TITLES = (
+    ("innernamespace", "Namespaces"), ("innerclass", "Classes"),
+    ("innerfile", "Files"), ("innerdir", "Directories"), ("innergroup", "Modules"),
+)
+_INDEX_KINDS = (
+    ("namespace", "Namespaces"), ("class", "Classes"), ("struct", "Structs"),
+    ("union", "Unions"), ("interface", "Interfaces"), ("file", "Files"),
+    ("group", "Modules"), ("page", "Pages"),
+)
+
+
+def ref_href(refid: str, kindref: str = "") -> str:
+    """
+    @brief Link target of a Doxygen refid
+    @param refid Compound or member refid
+    @param kindref "compound" or "member" (guessed from the refid when empty)
+    """
+    if kindref == "member" or (not kindref and "_1" in refid):
+        compound, _, _ = refid.rpartition("_1")
+        return f"{compound}.html#{refid}"
+    return f"{refid}.html"
+
+
+def doc_html(element: Optional[ET.Element]) -> str:
+    """
+    @brief Convert a Doxygen description element to HTML
+    @param element ``briefdescription``/``detaileddescription`` (or any doc subtree)
+    @return HTML fragment (empty for missing or empty descriptions)
+    """
+    if element is None:
+        return ""
+    out: List[str] = []
+    _convert_children(element, out)
+    return "".join(out).strip()
+
+
+def _convert_children(element: ET.Element, out: List[str]) -> None:
+    if element.text:
+        out.append(escape(element.text))
+    for child in element:
+        _convert(child, out)
+        if child.tail:
+            out.append(escape(child.tail))
+
+
+def _convert(element: ET.Element, out: List[str]) -> None:
+    tag = element.tag
+    if tag == "ref":
+        out.append(f'<a href="{escape(ref_href(element.get("refid", ""), element.get("kindref", "")))}">')
+        _convert_children(element, out)
+        out.append("</a>")
+    elif tag == "ulink":
+        out.append(f'<a href="{escape(element.get("url", ""))}">')
+        _convert_children(element, out)
+        out.append("</a>")
+    elif tag == "codeline":
+        _convert_children(element, out)
+        out.append("\n")
+    elif tag == "sp":
+        out.append(" ")
+    elif tag == "linebreak":
+        out.append("<br>")
+    elif tag == "simplesect":
+        title = _SECTION_TITLES.get(element.get("kind", ""), element.get("kind", "").title())
+        out.append(f"<dl><dt>{escape(title)}</dt><dd>")
+        _convert_children(element, out)
+        out.append("</dd></dl>")
+    elif tag == "parameterlist":
+        title = _PARAM_TITLES.get(element.get("kind", ""), "Parameters")
+        out.append(f"<dl><dt>{escape(title)}</dt><dd><table>")
+        for item in element.findall("parameteritem"):
+            names = ", ".join(
+                escape("".join(name.itertext())) for name in item.iter("parametername")
+            )
+            out.append(f"<tr><td><code>{names}</code></td><td>")
+            out.append(doc_html(item.find("parameterdescription")))
+            out.append("</td></tr>")
+        out.append("</table></dd></dl>")
+    elif tag == "heading":
+        level = min(6, max(3, int(element.get("level", "3") or 3) + 1))
+        out.append(f"<h{level}>")
+        _convert_children(element, out)
+        out.append(f"</h{level}>")
+    elif tag in _INLINE_TAGS:
+        name = _INLINE_TAGS[tag]
+        out.append(f"<{name}>")
+        _convert_children(element, out)
+        out.append(f"</{name}>")
+    else:
+        _convert_children(element, out)
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return " ".join("".join(element.itertext()).split()) if element is not None else ""
+
+
+def compound_context(path: Path) -> Dict[str, Any]:
+    """
+    @brief Template context for one compound file
+    @param path ``<refid>.xml`` from a Doxygen XML build
+    @return Variables for COMPOUND_TEMPLATE
+    @throws ValueError If the file does not contain a compound
+    """
+    compound = ET.parse(str(path)).getroot().find("compounddef")
+    if compound is None:
+        raise ValueError(f"No compound in {path.name}")
+    kind = compound.get("kind", "")
+    name = _text(compound.find("compoundname"))
+    title = _text(compound.find("title")) or f"{name} {kind.title()} Reference"
+
+    location = compound.find("location")
+    inner = []
+    for tag, group_title in _INNER_TITLES:
+        items = [
+            {"name": _text(item), "href": ref_href(item.get("refid", ""), "compound")}
+            for item in compound.findall(tag)
+        ]
+        if items:
+            inner.append({"title": group_title, "items": items})
+
+    sections = []
+    for section in compound.findall("sectiondef"):
+        members = [
+            {
+                "id": member.get("id", ""),
+                "name": _text(member.find("name")),
+                "definition": _text(member.find("definition")),
+                "argsstring": _text(member.find("argsstring")),
+                "brief": doc_html(member.find("briefdescription")),
+                "detailed": doc_html(member.find("detaileddescription")),
+            }
+            for member in section.findall("memberdef")
+        ]
+        if members:
+            section_kind = section.get("kind", "")
+            title_text = _text(section.find("header")) or _SECTIONDEF_TITLES.get(
+                section_kind, section_kind.replace("-", " ").title()
+            )
+            sections.append({"title": title_text, "members": members})
+
+    return {
+        "title": title,
+        "kind": kind,
+        "brief": doc_html(compound.find("briefdescription")),
+        "detailed": doc_html(compound.find("detaileddescription")),
+        "location": location.get("file") if location is not None else "",
+        "bases": [
+            {"name": _text(base), "href": ref_href(base.get("refid"), "compound") if base.get("refid") else ""}
+            for base in compound.findall("basecompoundref")
+        ],
+        "inner": inner,
+        "sections": sections,
+    }
+
+
+def index_context(path: Path) -> Dict[str, Any]:
+    """
+    @brief Template context for the project index page
+    @param path ``index.xml`` of a Doxygen XML build
+    """
+    groups: Dict[str, List[Dict[str, str]]] = {}
+    for compound in ET.parse(str(path)).getroot().findall("compound"):
+        groups.setdefault(compound.get("kind", ""), []).append(
+            {"name": _text(compound.find("name")), "href": ref_href(compound.get("refid", ""), "compound")}
+        )
+    return {
+        "groups": [
+            {"title": title, "items": sorted(groups[kind], key=lambda item: item["name"].lower())}
+            for kind, title in _INDEX_KINDS if groups.get(kind)
+        ]
+    }
+
+
+# Page cache ------------------------------------------------------------------
+
+class RenderedPage(NamedTuple):
+    """@brief Result of a page request"""
+
+    status: int
+    etag: str
+    body: bytes
+    cached: bool
+
+
+class PageCache:
+    """
+    @brief LRU cache of rendered pages bounded by total size in bytes
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        """@brief Cached body for a key if it was rendered for this ETag"""
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        """@brief Store a page, evicting least recently used pages to stay in budget"""
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            if len(body) > self.max_bytes:
+                return
+            self._pages[key] = (etag, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._pages.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """@brief Cache usage counters"""
+        with self._lock:
+            return {"pages": len(self._pages), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class PageRenderer:
+    """
+    @brief Renders pages of XML builds through a shared PageCache
+    """
+
+    def __init__(self, cache: Optional[PageCache] = None):
+        self.cache = cache or PageCache()
+
+    @staticmethod
+    def source(xml_dir: Path, page: str) -> Path:
+        """
+        @brief XML file backing a page name
+        @param xml_dir Doxygen XML directory
+        @param page ``index.html`` or ``<refid>.html`` (extension optional)
+        @throws FileNotFoundError If the page does not exist
+        """
+        name = page[:-5] if page.endswith(".html") else page
+        name = name or "index"
+        if not _PAGE_NAME.match(name):
+            raise FileNotFoundError(f"No such page: {page}")
+        path = Path(xml_dir) / f"{name}.xml"
+        if not path.is_file():
+            raise FileNotFoundError(f"No such page: {page}")
+        return path
+
+    @staticmethod
+    def etag(path: Path) -> str:
+        """@brief Strong ETag derived from the source file identity and template version"""
+        stat = path.stat()
+        identity = f"{TEMPLATE_VERSION}:{path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        return '"' + hashlib.blake2b(identity.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+    def render(self, xml_dir: Path, page: str = "index.html", project: str = "",
+               if_none_match: str = "") -> RenderedPage:
+        """
+        @brief Serve one page, rendering it only when needed
+        @param xml_dir Doxygen XML directory
+        @param page Page name
+        @param project Project name shown in the page header
+        @param if_none_match ETag(s) the client already has
+        @return 304 without a body when the client's copy is current, else 200
+        @throws FileNotFoundError If the page does not exist
+        @throws ValueError If the XML file is not a compound
+        @throws xml.etree.ElementTree.ParseError If the XML file is malformed
+        """
+        path = self.source(xml_dir, page)
+        etag = self.etag(path)
+        if etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+            return RenderedPage(304, etag, b"", True)
+
+        key = f"{project}\0{path.resolve()}"
+        body = self.cache.get(key, etag)
+        if body is not None:
+            return RenderedPage(200, etag, body, True)
+
+        if path.name == "index.xml":
+            context = index_context(path)
+            title = project or "Documentation"
+            content = INDEX_TEMPLATE.render(dict(context, project=title))
+        else:
+            context = compound_context(path)
+            title = context["title"]
+            content = COMPOUND_TEMPLATE.render(context)
+        body = PAGE_TEMPLATE.render({"title": title, "project": project or "Index", "content": content}).encode("utf-8")
+        self.cache.put(key, etag, body)
+        return RenderedPage(200, etag, body, False)
+
+
+page_renderer = PageRenderer()
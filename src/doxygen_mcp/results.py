@@ -0,0 +1,231 @@
+"""
+Tool result helpers
+
+Shared response layer for tools whose output grows with the size of the project.
+Every list-shaped result is paginated with an opaque cursor, truncated server-side
+to a page of top-N items (while still reporting totals), rendered either as the
+human-readable text the tools have always returned or as structured JSON, and
+finally held to an explicit byte budget.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+DEFAULT_MAX_BYTES = 64 * 1024
+MAX_PAGE_SIZE = 1000
+RESPONSE_FORMATS = ("text", "json")
+
+TRUNCATION_MARKER = "\n… [truncated to fit max_bytes]"
+
+
+class Page(BaseModel):
+    """
+    @brief One page of a larger result list
+
+    @details ``total`` always counts the full, untruncated list so that callers can
+    tell how much they are not seeing. ``next_cursor`` is empty on the last page.
+    ``build`` ties the cursors to the result they page through (see encode_cursor()).
+    """
+
+    items: List[Any]
+    total: int
+    offset: int = 0
+    next_cursor: str = ""
+    build: str = ""
+
+    @property
+    def truncated(self) -> bool:
+        """@brief True when items beyond this page exist"""
+        return bool(self.next_cursor)
+
+
+def encode_cursor(offset: int, build: str = "") -> str:
+    """
+    @brief Encode a list offset as an opaque cursor string
+    @param offset Index of the first item of the next page
+    @param build Identifier of the result being paged (e.g. a build id), if any
+    @return URL-safe cursor token
+    """
+    fields: Dict[str, Any] = {"o": offset}
+    if build:
+        fields["b"] = build
+    raw = json.dumps(fields, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fields = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset, build = fields["o"], fields.get("b", "")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(offset, int) or offset < 0 or not isinstance(build, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return {"o": offset, "b": build}
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    @brief Decode a cursor produced by encode_cursor()
+    @param cursor Cursor token, or an empty string for the first page
+    @return List offset the cursor points at
+    @throws ValueError If the cursor is malformed
+    """
+    return _decode(cursor)["o"] if cursor else 0
+
+
+def cursor_build(cursor: str) -> str:
+    """
+    @brief Result identifier a cursor was issued for
+    @param cursor Cursor token, or an empty string for the first page
+    @return Identifier passed to encode_cursor(), or an empty string
+    @throws ValueError If the cursor is malformed
+    """
+    return _decode(cursor)["b"] if cursor else ""
+
+
+def paginate(items: Sequence[Any], cursor: str = "", limit: int = 50, build: str = "") -> Page:
+    """
+    @brief Slice a result list into a page starting at the cursor
+    @param items Full, already-ordered result list
+    @param cursor Cursor from a previous page, or empty for the first page
+    @param limit Maximum number of items on the page (clamped to MAX_PAGE_SIZE)
+    @param build Identifier of the result, embedded in the next cursor
+    @return The requested page
+    """
+    offset = decode_cursor(cursor)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    end = offset + limit
+    return Page(
+        items=list(items[offset:end]),
+        total=len(items),
+        offset=offset,
+        next_cursor=encode_cursor(end, build) if end < len(items) else "",
+        build=build,
+    )
+
+
+def _shrink(page: Page, keep: int) -> Page:
+    """@brief Return a copy of page holding only its first keep items"""
+    end = page.offset + keep
+    return Page(
+        items=page.items[:keep],
+        total=page.total,
+        offset=page.offset,
+        next_cursor=encode_cursor(end, page.build) if end < page.total else "",
+        build=page.build,
+    )
+
+
+def clip_text(text: str, max_bytes: int) -> str:
+    """
+    @brief Hard-truncate text to a UTF-8 byte budget, appending a marker
+    @param text Text to truncate
+    @param max_bytes Byte budget (0 disables truncation)
+    @return The text, truncated if necessary
+    """
+    encoded = text.encode("utf-8")
+    if max_bytes <= 0 or len(encoded) <= max_bytes:
+        return text
+    marker = TRUNCATION_MARKER.encode("utf-8")
+    budget = max(0, max_bytes - len(marker))
+    return encoded[:budget].decode("utf-8", errors="ignore") + TRUNCATION_MARKER
+
+
+def render_page(
+    page: Page,
+    format_text: Callable[[Page], str],
+    summary: Optional[Dict[str, Any]] = None,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """
+    @brief Render a page as text or JSON while honouring a byte budget
+    @param page Page of items to render
+    @param format_text Callback producing the text rendering of a page
+    @param summary Extra top-level fields for the JSON rendering (totals, paths, ...)
+    @param response_format Either "text" or "json"
+    @param max_bytes Upper bound on the UTF-8 size of the response (0 disables it)
+    @return Rendered response
+
+    @details When the rendering exceeds ``max_bytes`` the page is shrunk, dropping
+    items from its tail and moving ``next_cursor`` back accordingly, so the caller
+    can resume exactly where the response stopped. If even an empty page does not
+    fit, text is hard-truncated as a last resort, while JSON drops its largest
+    summary fields (listed under ``omitted``) so that it stays parseable.
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(
+            f"Unsupported response_format '{response_format}'. "
+            f"Use one of: {', '.join(RESPONSE_FORMATS)}"
+        )
+
+    def render(current: Page, fields: Optional[Dict[str, Any]] = summary) -> str:
+        if response_format == "json":
+            payload = dict(fields or {})
+            payload.update(
+                items=current.items,
+                total=current.total,
+                offset=current.offset,
+                returned=len(current.items),
+                next_cursor=current.next_cursor or None,
+            )
+            return json.dumps(payload, ensure_ascii=False, default=str)
+        return format_text(current)
+
+    def fits(text: str) -> bool:
+        return len(text.encode("utf-8")) <= max_bytes
+
+    text = render(page)
+    if max_bytes <= 0 or fits(text):
+        return text
+
+    # Binary search for the largest prefix of the page that fits.
+    low, high = 0, len(page.items) - 1
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = render(_shrink(page, mid))
+        if fits(candidate):
+            best = candidate
+            low = mid + 1
+        else:
+            high = mid - 1
+
+    if best is not None:
+        return best
+    empty = _shrink(page, 0)
+    if response_format != "json":
+        return clip_text(render(empty), max_bytes)
+
+    # Truncated JSON is useless to a parser: drop summary fields, largest first
+    fields = dict(summary or {})
+    omitted: List[str] = []
+    for name in sorted(fields, key=lambda name: -len(json.dumps(fields[name], ensure_ascii=False, default=str))):
+        omitted.append(name)
+        del fields[name]
+        candidate = render(empty, {**fields, "omitted": omitted})
+        if fits(candidate):
+            return candidate
+    return json.dumps({"error": f"Response does not fit max_bytes={max_bytes}", "total": page.total})
+
+
+def page_footer(page: Page, noun: str) -> str:
+    """
+    @brief Standard text footer describing how much of a list is shown
+    @param page Rendered page
+    @param noun Plural noun for the listed items (e.g. "extensions")
+    @return Footer text, empty when the whole list fits on the page
+    """
+    if page.total <= len(page.items) and page.offset == 0:
+        return ""
+    shown_from = page.offset + 1 if page.items else page.offset
+    footer = f"\n📑 Showing {noun} {shown_from}-{page.offset + len(page.items)} of {page.total}"
+    if page.next_cursor:
+        footer += f"\n💡 Pass cursor=\"{page.next_cursor}\" for more"
+    return footer + "\n"
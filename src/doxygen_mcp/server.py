@@ -21,31 +21,111 @@ Key Features:
 - Custom theme and layout support
 """
 
+import argparse
 import asyncio
+import contextlib
+import fnmatch
+import hashlib
 import json
 import logging
 import os
 import subprocess
 import tempfile
+import time
+import uuid
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import shutil
 import re
 
 # MCP server imports
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
 from mcp.types import (
     TextContent,
 )
 from pydantic import BaseModel
 
+from .callgraph import QUERIES as GRAPH_QUERIES, graph_cache
+from .changes import _excluded, _signature, changes_since, list_files, snapshot
+from .diagrams import (
+    KINDS as DIAGRAM_KINDS, MAX_NODES as MAX_DIAGRAM_NODES, diagram_indexes, diagram_renderer, subgraph, to_dot,
+)
+from .distributed import (
+    TOKEN_ENV, DistributedBuild, clear_shard_output, merge_tagfiles, parse_workers, plan_shards,
+    register_worker_tools, uses_include, write_shard_index,
+)
+from .doxyfile import format_overrides, is_enabled, option, parse_doxyfile, quote, split_value
+from .estimate import PYTHON_EXTENSIONS, estimate_files, measure_xml_coverage, summarize_by_directory
+from .history import (
+    BuildRecord, CostModel, PhaseTimer, detect_regression, enabled_features, history_store, suggest_shards,
+    suggest_timeout,
+)
+from .jobs import DrainingError, build_pool, client_key, client_label, run_process
+from .metrics import metrics_store, parse_time, warning_counts
+from .pyextract import extract_python
+from .render import page_renderer
+from .staging import StagedOutput, set_scratch_dir
+from .results import (
+    DEFAULT_MAX_BYTES, RESPONSE_FORMATS, clip_text, cursor_build, decode_cursor, page_footer, paginate,
+    render_page,
+)
+from .storage import state_dir, write_json_atomic
+from .tagfiles import (
+    SOURCE_EXTENSIONS, TagEntry, collect_references, project_slug, tag_registry, tagfiles_value,
+)
+from .watch import BuildOutcome, ProjectWatch, watch_manager
+from .xmldiff import compare as compare_builds, find_xml_dir
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("doxygen-mcp")
 
 mcp = FastMCP("Doxygen")
 
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+
+def _allowed_roots() -> List[Path]:
+    """
+    @brief Directories that project paths must live under
+    @return Entries of ``$DOXYGEN_MCP_ALLOWED_ROOTS`` (os.pathsep separated),
+    defaulting to the current working directory
+    """
+    configured = os.environ.get("DOXYGEN_MCP_ALLOWED_ROOTS", "")
+    roots = [item for item in configured.split(os.pathsep) if item] or [os.getcwd()]
+    return [Path(os.path.realpath(root)) for root in roots]
+
+def _check_project_path(safe_project_path: Path, project_path: str) -> Optional[str]:
+    """
+    @brief Validate a sanitized project path
+    @param safe_project_path Absolute, symlink-resolved project path
+    @param project_path Path as given by the caller (for messages)
+    @return Error message, or None if the path is acceptable
+    """
+    if not safe_project_path.is_dir():
+        return f"❌ Invalid project path: {project_path}"
+    if not any(safe_project_path.is_relative_to(root) for root in _allowed_roots()):
+        return f"❌ Project path is not within an allowed root directory: {project_path}"
+    return None
+
+def _safe_path(path: str) -> Path:
+    """@brief Absolute, symlink-resolved form of a caller-supplied path"""
+    return Path(os.path.abspath(os.path.realpath(path)))
+
+def _check_allowed_path(safe_path: Path, path: str, extra_roots: Sequence[Path] = ()) -> Optional[str]:
+    """
+    @brief Validate that a sanitized file or directory path lies under an allowed root
+    @param safe_path Path from _safe_path()
+    @param path Path as given by the caller (for messages)
+    @param extra_roots Server-owned directories that are acceptable as well
+    @return Error message, or None if the path is acceptable
+    """
+    roots = _allowed_roots() + [Path(os.path.realpath(root)) for root in extra_roots]
+    if not any(safe_path.is_relative_to(root) for root in roots):
+        return f"❌ Path is not within an allowed root directory: {path}"
+    return None
+
 class DoxygenConfig(BaseModel):
     """
     @brief Represents a Doxygen configuration with all major options
@@ -120,6 +200,10 @@ class DoxygenConfig(BaseModel):
     referenced_by_relation: bool = True
     references_relation: bool = True
     
+    # External references
+    generate_tagfile: str = ""
+    tag_files: List[str] = []
+    
     def to_doxyfile(self) -> str:
         """
         @brief Convert configuration to Doxyfile format
@@ -190,9 +274,21 @@ class DoxygenConfig(BaseModel):
             f"REFERENCES_RELATION    = {'YES' if self.references_relation else 'NO'}",
         ])
         
+        if self.generate_tagfile or self.tag_files:
+            lines.extend([
+                f"",
+                f"# External references",
+                f"GENERATE_TAGFILE       = \"{self.generate_tagfile}\"",
+                f"TAGFILES               = {' '.join(self.tag_files)}",
+            ])
+        
         return "\n".join(lines)
 
 
+# Boolean DoxygenConfig options, recorded with every build for the cost model
+BUILD_FEATURES = [name for name, field in DoxygenConfig.model_fields.items() if field.annotation is bool]
+
+
 @mcp.tool()
 async def create_doxygen_project(
     project_name: str,
@@ -205,11 +301,9 @@ async def create_doxygen_project(
     try:
         # Sanitize the project path
         safe_project_path = Path(os.path.abspath(os.path.realpath(project_path)))
-        if "PYTEST_CURRENT_TEST" not in os.environ:
-            if not safe_project_path.is_dir():
-                return f"❌ Invalid project path: {project_path}"
-            if not str(safe_project_path).startswith(os.getcwd()):
-                return f"❌ Project path is not within the current working directory: {project_path}"
+        path_error = _check_project_path(safe_project_path, project_path)
+        if path_error:
+            return path_error
         
         # Create project directory if it doesn't exist
         safe_project_path.mkdir(parents=True, exist_ok=True)
@@ -271,114 +365,1161 @@ The project is ready for documentation generation!"""
     except Exception as e:
         return f"❌ Failed to create project: {str(e)}"
 
+_doxygen_versions: Dict[tuple, str] = {}
+
+async def _doxygen_version() -> Optional[str]:
+    """
+    @brief Version of the doxygen executable on PATH
+    @return Version string, or None if doxygen is missing or broken
+
+    @details Cached per executable path and modification time so concurrent
+    builds do not each spawn an extra ``doxygen --version`` process.
+    """
+    executable = shutil.which("doxygen")
+    if executable is None:
+        return None
+    key = (executable, os.stat(executable).st_mtime_ns)
+    if key not in _doxygen_versions:
+        try:
+            result = await run_process([executable, "--version"], timeout=30)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        if result.returncode != 0:
+            return None
+        _doxygen_versions[key] = result.stdout.strip()
+    return _doxygen_versions[key]
+
+def _resolve_project_dir(base: Path, value: str) -> Path:
+    """
+    @brief Resolve a Doxyfile path option the way Doxygen does
+    @param base Directory relative paths are resolved against
+    @param value Path as written in the Doxyfile
+    @return Absolute path
+    """
+    path = Path(value)
+    return path if path.is_absolute() else (base / path).resolve()
+
+def _pattern_match(path: Path, patterns: Sequence[str]) -> bool:
+    """@brief Whether a file name or its absolute path matches a Doxyfile wildcard pattern"""
+    return any(
+        fnmatch.fnmatchcase(candidate, pattern)
+        for pattern in patterns for candidate in (path.name, path.as_posix())
+    )
+
+def _iter_input_files(project_root: Path, options: Dict[str, str]):
+    """
+    @brief Yield the source files a Doxyfile's INPUT would consider
+    @param project_root Directory the Doxyfile lives in
+    @param options Parsed Doxyfile options
+    @return Iterator over source file paths
+
+    @details Follows Doxygen's rules: directories are walked (recursively with
+    RECURSIVE), skipping hidden directories, anything listed in EXCLUDE and
+    anything matching EXCLUDE_PATTERNS. Files found in directories must match
+    FILE_PATTERNS, or have a source extension when FILE_PATTERNS is empty.
+    """
+    recursive = option(options, "RECURSIVE", "NO").upper() == "YES"
+    file_patterns = split_value(options.get("FILE_PATTERNS", ""))
+    exclude_patterns = split_value(options.get("EXCLUDE_PATTERNS", ""))
+    excluded = {_resolve_project_dir(project_root, item) for item in split_value(options.get("EXCLUDE", ""))}
+
+    def skipped(path: Path) -> bool:
+        return path in excluded or _pattern_match(path, exclude_patterns)
+
+    def wanted(path: Path) -> bool:
+        if file_patterns:
+            return _pattern_match(path, file_patterns)
+        return path.suffix.lower() in SOURCE_EXTENSIONS
+
+    for item in split_value(options.get("INPUT", "")) or ["."]:
+        path = _resolve_project_dir(project_root, item)
+        if skipped(path):
+            continue
+        if path.is_file():
+            yield path
+        elif path.is_dir():
+            for directory, subdirectories, files in os.walk(path):
+                base = Path(directory)
+                subdirectories[:] = sorted(
+                    name for name in subdirectories
+                    if recursive and not name.startswith(".") and not skipped(base / name)
+                )
+                for name in sorted(files):
+                    file_path = base / name
+                    if wanted(file_path) and not skipped(file_path) and file_path.is_file():
+                        yield file_path
+
+LISTING_LABELS = {"git": "git index", "filesystem": "file system walk"}
+STAGING_MODES = ("auto", "disk", "off")
+EXTRACTORS = ("auto", "doxygen", "python")
+DIAGRAM_MODES = ("doxygen", "lazy")
+
+def _scan_inputs(project_root: Path, options: Dict[str, str]) -> Tuple[List[Path], int]:
+    """
+    @brief Input files of a build and their total size
+    @param project_root Directory the Doxyfile lives in
+    @param options Parsed Doxyfile options
+    @return Source files and their combined size in bytes
+    """
+    files = list(_iter_input_files(project_root, options))
+    total = 0
+    for path in files:
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return files, total
+
+def _format_memory(size: Optional[int], prefix: str = "") -> str:
+    """@brief Human-readable memory size, or nothing when unknown"""
+    if size is None:
+        return ""
+    return f"{prefix}{size / 1048576:.0f} MB"
+
+def _record_metrics(project_path: Path, values: Dict[str, Dict[str, float]]):
+    """
+    @brief Append a tool's numbers to the metrics warehouse (see metrics.py)
+    @param project_path Project directory; its resolved path identifies the project
+    @param values Metric name -> category -> value
+    """
+    return asyncio.to_thread(metrics_store.record, str(project_path.resolve()), values)
+
+def _output_paths(project_root: Path, paths: Sequence[Path]) -> List[str]:
+    """
+    @brief Build output locations inside a project, for change detection to ignore
+    @param project_root Project directory
+    @param paths Output directories and files
+    @return Paths relative to the project root (outputs outside it are dropped)
+    """
+    relative = []
+    for path in paths:
+        try:
+            name = path.relative_to(project_root).as_posix()
+        except ValueError:
+            continue
+        if name != ".":
+            relative.append(name)
+    return relative
+
+async def _linked_dependencies(project_name: str, inputs: Sequence[Path]) -> List[TagEntry]:
+    """
+    @brief Registered projects a build links against (see tagfiles.py)
+    @param project_name Project being built, which never links to itself
+    @param inputs Input files of the build
+    @return Latest registry entry of every project the inputs reference
+    """
+    refs = await asyncio.to_thread(collect_references, inputs)
+    return await asyncio.to_thread(tag_registry.resolve, refs, exclude_project=project_name)
+
+def _build_settings(
+    output_format: str,
+    overrides: Dict[str, str],
+    diagrams: str,
+    extractor: str,
+    link_dependencies: bool,
+    linked: Sequence[TagEntry] = (),
+) -> str:
+    """
+    @brief Hash of everything besides the input files that shapes a build's output
+    @param linked Registry entries the build links against (see _linked_dependencies)
+    @return Hex digest; skip_unchanged only skips builds whose digest matches the last one
+
+    @details The linked tag files are part of the hash, so rebuilding a project this
+    one depends on refreshes the links to it; other registered projects do not count.
+    """
+    linked = [[entry.project, entry.version, entry.tag_file, entry.registered_at] for entry in linked]
+    settings = {
+        "output_format": output_format,
+        "overrides": overrides,
+        "diagrams": diagrams,
+        "extractor": extractor,
+        "link_dependencies": link_dependencies,
+        "linked": sorted(linked),
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _up_to_date(project_path: str, change_set, output_index: Path, response_format: str, max_bytes: int) -> str:
+    """
+    @brief Response for a build skipped because nothing changed
+    @param project_path Project path as given by the caller
+    @param change_set Empty change set from ``changes_since``
+    @param output_index Index file of the existing output
+    @param response_format Either "text" or "json"
+    @param max_bytes Response size cap
+    @return Tool response
+    """
+    since = f", commit {change_set.base[:12]}" if change_set.base else ""
+
+    def format_text(page):
+        return f"""✅ Documentation is up to date
+
+📁 Project: {project_path}
+🔍 No changes since the last build ({LISTING_LABELS[change_set.method]}{since})
+📄 Output: {output_index}
+
+💡 Pass skip_unchanged=false to rebuild anyway
+"""
+
+    return render_page(
+        paginate([], "", 1),
+        format_text,
+        summary={
+            "status": "up_to_date",
+            "project_path": str(project_path),
+            "changed_files": 0,
+            "change_detection": change_set.method,
+            "base_commit": change_set.base or None,
+            "output_index": str(output_index),
+        },
+        response_format=response_format,
+        max_bytes=max_bytes,
+    )
+
+def _warnings_path(safe_project_path: Path) -> Path:
+    """@brief Warnings of a project's last build, kept for cursor follow-ups"""
+    return state_dir("warnings") / f"{project_slug(str(safe_project_path))}.json"
+
+def _remember_build(safe_project_path: Path, warnings: List[str], metrics: Dict[str, Dict[str, float]]) -> str:
+    """
+    @brief Store the warnings of a finished build and record its metrics, once per build
+    @param safe_project_path Project directory
+    @param warnings Warning lines of the build, kept so later pages need no rebuild
+    @param metrics Metric name -> category -> value (see metrics.py)
+    @return New build id, embedded in the cursors of the build's response
+
+    @details Only real builds mint a build id, and pages of an earlier build are
+    served from the stored record, so each build adds one set of metric rows.
+    """
+    build_id = uuid.uuid4().hex[:16]
+    write_json_atomic(_warnings_path(safe_project_path), {
+        "build_id": build_id, "built_at": time.time(), "warnings": warnings, "metrics": metrics,
+    })
+    metrics_store.record(str(safe_project_path.resolve()), metrics)
+    return build_id
+
+def _stored_warnings(
+    safe_project_path: Path, project_path: str, cursor: str, limit: int, response_format: str, max_bytes: int
+) -> str:
+    """
+    @brief Page through the warnings of the build a cursor was issued by
+    @return Tool response text
+    @throws ValueError If the cursor is malformed
+    """
+    build_id = cursor_build(cursor)
+    path = _warnings_path(safe_project_path)
+    stored = json.loads(path.read_text(encoding="utf-8")) if path.is_file() else None
+    if stored is None or (build_id and stored["build_id"] != build_id):
+        return (
+            "❌ The build this cursor belongs to has been superseded. "
+            "Run 'generate_documentation' without a cursor for the latest warnings."
+        )
+    warnings = stored["warnings"]
+    page = paginate(warnings, cursor, limit, build=stored["build_id"])
+
+    def format_text(page):
+        built = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stored["built_at"]))
+        result_text = f"""📊 Warnings: {len(warnings)} from the build of {built}
+
+📁 Project: {project_path}
+🔖 Build: {stored['build_id']} (not rebuilt)
+"""
+        if page.items:
+            result_text += "\n⚠️ Warnings:\n" + "\n".join(page.items) + "\n"
+        return result_text + page_footer(page, "warnings")
+
+    return render_page(
+        page,
+        format_text,
+        summary={
+            "status": "success",
+            "project_path": str(project_path),
+            "build_id": stored["build_id"],
+            "built_at": stored["built_at"],
+            "warning_count": len(warnings),
+        },
+        response_format=response_format,
+        max_bytes=max_bytes,
+    )
+
+async def _generate_python_xml(
+    safe_project_path: Path,
+    project_path: str,
+    options: Dict[str, str],
+    project_name: str,
+    inputs: List[Path],
+    xml_dir: Path,
+    tag_path: Path,
+    version: str,
+    verbose: bool,
+    change_set,
+    record_changes,
+    limit: int,
+    response_format: str,
+    max_bytes: int,
+    ctx: Optional[Context],
+) -> str:
+    """
+    @brief Write the XML of a Python project with the native extractor (see pyextract.py)
+    @param record_changes Coroutine function saving the change-detection snapshot
+    @return Tool response text, formatted like a Doxygen build
+    """
+    async with build_pool.slot(client_key(ctx), client_label(ctx)):
+        extracted = await asyncio.to_thread(
+            extract_python, inputs, safe_project_path, xml_dir, tag_path,
+            project_slug(str(safe_project_path)), is_enabled(options, "EXTRACT_PRIVATE"),
+        )
+    await record_changes()
+    html_location = f"/docs/{project_slug(project_name)}"
+    registered = await asyncio.to_thread(
+        tag_registry.register, project_name, tag_path, html_location,
+        version=version or "latest", xml_location=str(xml_dir),
+    )
+    warnings = extracted.warnings
+    build_id = await asyncio.to_thread(_remember_build, safe_project_path, warnings, {
+        "warnings": warning_counts(warnings), "build_seconds": {"python": extracted.seconds},
+    })
+    page = paginate(warnings, "", limit, build=build_id)
+
+    def format_text(page):
+        result_text = f"""✅ Documentation generated successfully!
+
+🐍 Extractor: native Python (Doxygen was not run)
+📁 Project: {project_path}
+📄 Files: {extracted.files} ({extracted.parsed} parsed, {extracted.files - extracted.parsed} unchanged)
+🧱 Compounds: {extracted.compounds} ({extracted.members} members)
+📊 Warnings: {len(warnings)}
+⏱️ Extraction Time: {extracted.seconds:.2f}s
+"""
+        if change_set is not None:
+            result_text += (
+                f"🔍 Changed Files: {len(change_set.changed)} since the last build "
+                f"({LISTING_LABELS[change_set.method]})\n"
+            )
+        result_text += f"""
+Generated Files:
+📄 XML: {xml_dir} (HTML pages are rendered on demand)
+🌐 Pages: render_documentation_page("{registered.project}") or {html_location}/index.html over HTTP
+🏷️ Tag File: {tag_path} (registered as {registered.project}@{registered.version})
+"""
+        if warnings and verbose:
+            result_text += f"\n⚠️ Warnings:\n" + "\n".join(page.items)
+            if page.next_cursor:
+                remaining = page.total - page.offset - len(page.items)
+                result_text += f"\n... and {remaining} more warnings"
+                result_text += f"\n💡 Pass cursor=\"{page.next_cursor}\" for more"
+        if not verbose and warnings:
+            result_text += f"\n💡 Use verbose=true to see detailed warnings"
+        return result_text
+
+    return render_page(
+        page,
+        format_text,
+        summary={
+            "status": "success",
+            "extractor": "python",
+            "build_id": build_id,
+            "project_path": str(project_path),
+            "warning_count": len(warnings),
+            "html_index": None,
+            "xml_dir": str(xml_dir),
+            "tag_file": str(tag_path),
+            "changed_files": len(change_set.changed) if change_set is not None else None,
+            "files": extracted.files,
+            "parsed": extracted.parsed,
+            "compounds": extracted.compounds,
+            "members": extracted.members,
+            "seconds": round(extracted.seconds, 3),
+        },
+        response_format=response_format,
+        max_bytes=max_bytes,
+    )
+
+async def _generate_distributed(
+    safe_project_path: Path,
+    project_path: str,
+    doxyfile_text: str,
+    options: Dict[str, str],
+    project_name: str,
+    html_dir: Path,
+    tag_path: Path,
+    workers: str,
+    shards: int,
+    clean_output: bool,
+    verbose: bool,
+    version: str,
+    timeout: float,
+    limit: int,
+    response_format: str,
+    max_bytes: int,
+) -> str:
+    """
+    @brief Build a project as shards on worker instances (see distributed.py)
+    @return Tool response text, formatted like a local build
+    """
+    worker_list = parse_workers(workers)
+    if not worker_list:
+        return "❌ No workers given"
+    if uses_include(doxyfile_text):
+        return "❌ Distributed builds do not support @INCLUDE; workers only accept the Doxyfile's own options"
+    files = await asyncio.to_thread(lambda: list(_iter_input_files(safe_project_path, options)))
+    if not files:
+        return "❌ No input files found for a distributed build"
+    plan = await asyncio.to_thread(plan_shards, files, safe_project_path, shards or 2 * len(worker_list))
+
+    if clean_output:
+        await asyncio.to_thread(clear_shard_output, html_dir)
+    affinity_path = state_dir("shard-affinity") / f"{project_slug(str(safe_project_path))}.json"
+    affinity = json.loads(affinity_path.read_text()) if affinity_path.is_file() else {}
+    build = await DistributedBuild(
+        worker_list, plan, doxyfile_text, html_dir, timeout=timeout, affinity=affinity
+    ).run()
+    await asyncio.to_thread(write_json_atomic, affinity_path, build.affinity)
+    worker_stats = [worker.summary() for worker in worker_list]
+    healthy = sum(1 for worker in worker_list if worker.healthy)
+
+    if build.failed:
+        result_text = f"❌ Distributed build failed: {len(build.failed)} of {len(plan)} shards could not be built\n"
+        result_text += "".join(f"\n  {name}: {error}" for name, error in sorted(build.failed.items()))
+        result_text += "\n\n🌐 Workers:"
+        for stats in worker_stats:
+            state = "healthy" if stats["healthy"] else f"unhealthy ({stats['error']})"
+            result_text += f"\n  {stats['worker']}: {state}"
+        return clip_text(result_text, max_bytes)
+
+    await asyncio.to_thread(write_shard_index, html_dir, project_name, plan)
+    compounds = await asyncio.to_thread(merge_tagfiles, build.tagfiles, tag_path)
+    registered = await asyncio.to_thread(
+        tag_registry.register, project_name, tag_path, str(html_dir), version=version or "latest"
+    )
+    files_sent = sum(stats["files_sent"] for stats in worker_stats)
+    bytes_sent = sum(stats["bytes_sent"] for stats in worker_stats)
+    build_id = await asyncio.to_thread(
+        _remember_build, safe_project_path, build.warnings, {"warnings": warning_counts(build.warnings)}
+    )
+    page = paginate(build.warnings, "", limit, build=build_id)
+
+    def format_text(page):
+        result_text = f"""✅ Documentation generated successfully!
+
+📁 Project: {project_path}
+🌐 Workers: {healthy} of {len(worker_list)} healthy
+🧩 Shards: {len(plan)} ({build.files_total} files)
+📤 Files Sent: {files_sent} ({bytes_sent / 1024:.1f} KB)
+🔁 Retries: {build.retries}
+📊 Warnings: {len(build.warnings)}
+
+Generated Files:
+📄 HTML: {html_dir / 'index.html'}
+🏷️ Tag File: {tag_path} ({compounds} compounds, registered as {registered.project}@{registered.version})
+"""
+        if len(plan) > 1:
+            result_text += "⚠️ References between shards are not linked; use fewer shards or no workers for them\n"
+        for stats in worker_stats:
+            if not stats["healthy"]:
+                result_text += f"⚠️ Worker {stats['worker']} unavailable: {stats['error']}\n"
+        if build.warnings and verbose:
+            result_text += f"\n⚠️ Warnings:\n" + "\n".join(page.items)
+            if page.next_cursor:
+                remaining = page.total - page.offset - len(page.items)
+                result_text += f"\n... and {remaining} more warnings"
+                result_text += f"\n💡 Pass cursor=\"{page.next_cursor}\" for more"
+        if not verbose and build.warnings:
+            result_text += f"\n💡 Use verbose=true to see detailed warnings"
+        return result_text
+
+    return render_page(
+        page,
+        format_text,
+        summary={
+            "status": "success",
+            "build_id": build_id,
+            "project_path": str(project_path),
+            "warning_count": len(build.warnings),
+            "html_index": str(html_dir / "index.html"),
+            "tag_file": str(tag_path),
+            "shards": len(plan),
+            "cross_shard_links": False,
+            "retries": build.retries,
+            "workers": worker_stats,
+        },
+        response_format=response_format,
+        max_bytes=max_bytes,
+    )
+
 @mcp.tool()
 async def generate_documentation(
     project_path: str,
     output_format: str = "html",
     clean_output: bool = True,
     verbose: bool = False,
+    cursor: str = "",
+    limit: int = 10,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    version: str = "",
+    link_dependencies: bool = True,
+    timeout: float = 0,
+    workers: str = "",
+    shards: int = 0,
+    skip_unchanged: bool = False,
+    staging: str = "auto",
+    extractor: str = "auto",
+    diagrams: str = "doxygen",
+    ctx: Optional[Context] = None,
 ) -> str:
-    """Generate documentation from source code using Doxygen"""
+    """
+    Generate documentation from source code using Doxygen. With workers, shards are
+    documented independently in one pass: references to symbols in another shard are
+    not linked (use fewer shards, or no workers, when those links matter)
+    """
     # Sanitize the project path
     safe_project_path = Path(os.path.abspath(os.path.realpath(project_path)))
-    if "PYTEST_CURRENT_TEST" not in os.environ:
-        if not safe_project_path.is_dir():
-            return f"❌ Invalid project path: {project_path}"
-        if not str(safe_project_path).startswith(os.getcwd()):
-            return f"❌ Project path is not within the current working directory: {project_path}"
+    path_error = _check_project_path(safe_project_path, project_path)
+    if path_error:
+        return path_error
 
     doxyfile_path = safe_project_path / "Doxyfile"
     if not doxyfile_path.exists():
         return "❌ No Doxyfile found. Create a project first using 'create_doxygen_project'."
-    
+    if staging not in STAGING_MODES:
+        return f"❌ Unsupported staging '{staging}'. Use one of: {', '.join(STAGING_MODES)}"
+    if diagrams not in DIAGRAM_MODES:
+        return f"❌ Unsupported diagrams '{diagrams}'. Use one of: {', '.join(DIAGRAM_MODES)}"
+    if extractor not in EXTRACTORS:
+        return f"❌ Unsupported extractor '{extractor}'. Use one of: {', '.join(EXTRACTORS)}"
+    if extractor == "python" and (output_format != "xml" or workers):
+        return "❌ The Python extractor only writes XML; use output_format=\"xml\" without workers"
+    # Rejected before the build, which would otherwise only fail once Doxygen has run
+    if response_format not in RESPONSE_FORMATS:
+        return f"❌ Unsupported response_format '{response_format}'. Use one of: {', '.join(RESPONSE_FORMATS)}"
     try:
+        decode_cursor(cursor)
+    except ValueError as e:
+        return f"❌ {str(e)}"
+    if cursor:
+        # Later pages come from the stored warnings of the build that issued the cursor
+        try:
+            return await asyncio.to_thread(
+                _stored_warnings, safe_project_path, project_path, cursor, limit, response_format, max_bytes
+            )
+        except ValueError as e:
+            return f"❌ {str(e)}"
+
+    stage = None
+    record_build = None
+    timer = PhaseTimer()
+    try:
+        # Build-time overrides: publish a tag file and link registered upstream projects
+        doxyfile_text = doxyfile_path.read_text(encoding="utf-8", errors="replace")
+        options = parse_doxyfile(doxyfile_text)
+        project_name = option(options, "PROJECT_NAME", safe_project_path.name)
+        output_dir = _resolve_project_dir(safe_project_path, option(options, "OUTPUT_DIRECTORY", "."))
+        html_dir = _resolve_project_dir(output_dir, option(options, "HTML_OUTPUT", "html"))
+        xml_dir = _resolve_project_dir(output_dir, option(options, "XML_OUTPUT", "xml"))
+        overrides: Dict[str, str] = {}
+
+        # XML-only builds: pages are rendered on demand by the server (see render.py)
+        lazy = output_format == "xml" and not workers
+        if lazy:
+            overrides.update(GENERATE_HTML="NO", GENERATE_LATEX="NO", GENERATE_XML="YES")
+
+        # Diagrams are drawn on request from the XML's graph structure (see diagrams.py)
+        if diagrams == "lazy":
+            overrides.update(HAVE_DOT="NO", GENERATE_XML="YES")
+
+        tag_file = option(options, "GENERATE_TAGFILE")
+        if tag_file:
+            tag_path = _resolve_project_dir(safe_project_path, tag_file)
+        else:
+            tag_path = output_dir / f"{project_slug(project_name)}.tag"
+            overrides["GENERATE_TAGFILE"] = quote(str(tag_path))
+
+        if workers:
+            return await _generate_distributed(
+                safe_project_path, project_path, doxyfile_text, options, project_name,
+                html_dir, tag_path, workers, shards, clean_output, verbose, version, timeout,
+                limit, response_format, max_bytes,
+            )
+
+        # Skip the build when no file changed since the last one (see changes.py)
+        changes_path = state_dir("changes") / f"{project_slug(str(safe_project_path))}.json"
+        build_snapshot = None
+        change_set = None
+        inputs = None
+        linked = None
+        if skip_unchanged:
+            exclude = _output_paths(safe_project_path, [output_dir, html_dir, xml_dir, tag_path])
+            input_paths = [
+                _resolve_project_dir(safe_project_path, item)
+                for item in split_value(options.get("INPUT", "")) or ["."]
+            ]
+            if link_dependencies:
+                # Only the projects actually linked count, which needs the input files first
+                inputs, input_bytes = await asyncio.to_thread(_scan_inputs, safe_project_path, options)
+                linked = await _linked_dependencies(project_name, inputs)
+            settings = _build_settings(output_format, overrides, diagrams, extractor, link_dependencies, linked or ())
+            previous = json.loads(changes_path.read_text(encoding="utf-8")) if changes_path.is_file() else None
+            output_index = xml_dir / "index.xml" if lazy else html_dir / "index.html"
+            if previous and previous.get("settings") == settings and output_index.is_file():
+                change_set = await asyncio.to_thread(
+                    changes_since, safe_project_path, previous["snapshot"], exclude, input_paths
+                )
+                if change_set is not None and not change_set.changed:
+                    return _up_to_date(project_path, change_set, output_index, response_format, max_bytes)
+            build_snapshot = await asyncio.to_thread(snapshot, safe_project_path, exclude, input_paths)
+
+        async def record_changes():
+            if build_snapshot is not None:
+                await asyncio.to_thread(write_json_atomic, changes_path, {
+                    "output_format": output_format,
+                    "settings": settings,
+                    "snapshot": build_snapshot,
+                    "built_at": time.time(),
+                })
+
+        if inputs is None:
+            inputs, input_bytes = await asyncio.to_thread(_scan_inputs, safe_project_path, options)
+
+        # XML of Python-only projects is written without Doxygen (see pyextract.py)
+        python_only = bool(inputs) and all(path.suffix.lower() in PYTHON_EXTENSIONS for path in inputs)
+        if lazy and (extractor == "python" or (extractor == "auto" and python_only)):
+            return await _generate_python_xml(
+                safe_project_path, project_path, options, project_name, inputs, xml_dir, tag_path,
+                version, verbose, change_set, record_changes, limit, response_format, max_bytes, ctx,
+            )
+
         # Check if doxygen is available
-        result = subprocess.run(["doxygen", "--version"], capture_output=True, text=True)
-        if result.returncode != 0:
+        doxygen_version = await _doxygen_version()
+        if doxygen_version is None:
             return "❌ Doxygen not found. Please install Doxygen first."
-        
-        doxygen_version = result.stdout.strip()
-        
-        # Run Doxygen
-        cmd = ["doxygen", str(doxyfile_path)]
-        result = subprocess.run(
-            cmd,
-            cwd=project_path,
-            capture_output=True,
-            text=True
-        )
+
+        if linked is None:
+            linked = await _linked_dependencies(project_name, inputs) if link_dependencies else []
+        if linked:
+            overrides["TAGFILES"] = " ".join(
+                filter(None, [options.get("TAGFILES", ""), tagfiles_value(linked)])
+            )
+
+        # Build into scratch space and publish the output only if Doxygen succeeds (see staging.py)
+        if staging != "off":
+            stage = await asyncio.to_thread(
+                StagedOutput.prepare, output_dir, options, tag_path,
+                project_slug(str(safe_project_path)), use_memory=staging == "auto",
+            )
+            if stage is not None:
+                overrides.update(stage.overrides)
+
+        # Run Doxygen in a pooled slot, off the event loop so other clients stay responsive
+        if overrides:
+            cmd = ["doxygen", "-"]
+            stdin_text = doxyfile_text + "\n" + format_overrides(overrides)
+        else:
+            cmd = ["doxygen", str(doxyfile_path)]
+            stdin_text = None
+
+        # Every build is recorded for the cost model (see history.py)
+        history_key = project_slug(str(safe_project_path))
+        features = enabled_features(parse_doxyfile(stdin_text) if stdin_text else options, BUILD_FEATURES)
+
+        def record_build(status: str, process=None, warning_count: int = 0):
+            return asyncio.to_thread(history_store.append, history_key, BuildRecord(
+                project=project_name,
+                project_path=str(safe_project_path),
+                started_at=timer.started_at,
+                status=status,
+                input_files=len(inputs),
+                input_bytes=input_bytes,
+                features=features,
+                phases=dict(timer.phases),
+                peak_rss=getattr(process, "peak_rss", None),
+                cpu_seconds=getattr(process, "cpu_seconds", None),
+                warnings=warning_count,
+                doxygen_version=doxygen_version,
+            ))
+
+        timer.lap("prepare")
+        async with build_pool.slot(client_key(ctx), client_label(ctx)):
+            timer.lap("queue")
+            result = await run_process(cmd, cwd=str(safe_project_path), input_text=stdin_text, timeout=timeout)
+            timer.lap("doxygen")
 
         if result.returncode == 0:
             # Parse output for statistics
             output_lines = result.stderr.split('\n')
             warnings = [line for line in output_lines if 'warning' in line.lower()]
-            
-            result_text = f"""✅ Documentation generated successfully!
+
+            published = None
+            if stage is not None:
+                published = await asyncio.to_thread(stage.publish, keep_stale=not clean_output)
+                timer.lap("publish")
+
+            await record_changes()
+
+            has_xml = (xml_dir / "index.xml").is_file()
+            html_location = f"/docs/{project_slug(project_name)}" if lazy else str(html_dir)
+            registered = None
+            if tag_path.is_file():
+                registered = await asyncio.to_thread(
+                    tag_registry.register, project_name, tag_path, html_location,
+                    version=version or "latest", xml_location=str(xml_dir) if has_xml else "",
+                )
+            timer.lap("register")
+            await record_build("success", result, len(warnings))
+            build_id = await asyncio.to_thread(_remember_build, safe_project_path, warnings, {
+                "warnings": warning_counts(warnings), "build_seconds": {"doxygen": timer.phases["doxygen"]},
+            })
+            regression = detect_regression(await asyncio.to_thread(history_store.load, history_key))
+
+            page = paginate(warnings, "", limit, build=build_id)
+
+            def format_text(page):
+                result_text = f"""✅ Documentation generated successfully!
 
 🔧 Doxygen Version: {doxygen_version}
 📁 Project: {project_path}
 📊 Warnings: {len(warnings)}
+⏱️ Doxygen Time: {timer.phases['doxygen']:.1f}s{_format_memory(result.peak_rss, ', peak memory ')}
+"""
+                if regression:
+                    result_text += (
+                        f"⚠️ Slower Than Usual: {regression['latest_seconds']:.1f}s, "
+                        f"{regression['ratio']:.1f}x the expected {regression['expected_seconds']:.1f}s\n"
+                    )
+                if change_set is not None:
+                    result_text += (
+                        f"🔍 Changed Files: {len(change_set.changed)} since the last build "
+                        f"({LISTING_LABELS[change_set.method]})\n"
+                    )
+                if published is not None:
+                    result_text += (
+                        f"📦 Published: {published.files} files ({published.copied} written, "
+                        f"{published.linked} unchanged) from {published.location} staging\n"
+                    )
+                result_text += "\nGenerated Files:\n"
+                if lazy:
+                    result_text += f"📄 XML: {xml_dir} (HTML pages are rendered on demand)\n"
+                    if registered:
+                        result_text += (
+                            f"🌐 Pages: render_documentation_page(\"{registered.project}\") "
+                            f"or {html_location}/index.html over HTTP\n"
+                        )
+                else:
+                    result_text += f"📄 HTML: {html_dir / 'index.html'}\n"
+                if registered:
+                    result_text += f"🏷️ Tag File: {tag_path} (registered as {registered.project}@{registered.version})\n"
+                if diagrams == "lazy" and has_xml:
+                    target = registered.project if registered else str(xml_dir)
+                    result_text += f"🎨 Diagrams: drawn on request with render_diagram(\"{target}\", ...)\n"
+                if linked:
+                    result_text += f"🔗 Linked Projects: {', '.join(entry.project for entry in linked)}\n"
+                result_text += "\n"
 
-Generated Files:
-📄 HTML: {Path(project_path) / 'docs' / 'html' / 'index.html'}
+                if warnings and verbose:
+                    result_text += f"\n⚠️ Warnings:\n" + "\n".join(page.items)
+                    if page.next_cursor:
+                        remaining = page.total - page.offset - len(page.items)
+                        result_text += f"\n... and {remaining} more warnings"
+                        result_text += f"\n💡 Pass cursor=\"{page.next_cursor}\" for more"
 
-"""
-            
-            if warnings and verbose:
-                result_text += f"\n⚠️ Warnings:\n" + "\n".join(warnings[:10])
-                if len(warnings) > 10:
-                    result_text += f"\n... and {len(warnings) - 10} more warnings"
-
-            if not verbose and warnings:
-                result_text += f"\n💡 Use verbose=true to see detailed warnings"
-            
-            return result_text
+                if not verbose and warnings:
+                    result_text += f"\n💡 Use verbose=true to see detailed warnings"
+
+                return result_text
+
+            return render_page(
+                page,
+                format_text,
+                summary={
+                    "status": "success",
+                    "extractor": "doxygen",
+                    "build_id": build_id,
+                    "doxygen_version": doxygen_version,
+                    "project_path": str(project_path),
+                    "warning_count": len(warnings),
+                    "html_index": None if lazy else str(html_dir / "index.html"),
+                    "xml_dir": str(xml_dir) if has_xml else None,
+                    "tag_file": str(tag_path) if registered else None,
+                    "diagrams": diagrams,
+                    "linked_projects": [entry.model_dump() for entry in linked],
+                    "changed_files": len(change_set.changed) if change_set is not None else None,
+                    "published": published._asdict() if published is not None else None,
+                    "phases": timer.phases,
+                    "peak_rss": result.peak_rss,
+                    "regression": regression,
+                },
+                response_format=response_format,
+                max_bytes=max_bytes,
+            )
         else:
+            await record_build("failed", result)
             error_output = result.stderr or result.stdout
-            return f"❌ Documentation generation failed:\n{error_output}"
-            
+            return clip_text(f"❌ Documentation generation failed:\n{error_output}", max_bytes)
+
+    except DrainingError as e:
+        return f"❌ {str(e)}"
+    except asyncio.TimeoutError:
+        if record_build is not None:
+            timer.lap("doxygen")
+            await record_build("timeout")
+        return f"❌ Documentation generation timed out after {timeout:g}s; Doxygen was stopped"
     except Exception as e:
         return f"❌ Error generating documentation: {str(e)}"
+    finally:
+        if stage is not None:
+            await asyncio.to_thread(stage.discard)
+
+
+def _count_extensions(project_path: Path) -> Tuple[Dict[str, int], str]:
+    """
+    @brief Count the files of a project by lower-cased extension
+    @param project_path Project directory (git checkouts are listed from the index)
+    @return Mapping of extension (including the dot) to file count, and the
+    listing method ("git" or "filesystem")
+    """
+    listing = list_files(project_path)
+    extensions: Dict[str, int] = {}
+    for file_path in listing.files:
+        ext = file_path.suffix.lower()
+        if ext:
+            extensions[ext] = extensions.get(ext, 0) + 1
+    return extensions, listing.method
 
 @mcp.tool()
 async def scan_project(
     project_path: str,
+    cursor: str = "",
+    limit: int = 15,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    record_metrics: bool = False,
 ) -> str:
     """Analyze project structure and identify documentation opportunities"""
     project_path = Path(project_path)
 
     if not project_path.exists():
         return f"❌ Project path does not exist: {project_path}"
+    path_error = _check_allowed_path(_safe_path(str(project_path)), str(project_path))
+    if path_error:
+        return path_error
 
     try:
         # Count files by extension
-        extensions = {}
-        total_files = 0
-
-        for file_path in project_path.rglob("*"):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                if ext:
-                    extensions[ext] = extensions.get(ext, 0) + 1
-                    total_files += 1
+        extensions, listing = await asyncio.to_thread(_count_extensions, project_path)
+        total_files = sum(extensions.values())
+        if record_metrics and not cursor:
+            await _record_metrics(project_path, {"files": extensions})
 
         # Sort by frequency
-        sorted_extensions = sorted(extensions.items(), key=lambda x: x[1], reverse=True)
+        sorted_extensions = [
+            {"extension": ext, "count": count}
+            for ext, count in sorted(extensions.items(), key=lambda x: x[1], reverse=True)
+        ]
+        page = paginate(sorted_extensions, cursor, limit)
 
-        result_text = f"""📁 Project Scan Results for: {project_path}
+        def format_text(page):
+            result_text = f"""📁 Project Scan Results for: {project_path}
 📊 Total Files Found: {total_files}
+🗂️ Listed From: {LISTING_LABELS[listing]}
 
 📋 Files by Type:
 """
+            for item in page.items:
+                result_text += f"  📄 {item['extension']}: {item['count']} files\n"
+            return result_text + page_footer(page, "extensions")
 
-        for ext, count in sorted_extensions[:15]:  # Show top 15 extensions
-            result_text += f"  📄 {ext}: {count} files\n"
-
-        return result_text
+        return render_page(
+            page,
+            format_text,
+            summary={"project_path": str(project_path), "total_files": total_files, "listing": listing},
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
 
     except Exception as e:
         return f"❌ Error scanning project: {str(e)}"
 
+@mcp.tool()
+async def estimate_coverage(
+    project_path: str,
+    xml_path: str = "",
+    cursor: str = "",
+    limit: int = 15,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    record_metrics: bool = False,
+) -> str:
+    """Quickly estimate documentation coverage per directory without running Doxygen"""
+    project_root = Path(project_path)
+    if not project_root.is_dir():
+        return f"❌ Project path does not exist: {project_path}"
+    for path in filter(None, (project_path, xml_path)):
+        path_error = _check_allowed_path(_safe_path(path), path)
+        if path_error:
+            return path_error
+
+    try:
+        started = time.perf_counter()
+        estimates = await asyncio.to_thread(lambda: estimate_files(list_files(project_root).files))
+        directories = summarize_by_directory(estimates, project_root)
+        elapsed = time.perf_counter() - started
+        documented = sum(item["documented"] for item in directories)
+        declarations = sum(item["declarations"] for item in directories)
+        estimated = 100.0 * documented / declarations if declarations else 0.0
+
+        # Compare against a real Doxygen XML build when one is available
+        history_path = state_dir("coverage") / f"{project_slug(str(project_root.resolve()))}.json"
+        measured = None
+        xml_dir = None
+        try:
+            xml_dir = find_xml_dir(Path(xml_path) if xml_path else project_root)
+        except (FileNotFoundError, ValueError):
+            if xml_path:
+                return f"❌ No Doxygen XML output found at: {xml_path}"
+        if xml_dir is not None:
+            actual_documented, actual_total = await asyncio.to_thread(measure_xml_coverage, xml_dir)
+            if actual_total:
+                actual = 100.0 * actual_documented / actual_total
+                measured = {
+                    "xml_dir": str(xml_dir),
+                    "actual_coverage": round(actual, 1),
+                    "actual_declarations": actual_total,
+                    "error_points": round(estimated - actual, 1),
+                    "measured_at": time.time(),
+                }
+                await asyncio.to_thread(write_json_atomic, history_path, measured)
+        coverage = {"estimated": estimated} if declarations else {}
+        if measured:
+            coverage["measured"] = measured["actual_coverage"]
+        if record_metrics and not cursor:
+            await _record_metrics(project_root, {"coverage": coverage})
+        previous = None
+        if measured is None and history_path.is_file():
+            previous = json.loads(history_path.read_text(encoding="utf-8"))
+
+        page = paginate(directories, cursor, limit)
+
+        def format_text(page):
+            result_text = f"""📈 Estimated Documentation Coverage: {project_path}
+
+📊 Estimated Coverage: {estimated:.1f}% ({documented} of {declarations} declarations)
+📄 Files Analyzed: {sum(item['files'] for item in directories)}
+⏱️ Time: {elapsed:.2f}s
+"""
+            if measured:
+                result_text += (
+                    f"🎯 Doxygen Coverage: {measured['actual_coverage']:.1f}% "
+                    f"({measured['actual_declarations']} entities)\n"
+                    f"📏 Estimate Error: {measured['error_points']:+.1f} points\n"
+                )
+            elif previous:
+                result_text += f"📏 Last Measured Estimate Error: {previous['error_points']:+.1f} points\n"
+            else:
+                result_text += "💡 Build with GENERATE_XML = YES to measure the estimate's error\n"
+            if page.items:
+                result_text += "\n📁 Coverage by Directory (least documented first):\n"
+                for item in page.items:
+                    result_text += (
+                        f"  {item['coverage']:5.1f}%  {item['directory'] or '.'} "
+                        f"({item['documented']}/{item['declarations']} in {item['files']} files)\n"
+                    )
+            return result_text + page_footer(page, "directories")
+
+        return render_page(
+            page,
+            format_text,
+            summary={
+                "project_path": str(project_path),
+                "estimated_coverage": round(estimated, 1),
+                "documented": documented,
+                "declarations": declarations,
+                "seconds": round(elapsed, 3),
+                "measured": measured,
+                "last_measured_error": previous["error_points"] if previous else None,
+            },
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
+
+    except Exception as e:
+        return f"❌ Error estimating coverage: {str(e)}"
+
+@mcp.tool()
+async def predict_build_cost(
+    project_path: str,
+    output_format: str = "html",
+    overrides: Optional[Dict[str, str]] = None,
+    target_shard_seconds: float = 120,
+    cursor: str = "",
+    limit: int = 10,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """Predict how long a build will take and how much memory Doxygen will need, from earlier builds"""
+    safe_project_path = Path(os.path.abspath(os.path.realpath(project_path)))
+    path_error = _check_project_path(safe_project_path, project_path)
+    if path_error:
+        return path_error
+    doxyfile_path = safe_project_path / "Doxyfile"
+    if not doxyfile_path.exists():
+        return "❌ No Doxyfile found. Create a project first using 'create_doxygen_project'."
+
+    try:
+        options = parse_doxyfile(doxyfile_path.read_text(encoding="utf-8", errors="replace"))
+        if output_format == "xml":
+            options.update(GENERATE_HTML="NO", GENERATE_LATEX="NO", GENERATE_XML="YES")
+        options.update({name.upper(): value for name, value in (overrides or {}).items()})
+        inputs, input_bytes = await asyncio.to_thread(_scan_inputs, safe_project_path, options)
+        features = enabled_features(options, BUILD_FEATURES)
+
+        history = await asyncio.to_thread(history_store.load, project_slug(str(safe_project_path)))
+        model = CostModel(await asyncio.to_thread(history_store.load_all))
+        prediction = model.predict(input_bytes, len(inputs), features, history)
+        if prediction is None:
+            return (
+                f"❌ No builds recorded yet. Run 'generate_documentation' once (on this or any project) "
+                f"to train the cost model.\n📄 Input: {len(inputs)} files, {input_bytes / 1048576:.1f} MB"
+            )
+        without_dot = None
+        if features.get("have_dot"):
+            without_dot = model.predict(input_bytes, len(inputs), {**features, "have_dot": False}, history)
+        regression = detect_regression(history)
+        timeout_seconds = suggest_timeout(prediction)
+        shard_count = suggest_shards(prediction, target_shard_seconds, len(inputs))
+        builds = [
+            {
+                "started_at": record.started_at,
+                "status": record.status,
+                "seconds": round(record.seconds, 2),
+                "peak_rss": record.peak_rss,
+                "input_files": record.input_files,
+                "warnings": record.warnings,
+            }
+            for record in reversed(history)
+        ]
+        page = paginate(builds, cursor, limit)
+
+        def format_text(page):
+            enabled = sorted(name for name, on in features.items() if on)
+            result_text = f"""🔮 Build Cost Prediction: {project_path}
+
+📄 Input: {len(inputs)} files, {input_bytes / 1048576:.1f} MB
+⚙️ Features: {', '.join(enabled) or 'none'}
+⏱️ Predicted Duration: {prediction.seconds:.1f}s (±{prediction.relative_error * 100:.0f}%)
+"""
+            if prediction.peak_rss is not None:
+                result_text += f"🧠 Predicted Peak Memory: {_format_memory(prediction.peak_rss)}\n"
+            result_text += f"⏳ Suggested Timeout: {timeout_seconds}s\n"
+            result_text += f"🧩 Suggested Shards: {shard_count} (about {target_shard_seconds:g}s each)\n"
+            if without_dot is not None:
+                result_text += f"🎨 Without Diagrams (HAVE_DOT = NO): {without_dot.seconds:.1f}s\n"
+            result_text += (
+                f"📚 Model: fitted on {prediction.samples} builds of {model.projects} projects, "
+                f"calibrated with {prediction.project_samples} builds of this project\n"
+            )
+            if regression:
+                result_text += (
+                    f"⚠️ Regression: last build took {regression['latest_seconds']:.1f}s, "
+                    f"{regression['ratio']:.1f}x the expected {regression['expected_seconds']:.1f}s\n"
+                )
+            if page.items:
+                result_text += "\n🕘 Recent Builds:\n"
+                for item in page.items:
+                    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["started_at"]))
+                    result_text += (
+                        f"  {when}  {item['status']:<8} {item['seconds']:7.1f}s"
+                        f"{_format_memory(item['peak_rss'], '  ')}  {item['input_files']} files, "
+                        f"{item['warnings']} warnings\n"
+                    )
+            return result_text + page_footer(page, "builds")
+
+        return render_page(
+            page,
+            format_text,
+            summary={
+                "project_path": str(project_path),
+                "input_files": len(inputs),
+                "input_bytes": input_bytes,
+                "features": features,
+                "prediction": prediction._asdict(),
+                "suggested_timeout": timeout_seconds,
+                "suggested_shards": shard_count,
+                "without_diagrams_seconds": without_dot.seconds if without_dot is not None else None,
+                "regression": regression,
+            },
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
+
+    except Exception as e:
+        return f"❌ Error predicting build cost: {str(e)}"
+
+@mcp.tool()
+async def query_metrics(
+    metric: str = "",
+    group_by: str = "project",
+    aggregate: str = "last",
+    since: str = "",
+    until: str = "",
+    bucket: str = "",
+    projects: str = "",
+    categories: str = "",
+    teams: Optional[Dict[str, str]] = None,
+    cursor: str = "",
+    limit: int = 50,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """Aggregate recorded warnings, file counts, coverage and build times across projects over time"""
+    try:
+        if not metric:
+            known = await asyncio.to_thread(metrics_store.metrics)
+            if not known:
+                return "❌ No metrics recorded yet. Run 'generate_documentation', 'scan_project' or 'estimate_coverage' first."
+            return f"📊 Recorded Metrics: {', '.join(known)}\n💡 Pass metric=\"{known[0]}\" to query one"
+        dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+        wanted = [name.strip() for name in categories.split(",") if name.strip()]
+        result = await asyncio.to_thread(
+            metrics_store.query, metric, dimensions, aggregate, parse_time(since), parse_time(until),
+            bucket, projects, wanted, teams,
+        )
+        page = paginate(result.groups, cursor, limit)
+
+        def format_text(page):
+            grouping = ", ".join(dimensions) or "everything"
+            result_text = f"""📊 Metric: {metric} ({aggregate} by {grouping}{f' per {bucket}' if bucket else ''})
+
+🧮 Rows: {result.rows_scanned:,} scanned of {result.rows_total:,} in {result.seconds * 1000:.1f} ms
+"""
+            if page.items:
+                result_text += "\n📋 Groups:\n"
+                for item in page.items:
+                    labels = [str(item[name]) for name in (["bucket"] if bucket else []) + dimensions]
+                    result_text += f"  {'  '.join(labels) or 'all'}: {item['value']:g} ({item['rows']} rows)\n"
+            else:
+                result_text += "\n📭 No rows match"
+            return result_text + page_footer(page, "groups")
+
+        return render_page(
+            page,
+            format_text,
+            summary={
+                "metric": metric,
+                "aggregate": aggregate,
+                "group_by": dimensions,
+                "bucket": bucket or None,
+                "rows_scanned": result.rows_scanned,
+                "rows_total": result.rows_total,
+                "seconds": round(result.seconds, 4),
+            },
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
+
+    except ValueError as e:
+        return f"❌ {str(e)}"
+    except Exception as e:
+        return f"❌ Error querying metrics: {str(e)}"
+
 @mcp.tool()
 async def validate_documentation(
     project_path: str,
@@ -422,21 +1563,23 @@ async def suggest_file_patterns(
     primary_language: str = "",
     include_tests: bool = False,
     include_examples: bool = True,
+    cursor: str = "",
+    limit: int = 10,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
 ) -> str:
     """Suggest appropriate file patterns for a project"""
     project_path = Path(project_path)
     
     if not project_path.exists():
         return f"❌ Project path does not exist: {project_path}"
+    path_error = _check_allowed_path(_safe_path(str(project_path)), str(project_path))
+    if path_error:
+        return path_error
     
     try:
         # Analyze actual files in the project
-        extensions = {}
-        for file_path in project_path.rglob("*"):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                if ext:
-                    extensions[ext] = extensions.get(ext, 0) + 1
+        extensions, listing = await asyncio.to_thread(_count_extensions, project_path)
         
         # Language-specific pattern suggestions
         language_patterns = {
@@ -478,28 +1621,826 @@ async def suggest_file_patterns(
         if include_tests:
             optional_patterns.extend(["test_*.py", "*_test.cpp", "Test*.java"])
 
-        result_text = f"""📋 File Pattern Suggestions for: {project_path}
+        found_extensions = [
+            {"extension": ext, "count": count}
+            for ext, count in sorted(extensions.items(), key=lambda x: x[1], reverse=True)
+        ]
+        page = paginate(found_extensions, cursor, limit)
+
+        def format_text(page):
+            result_text = f"""📋 File Pattern Suggestions for: {project_path}
 
 🎯 Recommended Patterns:
 {chr(10).join(f"  📄 {pattern}" for pattern in suggested_patterns)}
 
 📊 Found Extensions:
-{chr(10).join(f"  {ext}: {count} files" for ext, count in sorted(extensions.items(), key=lambda x: x[1], reverse=True)[:10])}
+{chr(10).join(f"  {item['extension']}: {item['count']} files" for item in page.items)}
 """
+            result_text += page_footer(page, "extensions")
 
-        if optional_patterns:
-            result_text += f"\n🔧 Optional Patterns:\n{chr(10).join(f'  📄 {pattern}' for pattern in optional_patterns)}"
+            if optional_patterns:
+                result_text += f"\n🔧 Optional Patterns:\n{chr(10).join(f'  📄 {pattern}' for pattern in optional_patterns)}"
 
-        result_text += f"\n\n💡 Add these patterns to your Doxyfile:\nFILE_PATTERNS = {' '.join(suggested_patterns)}"
+            result_text += f"\n\n💡 Add these patterns to your Doxyfile:\nFILE_PATTERNS = {' '.join(suggested_patterns)}"
+            return result_text
 
-        return result_text
+        return render_page(
+            page,
+            format_text,
+            summary={
+                "project_path": str(project_path),
+                "recommended_patterns": suggested_patterns,
+                "optional_patterns": optional_patterns,
+                "listing": listing,
+            },
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
 
     except Exception as e:
         return f"❌ Error analyzing patterns: {str(e)}"
 
-def main():
+@mcp.tool()
+async def register_tag_file(
+    project_name: str,
+    tag_file: str,
+    html_location: str,
+    version: str = "latest",
+) -> str:
+    """Register an existing Doxygen tag file so other projects can link to it"""
+    path_error = _check_allowed_path(_safe_path(tag_file), tag_file)
+    if path_error:
+        return path_error
+    try:
+        # Tag files are parsed off the event loop so other clients stay responsive
+        entry = await asyncio.to_thread(
+            tag_registry.register, project_name, Path(tag_file), html_location, version=version
+        )
+        index = await asyncio.to_thread(tag_registry.index, entry)
+    except Exception as e:
+        return f"❌ Failed to register tag file: {str(e)}"
+
+    return f"""✅ Tag file registered for '{entry.project}@{entry.version}'
+
+🏷️ Tag File: {entry.tag_file}
+🌐 HTML Location: {entry.html_location}
+📊 Compounds: {index.compounds} ({len(index.files)} files, {len(index.symbols)} scopes)"""
+
+@mcp.tool()
+async def list_tag_files(
+    project_name: str = "",
+    cursor: str = "",
+    limit: int = 50,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """List tag files in the cross-project registry"""
+    try:
+        entries = [entry.model_dump() for entry in tag_registry.entries(project_name)]
+        page = paginate(entries, cursor, limit)
+
+        def format_text(page):
+            if not page.total:
+                return "📭 No tag files registered yet. Successful builds register theirs automatically."
+            result_text = f"🏷️ Registered Tag Files: {page.total}\n\n"
+            for entry in page.items:
+                result_text += f"  📦 {entry['project']}@{entry['version']} → {entry['html_location']}\n"
+            return result_text + page_footer(page, "tag files")
+
+        return render_page(page, format_text, response_format=response_format, max_bytes=max_bytes)
+
+    except Exception as e:
+        return f"❌ Error listing tag files: {str(e)}"
+
+@mcp.tool()
+async def resolve_tag_dependencies(
+    project_path: str,
+) -> str:
+    """Show which registered projects a project would link against at build time"""
+    project_root = Path(os.path.abspath(project_path))
+    path_error = _check_allowed_path(_safe_path(project_path), project_path)
+    if path_error:
+        return path_error
+    doxyfile_path = project_root / "Doxyfile"
+    if not doxyfile_path.exists():
+        return "❌ No Doxyfile found. Create a project first using 'create_doxygen_project'."
+
+    try:
+        options = parse_doxyfile(doxyfile_path.read_text(encoding="utf-8", errors="replace"))
+        project_name = option(options, "PROJECT_NAME", project_root.name)
+        refs = await asyncio.to_thread(collect_references, _iter_input_files(project_root, options))
+        linked = await asyncio.to_thread(tag_registry.resolve, refs, exclude_project=project_name)
+
+        result_text = f"""🔗 Tag Dependencies for: {project_name}
+
+📄 Source Files Analyzed: {refs.files_scanned}
+📥 Distinct Includes: {len(refs.includes)}
+📦 Distinct Imports: {len(refs.modules)}
+"""
+        if linked:
+            result_text += "\n🏷️ Linked Projects:\n"
+            result_text += "\n".join(
+                f"  📦 {entry.project}@{entry.version} → {entry.html_location}" for entry in linked
+            )
+            result_text += f"\n\nTAGFILES = {tagfiles_value(linked)}"
+        else:
+            result_text += "\n📭 No registered project provides any of these references."
+        return result_text
+
+    except Exception as e:
+        return f"❌ Error resolving tag dependencies: {str(e)}"
+
+@mcp.tool()
+async def compare_documentation(
+    old_path: str,
+    new_path: str,
+    save_snapshot: str = "",
+    change_types: str = "",
+    cursor: str = "",
+    limit: int = 50,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """Report documentation drift between two Doxygen XML builds (or saved snapshots)"""
+    icons = {"added": "➕", "removed": "➖", "changed": "✏️", "undocumented": "⚠️"}
+    wanted = {item.strip() for item in change_types.split(",") if item.strip()}
+    unknown = wanted - set(icons)
+    if unknown:
+        return f"❌ Unknown change types: {', '.join(sorted(unknown))}. Use: {', '.join(icons)}"
+
+    # Bare snapshot names live in the server's snapshot directory; other paths must be allowed
+    snapshots = state_dir("snapshots")
+    paths: List[Optional[Path]] = []
+    for path, writing in ((old_path, False), (new_path, False), (save_snapshot, True)):
+        if not path:
+            paths.append(None)
+            continue
+        named = snapshots / path if Path(path).name == path and path not in (".", "..") else None
+        if named is not None and (writing or named.is_file()):
+            paths.append(named)
+            continue
+        path_error = _check_allowed_path(_safe_path(path), path)
+        if path_error:
+            return path_error
+        paths.append(Path(path))
+    old, new, snapshot_out = paths
+
+    try:
+        changes, counts = await asyncio.to_thread(compare_builds, old, new, snapshot_out)
+        items = [
+            change._asdict() for change in changes
+            if not wanted or change.change in wanted
+        ]
+        page = paginate(items, cursor, limit)
+
+        def format_text(page):
+            result_text = f"""📊 Documentation Drift: {old_path} → {new_path}
+
+📄 Members in New Build: {counts['members']}
+➕ Added: {counts['added']}
+➖ Removed: {counts['removed']}
+✏️ Changed: {counts['changed']}
+⚠️ Newly Undocumented: {counts['undocumented']}
+"""
+            if snapshot_out is not None:
+                result_text += f"💾 Snapshot Saved: {snapshot_out}\n"
+            if page.items:
+                result_text += "\n📋 Changes:\n"
+                for item in page.items:
+                    detail = f" ({', '.join(item['fields'])})" if item["fields"] else ""
+                    result_text += f"  {icons[item['change']]} {item['kind']} {item['name']}{detail}\n"
+            return result_text + page_footer(page, "changes")
+
+        return render_page(
+            page,
+            format_text,
+            summary={"counts": counts, "snapshot": str(snapshot_out) if snapshot_out else None},
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
+
+    except Exception as e:
+        return f"❌ Error comparing documentation: {str(e)}"
+
+@mcp.tool()
+async def query_call_graph(
+    xml_path: str,
+    symbol: str,
+    query: str = "callees",
+    target: str = "",
+    max_depth: int = 0,
+    cursor: str = "",
+    limit: int = 50,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """Query callers, callees, reachability, impact or call paths from a Doxygen XML build"""
+    if query not in GRAPH_QUERIES:
+        return f"❌ Unknown query '{query}'. Use: {', '.join(GRAPH_QUERIES)}"
+    if query == "path" and not target:
+        return "❌ A target symbol is required for path queries"
+    path_error = _check_allowed_path(_safe_path(xml_path), xml_path)
+    if path_error:
+        return path_error
+
+    try:
+        graph = await asyncio.to_thread(graph_cache.get, Path(xml_path))
+        sources = graph.resolve(symbol)
+        if not sources:
+            return f"❌ Symbol not found in call graph: {symbol}"
+
+        started = time.perf_counter()
+        if query == "path":
+            targets = graph.resolve(target)
+            if not targets:
+                return f"❌ Symbol not found in call graph: {target}"
+            nodes = graph.shortest_path(sources, targets, max_depth)
+            items = [graph.describe(node, depth) for depth, node in enumerate(nodes)]
+        elif query in ("callers", "callees"):
+            items = [graph.describe(node) for node in graph.neighbours(sources, reverse=query == "callers")]
+        else:
+            items = [
+                graph.describe(node, depth)
+                for node, depth in graph.reachable(sources, reverse=query == "impact", max_depth=max_depth)
+            ]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        page = paginate(items, cursor, limit)
+
+        def format_text(page):
+            subject = f"{symbol} → {target}" if query == "path" else symbol
+            result_text = f"""🕸️ Call Graph: {query} of {subject}
+
+📊 Graph Size: {graph.node_count} members, {graph.edge_count} edges
+🎯 Matched Symbols: {len(sources)}
+📄 Results: {len(items)}
+⏱️ Query Time: {elapsed_ms:.2f} ms
+"""
+            if query == "path" and not items:
+                result_text += "\n📭 No call path found.\n"
+            elif page.items:
+                result_text += "\n📋 Members:\n"
+                for item in page.items:
+                    prefix = "" if query in ("callers", "callees") else f"[{item['depth']}] "
+                    result_text += f"  {prefix}{item['kind']} {item['name']}\n"
+            return result_text + page_footer(page, "members")
+
+        return render_page(
+            page,
+            format_text,
+            summary={
+                "query": query,
+                "symbol": symbol,
+                "target": target or None,
+                "nodes": graph.node_count,
+                "edges": graph.edge_count,
+                "query_ms": round(elapsed_ms, 3),
+            },
+            response_format=response_format,
+            max_bytes=max_bytes,
+        )
+
+    except Exception as e:
+        return f"❌ Error querying call graph: {str(e)}"
+
+def _lazy_xml_dir(source: str, version: str = "", registry_only: bool = False):
+    """
+    @brief Locate the XML output that pages are rendered from
+    @param source Registered project name, or an XML/output/project directory
+    @param version Registered version (newest when empty)
+    @param registry_only Only accept registered projects (used for HTTP requests)
+    @return (XML directory, project label)
+    @throws FileNotFoundError If no XML output can be found
+    @throws PermissionError If a directory outside the allowed roots is given
+    """
+    entries = [
+        entry for entry in tag_registry.entries(source)
+        if not version or entry.version == project_slug(version) or entry.version == version
+    ] if source else []
+    if entries:
+        entry = entries[0]
+        if not entry.xml_location:
+            raise FileNotFoundError(
+                f"{entry.project}@{entry.version} has no XML output; build it with output_format=\"xml\""
+            )
+        return Path(entry.xml_location), entry.project
+    if registry_only:
+        raise FileNotFoundError(f"No registered project: {source}")
+    if _check_allowed_path(_safe_path(source), source):
+        raise PermissionError(f"Path is not within an allowed root directory: {source}")
+    return find_xml_dir(Path(source)), Path(source).resolve().name
+
+@mcp.tool()
+async def render_documentation_page(
+    project: str,
+    page: str = "index.html",
+    version: str = "",
+    if_none_match: str = "",
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """Render one HTML documentation page on demand from a project's Doxygen XML"""
+    try:
+        xml_dir, label = await asyncio.to_thread(_lazy_xml_dir, project, version)
+        rendered = await asyncio.to_thread(page_renderer.render, xml_dir, page, label, if_none_match)
+        html = rendered.body.decode("utf-8")
+        if response_format == "json":
+            return clip_text(json.dumps({
+                "page": page,
+                "status": rendered.status,
+                "etag": rendered.etag,
+                "cached": rendered.cached,
+                "html": html if rendered.status == 200 else None,
+            }), max_bytes)
+        if rendered.status == 304:
+            return f"✅ Not modified: {page} (ETag {rendered.etag})"
+        header = f"📄 Page: {page}\n🏷️ ETag: {rendered.etag}\n💾 Cache: {'hit' if rendered.cached else 'rendered'}\n\n"
+        return clip_text(header + html, max_bytes)
+
+    except (FileNotFoundError, PermissionError) as e:
+        return f"❌ {str(e)}"
+    except Exception as e:
+        return f"❌ Error rendering page: {str(e)}"
+
+async def _diagram(project: str, symbol: str, kind: str, version: str, max_nodes: int,
+                   client: str, registry_only: bool = False):
+    """
+    @brief Render (or fetch from the cache) one diagram of an XML build
+    @return (subgraph, rendered diagram, project label)
+    @throws FileNotFoundError If the XML output or the symbol cannot be found
+    @throws ValueError If the symbol is ambiguous or of the wrong kind for the diagram
+    """
+    xml_dir, label = await asyncio.to_thread(_lazy_xml_dir, project, version, registry_only)
+    index = await asyncio.to_thread(diagram_indexes.get, xml_dir)
+    matches = index.resolve(symbol)
+    if kind in ("include", "included_by"):
+        matches = [refid for refid in matches if index.nodes[refid].kind == "file"] or matches
+    else:
+        matches = [refid for refid in matches if index.nodes[refid].kind != "file"] or matches
+    if not matches:
+        raise FileNotFoundError(f"No class or file '{symbol}' in {label}")
+    if len(matches) > 1:
+        names = ", ".join(f"{index.label(refid)} ({refid})" for refid in matches[:10])
+        raise ValueError(f"'{symbol}' is ambiguous; pass one of the refids: {names}")
+    graph = subgraph(index, matches[0], kind, max_nodes)
+    rendered = await diagram_renderer.render(to_dot(graph), client)
+    return graph, rendered, label
+
+@mcp.tool()
+async def render_diagram(
+    project: str,
+    symbol: str,
+    kind: str = "inheritance",
+    version: str = "",
+    max_nodes: int = 50,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    ctx: Optional[Context] = None,
+) -> str:
+    """Render a class inheritance/collaboration or file include diagram as SVG on demand from XML"""
+    if kind not in DIAGRAM_KINDS:
+        return f"❌ Unsupported diagram kind '{kind}'. Use one of: {', '.join(DIAGRAM_KINDS)}"
+    max_nodes = max(2, min(max_nodes, MAX_DIAGRAM_NODES))
+    try:
+        graph, rendered, label = await _diagram(project, symbol, kind, version, max_nodes, client_key(ctx))
+        svg = rendered.svg.decode("utf-8")
+        summary = {
+            "project": label,
+            "kind": kind,
+            "refid": graph.root,
+            "name": graph.nodes[0][1],
+            "nodes": len(graph.nodes),
+            "edges": len(graph.edges),
+            "truncated": graph.truncated,
+            "key": rendered.key,
+            "cached": rendered.cached,
+            "seconds": round(rendered.seconds, 3),
+            "svg_path": str(rendered.path),
+        }
+        if response_format == "json":
+            return clip_text(json.dumps({**summary, "svg": svg}), max_bytes)
+        result_text = f"""🎨 Diagram: {kind.replace('_', ' ')} of {graph.nodes[0][1]}
+
+🧮 Graph: {len(graph.nodes)} nodes, {len(graph.edges)} edges{f' (cut off at {max_nodes} nodes)' if graph.truncated else ''}
+🔑 Key: {rendered.key[:16]}
+💾 Cache: {'hit' if rendered.cached else f'rendered in {rendered.seconds:.2f}s'}
+📄 SVG: {rendered.path}
+
+"""
+        return clip_text(result_text + svg, max_bytes)
+
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        return f"❌ {str(e)}"
+    except Exception as e:
+        return f"❌ Error rendering diagram: {str(e)}"
+
+@mcp.custom_route("/diagrams/{project}/{kind}/{symbol}", methods=["GET"])
+async def diagram_image(request):
+    """Serve on-demand diagrams of registered XML builds over HTTP"""
+    from starlette.responses import Response
+
+    symbol = request.path_params["symbol"]
+    symbol = symbol[:-len(".svg")] if symbol.endswith(".svg") else symbol
+    kind = request.path_params["kind"]
+    if kind not in DIAGRAM_KINDS:
+        return Response(f"Unknown diagram kind: {kind}", status_code=404, media_type="text/plain")
+    try:
+        max_nodes = max(2, min(int(request.query_params.get("max_nodes", 50)), MAX_DIAGRAM_NODES))
+        _, rendered, _ = await _diagram(
+            request.path_params["project"], symbol, kind, request.query_params.get("version", ""),
+            max_nodes, "http", registry_only=True,
+        )
+    except FileNotFoundError as e:
+        return Response(str(e), status_code=404, media_type="text/plain")
+    except ValueError as e:
+        return Response(str(e), status_code=400, media_type="text/plain")
+    except RuntimeError as e:  # dot failed
+        return Response(str(e), status_code=502, media_type="text/plain")
+    except asyncio.TimeoutError:
+        return Response("dot did not finish in time", status_code=504, media_type="text/plain")
+    etag = f'"{rendered.key[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(rendered.svg, media_type="image/svg+xml", headers=headers)
+
+@mcp.custom_route("/docs/{project}/{page}", methods=["GET"])
+async def documentation_page(request):
+    """Serve on-demand rendered pages of registered XML builds over HTTP"""
+    from starlette.responses import Response
+
+    try:
+        xml_dir, label = await asyncio.to_thread(
+            _lazy_xml_dir, request.path_params["project"], request.query_params.get("version", ""), True
+        )
+        rendered = await asyncio.to_thread(
+            page_renderer.render, xml_dir, request.path_params["page"], label,
+            request.headers.get("if-none-match", ""),
+        )
+    except FileNotFoundError as e:
+        return Response(str(e), status_code=404, media_type="text/plain")
+    except (ValueError, ET.ParseError) as e:
+        # XML files that are not compounds (Doxyfile.xml) or are damaged are not pages
+        return Response(f"Not a documentation page: {e}", status_code=404, media_type="text/plain")
+    except PermissionError as e:
+        return Response(str(e), status_code=403, media_type="text/plain")
+    headers = {"ETag": rendered.etag, "Cache-Control": "no-cache"}
+    if rendered.status == 304:
+        return Response(status_code=304, headers=headers)
+    return Response(rendered.body, media_type="text/html; charset=utf-8", headers=headers)
+
+def _watch_outputs(project_root: Path, options: Dict[str, str]) -> List[Path]:
+    """@brief Build output directories of a project, whose changes must not trigger rebuilds"""
+    output_dir = _resolve_project_dir(project_root, option(options, "OUTPUT_DIRECTORY", "."))
+    outputs = [output_dir] + [
+        _resolve_project_dir(output_dir, option(options, name, default))
+        for name, default in (("HTML_OUTPUT", "html"), ("XML_OUTPUT", "xml"), ("LATEX_OUTPUT", "latex"))
+    ]
+    # OUTPUT_DIRECTORY = . is the project itself, which is not output as a whole
+    return [path for path in outputs if path != project_root and path not in project_root.parents]
+
+def _watch_scanner(project_root: Path):
+    """
+    @brief Signature scan of what a build of the project reads
+    @param project_root Project directory
+    @return Blocking callable mapping watched paths to stat signatures
+
+    @details The Doxyfile is parsed on every scan so INPUT changes apply at once.
+    Build output inside the project is ignored, or every rebuild would trigger the next.
+    """
+    doxyfile_path = project_root / "Doxyfile"
+
+    def scan():
+        options = parse_doxyfile(doxyfile_path.read_text(encoding="utf-8", errors="replace"))
+        exclude = _output_paths(project_root, _watch_outputs(project_root, options))
+        signatures = {"Doxyfile": _signature(doxyfile_path)}
+        for path in _iter_input_files(project_root, options):
+            try:
+                name = path.relative_to(project_root).as_posix()
+            except ValueError:
+                name = str(path)
+            if not _excluded(name, exclude):
+                signatures[name] = _signature(path)
+        return signatures
+
+    return scan
+
+def _watch_roots(project_root: Path) -> Tuple[List[Path], List[Path]]:
+    """
+    @brief Directories to receive change notifications for: the project and INPUT outside it
+    @return Watched roots, and the build output directories below them to ignore
+    """
+    options = parse_doxyfile((project_root / "Doxyfile").read_text(encoding="utf-8", errors="replace"))
+    roots = [project_root]
+    for item in split_value(options.get("INPUT", "")):
+        path = _resolve_project_dir(project_root, item)
+        path = path if path.is_dir() else path.parent
+        if path.is_dir() and not any(path == root or root in path.parents for root in roots):
+            roots.append(path)
+    return roots, _watch_outputs(project_root, options)
+
+def _format_watch(stats: Dict[str, Any]) -> str:
+    """@brief Text report of one watch"""
+    text = (
+        f"👀 {stats['project']}: {stats['state']}\n"
+        f"  🔨 Rebuilds: {stats['builds']} ({stats['cancelled']} cancelled, "
+        f"{stats['skipped']} unchanged, {stats['failed']} failed)\n"
+    )
+    if stats["last_latency"] is not None:
+        text += (
+            f"  ⏱️ Save to Docs: {stats['last_latency']:.1f}s last, {stats['median_latency']:.1f}s median, "
+            f"{stats['max_latency']:.1f}s max\n"
+        )
+    if stats["pending_files"]:
+        text += f"  📝 Pending Changes: {stats['pending_files']} files\n"
+    if stats["last_result"]:
+        text += f"  📋 Last Result: {stats['last_result']}\n"
+    if stats["last_error"]:
+        text += f"  ⚠️ Last Error: {stats['last_error'].splitlines()[0]}\n"
+    return text
+
+@mcp.tool()
+async def watch_project(
+    project_path: str,
+    output_format: str = "html",
+    diagrams: str = "doxygen",
+    debounce: float = 1.0,
+    max_rebuilds_per_minute: float = 6,
+    poll_interval: float = 1.0,
+) -> str:
+    """Keep a project's documentation current: rebuild after edits settle, cancelling superseded builds"""
+    safe_project_path = Path(os.path.abspath(os.path.realpath(project_path)))
+    path_error = _check_project_path(safe_project_path, project_path)
+    if path_error:
+        return path_error
+    if not (safe_project_path / "Doxyfile").exists():
+        return "❌ No Doxyfile found. Create a project first using 'create_doxygen_project'."
+    if diagrams not in DIAGRAM_MODES:
+        return f"❌ Unsupported diagrams '{diagrams}'. Use one of: {', '.join(DIAGRAM_MODES)}"
+
+    try:
+        doxyfile_path = safe_project_path / "Doxyfile"
+
+        def read_options() -> Dict[str, str]:
+            return parse_doxyfile(doxyfile_path.read_text(encoding="utf-8", errors="replace"))
+
+        built_options = [await asyncio.to_thread(read_options)]  # options of the last completed build
+
+        async def rebuild(changed: List[str]) -> BuildOutcome:
+            options = await asyncio.to_thread(read_options)
+            if changed == ["Doxyfile"] and options == built_options[0]:
+                return BuildOutcome("up_to_date", "✅ Only comments or whitespace changed in the Doxyfile")
+            # skip_unchanged still skips saves that leave every input as the last build saw
+            # it: in git trees, files identical to the last build's commit; elsewhere only
+            # untouched files, since any new modification time counts as a change
+            text = await generate_documentation(
+                str(safe_project_path), output_format=output_format, diagrams=diagrams,
+                skip_unchanged=True, limit=1, response_format="json",
+            )
+            if text.startswith("❌"):
+                return BuildOutcome("failed", text)
+            result = json.loads(text)
+            if "error" in result:
+                return BuildOutcome("failed", f"❌ {result['error']}")
+            status = result.get("status", "success")
+            built_options[0] = options
+            if status == "up_to_date":
+                return BuildOutcome(status, "✅ Documentation is up to date")
+            warnings = result.get("warning_count")
+            counted = f" ({warnings} warnings)" if warnings is not None else ""
+            return BuildOutcome(status, f"✅ Rebuilt after {len(changed)} changed files{counted}")
+
+        scan = _watch_scanner(safe_project_path)
+        baseline = await asyncio.to_thread(scan)
+        roots, outputs = await asyncio.to_thread(_watch_roots, safe_project_path)
+        watch = ProjectWatch(
+            str(safe_project_path), scan, rebuild, debounce=debounce,
+            min_interval=60.0 / max_rebuilds_per_minute if max_rebuilds_per_minute > 0 else 0.0,
+            poll_interval=poll_interval, roots=roots, ignored=outputs, baseline=baseline,
+        )
+        replaced = await watch_manager.start(str(safe_project_path), watch)
+        await asyncio.sleep(0)  # let the watch start its notifications
+        detection = (
+            "file-system notifications" if watch.notifications else f"polling every {watch.poll_interval:g}s"
+        )
+        rate = f"{max_rebuilds_per_minute:g} per minute" if max_rebuilds_per_minute > 0 else "unlimited"
+        return f"""👀 Watching: {project_path}{' (previous watch replaced)' if replaced else ''}
+
+📄 Watched Files: {len(baseline)}
+⏳ Debounce: {watch.debounce:g}s
+🚦 Rebuilds: at most {rate}
+📡 Change Detection: {detection}
+
+💡 Use list_watches for save-to-docs latency and unwatch_project to stop"""
+
+    except Exception as e:
+        return f"❌ Error starting watch: {str(e)}"
+
+@mcp.tool()
+async def unwatch_project(project_path: str) -> str:
+    """Stop watching a project, cancelling a rebuild in progress"""
+    safe_project_path = Path(os.path.abspath(os.path.realpath(project_path)))
+    watch = await watch_manager.stop(str(safe_project_path))
+    if watch is None:
+        return f"❌ Not watching: {project_path}"
+    return "🛑 Watch stopped\n\n" + _format_watch(watch.status())
+
+@mcp.tool()
+async def list_watches(
+    cursor: str = "",
+    limit: int = 20,
+    response_format: str = "text",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """List watched projects with rebuild counts and save-to-docs latency"""
+    watches = [watch.status() for watch in watch_manager.watches()]
+    page = paginate(watches, cursor, limit)
+
+    def format_text(page):
+        if not watches:
+            return "📭 No projects are being watched. Start one with watch_project."
+        result_text = f"👀 Watched Projects: {len(watches)}\n\n"
+        result_text += "\n".join(_format_watch(item) for item in page.items)
+        return result_text + page_footer(page, "watches")
+
+    return render_page(page, format_text, summary={"total": len(watches)},
+                       response_format=response_format, max_bytes=max_bytes)
+
+@mcp.tool()
+async def server_status() -> str:
+    """Report build pool usage and shutdown state of this server"""
+    stats = build_pool.stats()
+    clients = stats["clients"]
+    result_text = f"""🖥️ Doxygen MCP Server Status
+
+🔨 Active Builds: {stats['active']} / {stats['max_builds']}
+⏳ Queued Builds: {stats['waiting']}
+👥 Per-Client Limit: {stats['max_builds_per_client']}
+🛑 Draining: {'Yes' if stats['draining'] else 'No'}
+"""
+    pages = page_renderer.cache.stats()
+    result_text += (
+        f"📄 Page Cache: {pages['pages']} pages, {pages['bytes'] / 1048576:.1f} / "
+        f"{pages['max_bytes'] / 1048576:.0f} MB ({pages['hits']} hits, {pages['misses']} misses)\n"
+    )
+    diagram_stats = diagram_renderer.stats()
+    result_text += (
+        f"🎨 Diagrams: {diagram_stats['running']} / {diagram_stats['max_jobs']} dot runs active "
+        f"({diagram_stats['rendered']} rendered, {diagram_stats['hits']} cache hits)\n"
+    )
+    watches = watch_manager.watches()
+    if watches:
+        building = sum(1 for watch in watches if watch.state == "building")
+        result_text += f"👀 Watches: {len(watches)} ({building} rebuilding)\n"
+    if clients:
+        result_text += "\n📋 Builds by Client:\n"
+        result_text += "\n".join(f"  {client}: {count}" for client, count in clients.items())
+    return result_text
+
+def _with_build_drain(app, drain_timeout: float):
+    """
+    @brief Wrap a Starlette app's lifespan so shutdown waits for in-flight builds
+    @param app Starlette application produced by FastMCP
+    @param drain_timeout Seconds to wait for running builds before giving up
+    @return The same app with its lifespan wrapped
+    """
+    inner_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with inner_lifespan(app) as state:
+            try:
+                yield state
+            finally:
+                # Drain before the session manager tears down its task group.
+                await watch_manager.stop_all()
+                await build_pool.drain(drain_timeout)
+
+    app.router.lifespan_context = lifespan
+    return app
+
+def _run_http(transport: str, host: str, port: int, drain_timeout: float) -> None:
+    """
+    @brief Serve the MCP app over SSE or streamable HTTP with graceful draining
+    @param transport Either "sse" or "streamable-http"
+    @param host Interface to bind
+    @param port TCP port to bind
+    @param drain_timeout Seconds to let in-flight builds finish on shutdown
+    """
+    import uvicorn
+
+    class DrainingServer(uvicorn.Server):
+        """uvicorn server that stops accepting builds as soon as shutdown starts"""
+
+        async def shutdown(self, sockets=None):
+            build_pool.start_draining()
+            await super().shutdown(sockets=sockets)
+
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+    config = uvicorn.Config(
+        _with_build_drain(app, drain_timeout),
+        host=host,
+        port=port,
+        log_level=mcp.settings.log_level.lower(),
+        timeout_graceful_shutdown=int(drain_timeout) or None,
+    )
+    DrainingServer(config).run()
+
+def _transport_security(
+    host: str, allowed_hosts: str = "", allowed_origins: str = "", disabled: bool = False
+) -> Optional[TransportSecuritySettings]:
+    """
+    @brief Build the DNS rebinding protection settings for an HTTP bind address
+    @param host Bind address
+    @param allowed_hosts Comma-separated Host header values; a name without a port accepts any port
+    @param allowed_origins Comma-separated Origin header values
+    @param disabled True to turn the protection off explicitly
+    @return Settings to install, or None to keep FastMCP's localhost defaults (or when disabled)
+    @throws ValueError If a non-localhost address is bound without allowed hosts or an explicit opt-out
+    """
+    if disabled:
+        return None
+    hosts = [item.strip() for item in allowed_hosts.split(",") if item.strip()]
+    origins = [item.strip() for item in allowed_origins.split(",") if item.strip()]
+    if not hosts and not origins:
+        if host in ("127.0.0.1", "localhost", "::1"):
+            return None
+        raise ValueError(
+            f"Binding to {host} needs --allowed-hosts (the Host names clients use) "
+            f"or an explicit --disable-dns-rebinding-protection"
+        )
+    if not hosts:
+        raise ValueError("--allowed-origins needs --allowed-hosts as well")
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=hosts + [f"{item}:*" for item in hosts if ":" not in item],
+        allowed_origins=origins,
+    )
+
+def main(argv: Optional[Sequence[str]] = None):
     """Main entry point for the Doxygen MCP server"""
-    mcp.run()
+    from . import __version__
+
+    parser = argparse.ArgumentParser(prog="doxygen-mcp", description="Doxygen MCP server")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="stdio",
+                        help="MCP transport (default: stdio)")
+    parser.add_argument("--host", default=mcp.settings.host, help="Bind address for HTTP transports")
+    parser.add_argument("--port", type=int, default=mcp.settings.port, help="Port for HTTP transports")
+    parser.add_argument("--max-builds", type=int, default=0,
+                        help="Concurrent Doxygen builds across all clients (default: CPU count)")
+    parser.add_argument("--max-builds-per-client", type=int, default=0,
+                        help="Concurrent Doxygen builds per client (default: 2)")
+    parser.add_argument("--drain-timeout", type=float, default=300.0,
+                        help="Seconds to let in-flight builds finish on shutdown")
+    parser.add_argument("--page-cache-mb", type=int, default=64,
+                        help="Memory for pages rendered on demand from XML builds")
+    parser.add_argument("--max-dot-jobs", type=int, default=0,
+                        help="Concurrent dot runs for on-demand diagrams (default: CPU count)")
+    parser.add_argument("--diagram-cache-mb", type=int, default=256,
+                        help="Disk space for cached on-demand diagrams")
+    parser.add_argument("--scratch-dir", default="/dev/shm",
+                        help="RAM-backed directory for staged builds (empty to stage on the output disk)")
+    parser.add_argument("--worker", action="store_true",
+                        help=f"Also serve the shard worker protocol for distributed builds "
+                             f"(callers must present ${TOKEN_ENV})")
+    parser.add_argument("--allowed-hosts", default="",
+                        help="Comma-separated Host header values accepted over HTTP, e.g. docs.example.com "
+                             "(required when binding to a non-localhost address)")
+    parser.add_argument("--allowed-origins", default="",
+                        help="Comma-separated Origin header values accepted over HTTP")
+    parser.add_argument("--disable-dns-rebinding-protection", action="store_true",
+                        help="Accept any Host and Origin header (only behind a proxy that checks them)")
+    args = parser.parse_args(argv)
+    if args.transport != "stdio":
+        try:
+            _transport_security(args.host, args.allowed_hosts, args.allowed_origins,
+                                args.disable_dns_rebinding_protection)
+        except ValueError as e:
+            parser.error(str(e))
+
+    build_pool.configure(args.max_builds or None, args.max_builds_per_client or None)
+    page_renderer.cache.max_bytes = args.page_cache_mb * 1024 * 1024
+    diagram_renderer.configure(args.max_dot_jobs or None, args.diagram_cache_mb * 1024 * 1024)
+    set_scratch_dir(args.scratch_dir)
+    if args.worker:
+        token = os.environ.get(TOKEN_ENV, "")
+        if not token:
+            parser.error(f"--worker needs a shared token in ${TOKEN_ENV}")
+        # A coordinator is a single client; let it use every build slot by default
+        if not args.max_builds_per_client:
+            build_pool.configure(build_pool.max_builds, build_pool.max_builds)
+        register_worker_tools(mcp, token)
+
+    if args.transport == "stdio":
+        mcp.run()
+    else:
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        security = _transport_security(args.host, args.allowed_hosts, args.allowed_origins,
+                                       args.disable_dns_rebinding_protection)
+        if security is not None or args.disable_dns_rebinding_protection:
+            mcp.settings.transport_security = security
+        _run_http(args.transport, args.host, args.port, args.drain_timeout)
 
 if __name__ == "__main__":
     main()
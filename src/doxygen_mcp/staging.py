@@ -0,0 +1,330 @@
+"""
+Staged build output
+
+Doxygen writes thousands of small files. Writing them straight into the project's
+output directory is slow on network or spinning disks, and readers of that
+directory see a half-written tree while a build runs (or forever, if it fails).
+
+A staged build points Doxygen's ``OUTPUT_DIRECTORY`` at a scratch directory,
+preferably on a RAM-backed file system (``/dev/shm``) when there is enough free
+memory, otherwise at a hidden directory next to the real output. Once Doxygen
+succeeds, every top-level output entry (``html``, ``xml``, the tag file, ...) is
+published:
+
+- From scratch space on another file system, a new tree is assembled next to the
+  live one: files whose content did not change are hard-linked from the live
+  tree, only changed files are copied.
+- The new tree then replaces the live one with an atomic exchange
+  (``renameat2(RENAME_EXCHANGE)`` on Linux), falling back to two renames.
+
+A failed build discards its scratch directory and leaves the published output
+untouched.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import filecmp
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .doxyfile import option, quote
+from .storage import state_dir, write_json_atomic
+
+# RAM-backed scratch file systems, tried in order (see set_scratch_dir).
+scratch_dirs: List[str] = ["/dev/shm"]
+
+# Scratch space needed when a project's output size is not known yet.
+DEFAULT_REQUIRED_BYTES = 256 * 1024 * 1024
+# Factor applied to the last build's output size, for growth and Doxygen's temporaries.
+HEADROOM = 2
+
+# Output locations Doxygen resolves relative to OUTPUT_DIRECTORY.
+_OUTPUT_OPTIONS = (
+    "HTML_OUTPUT", "XML_OUTPUT", "LATEX_OUTPUT", "RTF_OUTPUT", "MAN_OUTPUT", "DOCBOOK_OUTPUT",
+)
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+_swap_lock = threading.Lock()
+
+
+class PublishStats(NamedTuple):
+    """@brief What publishing a staged build did"""
+
+    entries: List[str]
+    files: int
+    copied: int
+    linked: int
+    bytes: int
+    location: str  # "memory" or "disk"
+
+
+def set_scratch_dir(path: str) -> None:
+    """
+    @brief Choose where staged builds run
+    @param path Scratch directory; empty to stage next to the output only
+    """
+    scratch_dirs[:] = [path] if path else []
+
+
+def _available_memory() -> Optional[int]:
+    """@brief MemAvailable from /proc/meminfo in bytes, None where unknown"""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _scratch_root(required: int) -> Optional[Path]:
+    """
+    @brief First scratch directory with room for a build
+    @param required Bytes the build is expected to write
+    @return Directory, or None to stage on the output's own file system
+    """
+    for candidate in scratch_dirs:
+        path = Path(candidate)
+        if not path.is_dir() or not os.access(path, os.W_OK):
+            continue
+        try:
+            if shutil.disk_usage(path).free < required:
+                continue
+        except OSError:
+            continue
+        memory = _available_memory()
+        if memory is not None and memory < required:
+            continue
+        return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _renameat2():
+    """@brief libc's renameat2, or None where it is unavailable"""
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    try:
+        return getattr(ctypes.CDLL(libc_name, use_errno=True), "renameat2", None)
+    except OSError:
+        return None
+
+
+def _exchange(first: Path, second: Path) -> bool:
+    """
+    @brief Atomically swap two paths
+    @return False when the platform or file system does not support it
+    """
+    renameat2 = _renameat2()
+    if renameat2 is None:
+        return False
+    result = renameat2(_AT_FDCWD, os.fsencode(first), _AT_FDCWD, os.fsencode(second), _RENAME_EXCHANGE)
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EPERM):
+        return False
+    raise OSError(error, os.strerror(error), str(second))
+
+
+def swap_into_place(new: Path, target: Path) -> None:
+    """
+    @brief Replace ``target`` with ``new`` (both on one file system)
+    @param new Fully written replacement; consumed
+    @param target Published file or directory
+
+    @details Files are replaced with ``os.replace``. Directories are exchanged
+    atomically where supported; otherwise the old tree is renamed aside first,
+    leaving a moment in which ``target`` does not exist. Swaps within this
+    process are serialised so concurrent builds of one project cannot interleave.
+    """
+    retired = None
+    with _swap_lock:
+        if new.is_dir() and target.is_dir() and not target.is_symlink():
+            if _exchange(new, target):
+                retired = new
+            else:
+                retired = target.with_name(f".{target.name}.old-{uuid.uuid4().hex[:8]}")
+                os.rename(target, retired)
+                os.rename(new, target)
+        else:
+            if target.is_dir() and not target.is_symlink():
+                retired = target.with_name(f".{target.name}.old-{uuid.uuid4().hex[:8]}")
+                os.rename(target, retired)
+            os.replace(new, target)
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def sync_tree(staged: Path, live: Path, new: Path, keep_stale: bool = False) -> Dict[str, int]:
+    """
+    @brief Assemble a new output tree from a staged one, reusing unchanged files
+    @param staged Freshly built tree (typically on scratch space)
+    @param live Currently published tree (may not exist)
+    @param new Directory to create, on the same file system as ``live``
+    @param keep_stale Also carry over files of ``live`` the build no longer produced
+    @return Counts of files, copied files, hard-linked files, bytes copied and
+    total size of the tree
+    """
+    stats = {"files": 0, "copied": 0, "linked": 0, "bytes": 0, "size": 0}
+    for directory, _, files in os.walk(staged):
+        relative = Path(directory).relative_to(staged)
+        (new / relative).mkdir(parents=True, exist_ok=True)
+        for name in files:
+            source = Path(directory) / name
+            current = live / relative / name
+            destination = new / relative / name
+            size = source.stat().st_size
+            stats["files"] += 1
+            stats["size"] += size
+            try:
+                if current.is_file() and not current.is_symlink() and filecmp.cmp(source, current, shallow=False):
+                    os.link(current, destination)
+                    stats["linked"] += 1
+                    continue
+            except OSError:
+                pass  # live tree replaced meanwhile, or no hard links here: copy instead
+            shutil.copyfile(source, destination, follow_symlinks=False)
+            stats["copied"] += 1
+            stats["bytes"] += size
+    if keep_stale and live.is_dir():
+        for directory, _, files in os.walk(live):
+            relative = Path(directory).relative_to(live)
+            for name in files:
+                destination = new / relative / name
+                if destination.exists():
+                    continue
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(Path(directory) / name, destination)
+                except OSError:
+                    shutil.copyfile(Path(directory) / name, destination)
+    return stats
+
+
+def _tree_stats(path: Path) -> Dict[str, int]:
+    """@brief File count and total size of a file or directory tree"""
+    if path.is_file():
+        return {"files": 1, "size": path.stat().st_size}
+    sizes = [
+        (Path(directory) / name).stat().st_size
+        for directory, _, files in os.walk(path) for name in files
+    ]
+    return {"files": len(sizes), "size": sum(sizes)}
+
+
+class StagedOutput:
+    """
+    @brief Scratch directory for one build and the publishing of its results
+    """
+
+    def __init__(self, root: Path, output_dir: Path, overrides: Dict[str, str], history: Path):
+        self.root = root
+        self.output_dir = output_dir
+        self.overrides = overrides
+        self.location = "disk" if root.parent == output_dir else "memory"
+        self._history = history
+
+    @classmethod
+    def prepare(
+        cls, output_dir: Path, options: Dict[str, str], tag_path: Path, key: str, use_memory: bool = True,
+    ) -> Optional["StagedOutput"]:
+        """
+        @brief Create a scratch directory for a build
+        @param output_dir Resolved OUTPUT_DIRECTORY
+        @param options Parsed Doxyfile options
+        @param tag_path Tag file the build writes
+        @param key Project identifier for the remembered output size
+        @param use_memory Allow RAM-backed scratch space
+        @return Staging, or None when the output cannot be staged (an output
+        option is an absolute path outside the output directory)
+        """
+        for name in _OUTPUT_OPTIONS:
+            value = option(options, name)
+            if value and os.path.isabs(value) and not Path(value).is_relative_to(output_dir):
+                return None
+
+        history = state_dir("staging") / f"{key}.json"
+        required = DEFAULT_REQUIRED_BYTES
+        if history.is_file():
+            required = json.loads(history.read_text(encoding="utf-8"))["output_bytes"] * HEADROOM
+        scratch = _scratch_root(required) if use_memory else None
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if scratch is not None:
+            root = Path(tempfile.mkdtemp(prefix="doxygen-mcp-", dir=scratch))
+        else:
+            root = Path(tempfile.mkdtemp(prefix=".doxygen-staging-", dir=output_dir))
+
+        overrides = {"OUTPUT_DIRECTORY": quote(str(root))}
+        for name in _OUTPUT_OPTIONS:
+            value = option(options, name)
+            if value and os.path.isabs(value):
+                overrides[name] = quote(str(root / Path(value).relative_to(output_dir)))
+        if tag_path.is_relative_to(output_dir):
+            overrides["GENERATE_TAGFILE"] = quote(str(root / tag_path.relative_to(output_dir)))
+        return cls(root, output_dir, overrides, history)
+
+    def publish(self, keep_stale: bool = False) -> PublishStats:
+        """
+        @brief Move every top-level entry of the finished build into the output directory
+        @param keep_stale Keep published files the build no longer produced
+        @return Publishing statistics
+        """
+        entries = sorted(self.root.iterdir())
+        same_device = self.root.stat().st_dev == self.output_dir.stat().st_dev
+        files = copied = linked = written = size = 0
+        for entry in entries:
+            target = self.output_dir / entry.name
+            if same_device and not keep_stale:
+                # Already on the output's file system: every file is new, nothing to copy
+                stats = _tree_stats(entry)
+                files += stats["files"]
+                copied += stats["files"]
+                size += stats["size"]
+                swap_into_place(entry, target)
+                continue
+            new = self.output_dir / f".{entry.name}.new-{uuid.uuid4().hex[:8]}"
+            try:
+                if entry.is_file():
+                    entry_size = entry.stat().st_size
+                    size += entry_size
+                    files += 1
+                    if target.is_file() and filecmp.cmp(entry, target, shallow=False):
+                        linked += 1
+                        continue
+                    shutil.copyfile(entry, new)
+                    swap_into_place(new, target)
+                    copied += 1
+                    written += entry_size
+                    continue
+                stats = sync_tree(entry, target, new, keep_stale)
+                swap_into_place(new, target)
+            except BaseException:
+                if new.is_dir():
+                    shutil.rmtree(new, ignore_errors=True)
+                elif new.exists():
+                    new.unlink()
+                raise
+            files += stats["files"]
+            copied += stats["copied"]
+            linked += stats["linked"]
+            written += stats["bytes"]
+            size += stats["size"]
+        write_json_atomic(self._history, {"output_bytes": size})
+        return PublishStats([entry.name for entry in entries], files, copied, linked, written, self.location)
+
+    def discard(self) -> None:
+        """@brief Remove the scratch directory and anything left in it"""
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,73 @@
+"""
+Persistent server state
+
+Locations for state that outlives a single tool call (registries, caches, build
+history). Everything lives below one data home so that a shared server can be
+pointed at fast local storage with a single environment variable.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def data_home() -> Path:
+    """
+    @brief Root directory for persistent server state
+    @return ``$DOXYGEN_MCP_HOME`` if set, otherwise ``$XDG_CACHE_HOME/doxygen-mcp``
+    (falling back to ``~/.cache/doxygen-mcp``)
+    """
+    explicit = os.environ.get("DOXYGEN_MCP_HOME")
+    if explicit:
+        return Path(explicit)
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(cache_home) / "doxygen-mcp"
+
+
+def state_dir(*parts: str) -> Path:
+    """
+    @brief Return (and create) a subdirectory of the data home
+    @param parts Path components below the data home
+    @return Existing directory path
+    """
+    path = data_home().joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    @brief Replace a file's contents atomically
+    @param path Destination file
+    @param data New contents
+
+    @details Readers either see the old or the new file, never a partial write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        remove_quietly(tmp_name)
+        raise
+
+
+def write_json_atomic(path: Path, value: Any) -> None:
+    """
+    @brief Atomically write a JSON document
+    @param path Destination file
+    @param value JSON-serialisable value
+    """
+    write_atomic(path, json.dumps(value, indent=2, sort_keys=True).encode("utf-8"))
+
+
+def remove_quietly(path: str) -> None:
+    """@brief Remove a file, ignoring it if it is already gone"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,322 @@
+"""
+Cross-project tag file registry
+
+Every successful build can publish the Doxygen tag file it produces. The registry
+keeps a copy of each tag file per project and version together with the location
+of that project's HTML output, resolves which registered projects a source tree
+depends on (from its ``#include``/``import`` statements) and turns them into
+``TAGFILES`` entries at build time. Projects can therefore be documented
+independently, and in parallel, while still linking to each other.
+
+Parsed tag indexes are kept in memory and only re-read when the tag file on disk
+changes, so rebuilding one upstream project never forces dependents to reparse
+anything but that project's tag file.
+"""
+
+import json
+import re
+import shutil
+import threading
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from .storage import state_dir, write_json_atomic
+
+SOURCE_EXTENSIONS = {
+    ".c", ".cc", ".cpp", ".cxx", ".h", ".hh", ".hpp", ".hxx", ".inl", ".ipp",
+    ".m", ".mm", ".py", ".pyi", ".java", ".cs", ".php",
+}
+
+_INCLUDE = re.compile(r'^\s*#\s*(?:include|import)\s*[<"]([^>"]+)[>"]', re.M)
+_PY_FROM = re.compile(r"^\s*from\s+([A-Za-z_][\w.]*)\s+import\b", re.M)
+_PY_IMPORT = re.compile(r"^\s*import\s+([A-Za-z_][\w.]*(?:\s*,\s*[A-Za-z_][\w.]*)*)\s*(?:#.*)?$", re.M)
+_JAVA_IMPORT = re.compile(r"^\s*import\s+(?:static\s+)?([A-Za-z_][\w.]*)(?:\.\*)?\s*;", re.M)
+_CS_USING = re.compile(r"^\s*using\s+(?:static\s+)?([A-Za-z_][\w.]*)\s*;", re.M)
+_PHP_USE = re.compile(r"^\s*use\s+([A-Za-z_][\w\\]*)", re.M)
+
+_SYMBOL_KINDS = {
+    "namespace", "package", "class", "struct", "union", "interface",
+    "protocol", "category", "exception", "module", "concept",
+}
+
+
+def project_slug(project_name: str) -> str:
+    """
+    @brief File-system friendly identifier for a project name
+    @param project_name Human-readable project name
+    @return Lower-case slug made of letters, digits, dashes and underscores
+    """
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", project_name.strip()).strip("-.").lower()
+    return slug or "project"
+
+
+def _normalize_symbol(name: str) -> str:
+    """@brief Use Doxygen's ``::`` scope separator regardless of language"""
+    return name.replace("\\", "::").replace(".", "::").strip(":")
+
+
+class TagIndex(BaseModel):
+    """
+    @brief Names a tag file makes available to other projects
+
+    @details ``files`` maps include basenames to the full paths recorded in the tag
+    file, ``symbols`` holds fully-scoped namespace/package/class names.
+    """
+
+    files: Dict[str, List[str]] = {}
+    symbols: FrozenSet[str] = frozenset()
+    compounds: int = 0
+
+    @classmethod
+    def from_tagfile(cls, path: Path) -> "TagIndex":
+        """
+        @brief Stream-parse a tag file into an index
+        @param path Tag file produced by GENERATE_TAGFILE
+        @return Parsed index
+        """
+        files: Dict[str, List[str]] = {}
+        symbols: Set[str] = set()
+        compounds = 0
+        depth = 0
+        for event, element in ET.iterparse(str(path), events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if element.tag != "compound" or depth != 1:
+                continue
+            compounds += 1
+            kind = element.get("kind", "")
+            name = element.findtext("name", "").strip()
+            if kind == "file" and name:
+                directory = element.findtext("path", "").strip().replace("\\", "/")
+                full = f"{directory.rstrip('/')}/{name}" if directory else name
+                files.setdefault(name, []).append(full)
+            elif kind in _SYMBOL_KINDS and name:
+                symbols.add(_normalize_symbol(name))
+            element.clear()
+        return cls(files=files, symbols=frozenset(symbols), compounds=compounds)
+
+    def provides_include(self, include: str) -> bool:
+        """
+        @brief Check whether an ``#include`` target is one of this project's files
+        @param include Include path as written in the source
+        @return True if the include matches a file recorded in the tag file
+        """
+        include = include.replace("\\", "/")
+        candidates = self.files.get(include.rsplit("/", 1)[-1])
+        if not candidates:
+            return False
+        if "/" not in include:
+            return True
+        return any(full.endswith("/" + include) or full == include for full in candidates)
+
+    def provides_module(self, module: str) -> bool:
+        """
+        @brief Check whether an imported module/namespace belongs to this project
+        @param module Dotted or scoped module name as written in the source
+        @return True if the module or one of its enclosing scopes is provided
+        """
+        parts = _normalize_symbol(module).split("::")
+        return any("::".join(parts[:length]) in self.symbols for length in range(len(parts), 0, -1))
+
+
+class TagEntry(BaseModel):
+    """@brief One registered tag file"""
+
+    project: str
+    version: str
+    tag_file: str
+    html_location: str
+    registered_at: float
+    xml_location: str = ""
+
+
+class SourceReferences(BaseModel):
+    """@brief External names a source tree refers to"""
+
+    includes: Set[str] = set()
+    modules: Set[str] = set()
+    files_scanned: int = 0
+
+
+def collect_references(paths: Iterable[Path]) -> SourceReferences:
+    """
+    @brief Extract include and import targets from source files
+    @param paths Source files to read
+    @return Collected include paths and imported module names
+    """
+    refs = SourceReferences()
+    for path in paths:
+        if path.suffix.lower() not in SOURCE_EXTENSIONS:
+            continue
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            continue
+        refs.files_scanned += 1
+        refs.includes.update(_INCLUDE.findall(text))
+        refs.modules.update(_PY_FROM.findall(text))
+        for group in _PY_IMPORT.findall(text):
+            refs.modules.update(name.strip() for name in group.split(","))
+        refs.modules.update(_JAVA_IMPORT.findall(text))
+        refs.modules.update(_CS_USING.findall(text))
+        refs.modules.update(_PHP_USE.findall(text))
+    return refs
+
+
+class TagRegistry:
+    """
+    @brief Persistent registry of tag files indexed by project and version
+
+    @details Layout below the data home::
+
+        tags/registry.json          {project: {version: TagEntry}}
+        tags/<project>/<version>.tag
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[int, TagIndex]] = {}
+
+    @property
+    def root(self) -> Path:
+        """@brief Registry directory (resolved lazily so DOXYGEN_MCP_HOME changes apply)"""
+        if self._root is not None:
+            self._root.mkdir(parents=True, exist_ok=True)
+            return self._root
+        return state_dir("tags")
+
+    def _load(self) -> Dict[str, Dict[str, TagEntry]]:
+        path = self.root / "registry.json"
+        if not path.exists():
+            return {}
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        return {
+            project: {version: TagEntry(**entry) for version, entry in versions.items()}
+            for project, versions in raw.items()
+        }
+
+    def _save(self, entries: Dict[str, Dict[str, TagEntry]]) -> None:
+        write_json_atomic(
+            self.root / "registry.json",
+            {
+                project: {version: entry.model_dump() for version, entry in versions.items()}
+                for project, versions in entries.items()
+            },
+        )
+
+    def register(self, project: str, tag_file: Path, html_location: str, version: str = "latest",
+                 xml_location: str = "") -> TagEntry:
+        """
+        @brief Store a copy of a tag file and record where its HTML lives
+        @param project Project name (slugified for storage)
+        @param tag_file Tag file produced by a build
+        @param html_location Path or URL of the project's HTML output
+        @param version Version label; "latest" is overwritten on every build
+        @param xml_location XML output directory, for builds whose pages are rendered on demand
+        @return The registered entry
+        @throws FileNotFoundError If the tag file does not exist
+        """
+        tag_file = Path(tag_file)
+        if not tag_file.is_file():
+            raise FileNotFoundError(f"Tag file not found: {tag_file}")
+        slug = project_slug(project)
+        version = version or "latest"
+        with self._lock:
+            destination = self.root / slug / f"{project_slug(version)}.tag"
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            staging = destination.with_suffix(".tag.tmp")
+            shutil.copyfile(tag_file, staging)
+            staging.replace(destination)
+            entries = self._load()
+            entry = TagEntry(
+                project=slug,
+                version=version,
+                tag_file=str(destination),
+                html_location=html_location,
+                registered_at=time.time(),
+                xml_location=xml_location,
+            )
+            entries.setdefault(slug, {})[version] = entry
+            self._save(entries)
+        return entry
+
+    def entries(self, project: str = "") -> List[TagEntry]:
+        """
+        @brief List registered tag files
+        @param project Restrict to one project (empty for all)
+        @return Entries ordered by project, newest version first
+        """
+        with self._lock:
+            entries = self._load()
+        selected = [entries.get(project_slug(project), {})] if project else entries.values()
+        result = [entry for versions in selected for entry in versions.values()]
+        return sorted(result, key=lambda e: (e.project, -e.registered_at))
+
+    def latest(self, project: str) -> Optional[TagEntry]:
+        """
+        @brief Most recently registered version of a project
+        @param project Project name
+        @return The entry, or None if the project is unknown
+        """
+        entries = self.entries(project)
+        return entries[0] if entries else None
+
+    def index(self, entry: TagEntry) -> TagIndex:
+        """
+        @brief Parsed index of a registered tag file, cached by modification time
+        @param entry Registered entry
+        @return Tag index
+        """
+        path = Path(entry.tag_file)
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._indexes.get(entry.tag_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = TagIndex.from_tagfile(path)
+        with self._lock:
+            self._indexes[entry.tag_file] = (mtime, index)
+        return index
+
+    def resolve(self, refs: SourceReferences, exclude_project: str = "") -> List[TagEntry]:
+        """
+        @brief Find the registered projects a source tree depends on
+        @param refs References collected from the dependent project's sources
+        @param exclude_project The dependent project itself, which must not link to itself
+        @return Latest entry of every project that provides at least one reference
+        """
+        excluded = project_slug(exclude_project) if exclude_project else ""
+        dependencies = []
+        seen = set()
+        for entry in self.entries():
+            if entry.project in seen or entry.project == excluded:
+                continue
+            seen.add(entry.project)
+            try:
+                index = self.index(entry)
+            except (OSError, ET.ParseError):
+                continue
+            if any(index.provides_include(include) for include in refs.includes) or any(
+                index.provides_module(module) for module in refs.modules
+            ):
+                dependencies.append(entry)
+        return dependencies
+
+
+def tagfiles_value(entries: Iterable[TagEntry]) -> str:
+    """
+    @brief Format registry entries as a Doxyfile ``TAGFILES`` value
+    @param entries Entries to link against
+    @return Space-separated ``"tagfile=location"`` items
+    """
+    return " ".join(f'"{entry.tag_file}={entry.html_location}"' for entry in entries)
+
+
+tag_registry = TagRegistry()
@@ -0,0 +1,324 @@
+"""
+Watch mode
+
+A watch keeps one project's documentation current while its sources are edited.
+It compares stat signatures of the project's input files (and its Doxyfile)
+between scans, so only changes Doxygen would see trigger a rebuild.
+
+Bursts of saves are coalesced: a rebuild starts once no input has changed for the
+debounce window, or after MAX_WAIT_FACTOR windows of continuous editing. A change
+that arrives while a rebuild runs cancels it (the Doxygen process is killed and its
+staged output discarded, so the published documentation stays intact), and the
+next rebuild covers both sets of changes. Rebuild starts are spaced by a minimum
+interval, so a project that is edited non-stop cannot monopolise build slots.
+
+When the optional ``watchdog`` package is installed, file-system notifications
+wake a watch as soon as something changes and the periodic scan is only a safety
+net; otherwise the inputs are polled. Notifications from build output directories
+are dropped, so a rebuild writing its output does not wake the watch.
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger("doxygen-mcp")
+
+Signature = Tuple[int, int]
+
+# Continuous edits still get a rebuild after this many debounce windows.
+MAX_WAIT_FACTOR = 10
+# Scan interval while file-system notifications are available.
+NOTIFIED_POLL_INTERVAL = 30.0
+# Latencies kept for the reported statistics.
+LATENCY_SAMPLES = 50
+
+
+class BuildOutcome(NamedTuple):
+    """@brief Result of one rebuild, as reported by the build callback"""
+
+    status: str  # "success", "up_to_date" or "failed"
+    message: str
+
+
+def diff_signatures(before: Dict[str, Optional[Signature]], after: Dict[str, Optional[Signature]]) -> List[str]:
+    """
+    @brief Paths added, removed or modified between two scans
+    @return Sorted relative paths
+    """
+    return sorted(path for path in before.keys() | after.keys() if before.get(path) != after.get(path))
+
+
+class ProjectWatch:
+    """
+    @brief Debounced, cancellable rebuild loop for one project
+    """
+
+    def __init__(
+        self,
+        project: str,
+        scan: Callable[[], Dict[str, Optional[Signature]]],
+        build: Callable[[List[str]], Awaitable[BuildOutcome]],
+        debounce: float = 1.0,
+        min_interval: float = 10.0,
+        poll_interval: float = 1.0,
+        roots: Sequence[Path] = (),
+        ignored: Sequence[Path] = (),
+        baseline: Optional[Dict[str, Optional[Signature]]] = None,
+    ):
+        """
+        @param project Project path, used in reports
+        @param scan Blocking callable returning the signature of every watched file
+        @param build Coroutine function rebuilding the documentation for a list of changed files
+        @param debounce Seconds without changes before a rebuild starts
+        @param min_interval Minimum seconds between rebuild starts
+        @param poll_interval Seconds between scans when no notifications are available
+        @param roots Directories to receive file-system notifications for (watchdog)
+        @param ignored Directories below the roots whose notifications are dropped (build output)
+        @param baseline Result of a scan taken before starting; later changes are measured
+        against it (a fresh scan when omitted)
+        """
+        self.project = project
+        self.scan = scan
+        self.build = build
+        self.debounce = max(0.0, debounce)
+        self.min_interval = max(0.0, min_interval)
+        self.poll_interval = max(0.05, poll_interval)
+        self.roots = list(roots)
+        self.ignored = [Path(path) for path in ignored]
+        self._baseline = baseline
+        self.started_at = time.time()
+        self.builds = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.failed = 0
+        self.last_result = ""
+        self.last_error = ""
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.notifications = False
+        self._pending: Dict[str, float] = {}  # path -> save time
+        self._building: Dict[str, float] = {}
+        self._build_task: Optional["asyncio.Task[BuildOutcome]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._observer = None
+
+    @property
+    def state(self) -> str:
+        if self._task is None or self._task.done():
+            return "stopped"
+        if self._running:
+            return "building"
+        return "debouncing" if self._pending else "idle"
+
+    @property
+    def _running(self) -> bool:
+        return self._build_task is not None and not self._build_task.done()
+
+    def start(self) -> None:
+        """@brief Start watching on the running event loop"""
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """@brief Stop watching and cancel a running rebuild"""
+        for task in (self._task, self._build_task):
+            if task is not None and not task.done():
+                task.cancel()
+        for task in (self._task, self._build_task):
+            if task is not None:
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._stop_observer()
+
+    def relevant(self, paths: Sequence[str]) -> bool:
+        """@brief Whether a notification about these paths may concern a watched file"""
+        for path in filter(None, paths):
+            path = Path(os.fsdecode(path))
+            if not any(path == ignored or ignored in path.parents for ignored in self.ignored):
+                return True
+        return False
+
+    def _start_observer(self) -> None:
+        """@brief Wake the loop on file-system notifications when watchdog is installed"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+        loop, wake, relevant = asyncio.get_running_loop(), self._wake, self.relevant
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if relevant([event.src_path, getattr(event, "dest_path", "")]):
+                    loop.call_soon_threadsafe(wake.set)
+
+        try:
+            observer = Observer()
+            for root in self.roots:
+                observer.schedule(Handler(), str(root), recursive=True)
+            observer.start()
+        except OSError as e:  # e.g. out of inotify watches: keep polling
+            logger.warning("File-system notifications unavailable for %s: %s", self.project, e)
+            return
+        self._observer, self.notifications = observer, True
+
+    def _stop_observer(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    async def _run(self) -> None:
+        if self.roots:
+            self._start_observer()
+        poll_interval = max(self.poll_interval, NOTIFIED_POLL_INTERVAL) if self.notifications else self.poll_interval
+        last_change = first_change = 0.0
+        last_start = -float("inf")
+        try:
+            baseline = self._baseline if self._baseline is not None else await asyncio.to_thread(self.scan)
+            while True:
+                # Sleep until the next scan, a notification, the end of a running build
+                # or the moment the pending rebuild may start
+                now = time.monotonic()
+                timeout = poll_interval
+                if self._pending and not self._running:
+                    ready = max(min(last_change + self.debounce, first_change + self.debounce * MAX_WAIT_FACTOR),
+                                last_start + self.min_interval)
+                    timeout = min(timeout, max(0.0, ready - now))
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+                try:
+                    current = await asyncio.to_thread(self.scan)
+                except Exception as e:  # e.g. the Doxyfile is being rewritten; try again next time
+                    self.last_error = f"Scan failed: {e}"
+                    continue
+                changed = diff_signatures(baseline, current)
+                now = time.monotonic()
+                if changed:
+                    detected = time.time()
+                    for path in changed:
+                        signature = current.get(path)
+                        # The file's modification time is when it was saved; deletions are dated on detection
+                        self._pending[path] = min(signature[0] / 1e9, detected) if signature else detected
+                    baseline = current
+                    first_change = first_change or now
+                    last_change = now
+                    if self._running:
+                        # The running rebuild is already stale: cancel it and rebuild everything together
+                        self._build_task.cancel()
+                        try:
+                            await self._build_task
+                        except (asyncio.CancelledError, Exception):
+                            pass
+                        self.cancelled += 1
+                        self._pending = {**self._building, **self._pending}
+                        self._build_task = None
+
+                if self._build_task is not None and self._build_task.done():
+                    self._finish_build()
+                if self._pending and not self._running:
+                    quiet = now - last_change >= self.debounce
+                    overdue = now - first_change >= self.debounce * MAX_WAIT_FACTOR
+                    if (quiet or overdue) and now - last_start >= self.min_interval:
+                        self._building, self._pending = self._pending, {}
+                        first_change = 0.0
+                        last_start = now
+                        self._build_task = asyncio.get_running_loop().create_task(
+                            self.build(sorted(self._building))
+                        )
+                        self._build_task.add_done_callback(lambda _: self._wake.set())
+        finally:
+            self._stop_observer()
+
+    def _finish_build(self) -> None:
+        """@brief Account for a completed rebuild"""
+        task, self._build_task = self._build_task, None
+        try:
+            outcome = task.result()
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            outcome = BuildOutcome("failed", f"❌ {e}")
+        self.last_result = outcome.message.splitlines()[0] if outcome.message else outcome.status
+        if outcome.status == "success":
+            self.builds += 1
+            self.latencies.append(time.time() - max(self._building.values()))
+            self.last_error = ""
+        elif outcome.status == "up_to_date":
+            self.skipped += 1
+        else:
+            self.failed += 1
+            self.last_error = outcome.message
+        self._building = {}
+
+    def status(self) -> Dict[str, object]:
+        """@brief Counters and save-to-docs latencies for reporting"""
+        latencies = sorted(self.latencies)
+        return {
+            "project": self.project,
+            "state": self.state,
+            "debounce": self.debounce,
+            "min_interval": self.min_interval,
+            "notifications": self.notifications,
+            "builds": self.builds,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "pending_files": len(self._pending) + len(self._building),
+            "last_latency": round(self.latencies[-1], 3) if self.latencies else None,
+            "median_latency": round(statistics.median(latencies), 3) if latencies else None,
+            "max_latency": round(latencies[-1], 3) if latencies else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class WatchManager:
+    """
+    @brief Registry of running watches, one per project
+    """
+
+    def __init__(self):
+        self._watches: Dict[str, ProjectWatch] = {}
+
+    async def start(self, key: str, watch: ProjectWatch) -> bool:
+        """
+        @brief Start a watch, replacing any existing watch of the same project
+        @return Whether an existing watch was replaced
+        """
+        previous = self._watches.pop(key, None)
+        if previous is not None:
+            await previous.stop()
+        watch.start()
+        self._watches[key] = watch
+        return previous is not None
+
+    async def stop(self, key: str) -> Optional[ProjectWatch]:
+        """@brief Stop a project's watch; returns it (for final statistics) or None"""
+        watch = self._watches.pop(key, None)
+        if watch is not None:
+            await watch.stop()
+        return watch
+
+    async def stop_all(self) -> None:
+        """@brief Stop every watch (used on shutdown)"""
+        for key in list(self._watches):
+            await self.stop(key)
+
+    def watches(self) -> List[ProjectWatch]:
+        """@brief Running watches, by project"""
+        return [self._watches[key] for key in sorted(self._watches)]
+
+
+watch_manager = WatchManager()
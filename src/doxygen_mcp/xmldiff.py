@@ -0,0 +1,346 @@
+"""
+Documentation drift detection
+
+Compares two Doxygen XML outputs without loading either of them as a whole. Every
+compound file is stream-parsed on its own and reduced to one compact record per
+member: short hashes of its signature, brief description, detailed description
+and parameter documentation. Records are produced in (compound, member) refid
+order, so two builds are compared with a single sorted merge whose running time
+is proportional to the number of members and whose memory is bounded by the
+largest compound.
+
+The records of a build can be persisted as a snapshot (a gzipped TSV in the same
+order), which lets the next comparison run against the snapshot instead of the
+previous build's XML.
+"""
+
+import gzip
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+SNAPSHOT_HEADER = "# doxygen-mcp snapshot v1"
+SNAPSHOT_SUFFIX = ".tsv.gz"
+
+_WHITESPACE = re.compile(r"\s+")
+_EMPTY_HASH = ""
+
+# Large subtrees that never contribute to a member record.
+_SKIPPED_SUBTREES = {"programlisting", "listofallmembers", "inheritancegraph", "collaborationgraph",
+                     "incdepgraph", "invincdepgraph", "location"}
+
+
+class MemberRecord(NamedTuple):
+    """
+    @brief Compact fingerprint of one documented entity
+
+    @details Compounds themselves are recorded with ``refid == compound`` so that
+    class/file level documentation is tracked exactly like member documentation.
+    """
+
+    compound: str
+    refid: str
+    kind: str
+    name: str
+    signature: str
+    brief: str
+    detailed: str
+    params: str
+    documented: bool
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """@brief Merge key; records are always produced in this order"""
+        return (self.compound, self.refid)
+
+
+class Change(NamedTuple):
+    """@brief One difference between two builds"""
+
+    change: str
+    compound: str
+    refid: str
+    kind: str
+    name: str
+    fields: Tuple[str, ...] = ()
+
+
+def _digest(text: str) -> str:
+    """@brief Short stable hash of normalised text (empty text hashes to empty)"""
+    text = _WHITESPACE.sub(" ", text).strip()
+    if not text:
+        return _EMPTY_HASH
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _text(element: Optional[ET.Element], skip: Tuple[str, ...] = ()) -> str:
+    """@brief All text below an element, optionally skipping some subtrees"""
+    if element is None:
+        return ""
+    if not skip:
+        return "".join(element.itertext())
+    parts = [element.text or ""]
+    for child in element:
+        if child.tag not in skip:
+            parts.append(_text(child, skip))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _param_docs(detailed: Optional[ET.Element]) -> str:
+    """@brief Parameter names and descriptions from ``<parameterlist>`` blocks"""
+    if detailed is None:
+        return ""
+    items = []
+    for item in detailed.iter("parameteritem"):
+        names = ",".join(_text(name) for name in item.iter("parametername"))
+        items.append(f"{names}:{_text(item.find('parameterdescription'))}")
+    return "\n".join(items)
+
+
+def _record(compound: str, refid: str, kind: str, name: str, element: ET.Element, signature: str) -> MemberRecord:
+    """@brief Build a record from a memberdef or compounddef element"""
+    brief = _text(element.find("briefdescription"))
+    detailed_element = element.find("detaileddescription")
+    detailed = _text(detailed_element, skip=("parameterlist",))
+    params = _param_docs(detailed_element)
+    return MemberRecord(
+        compound=compound,
+        refid=refid,
+        kind=kind,
+        name=name,
+        signature=_digest(signature),
+        brief=_digest(brief),
+        detailed=_digest(detailed),
+        params=_digest(params),
+        documented=bool(brief.strip() or detailed.strip() or params.strip()),
+    )
+
+
+def iter_compound_records(path: Path) -> List[MemberRecord]:
+    """
+    @brief Stream-parse one compound XML file into sorted member records
+    @param path Compound file (``<refid>.xml``)
+    @return Records of the compound and of the members it defines, in refid order
+
+    @details Members that are merely listed in this compound but defined in another
+    one (for example namespace functions repeated in a file compound) are skipped
+    so that every member is counted exactly once across the whole build.
+    """
+    records: List[MemberRecord] = []
+    stack: List[str] = []
+    compound_id = ""
+    compound_name = ""
+    for event, element in ET.iterparse(str(path), events=("start", "end")):
+        if event == "start":
+            stack.append(element.tag)
+            if element.tag == "compounddef":
+                compound_id = element.get("id", "")
+            continue
+        stack.pop()
+        tag = element.tag
+        if tag == "compoundname" and stack and stack[-1] == "compounddef":
+            compound_name = (element.text or "").strip()
+        elif tag == "memberdef":
+            refid = element.get("id", "")
+            if refid.startswith(compound_id + "_1") or "_1" not in refid:
+                name = (element.findtext("name") or "").strip()
+                qualified = f"{compound_name}::{name}" if compound_name else name
+                signature = " ".join(
+                    filter(None, [_text(element.find("definition")), _text(element.find("argsstring"))])
+                )
+                records.append(_record(compound_id, refid, element.get("kind", ""), qualified, element, signature))
+            element.clear()
+        elif tag == "compounddef":
+            kind = element.get("kind", "")
+            templates = _text(element.find("templateparamlist"))
+            bases = ",".join(_text(base) for base in element.findall("basecompoundref"))
+            records.append(_record(compound_id, compound_id, kind, compound_name, element,
+                                   f"{kind} {compound_name} {templates} {bases}"))
+            element.clear()
+        elif tag in _SKIPPED_SUBTREES:
+            element.clear()
+    records.sort(key=lambda record: record.key)
+    return records
+
+
+def _compound_files(xml_dir: Path) -> List[Tuple[str, Path]]:
+    """@brief Compound refids and their files, sorted by refid"""
+    index = xml_dir / "index.xml"
+    refids = []
+    if index.exists():
+        for _, element in ET.iterparse(str(index), events=("end",)):
+            if element.tag == "compound":
+                refids.append(element.get("refid", ""))
+                element.clear()
+    else:
+        refids = [path.stem for path in xml_dir.glob("*.xml") if path.stem not in ("index", "Doxyfile")]
+    files = [(refid, xml_dir / f"{refid}.xml") for refid in set(refids) if refid]
+    return sorted((refid, path) for refid, path in files if path.exists())
+
+
+def find_xml_dir(path: Path) -> Path:
+    """
+    @brief Locate the Doxygen XML directory for a path
+    @param path XML directory, its parent output directory, or a project directory
+    @return Directory containing ``index.xml``
+    @throws FileNotFoundError If no XML output can be found
+    """
+    for candidate in (path, path / "xml", path / "docs" / "xml"):
+        if (candidate / "index.xml").exists():
+            return candidate
+    raise FileNotFoundError(f"No Doxygen XML output (index.xml) found at {path}")
+
+
+def iter_xml_records(xml_dir: Path) -> Iterator[MemberRecord]:
+    """
+    @brief Records of a whole XML output, in merge order
+    @param xml_dir Directory containing ``index.xml`` and compound files
+    @return Iterator yielding one compound's records at a time
+    """
+    for _, path in _compound_files(xml_dir):
+        try:
+            yield from iter_compound_records(path)
+        except ET.ParseError:
+            continue
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: {"t": "\t", "n": "\n"}.get(m.group(1), m.group(1)), value)
+
+
+def write_snapshot(records: Iterable[MemberRecord], path: Path) -> int:
+    """
+    @brief Persist records as a gzipped TSV snapshot
+    @param records Records in merge order
+    @param path Destination file
+    @return Number of records written
+    """
+    count = 0
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as out:
+        out.write(SNAPSHOT_HEADER + "\n")
+        for record in records:
+            _write_row(out, record)
+            count += 1
+    tmp.replace(path)
+    return count
+
+
+def _write_row(out: TextIO, record: MemberRecord) -> None:
+    out.write("\t".join(
+        [_escape(record.compound), _escape(record.refid), record.kind, _escape(record.name),
+         record.signature, record.brief, record.detailed, record.params,
+         "1" if record.documented else "0"]
+    ) + "\n")
+
+
+def iter_snapshot(path: Path) -> Iterator[MemberRecord]:
+    """
+    @brief Stream records back out of a snapshot
+    @param path Snapshot written by write_snapshot()
+    @return Iterator over records in merge order
+    @throws ValueError If the file is not a snapshot
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        if f.readline().rstrip("\n") != SNAPSHOT_HEADER:
+            raise ValueError(f"Not a documentation snapshot: {path}")
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) != 9:
+                continue
+            compound, refid, kind, name, signature, brief, detailed, params, documented = fields
+            yield MemberRecord(_unescape(compound), _unescape(refid), kind, _unescape(name),
+                               signature, brief, detailed, params, documented == "1")
+
+
+def open_records(path: Path) -> Iterator[MemberRecord]:
+    """
+    @brief Records from either a snapshot file or an XML output
+    @param path Snapshot file, XML directory or project/output directory
+    @return Iterator over records in merge order
+    """
+    path = Path(path)
+    if path.is_file():
+        return iter_snapshot(path)
+    return iter_xml_records(find_xml_dir(path))
+
+
+def _tee(records: Iterable[MemberRecord], out: Optional[TextIO]) -> Iterator[MemberRecord]:
+    for record in records:
+        if out is not None:
+            _write_row(out, record)
+        yield record
+
+
+def diff_records(old: Iterable[MemberRecord], new: Iterable[MemberRecord]) -> Iterator[Change]:
+    """
+    @brief Sorted merge of two record streams
+    @param old Records of the previous build
+    @param new Records of the current build
+    @return Changes in merge order
+
+    @details A member present in both builds yields ``changed`` when any of its
+    hashes differ and additionally ``undocumented`` when it lost all documentation.
+    """
+    old_iter, new_iter = iter(old), iter(new)
+    old_rec = next(old_iter, None)
+    new_rec = next(new_iter, None)
+    while old_rec is not None or new_rec is not None:
+        if new_rec is None or (old_rec is not None and old_rec.key < new_rec.key):
+            yield Change("removed", old_rec.compound, old_rec.refid, old_rec.kind, old_rec.name)
+            old_rec = next(old_iter, None)
+        elif old_rec is None or new_rec.key < old_rec.key:
+            yield Change("added", new_rec.compound, new_rec.refid, new_rec.kind, new_rec.name)
+            new_rec = next(new_iter, None)
+        else:
+            fields = tuple(
+                field for field in ("signature", "brief", "detailed", "params")
+                if getattr(old_rec, field) != getattr(new_rec, field)
+            )
+            if fields:
+                yield Change("changed", new_rec.compound, new_rec.refid, new_rec.kind, new_rec.name, fields)
+            if old_rec.documented and not new_rec.documented:
+                yield Change("undocumented", new_rec.compound, new_rec.refid, new_rec.kind, new_rec.name)
+            old_rec = next(old_iter, None)
+            new_rec = next(new_iter, None)
+
+
+def compare(old: Path, new: Path, snapshot_out: Optional[Path] = None) -> Tuple[List[Change], Dict[str, int]]:
+    """
+    @brief Compare two builds, optionally saving the new build's snapshot on the way
+    @param old Previous build (snapshot file or XML output)
+    @param new Current build (snapshot file or XML output)
+    @param snapshot_out Where to write the snapshot of ``new`` (None to skip)
+    @return Changes and summary counts (per change type plus ``members`` in ``new``)
+    """
+    counts = {"added": 0, "removed": 0, "changed": 0, "undocumented": 0, "members": 0}
+    changes: List[Change] = []
+
+    def counted(records: Iterable[MemberRecord]) -> Iterator[MemberRecord]:
+        for record in records:
+            counts["members"] += 1
+            yield record
+
+    new_records = open_records(new)
+    if snapshot_out is None:
+        for change in diff_records(open_records(old), counted(new_records)):
+            counts[change.change] += 1
+            changes.append(change)
+        return changes, counts
+
+    snapshot_out = Path(snapshot_out)
+    tmp = snapshot_out.with_name(snapshot_out.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as out:
+        out.write(SNAPSHOT_HEADER + "\n")
+        for change in diff_records(open_records(old), counted(_tee(new_records, out))):
+            counts[change.change] += 1
+            changes.append(change)
+    tmp.replace(snapshot_out)
+    return changes, counts
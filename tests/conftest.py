@@ -0,0 +1,90 @@
+"""
+Shared fixtures for the Doxygen MCP test suite
+
+Every test runs with its own server data home and with the temporary directory
+allowed as a project root. The ``fake_doxygen`` fixture puts scriptable
+``doxygen`` and ``dot`` executables first on PATH so that builds go through the
+real subprocess and FastMCP code paths without needing Doxygen installed.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+FAKE_SCRIPT = Path(__file__).with_name("fake_doxygen.py")
+
+
+@pytest.fixture(autouse=True)
+def isolated_server_state(tmp_path, monkeypatch):
+    """Keep registries and caches out of the user's home and allow temp projects"""
+    monkeypatch.setenv("DOXYGEN_MCP_HOME", str(tmp_path / "doxygen-mcp-home"))
+    roots = [os.path.realpath(tempfile.gettempdir()), os.path.realpath(tmp_path)]
+    monkeypatch.setenv("DOXYGEN_MCP_ALLOWED_ROOTS", os.pathsep.join(roots))
+
+
+class FakeDoxygen:
+    """Controller for the fake doxygen/dot executables"""
+
+    def __init__(self, root: Path):
+        self.bin_dir = root / "bin"
+        self.config_path = root / "fake-doxygen.json"
+        self.log_path = root / "fake-doxygen.log"
+        self.bin_dir.mkdir(parents=True)
+        self.configure()
+        for tool in ("doxygen", "dot"):
+            self._install(tool)
+
+    def _install(self, tool: str) -> None:
+        if os.name == "nt":
+            wrapper = self.bin_dir / f"{tool}.cmd"
+            wrapper.write_text(f'@"{sys.executable}" -S -E "{FAKE_SCRIPT}" {tool} %*\r\n')
+        else:
+            wrapper = self.bin_dir / tool
+            wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" -S -E "{FAKE_SCRIPT}" {tool} "$@"\n')
+            wrapper.chmod(0o755)
+
+    def configure(self, **settings) -> None:
+        """Replace the behaviour of subsequent invocations (see fake_doxygen.py)"""
+        self.config_path.write_text(json.dumps(settings))
+
+    def calls(self, tool: str = "doxygen", builds_only: bool = True, event: str = "end"):
+        """
+        Logged invocations of a tool, excluding ``--version`` probes by default.
+        ``event="end"`` lists completed runs, ``event="start"`` every run started.
+        """
+        if not self.log_path.exists():
+            return []
+        entries = [json.loads(line) for line in self.log_path.read_text().splitlines()]
+        return [
+            entry for entry in entries
+            if entry["tool"] == tool and entry["event"] == event
+            and not (builds_only and entry["args"] in (["--version"], ["-V"]))
+        ]
+
+
+@pytest.fixture
+def fake_doxygen(tmp_path, monkeypatch):
+    """Scriptable doxygen/dot executables placed first on PATH"""
+    fake = FakeDoxygen(tmp_path / "fake-doxygen")
+    monkeypatch.setenv("PATH", str(fake.bin_dir) + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("FAKE_DOXYGEN_CONFIG", str(fake.config_path))
+    monkeypatch.setenv("FAKE_DOXYGEN_LOG", str(fake.log_path))
+    return fake
+
+
+@pytest.fixture
+def doxygen_project(tmp_path):
+    """A minimal project with a Doxyfile writing into ./docs"""
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "main.cpp").write_text("/// Entry point\nint main() { return 0; }\n")
+    (project / "Doxyfile").write_text(
+        'PROJECT_NAME = "Sample"\nINPUT = .\nOUTPUT_DIRECTORY = docs\nRECURSIVE = YES\n'
+    )
+    return project
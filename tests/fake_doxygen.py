@@ -0,0 +1,163 @@
+"""
+Scriptable stand-in for the doxygen and dot executables
+
+Invoked through small wrapper scripts created by the ``fake_doxygen`` fixture in
+``conftest.py`` as ``python fake_doxygen.py <tool> [args...]``. Behaviour is read
+from the JSON file named by ``$FAKE_DOXYGEN_CONFIG``:
+
+- ``version``: string printed by ``doxygen --version``
+- ``delay``: seconds to sleep before finishing (per build / per dot run)
+- ``warnings``: number of "not documented" warnings written to stderr
+- ``stderr_lines``: extra lines written verbatim to stderr
+- ``memory_mb``: megabytes to allocate and touch while running
+- ``exit_code``: process exit status
+- ``xml_compounds``: list of ``{"refid", "kind", "name"}`` written to xml/index.xml
+
+Every invocation appends a ``start`` JSON line to ``$FAKE_DOXYGEN_LOG`` when it
+begins and an ``end`` line (arguments, working directory, stdin, timestamps) when it
+exits normally; a process that was killed only ever logs its ``start`` line.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+
+def load_config():
+    path = os.environ.get("FAKE_DOXYGEN_CONFIG")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def log(entry):
+    path = os.environ.get("FAKE_DOXYGEN_LOG")
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def parse_config(text):
+    options = {}
+    for line in text.splitlines():
+        match = re.match(r"^\s*([A-Z_][A-Z0-9_]*)\s*(\+?=)\s*(.*)$", line)
+        if not match:
+            continue
+        name, operator, value = match.groups()
+        value = value.strip()
+        if operator == "+=" and options.get(name):
+            value = f"{options[name]} {value}"
+        options[name] = value
+    return options
+
+
+def unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def consume_memory(megabytes):
+    if not megabytes:
+        return None
+    block = bytearray(int(megabytes * 1024 * 1024))
+    for offset in range(0, len(block), 4096):
+        block[offset] = 1
+    return block
+
+
+def write_outputs(options, config):
+    output_dir = Path(unquote(options.get("OUTPUT_DIRECTORY", "")) or ".")
+    project = unquote(options.get("PROJECT_NAME", "")) or "project"
+    if unquote(options.get("GENERATE_HTML", "YES")).upper() != "NO":
+        html = output_dir / (unquote(options.get("HTML_OUTPUT", "")) or "html")
+        html.mkdir(parents=True, exist_ok=True)
+        (html / "index.html").write_text(f"<html><body>{project}</body></html>\n")
+    if unquote(options.get("GENERATE_XML", "NO")).upper() == "YES":
+        xml = output_dir / (unquote(options.get("XML_OUTPUT", "")) or "xml")
+        xml.mkdir(parents=True, exist_ok=True)
+        compounds = "".join(
+            f'<compound refid="{c["refid"]}" kind="{c["kind"]}"><name>{c["name"]}</name></compound>'
+            for c in config.get("xml_compounds", [])
+        )
+        (xml / "index.xml").write_text(f'<?xml version="1.0"?><doxygenindex>{compounds}</doxygenindex>\n')
+    tagfile = unquote(options.get("GENERATE_TAGFILE", ""))
+    if tagfile:
+        Path(tagfile).parent.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"\W+", "_", project.lower())
+        Path(tagfile).write_text(
+            '<?xml version="1.0"?><tagfile>'
+            f'<compound kind="namespace"><name>{name}</name><filename>namespace{name}.html</filename></compound>'
+            "</tagfile>\n"
+        )
+
+
+def run_doxygen(args, config, entry):
+    if args == ["--version"]:
+        print(config.get("version", "1.9.8"))
+        return 0
+
+    if args and args[0] == "-":
+        text = sys.stdin.read()
+    elif args:
+        text = Path(args[0]).read_text(encoding="utf-8")
+    else:
+        text = Path("Doxyfile").read_text(encoding="utf-8")
+    entry["stdin"] = text if args and args[0] == "-" else None
+    options = parse_config(text)
+
+    memory = consume_memory(config.get("memory_mb", 0))
+    for i in range(config.get("warnings", 0)):
+        sys.stderr.write(f"src/module{i % 97}.cpp:{i + 1}: warning: Member fn{i}() is not documented.\n")
+    for line in config.get("stderr_lines", []):
+        sys.stderr.write(line + "\n")
+    time.sleep(config.get("delay", 0))
+    del memory
+
+    exit_code = config.get("exit_code", 0)
+    if exit_code == 0:
+        write_outputs(options, config)
+    else:
+        sys.stderr.write("error: fake doxygen failure\n")
+    return exit_code
+
+
+def run_dot(args, config, entry):
+    if "-V" in args:
+        sys.stderr.write("dot - graphviz version 2.43.0 (fake)\n")
+        return 0
+    source = sys.stdin.read()
+    entry["stdin"] = source
+    time.sleep(config.get("delay", 0))
+    nodes = len(re.findall(r"^\s*\"?[\w:.]+\"?\s*\[", source, re.M))
+    svg = f'<svg xmlns="http://www.w3.org/2000/svg"><!-- fake dot: {nodes} nodes --></svg>\n'
+    if "-o" in args:
+        Path(args[args.index("-o") + 1]).write_text(svg)
+    else:
+        sys.stdout.write(svg)
+    return config.get("exit_code", 0)
+
+
+def main():
+    tool, args = sys.argv[1], sys.argv[2:]
+    config = load_config()
+    entry = {"tool": tool, "args": args, "cwd": os.getcwd(), "pid": os.getpid(), "start": time.time()}
+    log(dict(entry, event="start"))
+    try:
+        if tool == "dot":
+            code = run_dot(args, config.get("dot", {}), entry)
+        else:
+            code = run_doxygen(args, config, entry)
+    finally:
+        entry["end"] = time.time()
+        log(dict(entry, event="end"))
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Tests for the call/reference graph built from Doxygen XML
+"""
+
+import json
+import os
+import time
+from array import array
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.callgraph import CallGraph, GraphCache
+from doxygen_mcp.server import query_call_graph
+
+INDEX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygenindex version="1.9.8">
+  <compound refid="classApp" kind="class"><name>App</name></compound>
+  <compound refid="classStore" kind="class"><name>Store</name></compound>
+</doxygenindex>
+"""
+
+COMPOUND = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen version="1.9.8">
+  <compounddef id="{id}" kind="class" prot="public">
+    <compoundname>{name}</compoundname>
+    <sectiondef kind="public-func">{members}
+    </sectiondef>
+    <listofallmembers></listofallmembers>
+  </compounddef>
+</doxygen>
+"""
+
+MEMBER = """
+      <memberdef kind="function" id="{id}" prot="public" static="no">
+        <name>{name}</name>{refs}
+      </memberdef>"""
+
+# App::run -> App::load -> Store::read -> Store::parse
+#          -> App::save -> Store::write -> Store::parse
+# Store::parse -> App::load (cycle); App::unused is isolated.
+# Edges are listed on one end only, as in Doxygen output split across compounds.
+APP = [
+    ("classApp_1a1", "run", [("references", "classApp_1a2"), ("references", "classApp_1a3")]),
+    ("classApp_1a2", "load", [("references", "classStore_1b1")]),
+    ("classApp_1a3", "save", [("referencedby", "classApp_1a1")]),
+    ("classApp_1a4", "unused", []),
+]
+STORE = [
+    ("classStore_1b1", "read", [("references", "classStore_1b3")]),
+    ("classStore_1b2", "write", [("referencedby", "classApp_1a3"), ("references", "classStore_1b3")]),
+    ("classStore_1b3", "parse", [("references", "classApp_1a2")]),
+]
+
+
+def write_compound(xml_dir: Path, refid: str, name: str, members) -> None:
+    body = "".join(
+        MEMBER.format(id=member_id, name=member_name, refs="".join(
+            f'\n        <{tag} refid="{target}" compoundref="x">t</{tag}>' for tag, target in refs
+        ))
+        for member_id, member_name, refs in members
+    )
+    (xml_dir / f"{refid}.xml").write_text(COMPOUND.format(id=refid, name=name, members=body))
+
+
+@pytest.fixture
+def xml_dir(tmp_path):
+    """A two-class XML build with a small reference graph"""
+    xml_dir = tmp_path / "docs" / "xml"
+    xml_dir.mkdir(parents=True)
+    (xml_dir / "index.xml").write_text(INDEX)
+    write_compound(xml_dir, "classApp", "App", APP)
+    write_compound(xml_dir, "classStore", "Store", STORE)
+    return xml_dir
+
+
+def names(graph, nodes):
+    return sorted(graph.names[node] for node in nodes)
+
+
+class TestCallGraph:
+    """Test graph loading and queries"""
+
+    def test_edges_from_both_directions(self, xml_dir):
+        """Test references and referencedby produce one deduplicated edge set"""
+        graph = CallGraph.from_xml(xml_dir)
+        assert graph.node_count == 7
+        assert graph.edge_count == 7
+
+        (run,) = graph.resolve("App::run")
+        assert names(graph, graph.neighbours([run])) == ["App::load", "App::save"]
+        (save,) = graph.resolve("save")
+        assert names(graph, graph.neighbours([save])) == ["Store::write"]
+        (parse,) = graph.resolve("classStore_1b3")
+        assert names(graph, graph.neighbours([parse], reverse=True)) == ["Store::read", "Store::write"]
+
+    def test_members_are_named_by_their_owner(self, xml_dir):
+        """Test members also listed by file and group compounds keep their class name"""
+        listed = [("classApp_1a1", "run", [("references", "classApp_1a2")])]
+        write_compound(xml_dir, "app_8cpp", "app.cpp", listed)
+        write_compound(xml_dir, "group__io", "io", listed)
+        (xml_dir / "index.xml").write_text(INDEX.replace(
+            "</doxygenindex>",
+            '<compound refid="app_8cpp" kind="file"><name>app.cpp</name></compound>\n'
+            '<compound refid="group__io" kind="group"><name>io</name></compound>\n</doxygenindex>',
+        ))
+        graph = CallGraph.from_xml(xml_dir)
+        assert graph.node_count == 7
+        assert names(graph, graph.resolve("run")) == ["App::run"]
+        assert graph.resolve("app.cpp::run") == [] and graph.resolve("io::run") == []
+
+    def test_reachable_and_impact(self, xml_dir):
+        """Test transitive closure in both directions with depth limits and cycles"""
+        graph = CallGraph.from_xml(xml_dir)
+        (run,) = graph.resolve("App::run")
+        (parse,) = graph.resolve("Store::parse")
+
+        reached = dict(graph.reachable([run]))
+        assert names(graph, reached) == sorted(
+            ["App::load", "App::save", "Store::read", "Store::write", "Store::parse"]
+        )
+        assert reached[parse] == 3
+        assert names(graph, dict(graph.reachable([run], max_depth=1))) == ["App::load", "App::save"]
+
+        impact = names(graph, dict(graph.reachable([parse], reverse=True)))
+        assert "App::run" in impact and "App::unused" not in impact
+
+    def test_shortest_path(self, xml_dir):
+        """Test the shortest chain is returned and unreachable targets yield nothing"""
+        graph = CallGraph.from_xml(xml_dir)
+        path = graph.shortest_path(graph.resolve("App::run"), graph.resolve("Store::parse"))
+        assert [graph.names[node] for node in path] == [
+            "App::run", "App::load", "Store::read", "Store::parse"
+        ]
+        assert graph.shortest_path(graph.resolve("App::run"), graph.resolve("App::unused")) == []
+        assert graph.shortest_path(graph.resolve("App::run"), graph.resolve("Store::parse"), max_depth=2) == []
+
+    def test_cache_reloads_on_rebuild(self, xml_dir):
+        """Test a cached graph is reused until index.xml changes"""
+        cache = GraphCache()
+        graph = cache.get(xml_dir.parent)
+        assert cache.get(xml_dir) is graph
+
+        write_compound(xml_dir, "classApp", "App", APP[:1])
+        (xml_dir / "index.xml").write_text(INDEX + "\n")
+        assert cache.get(xml_dir) is not graph
+
+    def test_large_graph_queries_are_fast(self):
+        """Test queries over a million-edge graph stay in the millisecond range"""
+        graph = CallGraph()
+        nodes = 100_000
+        for node in range(nodes):
+            graph._intern(f"m{node}")
+            graph.names[node] = f"N::f{node}"
+        sources, destinations = [], []
+        for node in range(nodes):
+            for step in (1, 7, 31, 127, 997, 4099, 16411, 65537, 3, 11):
+                sources.append(node)
+                destinations.append((node + step) % nodes)
+        graph._finish(array("i", sources), array("i", destinations))
+        assert graph.edge_count == 1_000_000
+
+        started = time.perf_counter()
+        graph.neighbours(graph.resolve("N::f42"), reverse=True)
+        graph.reachable([0], max_depth=2)
+        graph.shortest_path([0], [nodes // 2], max_depth=8)
+        assert time.perf_counter() - started < 0.5
+
+
+class TestQueryTool:
+    """Test the query_call_graph MCP tool"""
+
+    @pytest.mark.asyncio
+    async def test_callers_text(self, xml_dir):
+        """Test a callers query lists direct callers"""
+        result = await query_call_graph(str(xml_dir.parent.parent), "Store::parse", query="callers")
+        assert "🕸️ Call Graph: callers of Store::parse" in result
+        assert "Store::read" in result and "Store::write" in result
+        assert "App::run" not in result
+
+    @pytest.mark.asyncio
+    async def test_path_json(self, xml_dir):
+        """Test a path query returns the ordered chain as JSON"""
+        result = json.loads(await query_call_graph(
+            str(xml_dir), "run", query="path", target="write", response_format="json"
+        ))
+        assert [item["name"] for item in result["items"]] == ["App::run", "App::save", "Store::write"]
+        assert result["edges"] == 7
+
+    @pytest.mark.asyncio
+    async def test_errors(self, xml_dir):
+        """Test unknown queries and symbols are reported"""
+        assert "❌ Unknown query" in await query_call_graph(str(xml_dir), "run", query="siblings")
+        assert "❌ A target symbol" in await query_call_graph(str(xml_dir), "run", query="path")
+        assert "❌ Symbol not found" in await query_call_graph(str(xml_dir), "missing")
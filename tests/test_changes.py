@@ -0,0 +1,218 @@
+"""
+Tests for git-aware file listing and change detection
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp import changes
+from doxygen_mcp.changes import changes_since, list_files, snapshot
+from doxygen_mcp.server import generate_documentation, scan_project
+from doxygen_mcp.tagfiles import tag_registry
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(root, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", "-c", "commit.gpgsign=false", *args],
+        cwd=root, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """A git checkout with a committed source tree and ignored build output"""
+    root = tmp_path / "repo"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "a.cpp").write_text("int a();\n")
+    (root / "src" / "b.cpp").write_text("int b();\n")
+    (root / ".gitignore").write_text("build/\n")
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-q", "-m", "initial")
+    (root / "build").mkdir()
+    (root / "build" / "out.o").write_text("")
+    return root
+
+
+class TestListing:
+    """Test project file enumeration"""
+
+    def test_git_index(self, repository):
+        """Test git checkouts list tracked and untracked files but not ignored or deleted ones"""
+        (repository / "src" / "new.cpp").write_text("")
+        (repository / "src" / "b.cpp").unlink()
+        listing = list_files(repository)
+        assert listing.method == "git"
+        assert [path.relative_to(repository).as_posix() for path in listing.files] == [
+            ".gitignore", "src/a.cpp", "src/new.cpp"
+        ]
+        # A subdirectory of a checkout is listed relative to itself
+        assert [path.name for path in list_files(repository / "src").files] == ["a.cpp", "new.cpp"]
+
+    def test_filesystem_fallback(self, tmp_path, monkeypatch):
+        """Test plain directories, and machines without git, are walked"""
+        (tmp_path / "tree" / ".hidden").mkdir(parents=True)
+        (tmp_path / "tree" / ".hidden" / "x.h").write_text("")
+        (tmp_path / "tree" / "y.h").write_text("")
+        assert list_files(tmp_path / "tree") == ([tmp_path / "tree" / "y.h"], "filesystem")
+
+        monkeypatch.setattr(changes, "_git", lambda root, *args: None)
+        assert list_files(tmp_path / "tree").method == "filesystem"
+
+
+class TestChangeDetection:
+    """Test change sets against build snapshots"""
+
+    def test_git_changes(self, repository):
+        """Test edits, commits, new files and output directories"""
+        state = snapshot(repository, exclude=["docs"])
+        assert state["method"] == "git" and state["dirty"] == {}
+        assert changes_since(repository, state, ["docs"]).changed == []
+
+        (repository / "docs").mkdir()
+        (repository / "docs" / "index.html").write_text("")
+        assert changes_since(repository, state, ["docs"]).changed == []
+
+        (repository / "src" / "a.cpp").write_text("int a(int);\n")
+        (repository / "src" / "c.cpp").write_text("")
+        change_set = changes_since(repository, state, ["docs"])
+        assert change_set.changed == ["src/a.cpp", "src/c.cpp"]
+        assert change_set.base == state["commit"]
+
+        # Committing does not hide changes made since the snapshot's commit
+        git(repository, "add", "src")
+        git(repository, "commit", "-q", "-m", "edit")
+        assert changes_since(repository, state, ["docs"]).changed == ["src/a.cpp", "src/c.cpp"]
+
+    def test_dirty_files_at_snapshot_time(self, repository):
+        """Test uncommitted edits present when building only count if they change again"""
+        (repository / "src" / "a.cpp").write_text("int a(int);\n")
+        state = snapshot(repository)
+        assert list(state["dirty"]) == ["src/a.cpp"]
+        assert changes_since(repository, state).changed == []
+
+        git(repository, "checkout", "--", "src/a.cpp")
+        assert changes_since(repository, state).changed == ["src/a.cpp"]
+
+    def test_unknown_commit(self, repository):
+        """Test snapshots whose commit is gone cannot be compared"""
+        state = snapshot(repository)
+        state["commit"] = "0" * 40
+        assert changes_since(repository, state) is None
+
+    def test_filesystem_changes(self, tmp_path):
+        """Test modified, added and removed files outside git"""
+        tree = tmp_path / "tree"
+        (tree / "out").mkdir(parents=True)
+        (tree / "a.h").write_text("a")
+        (tree / "b.h").write_text("b")
+        state = snapshot(tree, exclude=["out"])
+        assert state["method"] == "filesystem" and sorted(state["files"]) == ["a.h", "b.h"]
+
+        (tree / "a.h").write_text("aa")
+        (tree / "b.h").unlink()
+        (tree / "c.h").write_text("c")
+        (tree / "out" / "index.html").write_text("")
+        restored = json.loads(json.dumps(state))
+        assert changes_since(tree, restored, ["out"]).changed == ["a.h", "b.h", "c.h"]
+
+
+class TestTools:
+    """Test scans and rebuild decisions through the MCP tools"""
+
+    @pytest.mark.asyncio
+    async def test_scan_uses_git(self, repository):
+        """Test scans of a checkout ignore build output"""
+        result = json.loads(await scan_project(str(repository), response_format="json"))
+        assert result["listing"] == "git"
+        assert [(item["extension"], item["count"]) for item in result["items"]] == [(".cpp", 2)]
+
+    @pytest.mark.asyncio
+    async def test_skip_unchanged(self, fake_doxygen, repository):
+        """Test builds are skipped until a file changes"""
+        (repository / "Doxyfile").write_text(
+            'PROJECT_NAME = "Repo"\nINPUT = src\nOUTPUT_DIRECTORY = docs\nRECURSIVE = YES\n'
+        )
+        first = await generate_documentation(str(repository), skip_unchanged=True)
+        assert "✅ Documentation generated successfully!" in first
+        assert "🔍 Changed Files" not in first
+
+        second = await generate_documentation(str(repository), skip_unchanged=True)
+        assert "✅ Documentation is up to date" in second
+        assert "(git index, commit " in second
+        assert len(fake_doxygen.calls()) == 1
+
+        (repository / "src" / "b.cpp").write_text("int b(int);\n")
+        third = json.loads(await generate_documentation(
+            str(repository), skip_unchanged=True, response_format="json"
+        ))
+        assert third["status"] == "success" and third["changed_files"] == 1
+        assert len(fake_doxygen.calls()) == 2
+
+        # Other output formats and missing output always rebuild
+        await generate_documentation(str(repository), output_format="xml", skip_unchanged=True)
+        shutil.rmtree(repository / "docs")
+        await generate_documentation(str(repository), output_format="xml", skip_unchanged=True)
+        assert len(fake_doxygen.calls()) == 4
+
+    @pytest.mark.asyncio
+    async def test_skip_unchanged_settings_and_uncovered_inputs(self, fake_doxygen, repository, tmp_path):
+        """Test other build options, ignored inputs and inputs outside the project force a rebuild"""
+        external = tmp_path / "external"
+        external.mkdir()
+        (external / "api.h").write_text("int api();\n")
+        (repository / "build" / "generated.h").write_text("int generated();\n")
+        (repository / "Doxyfile").write_text(
+            f'PROJECT_NAME = "Repo"\nINPUT = src build {external}\nOUTPUT_DIRECTORY = docs\n'
+        )
+
+        def build(**options):
+            return generate_documentation(str(repository), skip_unchanged=True, **options)
+
+        await build()
+        assert "✅ Documentation is up to date" in await build()
+        assert "✅ Documentation generated successfully!" in await build(diagrams="lazy")
+        assert "✅ Documentation is up to date" in await build(diagrams="lazy")
+        assert len(fake_doxygen.calls()) == 2
+
+        (repository / "build" / "generated.h").write_text("int generated(int);\n")
+        changed = json.loads(await build(diagrams="lazy", response_format="json"))
+        assert changed["status"] == "success" and changed["changed_files"] == 1
+
+        (external / "api.h").write_text("int api(int);\n")
+        changed = json.loads(await build(diagrams="lazy", response_format="json"))
+        assert changed["status"] == "success" and changed["changed_files"] == 1
+        assert "✅ Documentation is up to date" in await build(diagrams="lazy")
+
+    @pytest.mark.asyncio
+    async def test_skip_unchanged_follows_linked_projects_only(self, fake_doxygen, repository, tmp_path):
+        """Test only tag files of projects the sources link to invalidate a skipped build"""
+        (repository / "src" / "a.cpp").write_text('#include "vector.h"\nint a();\n')
+        (repository / "Doxyfile").write_text('PROJECT_NAME = "Repo"\nINPUT = src\nOUTPUT_DIRECTORY = docs\n')
+        unrelated, mathlib = tmp_path / "unrelated.tag", tmp_path / "mathlib.tag"
+        unrelated.write_text("<tagfile/>")
+        mathlib.write_text(
+            '<tagfile><compound kind="file"><name>vector.h</name>'
+            "<filename>vector_8h.html</filename></compound></tagfile>"
+        )
+
+        def build():
+            return generate_documentation(str(repository), skip_unchanged=True)
+
+        await build()
+        tag_registry.register("unrelated", unrelated, "/docs/unrelated")
+        assert "✅ Documentation is up to date" in await build()
+        tag_registry.register("mathlib", mathlib, "/docs/mathlib")
+        assert "🔗 Linked Projects: mathlib" in await build()
+        tag_registry.register("unrelated", unrelated, "/docs/unrelated")
+        assert "✅ Documentation is up to date" in await build()
+        assert len(fake_doxygen.calls()) == 2
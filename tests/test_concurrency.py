@@ -0,0 +1,257 @@
+"""
+Concurrency and performance tests
+
+Drives many simultaneous tool calls through the real FastMCP dispatch, against the
+fake doxygen executable, and checks event-loop responsiveness, timeouts, per-client
+quotas and throughput against fixed thresholds. A regression that blocks the loop
+or serialises builds fails these tests instead of passing silently.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from doxygen_mcp.jobs import build_pool
+from doxygen_mcp.server import mcp
+
+# Thresholds. Generous enough for slow single-core CI machines, where process
+# start-up competes with the event loop for the CPU, yet any build that runs on the
+# event loop thread stalls it for at least BUILD_DELAY and any pool that no longer
+# runs builds in parallel takes at least PARALLEL_BUILDS * BUILD_DELAY.
+BUILD_DELAY = 0.6
+MAX_LOOP_LAG = BUILD_DELAY / 2
+PARALLEL_BUILDS = 8
+
+
+def _text(result) -> str:
+    """Extract the text of a FastMCP call_tool result"""
+    content = result[0] if isinstance(result, tuple) else result
+    if hasattr(content, "content"):
+        content = content.content
+    return "".join(block.text for block in content)
+
+
+class LagProbe:
+    """Measures how late a periodic timer fires while the loop is busy"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - expected)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+@pytest.fixture
+def pool_size():
+    """Run the test with a fixed-size build pool and restore it afterwards"""
+    saved = (build_pool.max_builds, build_pool.max_builds_per_client)
+    build_pool.configure(max_builds=PARALLEL_BUILDS, max_builds_per_client=PARALLEL_BUILDS)
+    yield build_pool
+    build_pool.configure(*saved)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive(fake_doxygen, doxygen_project, pool_size):
+    """Test many concurrent builds never block the event loop"""
+    fake_doxygen.configure(delay=BUILD_DELAY, warnings=2000)
+
+    with LagProbe() as probe:
+        results = await asyncio.gather(*[
+            mcp.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+            for _ in range(2 * PARALLEL_BUILDS)
+        ])
+
+    assert all("✅" in _text(result) for result in results)
+    assert probe.max_lag < MAX_LOOP_LAG, f"event loop stalled for {probe.max_lag:.3f}s"
+
+
+@pytest.mark.asyncio
+async def test_builds_run_in_parallel(fake_doxygen, doxygen_project, pool_size):
+    """Test throughput: a full pool of builds takes about as long as one build"""
+    fake_doxygen.configure(delay=BUILD_DELAY, memory_mb=16)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        mcp.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+        for _ in range(PARALLEL_BUILDS)
+    ])
+    elapsed = time.perf_counter() - started
+
+    assert len(fake_doxygen.calls()) == PARALLEL_BUILDS
+    assert elapsed < BUILD_DELAY * PARALLEL_BUILDS / 2, f"{PARALLEL_BUILDS} builds took {elapsed:.2f}s"
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_concurrent_processes(fake_doxygen, doxygen_project):
+    """Test the number of simultaneous doxygen processes never exceeds the pool size"""
+    saved = (build_pool.max_builds, build_pool.max_builds_per_client)
+    build_pool.configure(max_builds=2, max_builds_per_client=8)
+    try:
+        fake_doxygen.configure(delay=0.2)
+        await asyncio.gather(*[
+            mcp.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+            for _ in range(6)
+        ])
+    finally:
+        build_pool.configure(*saved)
+
+    runs = fake_doxygen.calls()
+    assert len(runs) == 6
+    peak = max(
+        sum(1 for other in runs if other["start"] <= run["start"] < other["end"])
+        for run in runs
+    )
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_per_client_quota_across_sessions(fake_doxygen, doxygen_project):
+    """Test each MCP session is held to its own quota while sharing the pool"""
+    saved = (build_pool.max_builds, build_pool.max_builds_per_client)
+    build_pool.configure(max_builds=8, max_builds_per_client=2)
+    fake_doxygen.configure(delay=0.3)
+    peaks = {}
+
+    async def sample():
+        while True:
+            for client, count in build_pool.stats()["clients"].items():
+                peaks[client] = max(peaks.get(client, 0), count)
+            await asyncio.sleep(0.01)
+
+    async def client_burst():
+        async with create_connected_server_and_client_session(mcp._mcp_server) as session:
+            results = await asyncio.gather(*[
+                session.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+                for _ in range(4)
+            ])
+            return [_text(result) for result in results]
+
+    sampler = asyncio.create_task(sample())
+    try:
+        outputs = await asyncio.gather(client_burst(), client_burst())
+    finally:
+        sampler.cancel()
+        build_pool.configure(*saved)
+
+    assert all("✅" in text for texts in outputs for text in texts)
+    assert len(peaks) == 2
+    assert max(peaks.values()) == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_doxygen(fake_doxygen, doxygen_project):
+    """Test a hung build is stopped at its timeout and the process is killed"""
+    fake_doxygen.configure(delay=30)
+
+    started = time.perf_counter()
+    result = _text(await mcp.call_tool(
+        "generate_documentation", {"project_path": str(doxygen_project), "timeout": 0.5}
+    ))
+    elapsed = time.perf_counter() - started
+
+    assert "timed out after 0.5s" in result
+    assert elapsed < 5
+    (run,) = fake_doxygen.calls(event="start")
+    assert not fake_doxygen.calls()
+    with pytest.raises(ProcessLookupError):
+        os.kill(run["pid"], 0)
+    assert build_pool.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_kills_doxygen(fake_doxygen, doxygen_project):
+    """Test cancelling a tool call does not leave doxygen running"""
+    fake_doxygen.configure(delay=30)
+
+    task = asyncio.create_task(
+        mcp.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+    )
+    while not fake_doxygen.calls(event="start"):
+        await asyncio.sleep(0.02)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    (run,) = fake_doxygen.calls(event="start")
+    with pytest.raises(ProcessLookupError):
+        os.kill(run["pid"], 0)
+    assert build_pool.active == 0
+
+
+@pytest.mark.asyncio
+async def test_warning_flood_is_bounded(fake_doxygen, doxygen_project):
+    """Test a huge stderr warning stream still yields a bounded response"""
+    fake_doxygen.configure(warnings=50000)
+
+    result = _text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project),
+        "verbose": True,
+        "limit": 1000,
+        "max_bytes": 8192,
+    }))
+
+    assert "📊 Warnings: 50000" in result
+    assert len(result.encode("utf-8")) <= 8192
+    assert "cursor=" in result
+
+
+@pytest.mark.asyncio
+async def test_later_warning_pages_do_not_rebuild(fake_doxygen, doxygen_project):
+    """Test cursors page through the stored warnings of the build that issued them"""
+    fake_doxygen.configure(warnings=25)
+    first = json.loads(_text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "limit": 10, "response_format": "json",
+    })))
+    second = json.loads(_text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "cursor": first["next_cursor"], "limit": 10,
+        "response_format": "json",
+    })))
+    assert (second["build_id"], second["offset"], second["returned"]) == (first["build_id"], 10, 10)
+    assert set(first["items"]).isdisjoint(second["items"])
+    assert len(fake_doxygen.calls()) == 1
+
+    invalid = _text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "cursor": "not-a-cursor",
+    }))
+    assert "❌ Invalid cursor" in invalid
+    await mcp.call_tool("generate_documentation", {"project_path": str(doxygen_project)})
+    stale = _text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "cursor": first["next_cursor"],
+    }))
+    assert "❌ The build this cursor belongs to has been superseded" in stale
+    assert len(fake_doxygen.calls()) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_arguments_are_rejected_before_building(fake_doxygen, doxygen_project):
+    """Test a bad response_format or cursor fails without running Doxygen"""
+    unsupported = _text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "response_format": "yaml",
+    }))
+    assert "❌ Unsupported response_format 'yaml'" in unsupported
+    invalid = _text(await mcp.call_tool("generate_documentation", {
+        "project_path": str(doxygen_project), "cursor": "not-a-cursor", "response_format": "json",
+    }))
+    assert "❌ Invalid cursor" in invalid
+    assert fake_doxygen.calls() == []
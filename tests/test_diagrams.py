@@ -0,0 +1,206 @@
+"""
+Tests for on-demand diagrams drawn from Doxygen XML
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.diagrams import DiagramIndex, DiagramRenderer, subgraph, to_dot
+from doxygen_mcp.server import generate_documentation, mcp, render_diagram
+from doxygen_mcp.tagfiles import tag_registry
+
+INDEX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygenindex version="1.9.8">
+  <compound refid="classgeo_1_1Shape" kind="class"><name>geo::Shape</name></compound>
+  <compound refid="classgeo_1_1Point" kind="class"><name>geo::Point</name></compound>
+  <compound refid="classgeo_1_1Circle" kind="class"><name>geo::Circle</name></compound>
+  <compound refid="shape_8hpp" kind="file"><name>shape.hpp</name></compound>
+  <compound refid="circle_8hpp" kind="file"><name>circle.hpp</name></compound>
+</doxygenindex>
+"""
+
+
+def compound(refid, kind, name, body=""):
+    return f"""<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen version="1.9.8">
+  <compounddef id="{refid}" kind="{kind}" prot="public">
+    <compoundname>{name}</compoundname>
+    {body}
+  </compounddef>
+</doxygen>
+"""
+
+
+COMPOUNDS = {
+    "classgeo_1_1Shape": compound("classgeo_1_1Shape", "class", "geo::Shape", """
+    <basecompoundref prot="public" virt="virtual">Printable</basecompoundref>"""),
+    "classgeo_1_1Point": compound("classgeo_1_1Point", "class", "geo::Point", """
+    <basecompoundref refid="classgeo_1_1Shape" prot="public" virt="non-virtual">geo::Shape</basecompoundref>"""),
+    "classgeo_1_1Circle": compound("classgeo_1_1Circle", "class", "geo::Circle", """
+    <basecompoundref refid="classgeo_1_1Shape" prot="public" virt="non-virtual">geo::Shape</basecompoundref>
+    <sectiondef kind="private-attrib">
+      <memberdef kind="variable" id="classgeo_1_1Circle_1a1" prot="private" static="no">
+        <type><ref refid="classgeo_1_1Point" kindref="compound">Point</ref></type>
+        <name>center</name>
+      </memberdef>
+      <memberdef kind="variable" id="classgeo_1_1Circle_1a2" prot="private" static="yes">
+        <type><ref refid="classgeo_1_1Point" kindref="compound">Point</ref></type>
+        <name>origin</name>
+      </memberdef>
+    </sectiondef>"""),
+    "shape_8hpp": compound("shape_8hpp", "file", "shape.hpp", """
+    <includes local="no">string</includes>"""),
+    "circle_8hpp": compound("circle_8hpp", "file", "circle.hpp", """
+    <includes refid="shape_8hpp" local="yes">shape.hpp</includes>"""),
+}
+
+
+@pytest.fixture
+def xml_dir(tmp_path):
+    """A small XML build with a class hierarchy and includes"""
+    xml_dir = tmp_path / "docs" / "xml"
+    xml_dir.mkdir(parents=True)
+    (xml_dir / "index.xml").write_text(INDEX)
+    for refid, text in COMPOUNDS.items():
+        (xml_dir / f"{refid}.xml").write_text(text)
+    return xml_dir
+
+
+class TestSubgraph:
+    """Test subgraphs and their dot source"""
+
+    def test_inheritance(self, xml_dir):
+        """Test ancestors and descendants are collected, including undocumented bases"""
+        index = DiagramIndex.from_xml(xml_dir)
+        assert index.resolve("Shape") == ["classgeo_1_1Shape"]
+        assert index.resolve("geo.Point") == ["classgeo_1_1Point"]
+        graph = subgraph(index, "classgeo_1_1Shape", "inheritance")
+        assert [label for _, label, _ in graph.nodes] == ["geo::Shape", "Printable", "geo::Circle", "geo::Point"]
+        assert graph.nodes[1][2] == ""
+        assert len(graph.edges) == 3 and not graph.truncated
+
+        truncated = subgraph(index, "classgeo_1_1Shape", "inheritance", max_nodes=2)
+        assert len(truncated.nodes) == 2 and truncated.truncated
+
+    def test_collaboration_and_includes(self, xml_dir):
+        """Test non-static members become usage edges and includes are followed both ways"""
+        index = DiagramIndex.from_xml(xml_dir)
+        graph = subgraph(index, "classgeo_1_1Circle", "collaboration")
+        labels = [label for _, label, _ in graph.nodes]
+        assert "geo::Point" in labels and "geo::Shape" in labels
+        assert [edge[3] for edge in graph.edges if edge[2] == "use"] == ["center"]
+
+        includes = subgraph(index, "circle_8hpp", "include")
+        assert [label for _, label, _ in includes.nodes] == ["circle.hpp", "shape.hpp", "string"]
+        included_by = subgraph(index, "shape_8hpp", "included_by")
+        assert [label for _, label, _ in included_by.nodes] == ["shape.hpp", "circle.hpp"]
+
+        with pytest.raises(ValueError):
+            subgraph(index, "shape_8hpp", "inheritance")
+
+    def test_dot_source_is_deterministic(self, xml_dir):
+        """Test equal subgraphs give byte-identical dot source"""
+        first = to_dot(subgraph(DiagramIndex.from_xml(xml_dir), "classgeo_1_1Circle", "collaboration"))
+        second = to_dot(subgraph(DiagramIndex.from_xml(xml_dir), "classgeo_1_1Circle", "collaboration"))
+        assert first == second
+        assert 'URL="classgeo_1_1Point.html"' in first
+        assert 'label="center"' in first
+
+
+class TestRenderer:
+    """Test the SVG cache and the dot pool"""
+
+    @pytest.mark.asyncio
+    async def test_cache_hits(self, fake_doxygen, xml_dir):
+        """Test a diagram is rendered once and served from the cache afterwards"""
+        renderer = DiagramRenderer(max_jobs=2)
+        source = to_dot(subgraph(DiagramIndex.from_xml(xml_dir), "classgeo_1_1Shape", "inheritance"))
+        first = await renderer.render(source)
+        second = await renderer.render(source)
+        assert (first.cached, second.cached) == (False, True)
+        assert first.key == second.key and first.svg == second.svg
+        assert b"<svg" in first.svg and first.path.is_file()
+        assert len(fake_doxygen.calls("dot")) == 1
+        assert renderer.stats()["hits"] == 1
+
+        renderer.configure(max_bytes=1)
+        assert renderer.prune() == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_a_run(self, fake_doxygen, xml_dir):
+        """Test identical concurrent requests start a single dot process"""
+        fake_doxygen.configure(dot={"delay": 0.3})
+        renderer = DiagramRenderer(max_jobs=2)
+        source = to_dot(subgraph(DiagramIndex.from_xml(xml_dir), "circle_8hpp", "include"))
+        results = await asyncio.gather(*(renderer.render(source) for _ in range(4)))
+        assert len({result.key for result in results}) == 1
+        assert len(fake_doxygen.calls("dot")) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_cancelled_requester_does_not_cancel_others(self, fake_doxygen, xml_dir):
+        """Test a shared dot run outlives the requester that started it"""
+        fake_doxygen.configure(dot={"delay": 0.3})
+        renderer = DiagramRenderer(max_jobs=2)
+        source = to_dot(subgraph(DiagramIndex.from_xml(xml_dir), "classgeo_1_1Shape", "inheritance"))
+        first = asyncio.ensure_future(renderer.render(source))
+        await asyncio.sleep(0.1)
+        second = asyncio.ensure_future(renderer.render(source))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        rendered = await second
+        assert b"<svg" in rendered.svg
+        assert len(fake_doxygen.calls("dot")) == 1
+
+
+class TestTools:
+    """Test lazy diagrams through the MCP tools"""
+
+    @pytest.mark.asyncio
+    async def test_render_diagram(self, fake_doxygen, xml_dir):
+        """Test diagrams are rendered for XML directories and errors are reported"""
+        text = await render_diagram(str(xml_dir), "Circle", "collaboration")
+        assert "🎨 Diagram: collaboration of geo::Circle" in text
+        assert "🧮 Graph: 4 nodes, 4 edges" in text
+        assert "<svg" in text
+
+        result = json.loads(await render_diagram(str(xml_dir), "shape.hpp", "included_by", response_format="json"))
+        assert (result["refid"], result["nodes"], result["cached"]) == ("shape_8hpp", 2, False)
+
+        assert "❌ No class or file 'Missing'" in await render_diagram(str(xml_dir), "Missing")
+        assert "❌ Unsupported diagram kind" in await render_diagram(str(xml_dir), "Circle", "calls")
+
+    @pytest.mark.asyncio
+    async def test_lazy_build_skips_dot(self, fake_doxygen, doxygen_project):
+        """Test lazy diagram builds turn dot off and keep XML for later rendering"""
+        result = json.loads(await generate_documentation(
+            str(doxygen_project), diagrams="lazy", response_format="json"
+        ))
+        assert result["diagrams"] == "lazy"
+        overrides = fake_doxygen.calls()[0]["stdin"].split("# Build-time overrides")[1]
+        assert "HAVE_DOT               = NO" in overrides
+        assert "GENERATE_XML           = YES" in overrides
+        assert "❌ Unsupported diagrams" in await generate_documentation(str(doxygen_project), diagrams="svg")
+
+    def test_http_route(self, fake_doxygen, xml_dir):
+        """Test the /diagrams route bounds max_nodes and reports dot failures as plain text"""
+        from starlette.testclient import TestClient
+
+        tag = xml_dir.parent / "geo.tag"
+        tag.write_text("<tagfile/>")
+        tag_registry.register("geo", tag, "/docs/geo", xml_location=str(xml_dir))
+        client = TestClient(mcp.streamable_http_app())
+
+        response = client.get("/diagrams/geo/inheritance/Shape.svg?max_nodes=1000000000")
+        assert response.status_code == 200 and b"<svg" in response.content
+        assert client.get("/diagrams/geo/inheritance/Shape.svg?max_nodes=many").status_code == 400
+
+        fake_doxygen.configure(dot={"exit_code": 1})
+        failed = client.get("/diagrams/geo/collaboration/Circle.svg")
+        assert failed.status_code == 502 and failed.text.startswith("dot failed")
@@ -0,0 +1,265 @@
+"""
+Tests for distributed shard builds on worker processes
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import tarfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp import distributed
+from doxygen_mcp.distributed import (
+    BlobStore, LocalWorker, RemoteWorker, _unpack_directory, merge_tagfiles, parse_workers, plan_shards,
+    shard_doxyfile, worker_build_shard, worker_info,
+)
+from doxygen_mcp.server import generate_documentation
+from doxygen_mcp.storage import state_dir
+from doxygen_mcp.tagfiles import project_slug
+
+
+@pytest.fixture
+def monorepo(tmp_path):
+    """A project with sources spread over several directories"""
+    project = tmp_path / "monorepo"
+    for directory, count, size in (("core", 3, 4000), ("net", 2, 3000), ("ui", 2, 1000), ("util", 1, 500)):
+        (project / directory).mkdir(parents=True)
+        for i in range(count):
+            (project / directory / f"{directory}{i}.cpp").write_text(f"// {directory}{i}\n//" + "x" * size + "\n")
+    (project / "Doxyfile").write_text(
+        'PROJECT_NAME = "Mono"\nINPUT = .\nRECURSIVE = YES\nOUTPUT_DIRECTORY = docs\n'
+    )
+    return project
+
+
+class TestPlanning:
+    """Test shard planning and worker specifications"""
+
+    def test_directories_stay_together(self, monorepo):
+        """Test files of one directory land in one shard and sizes are balanced"""
+        files = sorted(monorepo.rglob("*.cpp"))
+        shards = plan_shards(files, monorepo, 2)
+        assert len(shards) == 2
+        assert sorted(name for shard in shards for name, _ in shard.files) == [
+            f.relative_to(monorepo).as_posix() for f in files
+        ]
+        for shard in shards:
+            directories = {name.split("/")[0] for name, _ in shard.files}
+            for directory in directories:
+                assert all(
+                    name.split("/")[0] != directory
+                    for other in shards if other is not shard for name, _ in other.files
+                )
+        assert abs(shards[0].size - shards[1].size) <= 4000
+
+    def test_more_shards_than_directories(self, monorepo):
+        """Test shard count is capped by the number of directories"""
+        assert len(plan_shards(monorepo.rglob("*.cpp"), monorepo, 16)) == 4
+
+    def test_affinity_survives_replanning(self, monorepo):
+        """Test affinity follows directories, so a new shard plan still finds its worker"""
+        workers = parse_workers("local:2")
+        shards = plan_shards(monorepo.rglob("*.cpp"), monorepo, 4)
+        build = distributed.DistributedBuild(workers, shards, "", monorepo, affinity={"core": "local-1"})
+        core = next(shard for shard in shards if shard.directories == ["core"])
+        assert not build._claimable(workers[0], core) and build._claimable(workers[1], core)
+
+        merged = plan_shards(monorepo.rglob("*.cpp"), monorepo, 2)
+        build = distributed.DistributedBuild(
+            workers, merged, "", monorepo, affinity={"core": "local-1", "util": "local-0"}
+        )
+        (with_core,) = [shard for shard in merged if "core" in shard.directories]
+        assert build._owner(with_core) == "local-1"
+
+    def test_parse_workers(self):
+        """Test local and remote worker specifications"""
+        workers = parse_workers("local:2, http://build-1:8000/mcp")
+        assert [type(worker) for worker in workers] == [LocalWorker, LocalWorker, RemoteWorker]
+        assert [worker.spec for worker in workers][:2] == ["local-0", "local-1"]
+        with pytest.raises(ValueError):
+            parse_workers("ssh://build-1")
+
+
+class TestTransfer:
+    """Test the content-addressed blob store and output archives"""
+
+    def test_blob_store(self, tmp_path):
+        """Test blobs are verified, stored once and reported as present"""
+        store = BlobStore(tmp_path / "blobs")
+        data = b"int main();\n"
+        digest = hashlib.sha256(data).hexdigest()
+        assert store.missing([digest, digest]) == [digest]
+
+        store.put(digest, data)
+        assert store.missing([digest]) == []
+        store.materialize(digest, tmp_path / "ws" / "a" / "main.h")
+        assert (tmp_path / "ws" / "a" / "main.h").read_bytes() == data
+
+        with pytest.raises(ValueError):
+            store.put(digest, b"tampered")
+        with pytest.raises(ValueError):
+            store.path("../../etc/passwd")
+
+    def test_unpack_rejects_escaping_members(self, tmp_path):
+        """Test archives from a worker cannot write outside the shard directory"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            info = tarfile.TarInfo("../evil.html")
+            archive.addfile(info, io.BytesIO(b""))
+        with pytest.raises(ValueError):
+            _unpack_directory(base64.b64encode(buffer.getvalue()).decode(), tmp_path / "out")
+        assert not (tmp_path / "evil.html").exists()
+
+    def test_merge_tagfiles(self, tmp_path):
+        """Test shard tag files are merged with shard-relative HTML paths"""
+        def tag(class_name):
+            return (
+                '<tagfile doxygen_version="1.9.8">'
+                '<compound kind="namespace"><name>app</name><filename>namespaceapp.html</filename>'
+                f'<class kind="class">app::{class_name}</class></compound>'
+                f'<compound kind="class"><name>app::{class_name}</name><filename>class{class_name}.html</filename>'
+                f'<member kind="function"><name>run</name><anchorfile>class{class_name}.html</anchorfile>'
+                '<anchor>a1</anchor></member></compound></tagfile>'
+            )
+
+        path = tmp_path / "merged.tag"
+        assert merge_tagfiles({"shard000": tag("A"), "shard001": tag("B")}, path) == 3
+        root = ET.parse(path).getroot()
+        (namespace,) = root.findall("compound[@kind='namespace']")
+        assert [c.text for c in namespace.findall("class")] == ["app::A", "app::B"]
+        assert namespace.findtext("filename") == "shard000/namespaceapp.html"
+        assert [c.findtext("member/anchorfile") for c in root.findall("compound[@kind='class']")] == [
+            "shard000/classA.html", "shard001/classB.html"
+        ]
+
+
+class TestWorkerSecurity:
+    """Test what a worker accepts from a caller"""
+
+    def test_shard_doxyfile_keeps_only_safe_options(self):
+        """Test filters, paths, commands and environment expansion never reach Doxygen"""
+        text = shard_doxyfile(
+            'PROJECT_NAME = "Mono"\nEXTRACT_ALL = YES\nINPUT_FILTER = "sh -c evil"\n'
+            "FILTER_PATTERNS = *.cpp=evil\nXML_OUTPUT = /etc\nWARN_LOGFILE = /tmp/log\n"
+            "PROJECT_BRIEF = $(HOME)\nHHC_LOCATION = /bin/sh\n"
+        )
+        assert text.split() == ["PROJECT_NAME", "=", '"Mono"', "EXTRACT_ALL", "=", "YES"]
+        with pytest.raises(ValueError):
+            shard_doxyfile("@INCLUDE = /etc/other.cfg\n")
+
+    @pytest.mark.asyncio
+    async def test_worker_tools_require_the_token(self, fake_doxygen, monkeypatch):
+        """Test calls without the shared token are refused and builds use the materialized paths"""
+        assert json.loads(await worker_info())["status"] == "error"  # no token configured
+        monkeypatch.setattr(distributed, "_worker_token", "secret")
+        assert "Unauthorized" in json.loads(await worker_info(token="guess"))["error"]
+        assert json.loads(await worker_info(token="secret"))["status"] == "ok"
+
+        data = b"int main();\n"
+        digest = hashlib.sha256(data).hexdigest()
+        BlobStore().put(digest, data)
+        doxyfile = 'PROJECT_NAME = "Mono"\nINPUT_FILTER = evil\n'
+        refused = await worker_build_shard("shard000", doxyfile, {"core/main.cpp": digest})
+        assert json.loads(refused)["status"] == "error" and not fake_doxygen.calls()
+
+        reply = json.loads(await worker_build_shard("shard000", doxyfile, {"core/main.cpp": digest}, token="secret"))
+        assert reply["status"] == "ok"
+        (build,) = fake_doxygen.calls()
+        assert "INPUT_FILTER" not in build["stdin"]
+        workspace = build["cwd"]
+        assert f"INPUT                  = {os.path.join(workspace, 'src', 'core', 'main.cpp')}" in build["stdin"]
+
+        escaping = await worker_build_shard("shard000", doxyfile, {"../main.cpp": digest}, token="secret")
+        assert "Unsafe shard path" in json.loads(escaping)["error"]
+
+
+class TestDistributedBuild:
+    """Test generate_documentation against local worker processes"""
+
+    @pytest.mark.asyncio
+    async def test_build_on_local_workers(self, fake_doxygen, monorepo):
+        """Test shards run on worker processes and only changed files are re-sent"""
+        result = json.loads(await generate_documentation(
+            str(monorepo), workers="local:2", shards=3, response_format="json"
+        ))
+        assert result["status"] == "success", result
+        assert result["shards"] == 3
+        assert result["cross_shard_links"] is False
+        assert sum(worker["shards_built"] for worker in result["workers"]) == 3
+        assert sum(worker["files_sent"] for worker in result["workers"]) >= 8
+
+        html = monorepo / "docs" / "html"
+        assert sorted(path.name for path in html.glob("shard*")) == ["shard000", "shard001", "shard002"]
+        assert all((html / name / "index.html").exists() for name in ("shard000", "shard001", "shard002"))
+        assert 'href="shard000/index.html"' in (html / "index.html").read_text()
+        tag = ET.parse(result["tag_file"]).getroot()
+        assert all(f.text.startswith("shard") for f in tag.iter("filename"))
+
+        builds = fake_doxygen.calls()
+        assert len(builds) == 3
+        assert all(call["stdin"] and "GENERATE_TAGFILE" in call["stdin"] for call in builds)
+
+        (monorepo / "ui" / "ui0.cpp").write_text("// changed\n")
+        again = json.loads(await generate_documentation(
+            str(monorepo), workers="local:2", shards=3, response_format="json"
+        ))
+        assert again["status"] == "success"
+        # Shards return to the worker holding their sources, so only the edit is sent
+        assert sum(worker["files_sent"] for worker in again["workers"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_unreachable_worker_is_skipped(self, fake_doxygen, monorepo):
+        """Test a dead worker is marked unhealthy and its shards go elsewhere"""
+        result = await generate_documentation(
+            str(monorepo), workers="http://127.0.0.1:9/mcp,local", shards=2
+        )
+        assert "✅ Documentation generated successfully!" in result
+        assert "🌐 Workers: 1 of 2 healthy" in result
+        assert "⚠️ References between shards are not linked" in result
+        assert "⚠️ Worker http://127.0.0.1:9/mcp unavailable" in result
+
+    @pytest.mark.asyncio
+    async def test_silent_worker_times_out(self, fake_doxygen, monorepo, monkeypatch):
+        """Test a worker that accepts connections but never answers loses its shards"""
+        monkeypatch.setattr(distributed, "CONNECT_TIMEOUT", 5.0)
+
+        async def ignore(reader, writer):
+            await reader.read()
+
+        server = await asyncio.start_server(ignore, "127.0.0.1", 0)
+        silent = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/mcp"
+        try:
+            # The silent worker built every directory last time, so the local worker must take over
+            affinity = state_dir("shard-affinity") / f"{project_slug(str(monorepo.resolve()))}.json"
+            affinity.write_text(json.dumps(dict.fromkeys(("core", "net", "ui", "util"), silent)))
+            result = await asyncio.wait_for(
+                generate_documentation(str(monorepo), workers=f"{silent},local", shards=2), 30
+            )
+        finally:
+            server.close()
+        assert "✅ Documentation generated successfully!" in result
+        assert f"⚠️ Worker {silent} unavailable: No MCP handshake within 5s" in result
+
+    @pytest.mark.asyncio
+    async def test_include_is_rejected(self, fake_doxygen, monorepo):
+        """Test Doxyfiles with @INCLUDE are refused before anything is sent"""
+        with open(monorepo / "Doxyfile", "a") as f:
+            f.write("@INCLUDE = common.cfg\n")
+        result = await generate_documentation(str(monorepo), workers="local", shards=1)
+        assert "❌ Distributed builds do not support @INCLUDE" in result
+
+    @pytest.mark.asyncio
+    async def test_failing_shards_are_retried_then_reported(self, fake_doxygen, monorepo):
+        """Test shards are retried and the build fails once attempts run out"""
+        fake_doxygen.configure(exit_code=1)
+        result = await generate_documentation(str(monorepo), workers="local", shards=1)
+        assert "❌ Distributed build failed: 1 of 1 shards" in result
+        assert len(fake_doxygen.calls()) == 3
@@ -0,0 +1,45 @@
+"""
+Tests for Doxyfile parsing and build-time overrides
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.doxyfile import format_overrides, is_enabled, option, parse_doxyfile, split_value
+from doxygen_mcp.server import DoxygenConfig
+
+
+class TestParseDoxyfile:
+    """Test reading existing Doxyfiles"""
+
+    def test_round_trip_generated_config(self):
+        """Test options written by DoxygenConfig are read back"""
+        config = DoxygenConfig(project_name="Round Trip", file_patterns=["*.c", "*.h"])
+        options = parse_doxyfile(config.to_doxyfile())
+
+        assert option(options, "PROJECT_NAME") == "Round Trip"
+        assert split_value(options["FILE_PATTERNS"]) == ["*.c", "*.h"]
+        assert is_enabled(options, "EXTRACT_ALL")
+        assert not is_enabled(options, "GENERATE_LATEX")
+
+    def test_append_and_continuation(self):
+        """Test += appends and backslash continuations"""
+        options = parse_doxyfile(
+            "INPUT = src \\\n        include\n"
+            "INPUT += tools\n"
+            "# INPUT = ignored\n"
+        )
+        assert split_value(options["INPUT"]) == ["src", "include", "tools"]
+
+    def test_windows_paths_survive(self):
+        """Test backslashes in quoted paths are not treated as escapes"""
+        options = parse_doxyfile('OUTPUT_DIRECTORY = "D:\\dev\\my project\\docs"\n')
+        assert option(options, "OUTPUT_DIRECTORY") == "D:\\dev\\my project\\docs"
+
+
+def test_format_overrides():
+    """Test override fragments are valid Doxyfile assignments"""
+    fragment = format_overrides({"GENERATE_TAGFILE": '"out.tag"'})
+    assert parse_doxyfile(fragment) == {"GENERATE_TAGFILE": '"out.tag"'}
+    assert format_overrides({}) == ""
@@ -0,0 +1,198 @@
+"""
+Tests for the pre-flight documentation coverage estimator
+"""
+
+import json
+import os
+import textwrap
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp import estimate
+from doxygen_mcp.estimate import estimate_c_family, estimate_files, estimate_python, summarize_by_directory
+from doxygen_mcp.server import estimate_coverage
+
+PYTHON_SOURCE = textwrap.dedent('''
+    """Geometry helpers."""
+
+    ## A point in the plane
+    class Point:
+        def __init__(self, x, y):
+            """Create a point."""
+
+        def length(self):
+            def inner():
+                """Nested functions are not counted."""
+            return 0
+
+        def __secret(self):
+            pass
+
+    @decorator
+    def add(a, b):
+        """Add two points."""
+
+    try:
+        import fast
+    except ImportError:
+        def fallback():
+            pass
+''')
+
+CPP_SOURCE = textwrap.dedent('''
+    #ifndef SAMPLE_H
+    #define SAMPLE_H
+
+    /// Maximum size
+    #define MAX_SIZE 10
+
+    namespace geo {
+
+    /**
+     * @brief A point.
+     */
+    class Point {
+    public:
+        /// Constructor
+        Point(double x, double y);
+        double length() const;   ///< Distance from origin
+        double x;                ///< X coordinate
+        double y;
+        static Point origin() { return Point(0, 0); }
+
+    private:
+        int cache_;
+    };
+
+    enum class Color { Red, Green, Blue };
+
+    //! Add two points
+    Point add(const Point& a,
+              const Point& b);
+
+    void helper(int n) {
+        for (int i = 0; i < n; ++i) {
+            if (i) { call(i); }
+        }
+        std::string s = "http://example.com";
+    }
+
+    }  // namespace geo
+    #endif
+''')
+
+INDEX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygenindex version="1.9.8">
+  <compound refid="classPoint" kind="class"><name>Point</name></compound>
+</doxygenindex>
+"""
+
+COMPOUND = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen version="1.9.8">
+  <compounddef id="classPoint" kind="class" prot="public">
+    <compoundname>Point</compoundname>
+    <sectiondef kind="public-func">
+      <memberdef kind="function" id="classPoint_1a1"><name>length</name>
+        <briefdescription><para>Length.</para></briefdescription></memberdef>
+      <memberdef kind="function" id="classPoint_1a2"><name>scale</name>
+        <briefdescription></briefdescription></memberdef>
+      <memberdef kind="function" id="classPoint_1a3"><name>rotate</name>
+        <briefdescription></briefdescription></memberdef>
+    </sectiondef>
+    <briefdescription><para>A point.</para></briefdescription>
+  </compounddef>
+</doxygen>
+"""
+
+
+class TestTokenizers:
+    """Test the per-language declaration counters"""
+
+    def test_python(self):
+        """Test docstrings, ## blocks, private and nested definitions"""
+        # module, Point, __init__, length, add, fallback
+        assert estimate_python(PYTHON_SOURCE) == (4, 6)
+        assert estimate_python("def broken(:\n") == (0, 0)
+
+    def test_c_family(self):
+        """Test declarations at namespace and class scope and their doc comments"""
+        # MAX_SIZE, geo, Point, Point(), length, x, y, origin, cache_, Color, add, helper
+        assert estimate_c_family(CPP_SOURCE) == (6, 12)
+
+    def test_java(self):
+        """Test Javadoc comments before classes and methods"""
+        source = textwrap.dedent('''
+            /** Shapes. */
+            public class Shape {
+                /** Area of the shape. */
+                public double area() { return 0; }
+                public String name() {
+                    return "shape";
+                }
+            }
+        ''')
+        assert estimate_c_family(source) == (2, 3)
+
+
+class TestEstimateFiles:
+    """Test parallel estimation and aggregation"""
+
+    def test_process_pool_matches_sequential(self, tmp_path, monkeypatch):
+        """Test the pooled path gives the same counts as in-process estimation"""
+        for i in range(40):
+            (tmp_path / f"mod{i}.py").write_text(PYTHON_SOURCE)
+            (tmp_path / f"src{i}.hpp").write_text(CPP_SOURCE)
+        (tmp_path / "notes.txt").write_text("ignored")
+        files = sorted(tmp_path.iterdir())
+
+        pooled = estimate_files(files)
+        monkeypatch.setattr(estimate, "POOL_THRESHOLD", 10_000)
+        assert estimate_files(files) == pooled
+        assert len(pooled) == 80
+        assert sum(item.total for item in pooled) == 40 * 6 + 40 * 12
+
+    def test_summarize_by_directory(self, tmp_path):
+        """Test directories are aggregated and sorted least documented first"""
+        (tmp_path / "good").mkdir()
+        (tmp_path / "bad").mkdir()
+        (tmp_path / "good" / "a.py").write_text('"""Doc."""\ndef f():\n    """Doc."""\n')
+        (tmp_path / "bad" / "b.py").write_text("def f():\n    pass\n")
+        summary = summarize_by_directory(estimate_files(sorted(tmp_path.rglob("*.py"))), tmp_path)
+        assert [(item["directory"], item["coverage"]) for item in summary] == [("bad", 0.0), ("good", 100.0)]
+
+
+class TestEstimateCoverageTool:
+    """Test the estimate_coverage MCP tool"""
+
+    @pytest.mark.asyncio
+    async def test_reports_error_against_xml(self, tmp_path):
+        """Test the estimate is compared with a real XML build and the error remembered"""
+        project = tmp_path / "geo"
+        (project / "include").mkdir(parents=True)
+        (project / "include" / "point.hpp").write_text(CPP_SOURCE)
+
+        result = await estimate_coverage(str(project))
+        assert "📊 Estimated Coverage: 50.0% (6 of 12 declarations)" in result
+        assert "GENERATE_XML" in result
+
+        xml = project / "docs" / "xml"
+        xml.mkdir(parents=True)
+        (xml / "index.xml").write_text(INDEX)
+        (xml / "classPoint.xml").write_text(COMPOUND)
+        measured = json.loads(await estimate_coverage(str(project), response_format="json"))
+        assert measured["measured"]["actual_coverage"] == 50.0
+        assert measured["measured"]["error_points"] == 0.0
+        assert measured["items"][0]["directory"] == "include"
+
+        (xml / "index.xml").unlink()
+        later = await estimate_coverage(str(project))
+        assert "📏 Last Measured Estimate Error: +0.0 points" in later
+
+    @pytest.mark.asyncio
+    async def test_invalid_paths(self, tmp_path):
+        """Test missing projects and XML directories are reported"""
+        assert "❌ Project path does not exist" in await estimate_coverage(str(tmp_path / "missing"))
+        assert "❌ No Doxygen XML output" in await estimate_coverage(str(tmp_path), xml_path=str(tmp_path))
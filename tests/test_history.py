@@ -0,0 +1,136 @@
+"""
+Tests for build history and build cost prediction
+"""
+
+import json
+import os
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp import history
+from doxygen_mcp.history import (
+    BuildRecord, CostModel, HistoryStore, detect_regression, enabled_features, fit_ridge, history_store,
+)
+from doxygen_mcp.jobs import run_process
+from doxygen_mcp.server import generate_documentation, predict_build_cost
+
+FEATURES = {"have_dot": False, "generate_html": True}
+
+
+def record(seconds, input_bytes=1_000_000, input_files=10, features=FEATURES, status="success", **fields):
+    return BuildRecord(
+        project="Sample", project_path="/src/sample", started_at=0.0, status=status,
+        input_files=input_files, input_bytes=input_bytes, features=dict(features),
+        phases={"doxygen": seconds}, **fields,
+    )
+
+
+class TestModel:
+    """Test the regression model and its helpers"""
+
+    def test_fit_ridge_recovers_linear_relation(self):
+        """Test weights of an exactly linear relation are recovered"""
+        rows = [[1.0, x, x * x % 7] for x in range(1, 20)]
+        targets = [2.0 + 3.0 * x + 0.5 * y for _, x, y in rows]
+        weights = fit_ridge(rows, targets, ridge=1e-9)
+        assert weights == pytest.approx([2.0, 3.0, 0.5], abs=1e-3)
+
+    def test_enabled_features_use_doxygen_defaults(self):
+        """Test options missing from the Doxyfile take Doxygen's defaults"""
+        features = enabled_features({"HAVE_DOT": "YES"}, ["have_dot", "generate_html", "generate_xml"])
+        assert features == {"have_dot": True, "generate_html": True, "generate_xml": False}
+
+    def test_prediction_scales_with_input(self):
+        """Test predictions follow input size and features and are calibrated per project"""
+        dot = {**FEATURES, "have_dot": True}
+        records = [record(size / 1e6, input_bytes=size) for size in (1e6, 2e6, 4e6, 8e6)]
+        records += [record(3 * size / 1e6, input_bytes=size, features=dot) for size in (1e6, 2e6, 4e6, 8e6)]
+        model = CostModel(records)
+        assert model.samples == 8
+        assert model.predict(6_000_000, 10, FEATURES).seconds == pytest.approx(6.0, rel=0.15)
+        assert model.predict(6_000_000, 10, dot).seconds == pytest.approx(18.0, rel=0.15)
+
+        # A project twice as slow as the rest is predicted twice as slow
+        slow = [record(2 * size / 1e6, input_bytes=size) for size in (1e6, 2e6)]
+        calibrated = model.predict(6_000_000, 10, FEATURES, slow)
+        assert calibrated.seconds == pytest.approx(12.0, rel=0.15)
+        assert calibrated.project_samples == 2
+
+        assert CostModel([record(1.0, status="failed")]).predict(1, 1, FEATURES) is None
+
+    def test_detect_regression(self):
+        """Test a build much slower than earlier ones of the same size is flagged"""
+        builds = [record(10.0), record(11.0), record(10.5)]
+        assert detect_regression(builds) is None
+        flagged = detect_regression(builds + [record(30.0)])
+        assert flagged["expected_seconds"] == pytest.approx(10.5)
+        assert flagged["ratio"] == pytest.approx(30.0 / 10.5)
+        # Larger inputs are expected to take longer
+        assert detect_regression(builds + [record(30.0, input_bytes=3_000_000)]) is None
+
+
+class TestHistoryStore:
+    """Test persisted build history"""
+
+    def test_append_and_compact(self, tmp_path, monkeypatch):
+        """Test records are appended per project and old ones dropped at the limit"""
+        monkeypatch.setattr(history, "HISTORY_LIMIT", 3)
+        store = HistoryStore(tmp_path)
+        for seconds in range(5):
+            store.append("sample", record(float(seconds)))
+        store.append("other", record(9.0))
+        assert [r.seconds for r in store.load("sample")] == [2.0, 3.0, 4.0]
+        assert len(store.load_all()) == 4
+        assert store.load("missing") == []
+
+
+class TestRecordedBuilds:
+    """Test builds are recorded and predicted through the MCP tools"""
+
+    @pytest.mark.asyncio
+    async def test_process_resources(self, fake_doxygen, doxygen_project):
+        """Test run_process reports the child's peak memory and CPU time"""
+        fake_doxygen.configure(memory_mb=50)
+        result = await run_process(["doxygen", "Doxyfile"], cwd=str(doxygen_project))
+        assert result.peak_rss >= 50 * 1024 * 1024
+        assert result.cpu_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_builds_are_recorded(self, fake_doxygen, doxygen_project):
+        """Test successful and failed builds are recorded with phases and resources"""
+        fake_doxygen.configure(memory_mb=20, warnings=2)
+        result = json.loads(await generate_documentation(str(doxygen_project), response_format="json"))
+        assert set(result["phases"]) == {"prepare", "queue", "doxygen", "publish", "register"}
+        assert result["peak_rss"] >= 20 * 1024 * 1024
+
+        fake_doxygen.configure(exit_code=1)
+        await generate_documentation(str(doxygen_project))
+        success, failure = history_store.load_all()
+        assert (success.status, failure.status) == ("success", "failed")
+        assert success.project == "Sample" and success.warnings == 2
+        assert success.input_files == 1 and success.input_bytes > 0
+        assert success.features["generate_html"] and not success.features["have_dot"]
+        assert success.doxygen_version == "1.9.8"
+
+    @pytest.mark.asyncio
+    async def test_predict_build_cost(self, fake_doxygen, doxygen_project):
+        """Test predictions need a recorded build and report suggestions"""
+        assert "❌ No builds recorded yet" in await predict_build_cost(str(doxygen_project))
+
+        for _ in range(3):
+            await generate_documentation(str(doxygen_project))
+        text = await predict_build_cost(str(doxygen_project), overrides={"HAVE_DOT": "YES"})
+        assert "⏱️ Predicted Duration:" in text
+        assert "🧠 Predicted Peak Memory:" in text
+        assert "⏳ Suggested Timeout: 60s" in text
+        assert "🎨 Without Diagrams" in text
+        assert "📚 Model: fitted on 3 builds of 1 projects" in text
+
+        result = json.loads(await predict_build_cost(str(doxygen_project), limit=2, response_format="json"))
+        assert result["prediction"]["samples"] == 3
+        assert result["suggested_shards"] == 1
+        assert [item["status"] for item in result["items"]] == ["success", "success"]
+        assert result["next_cursor"]
@@ -0,0 +1,149 @@
+"""
+Tests for the shared build job pool
+
+Verifies global and per-client concurrency limits and graceful draining.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.jobs import BuildPool, DrainingError, client_key, client_label
+from doxygen_mcp.server import _transport_security, main
+
+
+async def _occupy(pool, client, peaks, release):
+    """Hold a slot until release is set, tracking peak concurrency per client"""
+    async with pool.slot(client):
+        peaks[client] = max(peaks.get(client, 0), pool.stats()["clients"][client])
+        peaks["total"] = max(peaks.get("total", 0), pool.active)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_per_client_quota():
+    """Test a single client cannot exceed its quota even with free global slots"""
+    pool = BuildPool(max_builds=8, max_builds_per_client=2)
+    release = asyncio.Event()
+    peaks = {}
+
+    tasks = [asyncio.create_task(_occupy(pool, "a", peaks, release)) for _ in range(5)]
+    tasks.append(asyncio.create_task(_occupy(pool, "b", peaks, release)))
+    await asyncio.sleep(0.05)
+
+    assert pool.active == 3
+    assert pool.stats()["waiting"] == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert peaks["a"] == 2
+    assert peaks["b"] == 1
+    assert pool.active == 0
+    assert pool.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_global_limit():
+    """Test the pool never runs more builds than max_builds"""
+    pool = BuildPool(max_builds=2, max_builds_per_client=4)
+    release = asyncio.Event()
+    peaks = {}
+
+    tasks = [asyncio.create_task(_occupy(pool, f"c{i}", peaks, release)) for i in range(6)]
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert peaks["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_in_flight_builds():
+    """Test draining refuses new builds but lets running ones finish"""
+    pool = BuildPool(max_builds=2)
+    release = asyncio.Event()
+    running = asyncio.create_task(_occupy(pool, "a", {}, release))
+    await asyncio.sleep(0.01)
+
+    drain = asyncio.create_task(pool.drain(timeout=5))
+    await asyncio.sleep(0.01)
+    assert not drain.done()
+
+    with pytest.raises(DrainingError):
+        async with pool.slot("b"):
+            pass
+
+    release.set()
+    assert await drain is True
+    await running
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout():
+    """Test drain reports failure when builds outlive the timeout"""
+    pool = BuildPool(max_builds=1)
+    release = asyncio.Event()
+    running = asyncio.create_task(_occupy(pool, "a", {}, release))
+    await asyncio.sleep(0.01)
+
+    assert await pool.drain(timeout=0.05) is False
+
+    release.set()
+    await running
+
+
+def test_main_rejects_unknown_transport():
+    """Test the CLI validates the transport choice"""
+    with pytest.raises(SystemExit):
+        main(["--transport", "carrier-pigeon"])
+
+
+@pytest.mark.asyncio
+async def test_quota_key_ignores_client_id():
+    """Test a session cannot claim extra quota by sending a different client id per request"""
+    session = object()
+
+    def request(client_id, session_id=None):
+        headers = {"mcp-session-id": session_id} if session_id else {}
+        return SimpleNamespace(
+            client_id=client_id,
+            request_context=SimpleNamespace(session=session, request=SimpleNamespace(headers=headers)),
+        )
+
+    assert client_key(request("alice")) == client_key(request("mallory"))
+    assert client_key(request("alice", "abc")) == client_key(request("mallory", "abc")) == "abc"
+    assert client_label(request("alice")) == "alice"
+
+    pool = BuildPool(max_builds=8, max_builds_per_client=1)
+    release = asyncio.Event()
+
+    async def occupy(ctx):
+        async with pool.slot(client_key(ctx), client_label(ctx)):
+            await release.wait()
+
+    tasks = [asyncio.create_task(occupy(request(name, "abc"))) for name in ("a", "b", "c")]
+    await asyncio.sleep(0.05)
+    assert pool.active == 1
+    assert list(pool.stats()["clients"]) in (["a (abc)"], ["b (abc)"], ["c (abc)"])
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+def test_remote_bind_needs_allowed_hosts():
+    """Test DNS rebinding protection is only relaxed by explicit allowed hosts or opt-out"""
+    with pytest.raises(SystemExit):
+        main(["--transport", "streamable-http", "--host", "0.0.0.0"])
+    with pytest.raises(ValueError):
+        _transport_security("0.0.0.0")
+    assert _transport_security("127.0.0.1") is None
+    assert _transport_security("0.0.0.0", disabled=True) is None
+
+    security = _transport_security("0.0.0.0", "docs.example.com, proxy:8080", "https://docs.example.com")
+    assert security.enable_dns_rebinding_protection
+    assert security.allowed_hosts == ["docs.example.com", "proxy:8080", "docs.example.com:*"]
+    assert security.allowed_origins == ["https://docs.example.com"]
@@ -0,0 +1,147 @@
+"""
+Tests for the documentation metrics warehouse
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.metrics import MetricRow, MetricsStore, bucket_edges, parse_time, warning_counts
+from doxygen_mcp.server import estimate_coverage, generate_documentation, query_metrics, scan_project
+
+
+def at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A warehouse with coverage of three projects over two quarters"""
+    store = MetricsStore(tmp_path / "metrics")
+    store.append("coverage", [
+        MetricRow("/src/web/app", "measured", 50.0, at("2026-02-01")),
+        MetricRow("/src/web/app", "measured", 60.0, at("2026-05-01")),
+        MetricRow("/src/web/site", "measured", 70.0, at("2026-05-02")),
+        MetricRow("/src/core/lib", "measured", 90.0, at("2026-03-01")),
+        MetricRow("/src/core/lib", "estimated", 80.0, at("2026-03-01")),
+    ])
+    return store
+
+
+class TestHelpers:
+    """Test warning classification and time handling"""
+
+    def test_warning_counts(self):
+        """Test warnings are counted per category with zeros kept"""
+        counts = warning_counts([
+            "a.cpp:1: warning: Member f() is not documented.",
+            "a.cpp:2: warning: argument 'x' of command @param is not found",
+            "a.cpp:3: warning: unable to resolve reference to 'Foo' for \\ref command",
+            "a.cpp:4: warning: something odd",
+        ])
+        assert counts == {"undocumented": 1, "parameters": 1, "references": 1, "markup": 0, "other": 1}
+
+    def test_time_bounds_and_buckets(self):
+        """Test ages, ISO dates and calendar bucket labels"""
+        assert parse_time("") is None
+        assert parse_time("2d", now=1_000_000.0) == 1_000_000.0 - 2 * 86400
+        assert parse_time("2026-01-01") == at("2026-01-01")
+        with pytest.raises(ValueError):
+            parse_time("last quarter")
+        edges = bucket_edges(at("2025-12-15"), at("2026-04-01"), "quarter")
+        assert [label for label, _ in edges] == ["2025-Q4", "2026-Q1", "2026-Q2"]
+        assert edges[1][1] == at("2026-01-01")
+
+
+class TestStore:
+    """Test appends and aggregates"""
+
+    def test_group_by_project_and_team(self, store):
+        """Test last values per project and means per team and quarter"""
+        result = store.query("coverage", ["project"], "last", categories=["measured"])
+        assert [(g["project"], g["value"]) for g in result.groups] == [
+            ("/src/core/lib", 90.0), ("/src/web/app", 60.0), ("/src/web/site", 70.0),
+        ]
+        assert (result.rows_scanned, result.rows_total) == (4, 5)
+
+        teams = {"/src/web/*": "web", "/src/core/*": "core"}
+        result = store.query("coverage", ["team"], "mean", bucket="quarter", categories=["measured"], teams=teams)
+        assert [(g["bucket"], g["team"], g["value"], g["rows"]) for g in result.groups] == [
+            ("2026-Q1", "core", 90.0, 1), ("2026-Q1", "web", 50.0, 1), ("2026-Q2", "web", 65.0, 2),
+        ]
+
+    def test_filters_and_windows(self, store):
+        """Test time windows, project globs and ungrouped aggregates"""
+        result = store.query("coverage", [], "count", since=at("2026-03-01"), until=at("2026-05-02"))
+        assert result.groups == [{"value": 3.0, "rows": 3}]
+        result = store.query("coverage", ["category"], "max", projects="/src/core/*")
+        assert [(g["category"], g["value"]) for g in result.groups] == [("estimated", 80.0), ("measured", 90.0)]
+        assert store.query("coverage", ["team"], "sum", projects="/src/none/*").groups == []
+        with pytest.raises(ValueError):
+            store.query("warnings")
+        with pytest.raises(ValueError):
+            store.query("coverage", ["owner"])
+
+    def test_out_of_order_and_torn_appends(self, tmp_path):
+        """Test late rows keep the time column sorted and torn appends are repaired"""
+        store = MetricsStore(tmp_path / "metrics")
+        store.append("files", [MetricRow("p", ".cpp", 3, at("2026-02-01"))])
+        store.append("files", [MetricRow("p", ".cpp", 4, at("2026-01-01"))])
+        (_, _, _, directory), = store.partitions("files")
+        with open(os.path.join(directory, "value.col"), "ab") as f:
+            f.write(b"\0" * 8)  # a crash after writing only one column
+        store.append("files", [MetricRow("p", ".cpp", 5, at("2026-03-01"))])
+
+        result = store.query("files", ["project"], "sum", since=at("2026-02-01"))
+        assert result.groups == [{"project": "p", "value": 12.0, "rows": 3}]
+        assert store.metrics() == ["files"]
+
+    def test_names_added_by_another_store(self, tmp_path):
+        """Test the name cache notices a rewrite that keeps the modification time"""
+        first, second = MetricsStore(tmp_path / "metrics"), MetricsStore(tmp_path / "metrics")
+        first.append("files", [MetricRow("a", ".cpp", 1, at("2026-01-01"))])
+        strings = tmp_path / "metrics" / "strings.json"
+        mtime = strings.stat().st_mtime_ns
+        second.append("files", [MetricRow("b", ".cpp", 2, at("2026-01-02"))])
+        os.utime(strings, ns=(mtime, mtime))  # a rewrite within the file system's clock resolution
+
+        first.append("files", [MetricRow("c", ".cpp", 3, at("2026-01-03"))])
+        assert [group["project"] for group in first.query("files", ["project"], "sum").groups] == ["a", "b", "c"]
+
+
+class TestTools:
+    """Test metrics recorded by tools and queried through the MCP tool"""
+
+    @pytest.mark.asyncio
+    async def test_recorded_metrics(self, fake_doxygen, doxygen_project):
+        """Test builds, scans and coverage estimates feed the warehouse"""
+        assert "❌ No metrics recorded yet" in await query_metrics()
+
+        fake_doxygen.configure(warnings=3)
+        first = json.loads(await generate_documentation(str(doxygen_project), limit=1, response_format="json"))
+        await generate_documentation(str(doxygen_project), cursor=first["next_cursor"], limit=1)
+        await scan_project(str(doxygen_project))
+        await estimate_coverage(str(doxygen_project))
+        assert "build_seconds, warnings" in await query_metrics()
+
+        await scan_project(str(doxygen_project), record_metrics=True)
+        await estimate_coverage(str(doxygen_project), record_metrics=True)
+        assert "build_seconds, coverage, files, warnings" in await query_metrics()
+        result = json.loads(await query_metrics(
+            "warnings", group_by="category", aggregate="sum", since="1d", response_format="json"
+        ))
+        # One build, one set of rows: later pages come from the stored build
+        assert {item["category"]: item["value"] for item in result["items"]}["undocumented"] == 3
+        assert result["rows_scanned"] == 5
+
+        text = await query_metrics("files", group_by="project,category", teams={"*": "docs"})
+        assert f"{doxygen_project.resolve()}  .cpp: 1 (1 rows)" in text
+        text = await query_metrics("coverage", group_by="team", aggregate="mean", bucket="day", teams={"*": "docs"})
+        assert "docs:" in text
+        assert "❌ Unknown aggregate" in await query_metrics("files", aggregate="median")
+        assert "❌ Unrecognised time" in await query_metrics("files", since="yesterday")
@@ -0,0 +1,252 @@
+"""
+Tests for the native Python extractor
+"""
+
+import json
+import os
+import textwrap
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.callgraph import CallGraph
+from doxygen_mcp.estimate import measure_xml_coverage
+from doxygen_mcp.pyextract import escape_refid, extract_python, outline_python, parse_docstring
+from doxygen_mcp.server import (
+    estimate_coverage, generate_documentation, query_call_graph, render_documentation_page,
+)
+from doxygen_mcp.tagfiles import TagIndex
+from doxygen_mcp.xmldiff import iter_xml_records
+
+SOURCES = {
+    "pkg/__init__.py": '''
+        """Sample package"""
+        from .core import Engine
+    ''',
+    "pkg/core.py": '''
+        """Engines and their parts"""
+        from . import util
+
+        ## Default number of cylinders
+        CYLINDERS = 4
+
+        class Base:
+            """Common engine behaviour"""
+
+            def run(self):
+                """Run one cycle"""
+                return self.step()
+
+            def step(self):
+                return util.helper(1)
+
+        class Engine(Base):
+            """A combustion engine"""
+
+            def __init__(self, cylinders: int = CYLINDERS, *, name: str = "v") -> None:
+                """
+                @brief Create an engine
+                @param cylinders Number of cylinders
+                @return Nothing
+                """
+                self.cylinders = cylinders
+
+            def start(self):
+                self.run()
+                return Engine(2)
+
+            def __tune(self):
+                pass
+    ''',
+    "pkg/util.py": '''
+        def helper(x, /, y=2, *args, **options):
+            """Help out"""
+            return x
+    ''',
+}
+
+
+def write_sources(root, sources=SOURCES):
+    for name, text in sources.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(textwrap.dedent(text).lstrip())
+
+
+@pytest.fixture
+def python_project(tmp_path):
+    """A Python-only project with a Doxyfile writing into ./docs"""
+    project = tmp_path / "pyproject"
+    write_sources(project)
+    (project / "Doxyfile").write_text(
+        'PROJECT_NAME = "Engines"\nINPUT = pkg\nOUTPUT_DIRECTORY = docs\nRECURSIVE = YES\n'
+    )
+    return project
+
+
+class TestOutline:
+    """Test source outlines and docstring conversion"""
+
+    def test_outline(self):
+        """Test signatures, documentation sources and calls are captured"""
+        outline = outline_python(textwrap.dedent(SOURCES["pkg/core.py"]))
+        assert outline["doc"] == "Engines and their parts"
+        assert outline["imports"] == [["util", "util", 1]]
+        variable, base, engine = outline["members"]
+        assert (variable["name"], variable["doc"], variable["value"]) == ("CYLINDERS", "Default number of cylinders", "4")
+        assert [member["name"] for member in base["members"]] == ["run", "step"]
+        init = engine["members"][0]
+        assert init["args"] == "(self, cylinders: int=CYLINDERS, *, name: str='v') -> None"
+        assert init["params"][1] == ["cylinders", "int", "CYLINDERS"]
+        assert engine["members"][1]["calls"] == ["Engine", "self.run"]
+
+    def test_parse_docstring(self):
+        """Test Doxygen and Sphinx fields become brief, parameters and returns"""
+        brief, paragraphs, params, returns = parse_docstring(
+            "Add two numbers.\n\nWorks on ints.\n\n:param a: First\n    operand\n:param int b: Second\n:returns: The sum"
+        )
+        assert (brief, paragraphs) == ("Add two numbers.", ["Works on ints."])
+        assert params == [("a", "First operand"), ("b", "Second")]
+        assert returns == "The sum"
+        assert parse_docstring("@brief Short\n@param[in] x Value") == ("Short", [], [("x", "Value")], "")
+
+    def test_escape_refid(self):
+        """Test Doxygen's compound file name escaping"""
+        assert escape_refid("pkg::core::Engine") == "pkg_1_1core_1_1Engine"
+        assert escape_refid("my_module.py") == "my__module_8py"
+
+
+class TestExtraction:
+    """Test XML written by the extractor"""
+
+    def test_compounds_and_references(self, tmp_path):
+        """Test the XML reads like a Doxygen build for coverage, call graphs and tag files"""
+        write_sources(tmp_path)
+        xml_dir, tag_path = tmp_path / "docs" / "xml", tmp_path / "docs" / "engines.tag"
+        result = extract_python(sorted(tmp_path.rglob("*.py")), tmp_path, xml_dir, tag_path, "engines")
+        assert (result.files, result.parsed, result.warnings) == (3, 3, [])
+
+        names = {record.name for record in iter_xml_records(xml_dir)}
+        assert {"pkg::core", "pkg::core::Engine", "pkg::core::Engine::__init__", "pkg::util::helper"} <= names
+        assert "pkg::core::Engine::__tune" not in names
+        assert measure_xml_coverage(xml_dir) == (8, 11)
+
+        graph = CallGraph.from_xml(xml_dir)
+        start = graph.resolve("pkg::core::Engine::start")
+        callees = {graph.names[node] for node in graph.neighbours(start)}
+        assert callees == {"pkg::core::Base::run", "pkg::core::Engine::__init__"}
+        (helper,) = graph.resolve("helper")
+        assert [graph.names[node] for node in graph.neighbours([helper], reverse=True)] == ["pkg::core::Base::step"]
+
+        index = TagIndex.from_tagfile(tag_path)
+        assert index.provides_module("pkg.core")
+        assert index.files["core.py"] == ["pkg/core.py"]
+
+    def test_redefined_classes_are_written_once(self, tmp_path):
+        """Test a fallback class in an except block yields one compound, as in Doxygen"""
+        write_sources(tmp_path, {"compat.py": '''
+            try:
+                from fast import Parser
+            except ImportError:
+                class Parser:
+                    """Pure-Python parser"""
+
+                    def parse(self, text):
+                        return text
+
+                class Parser:
+                    def parse(self, text, strict=False):
+                        return text.strip()
+
+            def load(text):
+                return Parser().parse(text)
+        '''})
+        xml_dir, tag_path = tmp_path / "xml", tmp_path / "compat.tag"
+        extract_python([tmp_path / "compat.py"], tmp_path, xml_dir, tag_path, "compat")
+
+        index = (xml_dir / "index.xml").read_text()
+        assert index.count('refid="classcompat_1_1Parser"') == 1
+        assert index.count("<name>parse</name>") == 1
+        assert tag_path.read_text().count("<name>compat::Parser</name>") == 1
+        namespace = (xml_dir / "namespacecompat.xml").read_text()
+        assert namespace.count("<innerclass") == 1
+        assert "Pure-Python parser" in (xml_dir / "classcompat_1_1Parser.xml").read_text()
+
+    def test_cache_and_syntax_errors(self, tmp_path):
+        """Test unchanged files are not parsed again and broken files are reported"""
+        tree = tmp_path / "tree"
+        write_sources(tree)
+        xml_dir = tree / "xml"
+        extract_python(sorted(tree.rglob("*.py")), tree, xml_dir, None, "engines")
+        (tree / "pkg" / "util.py").write_text("def helper(:\n")
+        result = extract_python(sorted(tree.rglob("*.py")), tree, xml_dir, None, "engines")
+        assert result.parsed == 1
+        (warning,) = result.warnings
+        assert "util.py:1: warning: syntax error" in warning
+        assert not (xml_dir / "namespacepkg_1_1util.xml").exists()
+        assert sorted(path.name for path in tree.iterdir()) == ["pkg", "xml"]
+
+
+class TestTools:
+    """Test Python-only XML builds through the MCP tools"""
+
+    @pytest.mark.asyncio
+    async def test_xml_build_without_doxygen(self, fake_doxygen, python_project):
+        """Test XML builds of Python projects use the extractor and feed the XML tools"""
+        result = json.loads(await generate_documentation(
+            str(python_project), output_format="xml", response_format="json"
+        ))
+        assert result["extractor"] == "python"
+        assert (result["files"], result["parsed"]) == (3, 3)
+        assert fake_doxygen.calls() == []
+
+        page = await render_documentation_page("Engines", "classpkg_1_1core_1_1Engine.html")
+        assert "Create an engine" in page
+        coverage = json.loads(await estimate_coverage(str(python_project), response_format="json"))
+        assert coverage["measured"]["actual_declarations"] == 11
+        callers = await query_call_graph(str(python_project), "helper", "callers")
+        assert "pkg::core::Base::step" in callers
+
+        again = await generate_documentation(str(python_project), output_format="xml")
+        assert "🐍 Extractor: native Python" in again
+        assert "📄 Files: 3 (0 parsed, 3 unchanged)" in again
+
+    @pytest.mark.asyncio
+    async def test_extractor_choice(self, fake_doxygen, python_project, doxygen_project):
+        """Test Doxygen can be forced and the extractor is limited to XML builds"""
+        await generate_documentation(str(python_project), output_format="xml", extractor="doxygen")
+        await generate_documentation(str(python_project))
+        assert len(fake_doxygen.calls()) == 2
+
+        assert "❌ The Python extractor only writes XML" in await generate_documentation(
+            str(python_project), extractor="python"
+        )
+        assert "❌ Unsupported extractor" in await generate_documentation(str(python_project), extractor="sphinx")
+        # Mixed-language projects keep using Doxygen
+        result = json.loads(await generate_documentation(
+            str(doxygen_project), output_format="xml", response_format="json"
+        ))
+        assert result["extractor"] == "doxygen"
+
+    @pytest.mark.asyncio
+    async def test_excluded_inputs_are_not_extracted(self, fake_doxygen, tmp_path):
+        """Test EXCLUDE, EXCLUDE_PATTERNS, FILE_PATTERNS and hidden directories apply as in Doxygen"""
+        project = tmp_path / "excluding"
+        write_sources(project, {
+            "app.py": "def main():\n    pass\n",
+            "vendor/v.py": "def vendored():\n    pass\n",
+            "build/gen.py": "def generated():\n    pass\n",
+            ".venv/lib/site.py": "def site():\n    pass\n",
+            "notes.txt": "not Python\n",
+        })
+        (project / "Doxyfile").write_text(
+            'PROJECT_NAME = "Excluding"\nINPUT = .\nRECURSIVE = YES\nOUTPUT_DIRECTORY = docs\n'
+            "FILE_PATTERNS = *.py\nEXCLUDE = vendor\nEXCLUDE_PATTERNS = */build/*\n"
+        )
+        result = json.loads(await generate_documentation(
+            str(project), output_format="xml", response_format="json"
+        ))
+        assert result["extractor"] == "python" and result["files"] == 1
+        names = sorted(path.name for path in (project / "docs" / "xml").glob("namespace*.xml"))
+        assert names == ["namespaceapp.xml"]
@@ -0,0 +1,202 @@
+"""
+Tests for on-demand HTML rendering from Doxygen XML
+"""
+
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.render import PageCache, PageRenderer, Template, TemplateError, doc_html
+from doxygen_mcp.server import generate_documentation, mcp, render_documentation_page
+from doxygen_mcp.tagfiles import tag_registry
+
+INDEX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygenindex version="1.9.8">
+  <compound refid="classgeo_1_1Point" kind="class"><name>geo::Point</name></compound>
+  <compound refid="namespacegeo" kind="namespace"><name>geo</name></compound>
+</doxygenindex>
+"""
+
+POINT = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen version="1.9.8">
+  <compounddef id="classgeo_1_1Point" kind="class" prot="public">
+    <compoundname>geo::Point</compoundname>
+    <basecompoundref refid="classgeo_1_1Shape" prot="public" virt="non-virtual">geo::Shape</basecompoundref>
+    <sectiondef kind="public-func">
+      <memberdef kind="function" id="classgeo_1_1Point_1a1" prot="public" static="no">
+        <definition>double geo::Point::distance</definition>
+        <argsstring>(const Point &amp;other) const</argsstring>
+        <name>distance</name>
+        <briefdescription><para>Distance to <ref refid="classgeo_1_1Point" kindref="compound">Point</ref> other.</para></briefdescription>
+        <detaileddescription><para>
+          <parameterlist kind="param"><parameteritem>
+            <parameternamelist><parametername>other</parametername></parameternamelist>
+            <parameterdescription><para>The <bold>other</bold> point.</para></parameterdescription>
+          </parameteritem></parameterlist>
+          <simplesect kind="return"><para>Euclidean distance &lt;= inf.</para></simplesect>
+        </para></detaileddescription>
+      </memberdef>
+    </sectiondef>
+    <briefdescription><para>A point.</para></briefdescription>
+    <detaileddescription><para>Uses <computeroutput>double</computeroutput>.</para></detaileddescription>
+    <location file="geo/point.hpp" line="3"/>
+  </compounddef>
+</doxygen>
+"""
+
+
+@pytest.fixture
+def xml_dir(tmp_path):
+    """A small XML build"""
+    xml_dir = tmp_path / "docs" / "xml"
+    xml_dir.mkdir(parents=True)
+    (xml_dir / "index.xml").write_text(INDEX)
+    (xml_dir / "classgeo_1_1Point.xml").write_text(POINT)
+    return xml_dir
+
+
+class TestTemplate:
+    """Test the template engine"""
+
+    def test_render(self):
+        """Test escaping, safe output, loops and conditionals"""
+        template = Template(
+            "{% for m in members %}<{{ m.name }}>{% if m.doc %}{{ m.doc|safe }}{% else %}-{% endif %};"
+            "{% endfor %}{{ missing }}"
+        )
+        assert template.render({"members": [{"name": "a&b", "doc": "<i>x</i>"}, {"name": "c"}]}) == (
+            "<a&amp;b><i>x</i>;<c>-;"
+        )
+
+    def test_errors(self):
+        """Test malformed templates are rejected when parsed"""
+        for source in ("{% for x %}{% endfor %}", "{% if a %}", "{% endif %}", "{% include x %}"):
+            with pytest.raises(TemplateError):
+                Template(source)
+
+
+class TestRendering:
+    """Test XML conversion and page rendering"""
+
+    def test_doc_html(self):
+        """Test Doxygen markup becomes HTML"""
+        element = ET.fromstring(POINT).find(".//memberdef/detaileddescription")
+        html = doc_html(element)
+        assert "<code>other</code>" in html and "<b>other</b>" in html
+        assert "<dt>Returns</dt>" in html and "&lt;= inf" in html
+
+    def test_compound_page(self, xml_dir):
+        """Test a class page lists and documents its members"""
+        page = PageRenderer(PageCache()).render(xml_dir, "classgeo_1_1Point.html", "geo")
+        html = page.body.decode()
+        assert page.status == 200 and not page.cached
+        assert "<h1>geo::Point Class Reference</h1>" in html
+        assert '<a href="classgeo_1_1Shape.html">geo::Shape</a>' in html
+        assert 'id="classgeo_1_1Point_1a1"' in html
+        assert "double geo::Point::distance(const Point &amp;other) const" in html
+        assert '<a href="classgeo_1_1Point.html">Point</a>' in html
+
+    def test_index_page(self, xml_dir):
+        """Test the index groups compounds by kind"""
+        html = PageRenderer(PageCache()).render(xml_dir, "index.html", "geo").body.decode()
+        assert html.index("<h2>Namespaces</h2>") < html.index("<h2>Classes</h2>")
+        assert '<a href="namespacegeo.html">geo</a>' in html
+
+    def test_unknown_pages(self, xml_dir):
+        """Test missing and malicious page names are rejected"""
+        renderer = PageRenderer(PageCache())
+        for page in ("classMissing.html", "../xml/index.html", "a/b.html"):
+            with pytest.raises(FileNotFoundError):
+                renderer.render(xml_dir, page)
+
+
+class TestCaching:
+    """Test ETags and the LRU page cache"""
+
+    def test_etag_and_cache(self, xml_dir):
+        """Test cached pages, 304 responses and invalidation on rebuild"""
+        renderer = PageRenderer(PageCache())
+        first = renderer.render(xml_dir, "classgeo_1_1Point.html")
+        assert renderer.render(xml_dir, "classgeo_1_1Point.html").cached
+
+        not_modified = renderer.render(xml_dir, "classgeo_1_1Point.html", if_none_match=first.etag)
+        assert (not_modified.status, not_modified.body) == (304, b"")
+
+        (xml_dir / "classgeo_1_1Point.xml").write_text(POINT.replace("A point.", "A 2D point."))
+        rebuilt = renderer.render(xml_dir, "classgeo_1_1Point.html", if_none_match=first.etag)
+        assert rebuilt.status == 200 and rebuilt.etag != first.etag and not rebuilt.cached
+        assert b"A 2D point." in rebuilt.body
+
+    def test_lru_is_bounded_by_bytes(self):
+        """Test least recently used pages are evicted to stay within the budget"""
+        cache = PageCache(max_bytes=250)
+        for key in ("a", "b", "c"):
+            cache.put(key, "e", b"x" * 100)
+        assert cache.get("a", "e") is None
+        assert cache.get("b", "e") is not None
+        cache.put("d", "e", b"x" * 100)
+        assert cache.get("c", "e") is None and cache.get("b", "e") is not None
+        cache.put("huge", "e", b"x" * 1000)
+        assert cache.stats()["bytes"] <= 250
+
+
+class TestLazyBuilds:
+    """Test XML-only builds and page serving"""
+
+    @pytest.mark.asyncio
+    async def test_xml_only_build_serves_pages(self, fake_doxygen, doxygen_project):
+        """Test output_format=xml skips HTML and pages render from the registered XML"""
+        fake_doxygen.configure(xml_compounds=[{"refid": "classSample", "kind": "class", "name": "Sample"}])
+        result = json.loads(await generate_documentation(
+            str(doxygen_project), output_format="xml", response_format="json"
+        ))
+        assert result["status"] == "success"
+        assert result["html_index"] is None
+        assert not (doxygen_project / "docs" / "html").exists()
+        (build,) = fake_doxygen.calls()
+        assert "GENERATE_HTML" in build["stdin"] and "GENERATE_XML           = YES" in build["stdin"]
+
+        entry = tag_registry.latest("Sample")
+        assert entry.html_location == "/docs/sample"
+        assert entry.xml_location == result["xml_dir"]
+
+        page = await render_documentation_page("Sample")
+        assert "🏷️ ETag:" in page and '<a href="classSample.html">Sample</a>' in page
+        etag = page.split("🏷️ ETag: ")[1].split("\n")[0]
+        assert "Not modified" in await render_documentation_page("Sample", if_none_match=etag)
+
+    @pytest.mark.asyncio
+    async def test_html_build_has_no_pages(self, fake_doxygen, doxygen_project):
+        """Test projects built without XML explain how to enable on-demand pages"""
+        await generate_documentation(str(doxygen_project))
+        assert 'output_format="xml"' in await render_documentation_page("Sample")
+
+    def test_http_route(self, xml_dir):
+        """Test the /docs route serves registered pages with ETags"""
+        from starlette.testclient import TestClient
+
+        tag = xml_dir.parent / "geo.tag"
+        tag.write_text("<tagfile/>")
+        tag_registry.register("geo", tag, "/docs/geo", xml_location=str(xml_dir))
+        client = TestClient(mcp.streamable_http_app())
+
+        response = client.get("/docs/geo/classgeo_1_1Point.html")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert "geo::Point" in response.text
+
+        cached = client.get("/docs/geo/classgeo_1_1Point.html", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+        assert client.get("/docs/other/index.html").status_code == 404
+
+        (xml_dir / "Doxyfile.xml").write_text("<doxyfile/>")
+        (xml_dir / "broken.xml").write_text("<doxygen><compounddef")
+        for page in ("Doxyfile.html", "broken.html"):
+            response = client.get(f"/docs/geo/{page}")
+            assert response.status_code == 404
+            assert response.text.startswith("Not a documentation page")
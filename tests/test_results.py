@@ -0,0 +1,125 @@
+"""
+Tests for the tool result layer
+
+Covers cursor pagination, top-N truncation totals and the max_bytes budget.
+"""
+
+import json
+import tempfile
+import pytest
+from pathlib import Path
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.results import cursor_build, decode_cursor, encode_cursor, paginate, render_page
+from doxygen_mcp.server import scan_project
+
+
+class TestPagination:
+    """Test cursor-based pagination"""
+
+    def test_cursor_round_trip(self):
+        """Test cursors decode back to their offset"""
+        assert decode_cursor(encode_cursor(42)) == 42
+        assert decode_cursor("") == 0
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_cursors_carry_the_build(self):
+        """Test next cursors name the result they page through"""
+        page = paginate(list(range(30)), limit=10, build="b1")
+        assert cursor_build(page.next_cursor) == "b1"
+        assert decode_cursor(page.next_cursor) == 10
+        assert cursor_build(encode_cursor(5)) == ""
+
+    def test_pages_cover_all_items(self):
+        """Test following next_cursor visits every item exactly once"""
+        items = list(range(23))
+        seen = []
+        cursor = ""
+        while True:
+            page = paginate(items, cursor, limit=10)
+            assert page.total == 23
+            seen.extend(page.items)
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        assert seen == items
+
+
+class TestByteBudget:
+    """Test max_bytes enforcement"""
+
+    def test_json_page_shrinks_to_budget(self):
+        """Test oversized JSON pages drop tail items and move the cursor back"""
+        items = [{"name": f"item-{i:04d}", "payload": "x" * 50} for i in range(100)]
+        page = paginate(items, limit=100)
+        text = render_page(page, str, response_format="json", max_bytes=1000)
+
+        assert len(text.encode("utf-8")) <= 1000
+        data = json.loads(text)
+        assert data["total"] == 100
+        assert 0 < data["returned"] < 100
+        assert decode_cursor(data["next_cursor"]) == data["returned"]
+
+    def test_text_is_clipped_as_last_resort(self):
+        """Test text that cannot fit even an empty page is hard-truncated"""
+        page = paginate([], limit=10)
+        text = render_page(page, lambda p: "y" * 5000, max_bytes=200)
+        assert len(text.encode("utf-8")) <= 200
+        assert "truncated" in text
+
+    def test_json_stays_parseable_as_last_resort(self):
+        """Test JSON that cannot fit even an empty page drops summary fields instead of being cut"""
+        page = paginate(list(range(5)), limit=5)
+        summary = {"status": "success", "details": "z" * 5000}
+        data = json.loads(render_page(page, str, summary=summary, response_format="json", max_bytes=300))
+        assert data["status"] == "success" and data["omitted"] == ["details"]
+        assert data["total"] == 5 and data["returned"] == 0
+
+        data = json.loads(render_page(page, str, summary=summary, response_format="json", max_bytes=10))
+        assert "error" in data
+
+    def test_invalid_response_format(self):
+        """Test unknown response formats are rejected"""
+        with pytest.raises(ValueError):
+            render_page(paginate([]), str, response_format="yaml")
+
+
+@pytest.mark.asyncio
+async def test_scan_project_json_pagination():
+    """Test scan_project structured output and cursor follow-up"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(20):
+            (Path(temp_dir) / f"file.ext{i}").write_text("x")
+
+        first = json.loads(await scan_project(temp_dir, limit=8, response_format="json"))
+        assert first["total_files"] == 20
+        assert first["total"] == 20
+        assert first["returned"] == 8
+
+        second = json.loads(await scan_project(
+            temp_dir, cursor=first["next_cursor"], limit=8, response_format="json"
+        ))
+        assert second["offset"] == 8
+        names = {item["extension"] for item in first["items"] + second["items"]}
+        assert len(names) == 16
+
+
+@pytest.mark.asyncio
+async def test_scan_project_text_footer():
+    """Test the text rendering reports truncation and totals"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(20):
+            (Path(temp_dir) / f"file.ext{i}").write_text("x")
+
+        result = await scan_project(temp_dir)
+
+        assert "Total Files Found: 20" in result
+        assert "Showing extensions 1-15 of 20" in result
+        assert "cursor=" in result
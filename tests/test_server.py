@@ -13,9 +13,12 @@ from unittest.mock import patch, MagicMock
 
 import sys
 import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
 
-from server import DoxygenConfig, mcp, create_doxygen_project, generate_documentation, scan_project, check_doxygen_install
+from doxygen_mcp.server import DoxygenConfig, mcp, create_doxygen_project, generate_documentation, scan_project, check_doxygen_install
+from doxygen_mcp.server import (
+    compare_documentation, estimate_coverage, query_call_graph, register_tag_file, render_documentation_page,
+)
 
 
 class TestDoxygenConfig:
@@ -90,7 +93,40 @@ async def test_create_project_invalid_path():
         language="cpp"
     )
 
-    assert "❌ Failed to create project:" in result
+    assert result.startswith("❌")
+    assert "created successfully" not in result
+
+@pytest.mark.asyncio
+async def test_create_project_outside_allowed_roots(monkeypatch):
+    """Test project creation is confined to the allowed root directories"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setenv("DOXYGEN_MCP_ALLOWED_ROOTS", os.path.join(temp_dir, "elsewhere"))
+        result = await create_doxygen_project(
+            project_name="Test Project",
+            project_path=temp_dir,
+        )
+
+    assert "❌ Project path is not within an allowed root directory" in result
+
+@pytest.mark.asyncio
+async def test_path_arguments_outside_allowed_roots(tmp_path, monkeypatch):
+    """Test every tool that reads or writes a path is confined to the allowed roots"""
+    allowed = tmp_path / "allowed"
+    outside = tmp_path / "outside"
+    for directory in (allowed, outside):
+        directory.mkdir()
+    (outside / "lib.tag").write_text("<tagfile/>")
+    monkeypatch.setenv("DOXYGEN_MCP_ALLOWED_ROOTS", str(allowed))
+
+    denied = "❌ Path is not within an allowed root directory"
+    assert denied in await scan_project(str(outside))
+    assert denied in await estimate_coverage(str(allowed), xml_path=str(outside))
+    assert denied in await register_tag_file("lib", str(outside / "lib.tag"), "/docs/lib")
+    assert denied in await query_call_graph(str(outside), "main")
+    assert denied in await render_documentation_page(str(outside))
+    assert denied in await compare_documentation(str(allowed), str(allowed), save_snapshot=str(outside / "s.gz"))
+    assert denied in await compare_documentation(str(outside), str(allowed))
+    assert not (outside / "s.gz").exists()
 
 @pytest.mark.asyncio
 async def test_scan_project_nonexistent():
@@ -163,19 +199,14 @@ async def test_generate_documentation_no_doxyfile():
         assert "❌ No Doxyfile found" in result
 
 @pytest.mark.asyncio
-@patch('subprocess.run')
-async def test_generate_documentation_success(mock_run):
+async def test_generate_documentation_success(fake_doxygen):
     """Test successful documentation generation"""
     with tempfile.TemporaryDirectory() as temp_dir:
-        # Create a mock Doxyfile
+        # Create a minimal Doxyfile
         doxyfile_path = Path(temp_dir) / "Doxyfile"
         doxyfile_path.write_text("PROJECT_NAME = Test")
         
-        # Mock successful doxygen execution
-        mock_run.side_effect = [
-            MagicMock(returncode=0, stdout="1.9.4\n"),  # version check
-            MagicMock(returncode=0, stderr="")  # documentation generation
-        ]
+        fake_doxygen.configure(version="1.9.4")
         
         result = await generate_documentation(
             project_path=temp_dir,
@@ -183,6 +214,27 @@ async def test_generate_documentation_success(mock_run):
         )
         
         assert "✅ Documentation generated successfully!" in result
+        assert "Doxygen Version: 1.9.4" in result
+        assert len(fake_doxygen.calls()) == 1
+
+@pytest.mark.asyncio
+async def test_generate_documentation_failure(fake_doxygen, doxygen_project):
+    """Test a failing Doxygen run reports its error output"""
+    fake_doxygen.configure(exit_code=3)
+
+    result = await generate_documentation(project_path=str(doxygen_project))
+
+    assert "❌ Documentation generation failed" in result
+    assert "fake doxygen failure" in result
+
+@pytest.mark.asyncio
+async def test_generate_documentation_without_doxygen(doxygen_project, monkeypatch):
+    """Test a missing doxygen executable is reported"""
+    monkeypatch.setenv("PATH", str(doxygen_project))
+
+    result = await generate_documentation(project_path=str(doxygen_project))
+
+    assert "❌ Doxygen not found" in result
 
 
 class TestLanguageDetection:
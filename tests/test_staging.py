@@ -0,0 +1,132 @@
+"""
+Tests for staged builds and atomic output publishing
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp import staging
+from doxygen_mcp.server import generate_documentation
+from doxygen_mcp.staging import swap_into_place, sync_tree
+
+SHM = Path("/dev/shm")
+
+
+def write_tree(root, files):
+    for name, text in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text)
+
+
+def read_tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_text()
+        for path in sorted(root.rglob("*")) if path.is_file()
+    }
+
+
+class TestPublishing:
+    """Test delta syncs and directory swaps"""
+
+    def test_sync_tree_links_unchanged_files(self, tmp_path):
+        """Test unchanged files are hard-linked from the live tree and only changes copied"""
+        live, staged = tmp_path / "live", tmp_path / "staged"
+        write_tree(live, {"same.html": "same", "changed.html": "old", "search/stale.js": "x"})
+        write_tree(staged, {"same.html": "same", "changed.html": "new", "search/added.js": "y"})
+
+        stats = sync_tree(staged, live, tmp_path / "new")
+        assert (stats["files"], stats["copied"], stats["linked"]) == (3, 2, 1)
+        assert read_tree(tmp_path / "new") == {"changed.html": "new", "same.html": "same", "search/added.js": "y"}
+        assert os.stat(tmp_path / "new" / "same.html").st_ino == os.stat(live / "same.html").st_ino
+
+        sync_tree(staged, live, tmp_path / "kept", keep_stale=True)
+        assert "search/stale.js" in read_tree(tmp_path / "kept")
+
+    @pytest.mark.parametrize("atomic", [True, False])
+    def test_swap_into_place(self, tmp_path, monkeypatch, atomic):
+        """Test directories and files are replaced, with and without RENAME_EXCHANGE"""
+        if not atomic:
+            monkeypatch.setattr(staging, "_exchange", lambda first, second: False)
+        write_tree(tmp_path / "html", {"index.html": "old", "old.html": "old"})
+        write_tree(tmp_path / "new", {"index.html": "new"})
+        swap_into_place(tmp_path / "new", tmp_path / "html")
+        assert read_tree(tmp_path / "html") == {"index.html": "new"}
+
+        (tmp_path / "project.tag.new").write_text("tag")
+        swap_into_place(tmp_path / "project.tag.new", tmp_path / "project.tag")
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["html", "project.tag"]
+
+
+class TestStagedBuilds:
+    """Test generate_documentation with staging"""
+
+    @pytest.mark.asyncio
+    async def test_disk_staging(self, fake_doxygen, doxygen_project):
+        """Test Doxygen writes to a hidden directory that is swapped into place"""
+        result = json.loads(await generate_documentation(
+            str(doxygen_project), staging="disk", response_format="json"
+        ))
+        assert result["status"] == "success"
+        assert result["published"]["location"] == "disk"
+        assert result["published"]["entries"] == ["html", "sample.tag"]
+
+        (build,) = fake_doxygen.calls()
+        staging_prefix = str(doxygen_project / "docs" / ".doxygen-staging-")
+        assert f"OUTPUT_DIRECTORY       = {staging_prefix}" in build["stdin"]
+        assert sorted(path.name for path in (doxygen_project / "docs").iterdir()) == ["html", "sample.tag"]
+
+    @pytest.mark.asyncio
+    async def test_failed_build_keeps_published_output(self, fake_doxygen, doxygen_project, tmp_path, monkeypatch):
+        """Test a failing build leaves the previous output and no scratch files behind"""
+        monkeypatch.setattr(staging, "scratch_dirs", [str(tmp_path / "scratch")])
+        (tmp_path / "scratch").mkdir()
+        await generate_documentation(str(doxygen_project))
+        index = doxygen_project / "docs" / "html" / "index.html"
+        index.write_text("published")
+
+        fake_doxygen.configure(exit_code=1)
+        assert "❌ Documentation generation failed" in await generate_documentation(str(doxygen_project))
+        assert index.read_text() == "published"
+        assert list((tmp_path / "scratch").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_no_room_in_memory_falls_back_to_disk(self, fake_doxygen, doxygen_project, tmp_path, monkeypatch):
+        """Test scratch space without enough free memory is not used"""
+        monkeypatch.setattr(staging, "scratch_dirs", [str(tmp_path)])
+        monkeypatch.setattr(staging, "DEFAULT_REQUIRED_BYTES", 1 << 62)
+        result = json.loads(await generate_documentation(str(doxygen_project), response_format="json"))
+        assert result["published"]["location"] == "disk"
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not SHM.is_dir() or not os.access(SHM, os.W_OK), reason="no /dev/shm")
+    async def test_memory_staging_reuses_unchanged_files(self, fake_doxygen, doxygen_project, monkeypatch):
+        """Test tmpfs builds copy only files whose content changed"""
+        if os.stat(SHM).st_dev == os.stat(doxygen_project).st_dev:
+            pytest.skip("/dev/shm shares a file system with the temporary directory")
+        monkeypatch.setattr(staging, "scratch_dirs", [str(SHM)])
+        monkeypatch.setattr(staging, "DEFAULT_REQUIRED_BYTES", 1024)
+        first = json.loads(await generate_documentation(str(doxygen_project), response_format="json"))
+        assert first["published"]["location"] == "memory"
+        assert first["published"]["copied"] == 2
+        inode = os.stat(doxygen_project / "docs" / "html" / "index.html").st_ino
+
+        second = json.loads(await generate_documentation(str(doxygen_project), response_format="json"))
+        assert (second["published"]["copied"], second["published"]["linked"]) == (0, 2)
+        assert os.stat(doxygen_project / "docs" / "html" / "index.html").st_ino == inode
+
+    @pytest.mark.asyncio
+    async def test_staging_off(self, fake_doxygen, doxygen_project):
+        """Test staging can be disabled and unknown modes are rejected"""
+        result = json.loads(await generate_documentation(
+            str(doxygen_project), staging="off", response_format="json"
+        ))
+        assert result["published"] is None
+        overrides = fake_doxygen.calls()[0]["stdin"].split("# Build-time overrides")[1]
+        assert "OUTPUT_DIRECTORY" not in overrides
+        assert "❌ Unsupported staging" in await generate_documentation(str(doxygen_project), staging="ram")
@@ -0,0 +1,126 @@
+"""
+Tests for the cross-project tag file registry
+"""
+
+import pytest
+from pathlib import Path
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.tagfiles import TagIndex, TagRegistry, collect_references, tagfiles_value
+from doxygen_mcp.server import generate_documentation
+
+MATHLIB_TAGFILE = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<tagfile doxygen_version="1.9.8">
+  <compound kind="file">
+    <name>vector.h</name>
+    <path>/src/mathlib/include/mathlib/</path>
+    <filename>vector_8h.html</filename>
+    <class kind="class">mathlib::Vector</class>
+  </compound>
+  <compound kind="namespace">
+    <name>mathlib</name>
+    <filename>namespacemathlib.html</filename>
+  </compound>
+  <compound kind="class">
+    <name>mathlib::Vector</name>
+    <filename>classmathlib_1_1Vector.html</filename>
+    <member kind="function">
+      <name>norm</name>
+      <anchorfile>classmathlib_1_1Vector.html</anchorfile>
+      <anchor>a1</anchor>
+      <arglist>() const</arglist>
+    </member>
+  </compound>
+</tagfile>
+"""
+
+
+@pytest.fixture
+def mathlib_tag(tmp_path):
+    """A tag file for a small upstream library"""
+    path = tmp_path / "mathlib.tag"
+    path.write_text(MATHLIB_TAGFILE)
+    return path
+
+
+class TestTagIndex:
+    """Test tag file indexing"""
+
+    def test_parse(self, mathlib_tag):
+        """Test files and scopes are extracted"""
+        index = TagIndex.from_tagfile(mathlib_tag)
+        assert index.compounds == 3
+        assert "mathlib" in index.symbols
+        assert "mathlib::Vector" in index.symbols
+        assert "vector.h" in index.files
+
+    def test_include_matching(self, mathlib_tag):
+        """Test include paths must match the recorded directory suffix"""
+        index = TagIndex.from_tagfile(mathlib_tag)
+        assert index.provides_include("mathlib/vector.h")
+        assert index.provides_include("vector.h")
+        assert not index.provides_include("other/vector.h")
+        assert not index.provides_include("matrix.h")
+
+    def test_module_matching(self, mathlib_tag):
+        """Test dotted imports match enclosing scopes"""
+        index = TagIndex.from_tagfile(mathlib_tag)
+        assert index.provides_module("mathlib.Vector")
+        assert index.provides_module("mathlib.linalg.solvers")
+        assert not index.provides_module("numpy")
+
+
+class TestRegistry:
+    """Test registration and dependency resolution"""
+
+    def test_register_and_resolve(self, tmp_path, mathlib_tag):
+        """Test a dependent project resolves the upstream tag file"""
+        registry = TagRegistry(tmp_path / "registry")
+        entry = registry.register("MathLib", mathlib_tag, "/docs/mathlib/html", version="2.1")
+        assert entry.project == "mathlib"
+        assert Path(entry.tag_file).is_file()
+
+        source = tmp_path / "app.cpp"
+        source.write_text('#include <mathlib/vector.h>\n#include <vector>\n')
+        refs = collect_references([source])
+        assert refs.includes == {"mathlib/vector.h", "vector"}
+
+        assert registry.resolve(refs) == [entry]
+        assert registry.resolve(refs, exclude_project="MathLib") == []
+        assert tagfiles_value([entry]) == f'"{entry.tag_file}=/docs/mathlib/html"'
+
+    def test_index_cache_tracks_rebuilds(self, tmp_path, mathlib_tag):
+        """Test the in-memory index is reused until the tag file changes"""
+        registry = TagRegistry(tmp_path / "registry")
+        entry = registry.register("mathlib", mathlib_tag, "/html")
+        first = registry.index(entry)
+        assert registry.index(entry) is first
+
+        mathlib_tag.write_text(MATHLIB_TAGFILE.replace("mathlib::Vector", "mathlib::Matrix"))
+        entry = registry.register("mathlib", mathlib_tag, "/html")
+        assert "mathlib::Matrix" in registry.index(entry).symbols
+
+
+@pytest.mark.asyncio
+async def test_generate_documentation_injects_tagfiles(tmp_path, mathlib_tag, fake_doxygen):
+    """Test builds link registered upstream projects and register their own tag file"""
+    from doxygen_mcp.tagfiles import tag_registry
+    tag_registry.register("mathlib", mathlib_tag, "/docs/mathlib/html")
+
+    project = tmp_path / "app"
+    project.mkdir()
+    (project / "main.cpp").write_text('#include "mathlib/vector.h"\n')
+    (project / "Doxyfile").write_text('PROJECT_NAME = "App"\nINPUT = .\nOUTPUT_DIRECTORY = docs\n')
+
+    result = await generate_documentation(project_path=str(project))
+
+    assert "✅ Documentation generated successfully!" in result
+    assert "Linked Projects: mathlib" in result
+    stdin = fake_doxygen.calls()[-1]["stdin"]
+    assert "TAGFILES" in stdin and "/docs/mathlib/html" in stdin
+    assert "GENERATE_TAGFILE" in stdin
+    assert (project / "docs" / "app.tag").is_file()
+    assert [entry.project for entry in tag_registry.entries()] == ["app", "mathlib"]
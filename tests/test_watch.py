@@ -0,0 +1,167 @@
+"""
+Tests for watch mode
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.watch import BuildOutcome, ProjectWatch, diff_signatures, watch_manager
+from doxygen_mcp.server import list_watches, unwatch_project, watch_project
+
+
+class FakeTree:
+    """Scan results and a recording build callback"""
+
+    def __init__(self, build_seconds=0.0):
+        self.files = {"a.cpp": (1, 10)}
+        self.build_seconds = build_seconds
+        self.builds = []
+        self.started = 0
+
+    def scan(self):
+        return dict(self.files)
+
+    def touch(self, name):
+        _, size = self.files.get(name, (0, 0))
+        self.files[name] = (time.time_ns(), size + 1)
+
+    async def build(self, changed):
+        self.started += 1
+        await asyncio.sleep(self.build_seconds)
+        self.builds.append(changed)
+        return BuildOutcome("success", "✅ built")
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+class TestProjectWatch:
+    """Test debouncing, cancellation and the rate limit"""
+
+    def test_diff_signatures(self):
+        """Test added, removed and modified files are reported"""
+        before = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        after = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        assert diff_signatures(before, after) == ["b", "c", "d"]
+
+    @pytest.mark.asyncio
+    async def test_bursts_are_coalesced(self):
+        """Test a burst of saves leads to one rebuild with every changed file"""
+        tree = FakeTree()
+        watch = ProjectWatch("p", tree.scan, tree.build, debounce=0.2, min_interval=0, poll_interval=0.02)
+        watch.start()
+        try:
+            await asyncio.sleep(0.05)
+            for name in ("a.cpp", "b.cpp", "a.cpp"):
+                tree.touch(name)
+                await asyncio.sleep(0.05)
+            await wait_for(lambda: watch.builds == 1)
+            assert tree.builds == [["a.cpp", "b.cpp"]]
+            stats = watch.status()
+            assert stats["state"] == "idle" and stats["last_latency"] >= 0.2
+        finally:
+            await watch.stop()
+        assert watch.state == "stopped"
+
+    @pytest.mark.asyncio
+    async def test_superseded_builds_are_cancelled(self):
+        """Test a change during a rebuild cancels it and the next rebuild covers both changes"""
+        tree = FakeTree(build_seconds=0.5)
+        watch = ProjectWatch("p", tree.scan, tree.build, debounce=0.05, min_interval=0, poll_interval=0.02)
+        watch.start()
+        try:
+            await asyncio.sleep(0.05)
+            tree.touch("a.cpp")
+            await wait_for(lambda: watch.state == "building")
+            tree.touch("b.cpp")
+            await wait_for(lambda: watch.builds == 1)
+            assert (watch.cancelled, tree.started) == (1, 2)
+            assert tree.builds == [["a.cpp", "b.cpp"]]
+        finally:
+            await watch.stop()
+
+    def test_output_notifications_are_ignored(self, tmp_path):
+        """Test notifications from build output do not wake the watch"""
+        tree = FakeTree()
+        watch = ProjectWatch("p", tree.scan, tree.build, roots=[tmp_path], ignored=[tmp_path / "docs"])
+        assert not watch.relevant([str(tmp_path / "docs" / "html" / "index.html"), ""])
+        assert not watch.relevant([str(tmp_path / "docs")])
+        assert watch.relevant([str(tmp_path / "main.cpp")])
+        assert watch.relevant([str(tmp_path / "docs" / "tmp.cpp"), str(tmp_path / "main.cpp")])
+        assert watch.relevant([os.fsencode(tmp_path / "docsrc" / "a.cpp")])
+
+    @pytest.mark.asyncio
+    async def test_rate_limit(self):
+        """Test rebuild starts are spaced by the minimum interval"""
+        tree = FakeTree()
+        watch = ProjectWatch("p", tree.scan, tree.build, debounce=0, min_interval=0.5, poll_interval=0.02)
+        watch.start()
+        try:
+            await asyncio.sleep(0.05)
+            tree.touch("a.cpp")
+            await wait_for(lambda: watch.builds == 1)
+            first = time.monotonic()
+            tree.touch("a.cpp")
+            await wait_for(lambda: watch.builds == 2)
+            assert time.monotonic() - first >= 0.4
+        finally:
+            await watch.stop()
+
+
+class TestTools:
+    """Test watches started through the MCP tools"""
+
+    @pytest.mark.asyncio
+    async def test_watch_rebuilds_on_save(self, fake_doxygen, doxygen_project):
+        """Test saving an input rebuilds, output and other files are ignored, and stats are reported"""
+        text = await watch_project(
+            str(doxygen_project), debounce=0.05, max_rebuilds_per_minute=0, poll_interval=0.05
+        )
+        assert "👀 Watching:" in text and "📄 Watched Files: 2" in text
+        try:
+            (doxygen_project / "notes.txt").write_text("not an input")
+            (doxygen_project / "main.cpp").write_text("/// Entry point\nint main() { return 1; }\n")
+            await wait_for(lambda: len(fake_doxygen.calls()) == 1)
+            await asyncio.sleep(0.3)  # the build's own output must not trigger another rebuild
+
+            result = json.loads(await list_watches(response_format="json"))
+            (stats,) = result["items"]
+            assert stats["builds"] == 1 and stats["state"] == "idle"
+            assert stats["last_result"].startswith("✅ Rebuilt after 1 changed files")
+            assert len(fake_doxygen.calls()) == 1
+            assert "⏱️ Save to Docs:" in await list_watches()
+        finally:
+            stopped = await unwatch_project(str(doxygen_project))
+        assert "🛑 Watch stopped" in stopped
+        assert "❌ Not watching" in await unwatch_project(str(doxygen_project))
+        assert "📭 No projects are being watched" in await list_watches()
+
+    @pytest.mark.asyncio
+    async def test_doxyfile_comments_do_not_rebuild(self, fake_doxygen, doxygen_project):
+        """Test a Doxyfile edit that leaves every option as it was is skipped"""
+        await watch_project(str(doxygen_project), debounce=0.05, max_rebuilds_per_minute=0, poll_interval=0.05)
+        (watch,) = watch_manager.watches()
+        try:
+            doxyfile = doxygen_project / "Doxyfile"
+            doxyfile.write_text("# Documentation settings\n" + doxyfile.read_text().replace(" = ", "   =   "))
+            await wait_for(lambda: watch.skipped == 1)
+            assert watch.last_result == "✅ Only comments or whitespace changed in the Doxyfile"
+            assert fake_doxygen.calls() == []
+
+            with open(doxyfile, "a") as f:
+                f.write("EXTRACT_ALL = YES\n")
+            await wait_for(lambda: watch.builds == 1)
+            assert len(fake_doxygen.calls()) == 1
+        finally:
+            await unwatch_project(str(doxygen_project))
@@ -0,0 +1,152 @@
+"""
+Tests for documentation drift detection between XML builds
+"""
+
+import json
+import pytest
+from pathlib import Path
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from doxygen_mcp.xmldiff import compare, iter_compound_records, iter_snapshot, iter_xml_records, write_snapshot
+from doxygen_mcp.server import compare_documentation
+
+INDEX = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygenindex version="1.9.8">
+  <compound refid="classCalculator" kind="class"><name>Calculator</name></compound>
+</doxygenindex>
+"""
+
+MEMBER = """
+      <memberdef kind="function" id="classCalculator_1{suffix}" prot="public" static="no">
+        <type>double</type>
+        <definition>double Calculator::{name}</definition>
+        <argsstring>{args}</argsstring>
+        <name>{name}</name>
+        <briefdescription><para>{brief}</para></briefdescription>
+        <detaileddescription>{detailed}</detaileddescription>
+        <location file="calculator.h" line="10"/>
+      </memberdef>"""
+
+COMPOUND = """<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen version="1.9.8">
+  <compounddef id="classCalculator" kind="class" prot="public">
+    <compoundname>Calculator</compoundname>
+    <sectiondef kind="public-func">{members}
+    </sectiondef>
+    <briefdescription><para>A simple calculator.</para></briefdescription>
+    <detaileddescription></detaileddescription>
+    <listofallmembers></listofallmembers>
+  </compounddef>
+</doxygen>
+"""
+
+PARAMS = """<para><parameterlist kind="param"><parameteritem>
+<parameternamelist><parametername>a</parametername></parameternamelist>
+<parameterdescription><para>{text}</para></parameterdescription>
+</parameteritem></parameterlist></para>"""
+
+
+def write_build(directory: Path, members) -> Path:
+    """Write a one-class Doxygen XML output with the given members"""
+    directory.mkdir(parents=True)
+    (directory / "index.xml").write_text(INDEX)
+    body = "".join(MEMBER.format(**member) for member in members)
+    (directory / "classCalculator.xml").write_text(COMPOUND.format(members=body))
+    return directory
+
+
+def member(suffix, name, args="(double a, double b)", brief="", detailed=""):
+    return {"suffix": suffix, "name": name, "args": args, "brief": brief, "detailed": detailed}
+
+
+@pytest.fixture
+def builds(tmp_path):
+    """Two builds: add() changes signature, mul() loses docs, sub() removed, div() added"""
+    old = write_build(tmp_path / "old", [
+        member("a1", "add", brief="Adds.", detailed=PARAMS.format(text="first")),
+        member("a2", "sub", brief="Subtracts."),
+        member("a3", "mul", brief="Multiplies."),
+    ])
+    new = write_build(tmp_path / "new", [
+        member("a1", "add", args="(double a, double b, double c)", brief="Adds.",
+               detailed=PARAMS.format(text="first")),
+        member("a3", "mul"),
+        member("a4", "div", brief="Divides."),
+    ])
+    return old, new
+
+
+def test_records_are_sorted_and_compact(builds):
+    """Test a compound yields itself plus its members in refid order"""
+    old, _ = builds
+    records = iter_compound_records(old / "classCalculator.xml")
+    assert [record.refid for record in records] == [
+        "classCalculator", "classCalculator_1a1", "classCalculator_1a2", "classCalculator_1a3"
+    ]
+    add = records[1]
+    assert add.name == "Calculator::add"
+    assert add.documented and add.params and len(add.signature) == 16
+
+
+def test_compare_xml_builds(builds):
+    """Test every change category is detected"""
+    old, new = builds
+    changes, counts = compare(old, new)
+    summary = {(change.change, change.name) for change in changes}
+
+    assert ("changed", "Calculator::add") in summary
+    assert ("removed", "Calculator::sub") in summary
+    assert ("added", "Calculator::div") in summary
+    assert ("undocumented", "Calculator::mul") in summary
+    assert counts["members"] == 4
+
+    add = next(change for change in changes if change.name == "Calculator::add")
+    assert add.fields == ("signature",)
+
+
+def test_snapshot_replaces_old_xml(builds, tmp_path):
+    """Test a saved snapshot compares identically to the XML it came from"""
+    old, new = builds
+    snapshot = tmp_path / "old.tsv.gz"
+    assert write_snapshot(iter_xml_records(old), snapshot) == 4
+    assert list(iter_snapshot(snapshot)) == list(iter_xml_records(old))
+
+    from_xml, _ = compare(old, new)
+    from_snapshot, _ = compare(snapshot, new)
+    assert from_snapshot == from_xml
+
+
+def test_compare_tees_new_snapshot(builds, tmp_path):
+    """Test the new build's snapshot is written during the comparison"""
+    old, new = builds
+    snapshot = tmp_path / "new.tsv.gz"
+    compare(old, new, snapshot_out=snapshot)
+
+    changes, counts = compare(snapshot, new)
+    assert changes == []
+    assert counts["members"] == 4
+
+
+@pytest.mark.asyncio
+async def test_compare_documentation_tool(builds):
+    """Test the MCP tool filters change types and returns JSON"""
+    old, new = builds
+    result = json.loads(await compare_documentation(
+        str(old), str(new), change_types="undocumented", response_format="json"
+    ))
+    assert result["counts"]["undocumented"] == 1
+    assert [item["name"] for item in result["items"]] == ["Calculator::mul"]
+
+    error = await compare_documentation(str(old), str(new), change_types="renamed")
+    assert "❌ Unknown change types" in error
+
+    # Bare snapshot names are kept in the server's data home
+    saved = json.loads(await compare_documentation(
+        str(old), str(new), save_snapshot="drift.tsv.gz", response_format="json"
+    ))
+    assert saved["snapshot"].endswith(os.path.join("snapshots", "drift.tsv.gz"))
+    again = json.loads(await compare_documentation("drift.tsv.gz", str(new), response_format="json"))
+    assert again["total"] == 0